@@ -1,13 +1,14 @@
 """
 API FastAPI para servir os modelos de predição de preço de imóveis
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from pydantic import BaseModel, Field
 import joblib
 import numpy as np
 import pandas as pd
 from typing import List, Optional, Dict
 from pathlib import Path
+import time
 
 try:
     import onnxruntime as rt
@@ -21,8 +22,16 @@ except (ImportError, AttributeError, Exception) as e:
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
-from src.config import MODEL_PKL_PATH, MODEL_ONNX_PATH, PREPROCESSOR_PATH, FEATURE_NAMES_PATH
-from src.feature_engineering import FeatureEngineer  # Importar feature engineering
+from src.config import (
+    MODEL_PKL_PATH, MODEL_ONNX_PATH, PREPROCESSOR_PATH, FEATURE_NAMES_PATH, PIPELINE_PATH, OUTLIER_DETECTOR_PATH,
+    BUNDLE_DIR, DRIFT_REFERENCE_PATH, REQUEST_LOG_ENABLED, RAW_MIN_INPUT_FRACTION
+)
+from src.serving import build_pipeline, load_pipeline  # features + preprocessador + modelo
+from src.outliers import OutlierDetector  # limites das features vistos no treino
+from src.model_export import ModelExporter  # predição ONNX no tipo de entrada do modelo
+from src.bundle import load_bundle  # versão servida: pipeline + ONNX + limites, com manifesto
+from src.drift import DriftMonitor  # sketches das entradas servidas contra os do treino
+from src.request_log import RequestLogger  # log das predições gravado em segundo plano
 
 app = FastAPI(
     title="Ames Housing Price Prediction API",
@@ -35,12 +44,40 @@ model_pkl = None
 model_onnx = None
 preprocessor = None
 feature_names = None
+pipeline = None
+outlier_detector = None
+drift_monitor = None
+request_logger = None
+bundle = None
 
 
 @app.on_event("startup")
 async def load_models():
     """Carrega os modelos na inicialização"""
-    global model_pkl, model_onnx, preprocessor, feature_names
+    global model_pkl, model_onnx, preprocessor, feature_names, pipeline, outlier_detector, drift_monitor, bundle
+    global request_logger
+    
+    # Log das predições: fila em memória gravada em lotes por uma thread
+    if REQUEST_LOG_ENABLED and request_logger is None:
+        request_logger = RequestLogger().start()
+        print(f"Log de requisições em {request_logger.log_dir} ({request_logger.fmt})")
+    
+    # Bundle versionado: tudo da mesma versão, validado pelo manifesto
+    if (BUNDLE_DIR / "LATEST").exists():
+        try:
+            bundle = load_bundle()
+            pipeline = bundle.pipeline
+            model_pkl = bundle.model
+            preprocessor = pipeline.named_steps['preprocessor']
+            feature_names = bundle.schema['feature_names']
+            outlier_detector = bundle.outlier_detector
+            drift_monitor = bundle.drift_monitor
+            model_onnx = bundle.onnx_session if ONNX_AVAILABLE else None
+            print(f"Bundle {bundle.version} carregado em {bundle.load_ms:.1f} ms")
+            return
+        except Exception as e:
+            bundle = None
+            print(f"Bundle inválido ({e}); usando os artefatos soltos")
     
     try:
         # Carregar modelo pickle
@@ -65,6 +102,26 @@ async def load_models():
             feature_names = joblib.load(FEATURE_NAMES_PATH)
             print(f"Feature names carregadas")
         
+        # Pipeline servido (artefatos antigos: monta a partir de modelo + preprocessador)
+        if PIPELINE_PATH.exists():
+            pipeline = load_pipeline(PIPELINE_PATH)
+            model_pkl = pipeline.named_steps['model']
+            preprocessor = pipeline.named_steps['preprocessor']
+            print(f"Pipeline carregado de {PIPELINE_PATH}")
+        elif model_pkl is not None and preprocessor is not None:
+            pipeline = build_pipeline(model_pkl, preprocessor)
+            print("Pipeline montado a partir do modelo e do preprocessador")
+        
+        # Limites das features (sinaliza entradas fora do que o modelo viu)
+        if OUTLIER_DETECTOR_PATH.exists():
+            outlier_detector = OutlierDetector.load(OUTLIER_DETECTOR_PATH)
+            print(f"Limites de outlier carregados ({len(outlier_detector.columns)} features)")
+        
+        # Referência do monitor de drift (sketches do treino)
+        if DRIFT_REFERENCE_PATH.exists():
+            drift_monitor = DriftMonitor.load(DRIFT_REFERENCE_PATH)
+            print(f"Referência de drift carregada ({drift_monitor.memory_bytes / 1024:.0f} KB)")
+        
         if not any([model_pkl, model_onnx]):
             print("Nenhum modelo foi carregado! Execute train.py primeiro.")
         
@@ -72,6 +129,28 @@ async def load_models():
         print(f"Erro ao carregar modelos: {e}")
 
 
+@app.on_event("shutdown")
+async def close_request_log():
+    """Grava o que restou na fila do log de requisições"""
+    if request_logger is not None:
+        request_logger.close()
+
+
+@app.middleware("http")
+async def log_predictions(request: Request, call_next):
+    """Registra entrada, resposta e latência das predições sem esperar pelo disco"""
+    if request_logger is None or not request.url.path.startswith("/predict"):
+        return await call_next(request)
+    start = time.perf_counter()
+    body = await request.body()
+    response = await call_next(request)
+    content = b"".join([chunk async for chunk in response.body_iterator])
+    request_logger.log(request.method, request.url.path, response.status_code,
+                       (time.perf_counter() - start) * 1000, body, content)
+    return Response(content=content, status_code=response.status_code, headers=dict(response.headers),
+                    media_type=response.media_type)
+
+
 class HouseFeatures(BaseModel):
     """Schema de entrada pra API
     
@@ -118,6 +197,18 @@ class PredictionResponse(BaseModel):
     predicted_price: float
     model_used: str
     message: str
+    anomalous_features: List[str] = []  # features fora dos limites do treino
+
+
+def predict_records(records):
+    """Predições + features fora dos limites, com um só feature engineering"""
+    X = pipeline.named_steps['features'].transform(records)
+    predictions = pipeline[1:].predict(X)
+    if drift_monitor is not None:
+        drift_monitor.update(X)
+    if outlier_detector is None:
+        return predictions, [[] for _ in predictions]
+    return predictions, outlier_detector.anomalous_columns(X)
 
 
 @app.get("/")
@@ -130,7 +221,10 @@ async def root():
             "health": "/health",
             "predict_pkl": "/predict/pkl",
             "predict_onnx": "/predict/onnx",
-            "models_info": "/models/info"
+            "models_info": "/models/info",
+            "drift": "/monitoring/drift",
+            "drift_reset": "/monitoring/drift/reset",
+            "request_log": "/monitoring/requests"
         }
     }
 
@@ -143,7 +237,8 @@ async def health_check():
         "models_loaded": {
             "pickle": model_pkl is not None,
             "onnx": model_onnx is not None,
-            "preprocessor": preprocessor is not None
+            "preprocessor": preprocessor is not None,
+            "pipeline": pipeline is not None
         }
     }
 
@@ -152,6 +247,12 @@ async def health_check():
 async def models_info():
     """Retorna informações sobre os modelos"""
     info = {
+        "bundle": {
+            "loaded": bundle is not None,
+            "version": bundle.version if bundle else None,
+            "model": bundle.manifest['model'] if bundle else None,
+            "metrics": bundle.metrics if bundle else None
+        },
         "pickle_model": {
             "loaded": model_pkl is not None,
             "type": str(type(model_pkl).__name__) if model_pkl else None
@@ -161,6 +262,20 @@ async def models_info():
         },
         "preprocessor": {
             "loaded": preprocessor is not None,
+        },
+        "pipeline": {
+            "loaded": pipeline is not None,
+            "steps": [name for name, _ in pipeline.steps] if pipeline else None,
+            "raw_columns": len(pipeline.named_steps['features'].columns_) if pipeline else None
+        },
+        "outlier_bounds": {
+            "loaded": outlier_detector is not None,
+            "method": outlier_detector.method if outlier_detector else None,
+            "n_features": len(outlier_detector.columns) if outlier_detector else None
+        },
+        "drift_monitor": {
+            "loaded": drift_monitor is not None,
+            "memory_bytes": drift_monitor.memory_bytes if drift_monitor else None
         }
     }
     
@@ -170,32 +285,52 @@ async def models_info():
     return info
 
 
+@app.get("/monitoring/drift")
+async def drift_report():
+    """
+    Drift das entradas recebidas desde o último reset contra o treino
+    (PSI por feature, ausentes, categorias não vistas e alertas)
+    """
+    if drift_monitor is None:
+        raise HTTPException(status_code=503, detail="Referência de drift não carregada. Execute train.py primeiro.")
+    return drift_monitor.report()
+
+
+@app.post("/monitoring/drift/reset")
+async def drift_reset():
+    """Zera as contagens do monitor de drift (a referência do treino fica)"""
+    if drift_monitor is None:
+        raise HTTPException(status_code=503, detail="Referência de drift não carregada. Execute train.py primeiro.")
+    drift_monitor.reset()
+    return {"message": "Monitor de drift zerado", "since": drift_monitor.since}
+
+
+@app.get("/monitoring/requests")
+async def request_log_stats():
+    """Contadores do log de requisições (gravadas, descartadas por fila cheia, pendentes)"""
+    if request_logger is None:
+        return {"enabled": False}
+    return {"enabled": True, **request_logger.stats()}
+
+
 @app.post("/predict/pkl", response_model=PredictionResponse)
 async def predict_pkl(features: HouseFeatures):
     """
     Faz predição usando o modelo pickle
     """
-    if model_pkl is None:
+    if pipeline is None:
         raise HTTPException(status_code=503, detail="Modelo pickle não está carregado")
     
     try:
-        # Converter para DataFrame
-        features_dict = features.dict()
-        df = pd.DataFrame([features_dict])
-        
-        # Pré-processar se necessário
-        if preprocessor:
-            X = preprocessor.transform(df)
-        else:
-            X = df.values
-        
-        # Predição
-        prediction = model_pkl.predict(X)[0]
+        # Features, preprocessamento e predição num passo só
+        # (campos não enviados são imputados pelo preprocessador)
+        predictions, anomalies = predict_records(features.dict())
         
         return PredictionResponse(
-            predicted_price=float(prediction),
+            predicted_price=float(predictions[0]),
             model_used="pickle",
-            message="Predição realizada com sucesso"
+            message="Predição realizada com sucesso",
+            anomalous_features=anomalies[0]
         )
     
     except Exception as e:
@@ -220,28 +355,26 @@ async def predict_onnx(features: HouseFeatures):
         )
     
     try:
-        # Converter para DataFrame
-        features_dict = features.dict()
-        df = pd.DataFrame([features_dict])
-        
-        # Pré-processar se necessário
-        if preprocessor:
-            X = preprocessor.transform(df)
+        # Pré-processar com o pipeline (tudo menos o modelo)
+        anomalies = []
+        if pipeline is not None:
+            X_features = pipeline.named_steps['features'].transform(features.dict())
+            X = pipeline[1:-1].transform(X_features)
+            if outlier_detector is not None:
+                anomalies = outlier_detector.anomalous_columns(X_features)[0]
+            if drift_monitor is not None:
+                drift_monitor.update(X_features)
         else:
-            X = df.values
+            X = pd.DataFrame([features.dict()]).values
         
-        # Garantir float32
-        X = X.astype(np.float32)
-        
-        # Predição ONNX
-        input_name = model_onnx.get_inputs()[0].name
-        label_name = model_onnx.get_outputs()[0].name
-        prediction = model_onnx.run([label_name], {input_name: X})[0][0]
+        # Predição ONNX (converte para o tipo da entrada do modelo)
+        prediction = ModelExporter.predict_onnx(model_onnx, np.asarray(X)).ravel()[0]
         
         return PredictionResponse(
             predicted_price=float(prediction),
             model_used="onnx",
-            message="Predição realizada com sucesso usando ONNX"
+            message="Predição realizada com sucesso usando ONNX",
+            anomalous_features=anomalies
         )
     
     except Exception as e:
@@ -253,31 +386,22 @@ async def predict_batch(houses: List[HouseFeatures]):
     """
     Faz predição em lote usando o modelo pickle
     """
-    if model_pkl is None:
+    if pipeline is None:
         raise HTTPException(status_code=503, detail="Modelo pickle não está carregado")
     
     try:
-        # Converter para DataFrame
-        features_list = [house.dict() for house in houses]
-        df = pd.DataFrame(features_list)
-        
-        # Pré-processar se necessário
-        if preprocessor:
-            X = preprocessor.transform(df)
-        else:
-            X = df.values
-        
-        # Predição
-        predictions = model_pkl.predict(X)
+        # Predição do lote inteiro numa chamada só
+        predictions, anomalies = predict_records([house.dict() for house in houses])
         
         # Criar respostas
         responses = [
             PredictionResponse(
                 predicted_price=float(pred),
                 model_used="pickle",
-                message="Predição realizada com sucesso"
+                message="Predição realizada com sucesso",
+                anomalous_features=flagged
             )
-            for pred in predictions
+            for pred, flagged in zip(predictions, anomalies)
         ]
         
         return responses
@@ -295,28 +419,30 @@ async def predict_raw(data: Dict):
     if model_pkl is None:
         raise HTTPException(status_code=503, detail="Modelo não carregado. Execute train.py primeiro.")
     
-    if preprocessor is None:
+    if pipeline is None:
         raise HTTPException(status_code=503, detail="Preprocessador não carregado")
     
+    # Os endpoints tipados imputam os campos ausentes; aqui o registro deve vir do CSV
+    features = pipeline.named_steps['features']
+    missing = bundle.missing_columns(data) if bundle is not None else features.missing_columns(data)
+    n_columns = len(features.columns_)
+    if n_columns - len(missing) < RAW_MIN_INPUT_FRACTION * n_columns:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Registro incompleto: {n_columns - len(missing)} de {n_columns} colunas do esquema "
+                   f"(mínimo {RAW_MIN_INPUT_FRACTION:.0%}); ausentes: {', '.join(missing[:10])}"
+                   + (", ..." if len(missing) > 10 else "")
+        )
+    
     try:
-        # Converter para DataFrame
-        df = pd.DataFrame([data])
-        
-        # APLICAR FEATURE ENGINEERING (igual ao treinamento)
-        fe = FeatureEngineer()
-        df = fe.create_features(df)
-        df = fe.create_interaction_features(df)  # Adicionar features de interação
-        
-        # Pré-processar
-        X = preprocessor.transform(df)
-        
-        # Predição
-        prediction = model_pkl.predict(X)[0]
+        # Mesmo feature engineering do treino, dentro do pipeline
+        predictions, anomalies = predict_records(data)
         
         return PredictionResponse(
-            predicted_price=float(prediction),
+            predicted_price=float(predictions[0]),
             model_used="pickle",
-            message="Predição realizada com sucesso (endpoint raw)"
+            message="Predição realizada com sucesso (endpoint raw)",
+            anomalous_features=anomalies[0]
         )
     
     except Exception as e:
@@ -0,0 +1,390 @@
+"""
+Benchmarks dos caminhos quentes do pipeline
+
+Mede, em lotes de 1 a 100 mil linhas (dados do gerador sintético):
+
+- features/create_features, create_interaction_features, create_all_features
+  e create_record_features (um dict; a API usa o FeatureTransformer do pipeline)
+- preprocess/fit_transform e preprocess/transform
+- outliers/handle_outliers
+- model/<nome>/fit (tamanho de treino fixo) e model/<nome>/predict
+  (modelo recarregado do pickle, como na API)
+- onnx/<nome>/predict (ModelExporter.predict_onnx), com a diferença
+  máxima para o predict do pickle
+
+Cada execução vira um JSON com os metadados da máquina (CPU, memória,
+versões das bibliotecas, commit). O comando compare aponta os
+benchmarks que ficaram mais lentos que o limite entre duas execuções.
+
+Uso:
+    python -m src.benchmark run --out benchmarks/antes.json
+    python -m src.benchmark compare benchmarks/antes.json benchmarks/depois.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.config import (
+    BASE_DIR, BENCHMARK_DIR, BENCHMARK_BATCH_SIZES, BENCHMARK_FIT_ROWS,
+    BENCHMARK_REGRESSION_THRESHOLD, RANDOM_STATE, TARGET_COLUMN
+)
+from src.data_preprocessing import DataPreprocessor, handle_outliers
+from src.feature_engineering import FeatureEngineer
+from src.model_export import ModelExporter, ONNX_AVAILABLE
+from src.model_training import ModelTrainer
+from src.synthetic import SyntheticAmesGenerator
+
+GROUPS = ['features', 'preprocess', 'outliers', 'models', 'onnx']
+MIN_FIT_BATCH = 100  # fit_transform em lotes menores não faz sentido
+MIN_DELTA_MS = 0.05  # diferenças abaixo disso são ruído do relógio
+
+
+def machine_metadata() -> Dict:
+    """CPU, memória, sistema, versões das bibliotecas e commit atual"""
+    import sklearn
+    import xgboost
+    import lightgbm
+
+    metadata = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'packages': {
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'scikit-learn': sklearn.__version__,
+            'xgboost': xgboost.__version__,
+            'lightgbm': lightgbm.__version__
+        }
+    }
+    try:
+        import psutil
+        metadata['memory_gb'] = round(psutil.virtual_memory().total / 1024 ** 3, 1)
+    except ImportError:
+        pass
+    if ONNX_AVAILABLE:
+        import onnxruntime
+        metadata['packages']['onnxruntime'] = onnxruntime.__version__
+    try:
+        metadata['git_commit'] = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+            capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        metadata['git_commit'] = None
+    return metadata
+
+
+def time_call(fn: Callable, min_time: float = 0.2, min_repeats: int = 3,
+              max_repeats: int = 100, warmup: bool = True) -> Dict:
+    """
+    Repete fn até somar min_time (e pelo menos min_repeats vezes)
+
+    Returns:
+        Mediana, mínimo e p90 em milissegundos e o número de repetições
+    """
+    if warmup:
+        fn()
+    timings = []
+    start = time.perf_counter()
+    while len(timings) < max_repeats and (
+            len(timings) < min_repeats or time.perf_counter() - start < min_time):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    timings = np.array(timings) * 1000
+    return {
+        'median_ms': float(np.median(timings)),
+        'min_ms': float(timings.min()),
+        'p90_ms': float(np.percentile(timings, 90)),
+        'repeats': len(timings)
+    }
+
+
+class BenchmarkSuite:
+    """
+    Suíte de benchmarks do pipeline
+
+    Args:
+        batch_sizes: Tamanhos de lote medidos
+        fit_rows: Linhas usadas para ajustar preprocessador e modelos
+        models: Modelos medidos (None = todos do ModelTrainer)
+        min_time: Tempo mínimo (s) de medição por benchmark
+        random_state: Semente do gerador sintético
+    """
+
+    def __init__(self, batch_sizes: List[int] = None, fit_rows: int = BENCHMARK_FIT_ROWS,
+                 models: List[str] = None, min_time: float = 0.2,
+                 random_state: int = RANDOM_STATE):
+        self.batch_sizes = sorted(batch_sizes or BENCHMARK_BATCH_SIZES)
+        self.fit_rows = fit_rows
+        self.models = models
+        self.min_time = min_time
+        self.random_state = random_state
+        self.results = []
+
+    def _prepare(self):
+        """Dados sintéticos: fit_rows linhas de treino + o maior lote"""
+        n_batch = self.batch_sizes[-1]
+        generator = SyntheticAmesGenerator(random_state=self.random_state)
+        self.df_fit = generator.generate_chunk(self.fit_rows, chunk_index=0)
+        self.df_batch = generator.generate_chunk(n_batch, chunk_index=1, start=self.fit_rows)
+
+        fit_features = FeatureEngineer.create_all_features(self.df_fit)
+        batch_features = FeatureEngineer.create_all_features(self.df_batch)
+
+        self.preprocessor = DataPreprocessor()
+        self.X_fit, self.y_fit = self.preprocessor.split_features_target(fit_features)
+        self.X_batch, _ = self.preprocessor.split_features_target(batch_features)
+        with contextlib.redirect_stdout(io.StringIO()):
+            num_features, cat_features = self.preprocessor.identify_feature_types(self.X_fit)
+        self.feature_types = (num_features, cat_features)
+        self.preprocessor.create_preprocessor(num_features, cat_features)
+        self.X_fit_processed = self.preprocessor.fit_transform(self.X_fit)
+        self.X_batch_processed = self.preprocessor.transform(self.X_batch)
+
+    def _record(self, name: str, batch_size: int, stats: Dict, **extra):
+        record = {'benchmark': name, 'batch_size': batch_size, **stats, **extra}
+        record['rows_per_s'] = batch_size / max(stats['median_ms'] / 1000, 1e-12)
+        self.results.append(record)
+        print(f"  {name:<40} n={batch_size:<7} {stats['median_ms']:>10.3f} ms "
+              f"({stats['repeats']} rep.)")
+
+    def _time(self, fn: Callable, **kwargs) -> Dict:
+        # create_features/handle_outliers imprimem a cada chamada
+        def quiet():
+            with contextlib.redirect_stdout(io.StringIO()):
+                fn()
+        return time_call(quiet, min_time=self.min_time, **kwargs)
+
+    def bench_features(self):
+        engineer = FeatureEngineer()
+        for n in self.batch_sizes:
+            batch = self.df_batch.iloc[:n]
+            self._record('features/create_features', n, self._time(lambda: engineer.create_features(batch)))
+            with contextlib.redirect_stdout(io.StringIO()):
+                featured = engineer.create_features(batch)
+            self._record('features/create_interaction_features', n,
+                         self._time(lambda: engineer.create_interaction_features(featured)))
+            self._record('features/create_all_features', n,
+                         self._time(lambda: engineer.create_all_features(batch)))
+        # Um registro (dict) sem pandas; a API não passa por aqui (usa o pipeline)
+        record = {k: (None if pd.isna(v) else v) for k, v in self.df_batch.iloc[0].to_dict().items()}
+        self._record('features/create_record_features', 1,
+                     self._time(lambda: engineer.create_record_features(record)))
+
+    def bench_preprocess(self):
+        num_features, cat_features = self.feature_types
+        for n in self.batch_sizes:
+            X = self.X_batch.iloc[:n]
+            if n >= MIN_FIT_BATCH:
+                def fit_transform():
+                    fresh = DataPreprocessor()
+                    fresh.create_preprocessor(num_features, cat_features)
+                    fresh.fit_transform(X)
+                self._record('preprocess/fit_transform', n, self._time(fit_transform))
+            self._record('preprocess/transform', n, self._time(lambda: self.preprocessor.transform(X)))
+
+    def bench_outliers(self):
+        for n in self.batch_sizes:
+            batch = self.df_batch.iloc[:n]
+            self._record('outliers/handle_outliers', n,
+                         self._time(lambda: handle_outliers(batch, TARGET_COLUMN, method='iqr')))
+
+    def bench_models(self, onnx: bool = True):
+        """Ajuste, predict do pickle e (se possível) predict do ONNX de cada modelo"""
+        models = ModelTrainer(early_stopping_rounds=None).get_models()
+        names = self.models or list(models)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name in names:
+                model = models[name]
+                fit_stats = self._time(lambda: model.fit(self.X_fit_processed, self.y_fit),
+                                       min_repeats=1, warmup=False)
+                self._record(f'model/{name}/fit', self.fit_rows, fit_stats)
+
+                # A API carrega o modelo do pickle: mede esse objeto, não o da memória
+                pkl_path = Path(tmp_dir) / 'model.pkl'
+                joblib.dump(model, pkl_path)
+                loaded = joblib.load(pkl_path)
+
+                session = None
+                if onnx and ONNX_AVAILABLE:
+                    onnx_path = Path(tmp_dir) / 'model.onnx'
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        exported = ModelExporter.export_to_onnx(loaded, self.X_fit_processed, onnx_path)
+                        session = ModelExporter.load_onnx_model(str(onnx_path)) if exported else None
+                    if session is None:
+                        print(f"  onnx/{name}: conversão não suportada, pulando")
+
+                for n in self.batch_sizes:
+                    X = self.X_batch_processed[:n]
+                    self._record(f'model/{name}/predict', n, self._time(lambda: loaded.predict(X)))
+                    if session is not None:
+                        X_onnx = X.astype(ModelExporter.onnx_input_dtype(session))
+                        max_diff = float(np.max(np.abs(
+                            ModelExporter.predict_onnx(session, X_onnx).ravel() - loaded.predict(X))))
+                        self._record(f'onnx/{name}/predict', n,
+                                     self._time(lambda: ModelExporter.predict_onnx(session, X_onnx)),
+                                     max_abs_diff=max_diff)
+
+    def run(self, groups: List[str] = None) -> Dict:
+        """
+        Roda os grupos de benchmarks pedidos
+
+        Args:
+            groups: Subconjunto de GROUPS (None = todos)
+
+        Returns:
+            {'metadata': ..., 'config': ..., 'results': [...]}
+        """
+        groups = groups or GROUPS
+        start = time.perf_counter()
+        print(f"Preparando dados sintéticos ({self.fit_rows:,} + {self.batch_sizes[-1]:,} linhas)...")
+        self._prepare()
+        self.results = []
+
+        if 'features' in groups:
+            self.bench_features()
+        if 'preprocess' in groups:
+            self.bench_preprocess()
+        if 'outliers' in groups:
+            self.bench_outliers()
+        if 'models' in groups or 'onnx' in groups:
+            self.bench_models(onnx='onnx' in groups)
+
+        print(f"Benchmarks concluídos em {time.perf_counter() - start:.1f}s")
+        return {
+            'metadata': machine_metadata(),
+            'config': {
+                'batch_sizes': self.batch_sizes,
+                'fit_rows': self.fit_rows,
+                'models': self.models,
+                'groups': groups,
+                'min_time': self.min_time,
+                'n_features': int(self.X_fit_processed.shape[1])
+            },
+            'results': self.results
+        }
+
+
+def save_results(results: Dict, filepath: str = None) -> Path:
+    """Grava a execução em JSON (padrão: benchmarks/benchmark-<data>.json)"""
+    if filepath is None:
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        filepath = BENCHMARK_DIR / f"benchmark-{stamp}.json"
+    filepath = Path(filepath)
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    with open(filepath, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"Resultados salvos em: {filepath}")
+    return filepath
+
+
+def load_results(filepath) -> Dict:
+    with open(filepath) as f:
+        return json.load(f)
+
+
+def compare_runs(baseline: Dict, current: Dict, threshold: float = BENCHMARK_REGRESSION_THRESHOLD,
+                 metric: str = 'median_ms') -> pd.DataFrame:
+    """
+    Compara duas execuções benchmark a benchmark
+
+    Args:
+        threshold: Aumento relativo de tempo a partir do qual é regressão
+            (0.10 = 10% mais lento)
+        metric: Estatística comparada ('median_ms' ou 'min_ms')
+
+    Returns:
+        DataFrame por (benchmark, batch_size) com os tempos, a variação
+        relativa e o status ('regressão', 'melhora', 'ok', 'novo', 'removido')
+    """
+    def frame(run):
+        df = pd.DataFrame(run['results'])
+        return df.set_index(['benchmark', 'batch_size'])[metric]
+
+    base, curr = frame(baseline), frame(current)
+    df = pd.concat([base.rename('baseline_ms'), curr.rename('current_ms')], axis=1)
+    df['change'] = df['current_ms'] / df['baseline_ms'] - 1
+    delta = (df['current_ms'] - df['baseline_ms']).abs()
+
+    df['status'] = 'ok'
+    df.loc[(df['change'] > threshold) & (delta > MIN_DELTA_MS), 'status'] = 'regressão'
+    df.loc[(df['change'] < -threshold) & (delta > MIN_DELTA_MS), 'status'] = 'melhora'
+    df.loc[df['baseline_ms'].isna(), 'status'] = 'novo'
+    df.loc[df['current_ms'].isna(), 'status'] = 'removido'
+    return df
+
+
+def print_comparison(comparison: pd.DataFrame, baseline: Dict, current: Dict):
+    """Tabela da comparação, com aviso se as máquinas forem diferentes"""
+    base_meta, curr_meta = baseline['metadata'], current['metadata']
+    for key in ('processor', 'cpu_count', 'platform', 'packages'):
+        if base_meta.get(key) != curr_meta.get(key):
+            print(f"AVISO: '{key}' difere entre as execuções; os tempos podem não ser comparáveis")
+
+    # Benchmarks só de uma das execuções (ex: --groups diferentes) entram só na contagem
+    compared = comparison[comparison['status'].isin(['ok', 'regressão', 'melhora'])]
+    print(f"\n{'Benchmark':<40} {'Lote':>7} {'Antes':>11} {'Depois':>11} {'Var.':>8}  Status")
+    for (name, n), row in compared.iterrows():
+        print(f"{name:<40} {n:>7} {row['baseline_ms']:>9.3f}ms {row['current_ms']:>9.3f}ms "
+              f"{row['change']:>+8.1%}  {row['status']}")
+
+    counts = comparison['status'].value_counts()
+    print(f"\nRegressões: {counts.get('regressão', 0)} | Melhoras: {counts.get('melhora', 0)} | "
+          f"Sem mudança: {counts.get('ok', 0)} | Novos: {counts.get('novo', 0)} | "
+          f"Removidos: {counts.get('removido', 0)}")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline Ames Housing")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="Roda a suíte e grava o JSON")
+    run_parser.add_argument('--out', help="Arquivo de saída (padrão: benchmarks/benchmark-<data>.json)")
+    run_parser.add_argument('--batch-sizes', type=int, nargs='+', default=BENCHMARK_BATCH_SIZES)
+    run_parser.add_argument('--fit-rows', type=int, default=BENCHMARK_FIT_ROWS)
+    run_parser.add_argument('--models', nargs='+', help="Modelos medidos (padrão: todos)")
+    run_parser.add_argument('--groups', nargs='+', choices=GROUPS, help="Grupos medidos (padrão: todos)")
+    run_parser.add_argument('--min-time', type=float, default=0.2,
+                            help="Tempo mínimo de medição por benchmark (s)")
+
+    compare_parser = subparsers.add_parser('compare', help="Compara duas execuções")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=BENCHMARK_REGRESSION_THRESHOLD,
+                                help="Aumento relativo considerado regressão (0.10 = 10%%)")
+    compare_parser.add_argument('--metric', choices=['median_ms', 'min_ms'], default='median_ms')
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        suite = BenchmarkSuite(batch_sizes=args.batch_sizes, fit_rows=args.fit_rows,
+                               models=args.models, min_time=args.min_time)
+        save_results(suite.run(groups=args.groups), args.out)
+        return 0
+
+    baseline, current = load_results(args.baseline), load_results(args.current)
+    comparison = compare_runs(baseline, current, threshold=args.threshold, metric=args.metric)
+    print_comparison(comparison, baseline, current)
+    # Código de saída 1 com regressões (útil em CI)
+    return int((comparison['status'] == 'regressão').any())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
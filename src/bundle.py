@@ -0,0 +1,327 @@
+"""
+Bundle versionado do modelo servido: um diretório com manifesto
+
+Os artefatos soltos (best_model.pkl, preprocessor.pkl, feature_names.pkl,
+pipeline.pkl, outlier_detector.pkl, best_model.onnx) são gravados um a um
+pelo train.py, pelo streaming e pelo modo incremental: uma falha no meio
+deixa a API com modelo de uma versão e limites/ONNX de outra. Aqui tudo o
+que a API serve vira uma versão em models/bundles/<versão>/:
+
+    manifest.json         versões das bibliotecas, checksums, esquema das
+                          features e métricas do treino
+    pipeline.pkl          features + preprocessador + modelo
+    model.onnx            (opcional) mesmo modelo em ONNX
+    outlier_detector.pkl  (opcional) limites das features de entrada
+    drift_reference.pkl   (opcional) sketches de referência do monitor de drift
+
+A versão é montada num diretório temporário e só então o arquivo LATEST
+passa a apontar para ela (troca atômica); as versões mais antigas que
+BUNDLE_KEEP são apagadas.
+
+Os pickles são gravados sem compressão: joblib.load(mmap_mode='r') mapeia
+os arrays numpy grandes (coeficientes, categorias do one-hot, centróides
+dos sketches) direto do arquivo em vez de copiá-los para a memória do
+processo, e vários workers da API compartilham as mesmas páginas.
+
+load_bundle confere o manifesto (formato, arquivos, tamanhos e sha256)
+antes de abrir; a sessão ONNX só é criada no primeiro uso.
+
+Uso:
+    python -m src.bundle              # valida e resume a versão atual
+    python -m src.bundle --list       # versões disponíveis
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from importlib import metadata
+from pathlib import Path
+from typing import Dict, List
+
+import joblib
+import numpy as np
+
+from src.config import BUNDLE_DIR, BUNDLE_FORMAT_VERSION, BUNDLE_KEEP, BUNDLE_MMAP
+
+MANIFEST_NAME = 'manifest.json'
+LATEST_NAME = 'LATEST'
+LIBRARIES = ('numpy', 'pandas', 'scikit-learn', 'joblib', 'xgboost', 'lightgbm', 'onnx', 'onnxruntime')
+# Pickles de versões diferentes destas bibliotecas podem carregar errado
+PICKLE_LIBRARIES = ('scikit-learn', 'xgboost', 'lightgbm')
+
+
+def library_versions() -> Dict[str, str]:
+    """Versões das bibliotecas que entram nos pickles e no ONNX (sem importá-las)"""
+    versions = {'python': platform.python_version()}
+    for package in LIBRARIES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            pass
+    return versions
+
+
+def file_checksum(filepath) -> str:
+    """sha256 do arquivo, lido em blocos de 1 MB"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def feature_schema(pipeline, feature_names: List[str] = None) -> Dict:
+    """Colunas brutas esperadas (e quais são categóricas) e as features que o modelo recebe"""
+    features = pipeline.named_steps['features']
+    if feature_names is None:
+        try:
+            feature_names = pipeline.named_steps['preprocessor'].get_feature_names_out()
+        except (AttributeError, ValueError):
+            feature_names = None
+    feature_names = None if feature_names is None else [str(name) for name in feature_names]
+    model = pipeline.named_steps['model']
+    return {
+        'input_columns': list(features.columns_),
+        'categorical_columns': list(features.categorical_columns_),
+        'feature_names': feature_names,
+        'n_features': int(getattr(model, 'n_features_in_', len(feature_names or [])))
+    }
+
+
+def _major_minor(version: str) -> str:
+    return '.'.join(str(version).split('.')[:2])
+
+
+class ModelBundle:
+    """Uma versão aberta do bundle (use load_bundle)"""
+
+    def __init__(self, path: Path, manifest: Dict, pipeline, outlier_detector=None, load_ms: float = None,
+                 drift_monitor=None):
+        self.path = Path(path)
+        self.manifest = manifest
+        self.pipeline = pipeline
+        self.outlier_detector = outlier_detector
+        self.drift_monitor = drift_monitor
+        self.load_ms = load_ms
+        self._onnx_session = None
+
+    @property
+    def version(self) -> str:
+        return self.manifest['version']
+
+    @property
+    def metrics(self) -> Dict:
+        return self.manifest.get('metrics', {})
+
+    @property
+    def schema(self) -> Dict:
+        return self.manifest['schema']
+
+    @property
+    def model(self):
+        return self.pipeline.named_steps['model']
+
+    @property
+    def onnx_session(self):
+        """Sessão ONNX Runtime do model.onnx (None se o bundle não tem ONNX ou não há runtime)"""
+        if self._onnx_session is None and 'model.onnx' in self.manifest['files']:
+            try:
+                import onnxruntime as rt
+            except ImportError:
+                return None
+            self._onnx_session = rt.InferenceSession(str(self.path / 'model.onnx'))
+        return self._onnx_session
+
+    def missing_columns(self, X) -> List[str]:
+        """Colunas brutas do esquema ausentes em X (aceita nomes do CSV ou da API)"""
+        return self.pipeline.named_steps['features'].missing_columns(X)
+
+    def predict(self, records) -> np.ndarray:
+        """Predição a partir de registros brutos (DataFrame, dict ou lista de dicts)"""
+        return self.pipeline.predict(records)
+
+
+def save_bundle(pipeline, metrics: Dict = None, model_name: str = None, feature_names: List[str] = None,
+                onnx_path=None, outlier_detector=None, bundle_dir=None, keep: int = BUNDLE_KEEP,
+                drift_monitor=None) -> Path:
+    """
+    Grava uma nova versão do bundle e aponta LATEST para ela
+
+    Args:
+        pipeline: Pipeline servido (src.serving.build_pipeline)
+        metrics: Métricas do treino/atualização (vão para o manifesto)
+        model_name: Nome do modelo no ModelTrainer
+        feature_names: Features na saída do preprocessador
+        onnx_path: Arquivo ONNX do mesmo modelo (copiado se existir)
+        outlier_detector: OutlierDetector ajustado nas features de entrada
+        bundle_dir: Diretório das versões (padrão: BUNDLE_DIR)
+        keep: Quantas versões manter
+        drift_monitor: DriftMonitor com a referência do treino (src.drift)
+
+    Returns:
+        Diretório da versão criada
+    """
+    bundle_dir = Path(bundle_dir or BUNDLE_DIR)
+    bundle_dir.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix='.tmp-', dir=bundle_dir))
+    os.chmod(tmp_dir, 0o755)
+    try:
+        # compress=0: arrays gravados crus e alinhados, mapeáveis com mmap_mode
+        joblib.dump(pipeline, tmp_dir / 'pipeline.pkl', compress=0)
+        if onnx_path is not None and Path(onnx_path).exists():
+            shutil.copyfile(onnx_path, tmp_dir / 'model.onnx')
+        if outlier_detector is not None:
+            joblib.dump(outlier_detector, tmp_dir / 'outlier_detector.pkl', compress=0)
+        if drift_monitor is not None:
+            joblib.dump(drift_monitor, tmp_dir / 'drift_reference.pkl', compress=0)
+
+        files = {path.name: {'sha256': file_checksum(path), 'bytes': path.stat().st_size}
+                 for path in sorted(tmp_dir.iterdir())}
+        created = datetime.now()
+        version = f"{created:%Y%m%d-%H%M%S-%f}-{files['pipeline.pkl']['sha256'][:8]}"
+        manifest = {
+            'format_version': BUNDLE_FORMAT_VERSION,
+            'version': version,
+            'created_at': created.isoformat(timespec='seconds'),
+            'model': {'name': model_name, 'type': type(pipeline.named_steps['model']).__name__},
+            'libraries': library_versions(),
+            'schema': feature_schema(pipeline, feature_names),
+            'metrics': metrics or {},
+            'files': files
+        }
+        with open(tmp_dir / MANIFEST_NAME, 'w') as f:
+            json.dump(manifest, f, indent=4, default=float)
+
+        version_dir = bundle_dir / version
+        if version_dir.exists():
+            # Mesmo pipeline salvo de novo no mesmo instante: conteúdo idêntico
+            shutil.rmtree(tmp_dir)
+        else:
+            os.rename(tmp_dir, version_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    latest_tmp = bundle_dir / (LATEST_NAME + '.tmp')
+    latest_tmp.write_text(version + '\n')
+    os.replace(latest_tmp, bundle_dir / LATEST_NAME)
+    print(f"Bundle salvo: {version_dir}")
+
+    for old in list_versions(bundle_dir)[:-keep] if keep else []:
+        if old != version:
+            shutil.rmtree(bundle_dir / old, ignore_errors=True)
+    return version_dir
+
+
+def list_versions(bundle_dir=None) -> List[str]:
+    """Versões completas no diretório, da mais antiga para a mais nova"""
+    bundle_dir = Path(bundle_dir or BUNDLE_DIR)
+    if not bundle_dir.exists():
+        return []
+    return sorted(path.name for path in bundle_dir.iterdir()
+                  if path.is_dir() and not path.name.startswith('.') and (path / MANIFEST_NAME).exists())
+
+
+def resolve_bundle(path=None) -> Path:
+    """Diretório da versão: o próprio path se tem manifesto, senão a apontada por LATEST"""
+    path = Path(path or BUNDLE_DIR)
+    if (path / MANIFEST_NAME).exists():
+        return path
+    latest = path / LATEST_NAME
+    if not latest.exists():
+        raise FileNotFoundError(f"Nenhum bundle em {path}")
+    return path / latest.read_text().strip()
+
+
+def validate_bundle(path=None, checksums: bool = True) -> Dict:
+    """
+    Confere o manifesto de uma versão
+
+    Raises:
+        ValueError: formato desconhecido, arquivo ausente, tamanho ou checksum divergente
+
+    Returns:
+        O manifesto
+    """
+    path = resolve_bundle(path)
+    with open(path / MANIFEST_NAME) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Formato de bundle {manifest.get('format_version')} "
+                         f"(esperado {BUNDLE_FORMAT_VERSION}): {path}")
+    for name, info in manifest['files'].items():
+        filepath = path / name
+        if not filepath.exists():
+            raise ValueError(f"Arquivo do bundle ausente: {filepath}")
+        if filepath.stat().st_size != info['bytes']:
+            raise ValueError(f"Tamanho divergente do manifesto: {filepath}")
+        if checksums and file_checksum(filepath) != info['sha256']:
+            raise ValueError(f"Checksum divergente do manifesto: {filepath}")
+
+    current = library_versions()
+    for package in PICKLE_LIBRARIES:
+        saved = manifest['libraries'].get(package)
+        if saved and package in current and _major_minor(saved) != _major_minor(current[package]):
+            print(f"AVISO: bundle salvo com {package} {saved}, instalado {current[package]}")
+    return manifest
+
+
+def load_bundle(path=None, checksums: bool = True, mmap: bool = BUNDLE_MMAP) -> ModelBundle:
+    """
+    Valida e abre uma versão do bundle
+
+    Args:
+        path: Versão ou diretório das versões (padrão: BUNDLE_DIR, versão LATEST)
+        checksums: Confere o sha256 de cada arquivo (senão só existência e tamanho)
+        mmap: Mapeia os arrays dos pickles em vez de copiá-los (somente leitura)
+    """
+    start = time.perf_counter()
+    path = resolve_bundle(path)
+    manifest = validate_bundle(path, checksums)
+    mmap_mode = 'r' if mmap else None
+    pipeline = joblib.load(path / 'pipeline.pkl', mmap_mode=mmap_mode)
+    outlier_detector = None
+    if 'outlier_detector.pkl' in manifest['files']:
+        outlier_detector = joblib.load(path / 'outlier_detector.pkl', mmap_mode=mmap_mode)
+    drift_monitor = None
+    if 'drift_reference.pkl' in manifest['files']:
+        # Sem mmap: as contagens do monitor são atualizadas a cada requisição
+        drift_monitor = joblib.load(path / 'drift_reference.pkl')
+    load_ms = (time.perf_counter() - start) * 1000
+    return ModelBundle(path, manifest, pipeline, outlier_detector, load_ms, drift_monitor)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Valida e resume o bundle do modelo servido")
+    parser.add_argument('--path', help="Versão ou diretório das versões (padrão: BUNDLE_DIR)")
+    parser.add_argument('--list', action='store_true', help="Lista as versões disponíveis")
+    parser.add_argument('--no-checksums', action='store_true', help="Não confere o sha256")
+    args = parser.parse_args()
+
+    if args.list:
+        for version in list_versions(args.path):
+            print(version)
+        return
+
+    bundle = load_bundle(args.path, checksums=not args.no_checksums)
+    manifest = bundle.manifest
+    print(f"Bundle {bundle.version} ({bundle.path})")
+    print(f"Modelo: {manifest['model']['name']} ({manifest['model']['type']})")
+    print(f"Colunas brutas: {len(bundle.schema['input_columns'])}, features: {bundle.schema['n_features']}")
+    for name, info in manifest['files'].items():
+        print(f"  {name}: {info['bytes'] / 1024:.1f} KB")
+    for name, value in bundle.metrics.items():
+        if isinstance(value, (int, float)):
+            print(f"  {name}: {value:.4g}")
+    # A 1ª carga inclui importar as bibliotecas do modelo (sklearn etc.); a recarga mede só o bundle
+    reload_ms = load_bundle(args.path, checksums=not args.no_checksums).load_ms
+    print(f"Validado e carregado em {bundle.load_ms:.1f} ms (1ª carga), {reload_ms:.1f} ms (recarga)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Checkpoints do treino para execuções retomáveis
+
+Cada avaliação de modelo concluída é gravada em disco assim que termina
+(os trials da busca já ficam no SQLite do TrialStore). Com --resume, o
+train.py recarrega o que já foi feito e só roda o que falta; o
+training_results.json é reconstruído a partir dos checkpoints.
+
+Os checkpoints ficam numa pasta por execução, identificada pela chave
+dos dados preprocessados (a mesma do cache de estágios): se os dados, o
+código de preprocessamento ou a config mudarem, nada é reaproveitado.
+Dentro dela, cada checkpoint também guarda o hash dos parâmetros do
+modelo, então um modelo com outros hiperparâmetros é refeito.
+"""
+import os
+import re
+import shutil
+import joblib
+from pathlib import Path
+from typing import Any
+
+from src.config import CHECKPOINT_DIR
+
+
+class CheckpointStore:
+    """
+    Checkpoints por execução
+
+    Args:
+        run_key: Identificador da execução (ex: chave do estágio 'preprocess')
+        resume: Se False, apaga os checkpoints anteriores desta execução
+        checkpoint_dir: Diretório base dos checkpoints
+    """
+
+    def __init__(self, run_key: str, resume: bool = False, checkpoint_dir: str = None):
+        self.resume = resume
+        self.run_dir = Path(checkpoint_dir or CHECKPOINT_DIR) / run_key[:16]
+        if not resume and self.run_dir.exists():
+            shutil.rmtree(self.run_dir)
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+
+    def path(self, kind: str, name: str) -> Path:
+        slug = re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+        return self.run_dir / f"{kind}-{slug}.pkl"
+
+    def save(self, kind: str, name: str, value: Any, key: Any = None):
+        """Grava um checkpoint de forma atômica (um kill no meio não corrompe)"""
+        path = self.path(kind, name)
+        tmp_path = path.with_name(path.name + '.tmp')
+        joblib.dump({'name': name, 'key': joblib.hash(key), 'value': value}, tmp_path)
+        os.replace(tmp_path, path)
+
+    def load(self, kind: str, name: str, key: Any = None):
+        """Retorna o valor do checkpoint, ou None se não existe / não confere"""
+        if not self.resume:
+            return None
+        path = self.path(kind, name)
+        if not path.exists():
+            return None
+        try:
+            checkpoint = joblib.load(path)
+        except Exception as e:
+            print(f"Checkpoint ilegível ignorado ({path.name}): {e}")
+            return None
+        if checkpoint['key'] != joblib.hash(key):
+            return None
+        return checkpoint['value']
@@ -0,0 +1,255 @@
+"""
+Compactação do artefato: remove as colunas que o modelo nunca usa
+
+Com handle_unknown='ignore', o OneHotEncoder guarda todas as categorias
+vistas no treino e a matriz servida passa de 300 colunas, mas boa parte
+delas nunca aparece num split (árvores) ou tem coeficiente zero (Lasso,
+ElasticNet). Depois do treino:
+
+- used_columns(model) lista as colunas que o modelo usa
+- prune_preprocessor reconstrói o ColumnTransformer só com elas (numéricas
+  não usadas saem; no one-hot ficam só as categorias usadas, as outras
+  viram zeros como qualquer categoria desconhecida)
+- remap_model reescreve os índices de coluna do modelo (coeficientes,
+  nós das árvores do sklearn, JSON do XGBoost, texto do LightGBM)
+
+As predições ficam idênticas: compact() confere isso antes de devolver o
+par compactado. Modelos sem suporte (ex: ensembles) ficam como estão.
+"""
+import copy
+import json
+import pickle
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.tree._tree import Tree
+from typing import Dict, List
+
+from src.data_preprocessing import DataPreprocessor
+
+try:
+    import lightgbm as lgb
+    from lightgbm import LGBMRegressor
+    LIGHTGBM_AVAILABLE = True
+except ImportError:
+    LIGHTGBM_AVAILABLE = False
+
+try:
+    from xgboost import XGBRegressor
+    XGBOOST_AVAILABLE = True
+except ImportError:
+    XGBOOST_AVAILABLE = False
+
+
+def _sklearn_trees(model) -> list:
+    """Árvores do sklearn dentro do modelo (árvore única, floresta ou gradient boosting)"""
+    if hasattr(model, 'tree_'):
+        return [model]
+    estimators = getattr(model, 'estimators_', None)
+    if estimators is None:
+        return []
+    trees = list(np.ravel(estimators))
+    return trees if all(hasattr(tree, 'tree_') for tree in trees) else []
+
+
+def used_columns(model, n_columns: int):
+    """
+    Índices das colunas que o modelo usa (None = tipo de modelo sem suporte)
+    """
+    if XGBOOST_AVAILABLE and isinstance(model, XGBRegressor):
+        scores = model.get_booster().get_score(importance_type='weight')
+        return np.array(sorted(int(name[1:]) for name in scores), dtype=int)
+    if LIGHTGBM_AVAILABLE and isinstance(model, LGBMRegressor):
+        return np.flatnonzero(model.booster_.feature_importance('split') > 0)
+    trees = _sklearn_trees(model)
+    if trees:
+        used = np.zeros(n_columns, dtype=bool)
+        for tree in trees:
+            feature = tree.tree_.feature
+            used[feature[feature >= 0]] = True
+        return np.flatnonzero(used)
+    coef = getattr(model, 'coef_', None)
+    if coef is not None and np.ndim(coef) == 1:
+        return np.flatnonzero(coef != 0)
+    return None
+
+
+def _remap_tree(estimator, remap: np.ndarray, n_keep: int):
+    state = estimator.tree_.__getstate__()
+    nodes = state['nodes'].copy()
+    split = nodes['feature'] >= 0
+    nodes['feature'][split] = remap[nodes['feature'][split]]
+    tree = Tree(n_keep, estimator.tree_.n_classes, estimator.tree_.n_outputs)
+    tree.__setstate__({**state, 'nodes': nodes})
+    estimator.tree_ = tree
+    estimator.n_features_in_ = n_keep
+
+
+def _remap_xgboost(model, remap: np.ndarray, keep: np.ndarray):
+    raw = json.loads(model.get_booster().save_raw('json'))
+    learner = raw['learner']
+    learner['learner_model_param']['num_feature'] = str(len(keep))
+    for key in ('feature_names', 'feature_types'):
+        if learner.get(key):
+            learner[key] = [learner[key][i] for i in keep]
+    for tree in learner['gradient_booster']['model']['trees']:
+        tree['tree_param']['num_feature'] = str(len(keep))
+        tree['split_indices'] = [
+            int(remap[index]) if left != -1 else index
+            for index, left in zip(tree['split_indices'], tree['left_children'])
+        ]
+    compact = XGBRegressor(**model.get_params())
+    compact.load_model(bytearray(json.dumps(raw).encode()))
+    return compact
+
+
+def _remap_lightgbm(model, remap: np.ndarray, keep: np.ndarray):
+    lines = []
+    for line in model.booster_.model_to_string().split('\n'):
+        key, _, value = line.partition('=')
+        if key == 'max_feature_idx':
+            line = f"max_feature_idx={len(keep) - 1}"
+        elif key in ('feature_names', 'feature_infos'):
+            values = value.split(' ')
+            line = f"{key}=" + ' '.join(values[i] for i in keep)
+        elif key == 'split_feature':
+            line = "split_feature=" + ' '.join(str(remap[int(i)]) for i in value.split(' '))
+        elif key == 'tree_sizes':
+            continue  # os tamanhos mudam; sem a linha o LightGBM lê as árvores em sequência
+        lines.append(line)
+    compact = copy.deepcopy(model)
+    compact._Booster = lgb.Booster(model_str='\n'.join(lines))
+    compact._n_features = compact._n_features_in = len(keep)
+    return compact
+
+
+def remap_model(model, keep: np.ndarray, n_columns: int):
+    """Cópia do modelo que recebe só as colunas keep (na mesma ordem)"""
+    keep = np.asarray(keep, dtype=int)
+    remap = np.full(n_columns, -1, dtype=np.intp)
+    remap[keep] = np.arange(len(keep))
+
+    if XGBOOST_AVAILABLE and isinstance(model, XGBRegressor):
+        return _remap_xgboost(model, remap, keep)
+    if LIGHTGBM_AVAILABLE and isinstance(model, LGBMRegressor):
+        return _remap_lightgbm(model, remap, keep)
+
+    compact = copy.deepcopy(model)
+    trees = _sklearn_trees(compact)
+    if trees:
+        for tree in trees:
+            _remap_tree(tree, remap, len(keep))
+    else:
+        compact.coef_ = compact.coef_[keep]
+    compact.n_features_in_ = len(keep)
+    if hasattr(compact, 'feature_names_in_'):
+        del compact.feature_names_in_
+    return compact
+
+
+def _output_columns(preprocessor: ColumnTransformer) -> List[tuple]:
+    """(transformer, coluna bruta, categoria ou None) de cada coluna de saída, em ordem"""
+    outputs = []
+    for name, transformer, columns in preprocessor.transformers_:
+        if name == 'num':
+            kept = transformer.named_steps['imputer'].get_feature_names_out(columns)
+            outputs.extend(('num', col, None) for col in kept)
+        elif name == 'cat':
+            kept = transformer.named_steps['imputer'].get_feature_names_out(columns)
+            categories = transformer.named_steps['onehot'].categories_
+            outputs.extend(('cat', col, cat) for col, cats in zip(kept, categories) for cat in cats)
+    return outputs
+
+
+def prune_preprocessor(preprocessor: ColumnTransformer, keep: np.ndarray) -> DataPreprocessor:
+    """
+    ColumnTransformer que só gera as colunas keep, com as estatísticas do original
+
+    Ajustado numa tabela protótipo (como em StreamingStats.build_preprocessor)
+    e depois recebe medianas, médias e escalas do preprocessador original.
+    """
+    outputs = _output_columns(preprocessor)
+    kept = [outputs[i] for i in keep]
+    numerical = [col for kind, col, _ in kept if kind == 'num']
+    vocabularies = {}
+    for kind, col, cat in kept:
+        if kind == 'cat':
+            vocabularies.setdefault(col, []).append(cat)
+
+    num_input = list({name: cols for name, _, cols in preprocessor.transformers_}.get('num', []))
+    numeric = preprocessor.named_transformers_['num'] if numerical else None
+    medians = (numeric.named_steps['imputer'].statistics_[[num_input.index(col) for col in numerical]]
+               if numerical else [])
+    n_proto = max([2] + [len(v) for v in vocabularies.values()])
+    prototype = pd.DataFrame({
+        **{col: np.full(n_proto, median) for col, median in zip(numerical, medians)},
+        **{col: np.resize(np.array(vocab, dtype=object), n_proto) for col, vocab in vocabularies.items()}
+    })
+
+    pruned = DataPreprocessor()
+    pruned.create_preprocessor(numerical, list(vocabularies))
+    pruned.fit_transform(prototype)
+
+    if numerical:
+        scaler_kept = list(numeric.named_steps['imputer'].get_feature_names_out(num_input))
+        idx = [scaler_kept.index(col) for col in numerical]
+        original = numeric.named_steps['scaler']
+        target = pruned.preprocessor.named_transformers_['num']
+        target.named_steps['imputer'].statistics_ = np.asarray(medians, dtype=float)
+        scaler = target.named_steps['scaler']
+        scaler.mean_, scaler.var_, scaler.scale_ = (original.mean_[idx], original.var_[idx],
+                                                    original.scale_[idx])
+        scaler.n_samples_seen_ = original.n_samples_seen_
+    return pruned
+
+
+def compact(model, preprocessor, X_check: pd.DataFrame, tolerance: float = 1e-6) -> Dict:
+    """
+    Compacta o par preprocessador + modelo e confere as predições
+
+    Args:
+        model: Modelo ajustado na saída de preprocessor
+        preprocessor: DataPreprocessor ou ColumnTransformer ajustado
+        X_check: Dados brutos para conferir as predições
+        tolerance: Diferença máxima relativa aceita
+
+    Returns:
+        {'model', 'preprocessor' (DataPreprocessor), 'report'}; model e
+        preprocessor são None se o modelo não tem suporte ou se as
+        predições mudaram
+    """
+    column_transformer = getattr(preprocessor, 'preprocessor', preprocessor)
+    report = {'model': type(model).__name__}
+    # Só num + one-hot (as codificações de src/encoders.py já são compactas)
+    if (not isinstance(column_transformer, ColumnTransformer)
+            or {name for name, _, _ in column_transformer.transformers_} - {'num', 'cat', 'remainder'}):
+        report['status'] = 'preprocessador sem suporte'
+        return {'model': None, 'preprocessor': None, 'report': report}
+
+    X_full = column_transformer.transform(X_check)
+    keep = used_columns(model, X_full.shape[1])
+    report['n_columns'] = int(X_full.shape[1])
+    if keep is None:
+        report['status'] = 'modelo sem suporte'
+        return {'model': None, 'preprocessor': None, 'report': report}
+    report['n_used'] = int(len(keep))
+    if len(keep) == X_full.shape[1]:
+        report['status'] = 'nada a remover'
+        return {'model': None, 'preprocessor': None, 'report': report}
+
+    compact_model = remap_model(model, keep, X_full.shape[1])
+    pruned = prune_preprocessor(column_transformer, keep)
+    expected = model.predict(X_full)
+    predicted = compact_model.predict(pruned.transform(X_check))
+    max_diff = float(np.max(np.abs(predicted - expected)))
+    report.update({
+        'max_abs_diff': max_diff,
+        'size_kb_before': (len(pickle.dumps(model)) + len(pickle.dumps(column_transformer))) / 1024,
+        'size_kb_after': (len(pickle.dumps(compact_model)) + len(pickle.dumps(pruned.preprocessor))) / 1024
+    })
+    if max_diff > tolerance * max(1.0, float(np.max(np.abs(expected)))):
+        report['status'] = 'predições diferentes'
+        return {'model': None, 'preprocessor': None, 'report': report}
+
+    report['status'] = 'ok'
+    return {'model': compact_model, 'preprocessor': pruned, 'report': report}
@@ -9,22 +9,123 @@ BASE_DIR = Path(__file__).parent.parent
 DATA_DIR = BASE_DIR / "data"
 MODELS_DIR = BASE_DIR / "models"
 NOTEBOOKS_DIR = BASE_DIR / "notebooks"
+CACHE_DIR = DATA_DIR / "cache"  # cache dos estágios do train.py
 
 # Arquivos de dados
 RAW_DATA_FILE = BASE_DIR / "AmesHousing.csv"
 PROCESSED_DATA_FILE = DATA_DIR / "processed_data.csv"
+INCREMENTAL_DATA_FILE = DATA_DIR / "incremental_sales.csv"  # vendas ingeridas pelo modo incremental
 
 # Arquivos de modelos
 MODEL_PKL_PATH = MODELS_DIR / "best_model.pkl"
 MODEL_ONNX_PATH = MODELS_DIR / "best_model.onnx"
 PREPROCESSOR_PATH = MODELS_DIR / "preprocessor.pkl"
 FEATURE_NAMES_PATH = MODELS_DIR / "feature_names.pkl"
+PIPELINE_PATH = MODELS_DIR / "pipeline.pkl"  # features + preprocessador + modelo (servido pela API)
+SEARCH_DB_PATH = MODELS_DIR / "search_trials.db"
+PROFILE_PATH = MODELS_DIR / "training_profile.json"
+CHECKPOINT_DIR = MODELS_DIR / "checkpoints"  # checkpoints do train.py (--resume)
+TRAINING_STATE_PATH = MODELS_DIR / "training_state.json"
+OUTLIER_DETECTOR_PATH = MODELS_DIR / "outlier_detector.pkl"  # limites das features de entrada (API)
+DRIFT_REFERENCE_PATH = MODELS_DIR / "drift_reference.pkl"  # sketches do treino para o drift da API
+ONNX_REPORT_PATH = MODELS_DIR / "onnx_report.json"  # paridade/latência ONNX de todos os modelos
+ONNX_OPTIMIZATION_REPORT_PATH = MODELS_DIR / "onnx_optimization.json"  # variantes do ONNX servido
+BUNDLE_DIR = MODELS_DIR / "bundles"  # versões do bundle servido (src/bundle.py)
+REQUEST_LOG_DIR = DATA_DIR / "request_logs"  # requisições de predição capturadas pela API
 
 # Configurações de treinamento
 RANDOM_STATE = 42
 TEST_SIZE = 0.2
 CV_FOLDS = 5
 
+# Early stopping dos modelos de boosting
+MAX_BOOSTING_ROUNDS = 1000  # teto de rounds quando o early stopping está ativo
+EARLY_STOPPING_ROUNDS = 20
+EARLY_STOPPING_FRACTION = 0.1  # fração do treino usada como validação interna
+
+# XGBoost/LightGBM com categorias nativas em vez do one-hot
+NATIVE_CATEGORICAL_BOOSTERS = False
+
+# Remove do artefato servido as colunas que o modelo nunca usa (src/compaction.py)
+COMPACT_SERVING_ARTIFACT = True
+
+# Codificação das categóricas no lugar do one-hot (src/encoders.py), ex:
+# {'Neighborhood': 'target', 'Exterior 1st': 'frequency', 'MS SubClass': 'hash'}
+CATEGORICAL_ENCODINGS = {}
+TARGET_ENCODING_FOLDS = 5  # folds do target encoding out-of-fold
+TARGET_ENCODING_SMOOTHING = 10.0  # peso (em linhas) da média geral
+HASH_ENCODING_BUCKETS = 8  # colunas por categórica no hashing
+
+# Retreino incremental
+INCREMENTAL_ROUNDS = 10  # rounds (boosters) ou árvores (floresta) adicionados por lote
+DRIFT_PSI_THRESHOLD = 0.25  # PSI acima disso em alguma feature pede retreino completo
+UNSEEN_CATEGORY_THRESHOLD = 0.05  # fração de linhas com categorias não vistas
+MAE_DEGRADATION_THRESHOLD = 1.25  # MAE nas linhas novas / MAE de referência
+
+# Drift das entradas na API (src/drift.py; alertas com DRIFT_PSI_THRESHOLD e UNSEEN_CATEGORY_THRESHOLD)
+DRIFT_CMS_WIDTH = 2048  # colunas da tabela count-min das categóricas
+DRIFT_CMS_DEPTH = 4  # hashes da tabela count-min
+DRIFT_MIN_ROWS = 100  # requisições mínimas para emitir alertas
+
+# Orçamento da busca de hiperparâmetros (successive halving)
+SEARCH_MAX_TIME = 300  # segundos
+SEARCH_MAX_FITS = 300
+
+# Stacking com as predições out-of-fold
+STACKING_TOP_K = 3  # melhores modelos (por R^2 OOF) que entram no meta-modelo
+STACKING_MIN_GAIN = 0.002  # ganho mínimo de R^2 OOF para servir o ensemble
+
+# Treino em streaming (python train.py --stream ARQUIVO)
+STREAMING_CHUNK_SIZE = 50_000  # linhas por bloco (define a memória de pico)
+STREAMING_SAMPLE_SIZE = 200_000  # amostra para as medianas
+STREAMING_BOOST_ROUNDS = 300  # rounds do XGBoost com memória externa
+STREAMING_RESULTS_PATH = MODELS_DIR / "streaming_results.json"
+
+# Benchmarks (python -m src.benchmark)
+BENCHMARK_DIR = BASE_DIR / "benchmarks"
+BENCHMARK_BATCH_SIZES = [1, 100, 1_000, 10_000, 100_000]
+BENCHMARK_FIT_ROWS = 2_000  # linhas de treino dos benchmarks de ajuste
+BENCHMARK_REGRESSION_THRESHOLD = 0.10  # 10% mais lento = regressão
+
+# Exportação ONNX: paridade e latência de todos os modelos (onnx_parity_report)
+ONNX_PARITY_REPORT = True
+ONNX_PARITY_BATCH_SIZES = (1, 100, 1000)  # lotes conferidos (o split de teste inteiro em cada um)
+ONNX_PARITY_RTOL = 1e-5  # diferença máxima relativa à maior predição (saída ONNX em float32)
+
+# Otimização pós-exportação do ONNX servido (src/onnx_optimization.py)
+ONNX_OPTIMIZE = False  # estágio opcional do train.py
+ONNX_OPTIMIZATION_LEVEL = 'basic'  # otimizações de grafo gravadas offline ('basic' ou 'extended')
+ONNX_QUANTIZE = True  # tenta pesos int8 (modelos lineares)
+ONNX_OPTIMIZATION_RTOL = 1e-3  # diferença máxima relativa ao modelo float para manter a variante
+
+# Bundle versionado do modelo servido (src/bundle.py)
+BUNDLE_FORMAT_VERSION = 1
+BUNDLE_KEEP = 3  # versões mantidas em BUNDLE_DIR
+BUNDLE_MMAP = True  # arrays dos pickles mapeados do arquivo (somente leitura)
+
+# /predict/raw: fração mínima das colunas brutas do esquema no registro (abaixo disso, 422)
+RAW_MIN_INPUT_FRACTION = 0.5
+
+# Log das requisições de predição da API (src/request_log.py; replay com python -m src.replay)
+REQUEST_LOG_ENABLED = True
+REQUEST_LOG_FORMAT = 'jsonl'  # 'jsonl' (gzip) ou 'parquet' (pyarrow)
+REQUEST_LOG_BATCH_SIZE = 256  # registros por gravação
+REQUEST_LOG_FLUSH_SECONDS = 1.0  # intervalo máximo entre gravações
+REQUEST_LOG_QUEUE_SIZE = 10_000  # registros pendentes; acima disso são descartados (e contados)
+REQUEST_LOG_ROTATE_RECORDS = 100_000  # registros por arquivo
+REQUEST_LOG_ROTATE_SECONDS = 3600  # idade máxima do arquivo aberto
+REQUEST_LOG_KEEP = 48  # arquivos mantidos
+
+# Limites de outlier por sketches combináveis (src/outliers.py)
+OUTLIER_SKETCH_COMPRESSION = 200  # delta do t-digest (~delta/2 centróides por coluna)
+OUTLIER_INPUT_METHOD = 'quantile'  # limites das features de entrada sinalizadas na API
+OUTLIER_INPUT_FACTOR = 3.0  # usado com 'iqr' (multiplicador) ou 'zscore' (desvios)
+OUTLIER_INPUT_QUANTILES = (0.001, 0.999)
+
+# Seleção de features (python -m src.feature_selection)
+FEATURE_SELECTION_BLOCK_SIZE = 32  # colunas por job (informação mútua e permutação)
+FEATURE_SELECTION_PERM_REPEATS = 3  # embaralhamentos por coluna na importância por permutação
+
 # Target variable
 TARGET_COLUMN = "SalePrice"
 
@@ -6,12 +6,101 @@ from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.impute import SimpleImputer
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
-from typing import Tuple
+from sklearn.base import BaseEstimator, TransformerMixin
+from typing import Dict, Tuple
 import joblib
 # import warnings
 # warnings.filterwarnings('ignore')
 
 from src.config import TARGET_COLUMN, PREPROCESSOR_PATH
+from src.data_loading import load_dataset
+from src.encoders import ENCODERS
+
+
+class NativeCategoricalEncoder(BaseEstimator, TransformerMixin):
+    """Mantém as categóricas como colunas pandas `category` (sem one-hot)
+    
+    Para LightGBM e XGBoost, que tratam categorias nativamente. As
+    numéricas passam sem imputação nem escala (as árvores lidam com NaN);
+    categorias não vistas no treino viram NaN.
+    
+    Com output='codes', transform devolve a matriz float32 de códigos:
+    os boosters treinados no DataFrame aceitam essa matriz com predições
+    idênticas e sem o custo de conversão do pandas (usado na inferência).
+    """
+    
+    def __init__(self, numerical_features: list = None, categorical_features: list = None,
+                 output: str = 'frame'):
+        self.numerical_features = numerical_features
+        self.categorical_features = categorical_features
+        self.output = output
+    
+    def fit(self, X: pd.DataFrame, y=None):
+        self.categories_ = {
+            col: pd.Index(sorted(X[col].dropna().astype(str).unique()))
+            for col in self.categorical_features
+        }
+        self.feature_names_out_ = list(self.numerical_features) + list(self.categorical_features)
+        return self
+    
+    def transform(self, X: pd.DataFrame):
+        if self.output == 'codes':
+            return self.transform_codes(X)
+        return self._transform_frame(X)
+    
+    def _transform_frame(self, X: pd.DataFrame) -> pd.DataFrame:
+        columns = {col: X[col].astype(float) for col in self.numerical_features}
+        for col in self.categorical_features:
+            values = X[col].astype(str).where(X[col].notna())
+            # Não vistas viram NaN antes: o pandas 4 recusa valores fora das categorias
+            values = values.where(values.isin(self.categories_[col]))
+            columns[col] = pd.Categorical(values, categories=self.categories_[col])
+        return pd.DataFrame(columns, index=X.index)
+    
+    def transform_codes(self, X: pd.DataFrame) -> np.ndarray:
+        """Mesma saída como matriz float32 com os códigos das categorias (NaN = ausente)
+        
+        É o formato de entrada usado na exportação ONNX.
+        """
+        X_native = self._transform_frame(X)
+        codes = np.empty(X_native.shape, dtype=np.float32)
+        for i, col in enumerate(X_native.columns):
+            if isinstance(X_native[col].dtype, pd.CategoricalDtype):
+                col_codes = X_native[col].cat.codes.to_numpy().astype(np.float32)
+                col_codes[col_codes < 0] = np.nan
+                codes[:, i] = col_codes
+            else:
+                codes[:, i] = X_native[col].to_numpy(dtype=np.float32)
+        return codes
+    
+    def get_feature_names_out(self, input_features=None):
+        return np.array(self.feature_names_out_, dtype=object)
+
+
+class ColumnSubset(BaseEstimator, TransformerMixin):
+    """Mantém só algumas colunas da matriz transformada (por índice)
+    
+    Usado depois do ColumnTransformer quando o modelo foi treinado num
+    subconjunto das colunas (seleção de features).
+    """
+    
+    def __init__(self, indices: list = None, feature_names: list = None):
+        self.indices = indices
+        self.feature_names = feature_names
+    
+    def fit(self, X, y=None):
+        return self
+    
+    def __sklearn_is_fitted__(self):
+        return True  # sem estado: os índices vêm no construtor
+    
+    def transform(self, X):
+        return np.asarray(X)[:, self.indices]
+    
+    def get_feature_names_out(self, input_features=None):
+        if self.feature_names is not None:
+            return np.array(self.feature_names, dtype=object)
+        return np.asarray(input_features, dtype=object)[self.indices]
 
 
 class DataPreprocessor:
@@ -21,10 +110,16 @@ class DataPreprocessor:
         self.preprocessor = None
         self.feature_names = None
         
-    def load_data(self, filepath: str) -> pd.DataFrame:
-        """Carrega os dados do CSV"""
-        df = pd.read_csv(filepath)
-        print(f"Dados que foram carregados: {df.shape}")
+    def load_data(self, filepath: str, columns: list = None, use_cache: bool = True) -> pd.DataFrame:
+        """Carrega os dados do CSV com tipos explícitos (ver data_loading.py)
+        
+        Args:
+            columns: Projeção de colunas (None = todas)
+            use_cache: Lê do cache Parquet se o CSV não mudou
+        """
+        df = load_dataset(filepath, columns=columns, use_cache=use_cache)
+        print(f"Dados que foram carregados: {df.shape} "
+              f"({df.memory_usage(deep=True).sum() / 1024 ** 2:.1f} MB)")
         return df
     
     def split_features_target(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
@@ -42,17 +137,26 @@ class DataPreprocessor:
     
     def identify_feature_types(self, X: pd.DataFrame) -> Tuple[list, list]:
         """Identifica feats numéricas e categóricas"""
-        numerical_features = X.select_dtypes(include=['int64', 'float64']).columns.tolist()
-        categorical_features = X.select_dtypes(include=['object']).columns.tolist()
+        numerical_features = X.select_dtypes(include=['number']).columns.tolist()
+        categorical_features = X.select_dtypes(include=['object', 'str', 'category']).columns.tolist()
         
         print(f"Feats de nmúeros: {len(numerical_features)}")
         print(f"Feats de categórias: {len(categorical_features)}")
         
         return numerical_features, categorical_features
     
-    def create_preprocessor(self, numerical_features: list, categorical_features: list):
-        """Cria o pipeline de pré-processamento"""
-        
+    def create_preprocessor(self, numerical_features: list, categorical_features: list,
+                            encodings: dict = None):
+        """Cria o pipeline de pré-processamento
+
+        encodings troca o one-hot de colunas categóricas por 'target',
+        'frequency' ou 'hash' (ver src/encoders.py), ex: {'Neighborhood': 'target'}
+        """
+        encodings = {col: method for col, method in (encodings or {}).items() if col in categorical_features}
+        unknown = set(encodings.values()) - set(ENCODERS)
+        if unknown:
+            raise ValueError(f"Codificação desconhecida: {sorted(unknown)} (opções: {sorted(ENCODERS)})")
+
         # Pipeline para features numéricas
         numerical_transformer = Pipeline(steps=[
             ('imputer', SimpleImputer(strategy='median')),
@@ -65,18 +169,30 @@ class DataPreprocessor:
             ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=False))
         ])
         
+        # Colunas com codificação própria saem do one-hot
+        transformers = [
+            ('num', numerical_transformer, numerical_features),
+            ('cat', categorical_transformer, [col for col in categorical_features if col not in encodings])
+        ]
+        for method, encoder in ENCODERS.items():
+            columns = [col for col in categorical_features if encodings.get(col) == method]
+            if columns:
+                transformers.append((method, encoder(), columns))
+
         # Combinar os pipelines
-        self.preprocessor = ColumnTransformer(
-            transformers=[
-                ('num', numerical_transformer, numerical_features),
-                ('cat', categorical_transformer, categorical_features)
-            ])
-        
+        self.preprocessor = ColumnTransformer(transformers=transformers)
+
+        return self.preprocessor
+    
+    def create_native_preprocessor(self, numerical_features: list, categorical_features: list):
+        """Cria o caminho alternativo para LightGBM/XGBoost com categorias nativas"""
+        self.preprocessor = NativeCategoricalEncoder(numerical_features, categorical_features)
         return self.preprocessor
     
     def fit_transform(self, X: pd.DataFrame, y: pd.Series = None) -> np.ndarray:
         """Ajusta e transforma os dados"""
-        X_transformed = self.preprocessor.fit_transform(X)
+        # y só é usado pelo target encoding
+        X_transformed = self.preprocessor.fit_transform(X, y)
         
         # Salvar nomes das features
         self.feature_names = self._get_feature_names()
@@ -89,15 +205,16 @@ class DataPreprocessor:
     
     def _get_feature_names(self) -> list:
         """Obtém os nomes das features após transformação"""
+        if isinstance(self.preprocessor, NativeCategoricalEncoder):
+            return list(self.preprocessor.get_feature_names_out())
+        
         feature_names = []
         
         for name, transformer, features in self.preprocessor.transformers_:
-            if name == 'num':
-                feature_names.extend(features)
-            elif name == 'cat':
-                if hasattr(transformer.named_steps['onehot'], 'get_feature_names_out'):
-                    cat_features = transformer.named_steps['onehot'].get_feature_names_out(features)
-                    feature_names.extend(cat_features)
+            # Pelo pipeline inteiro: o imputer descarta colunas sem nenhum valor
+            # (acontece em amostras pequenas, ex: Pool QC)
+            if name != 'remainder':
+                feature_names.extend(transformer.get_feature_names_out(features))
         
         return feature_names
     
@@ -117,6 +234,41 @@ class DataPreprocessor:
         return self.preprocessor
 
 
+def feature_lists(preprocessor):
+    """Features numéricas e categóricas usadas pelo preprocessador ajustado"""
+    if isinstance(preprocessor, Pipeline):
+        # Preprocessador reduzido (ColumnTransformer + ColumnSubset)
+        preprocessor = preprocessor[0]
+    if isinstance(preprocessor, NativeCategoricalEncoder):
+        return list(preprocessor.numerical_features), list(preprocessor.categorical_features)
+    numerical, categorical = [], []
+    for name, _, cols in preprocessor.transformers_:
+        if name == 'num':
+            numerical.extend(cols)
+        elif name != 'remainder':
+            # 'cat' (one-hot) e as codificações de src/encoders.py
+            categorical.extend(cols)
+    return numerical, categorical
+
+
+def known_categories(preprocessor) -> Dict:
+    """Categorias vistas no ajuste do preprocessador"""
+    if isinstance(preprocessor, NativeCategoricalEncoder):
+        return {col: set(cats) for col, cats in preprocessor.categories_.items()}
+    if isinstance(preprocessor, Pipeline):
+        preprocessor = preprocessor[0]
+    known = {}
+    for name, transformer, cols in preprocessor.transformers_:
+        if name == 'cat':
+            categories = transformer.named_steps['onehot'].categories_
+        elif name in ENCODERS:
+            categories = [transformer.categories_[col] for col in cols]
+        else:
+            continue
+        known.update({col: set(map(str, cats)) for col, cats in zip(cols, categories)})
+    return known
+
+
 def handle_outliers(df: pd.DataFrame, column: str, method: str = 'iqr') -> pd.DataFrame:
     """
     Remove ou trata outliers
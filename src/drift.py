@@ -0,0 +1,253 @@
+"""
+Monitoramento de drift das entradas servidas, com memória constante
+
+A API não tinha como saber se as casas que chegam se parecem com as do
+treino, e recalcular estatísticas sobre requisições logadas é caro. O
+DriftMonitor mantém, dentro do processo da API, sketches de tamanho fixo
+(independente do número de requisições):
+
+- numéricas: histograma com os limites dos decis do treino (os mesmos bins
+  do PSI do modo incremental) e um bin para ausentes
+- categóricas: tabela count-min (DRIFT_CMS_DEPTH x DRIFT_CMS_WIDTH, uma só
+  para todas as colunas) e a contagem de categorias que o preprocessador
+  ajustado (OneHotEncoder e codificações de src/encoders.py) nunca viu
+
+Os mesmos sketches são preenchidos com o X de treino e salvos como
+referência (train.py). report() compara a referência com o que a API
+recebeu desde o último reset: PSI por feature, fração de ausentes e de
+categorias não vistas, e os alertas pelos limites DRIFT_PSI_THRESHOLD e
+UNSEEN_CATEGORY_THRESHOLD.
+
+O update é vetorizado: um histograma é uma comparação com a matriz de
+limites e um bincount. Categorias do treino (vocabulário fixo) somam num
+array denso por id e só entram na tabela count-min, pelas posições
+pré-calculadas, quando o relatório é montado; só categoria nova passa pelo
+hash na hora. O custo por requisição vem quase todo da conversão do
+DataFrame para array.
+"""
+import hashlib
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.config import (
+    DRIFT_CMS_DEPTH, DRIFT_CMS_WIDTH, DRIFT_MIN_ROWS, DRIFT_PSI_THRESHOLD, DRIFT_REFERENCE_PATH,
+    UNSEEN_CATEGORY_THRESHOLD
+)
+from src.data_preprocessing import feature_lists, known_categories
+from src.incremental import population_stability_index
+
+
+class DriftMonitor:
+    """
+    Sketches de tamanho fixo das entradas, comparados com os do treino
+
+    Args:
+        numeric_edges: {coluna numérica: limites dos bins}
+        known_categories: {coluna categórica: categorias vistas no ajuste}
+        width: Colunas da tabela count-min
+        depth: Linhas (hashes independentes) da tabela count-min
+    """
+
+    def __init__(self, numeric_edges: Dict[str, List[float]], known_categories: Dict[str, set],
+                 width: int = DRIFT_CMS_WIDTH, depth: int = DRIFT_CMS_DEPTH):
+        self.numeric_columns = list(numeric_edges)
+        self.categorical_columns = list(known_categories)
+        self.known_categories = {col: sorted(map(str, cats)) for col, cats in known_categories.items()}
+        self.width = width
+        self.depth = depth
+
+        # Limites numa matriz (colunas x limites), completada com +inf: bin = nº de limites <= valor
+        n_edges = max([len(edges) for edges in numeric_edges.values()] + [0])
+        self.edges = np.full((len(self.numeric_columns), n_edges), np.inf)
+        for i, edges in enumerate(numeric_edges.values()):
+            self.edges[i, :len(edges)] = edges
+        self.n_bins = n_edges + 2  # bins + ausentes (último)
+        self._offsets = np.arange(len(self.numeric_columns)) * self.n_bins
+
+        # Id de cada categoria do treino e suas posições (achatadas) na tabela count-min
+        self._category_ids = {}
+        for j, col in enumerate(self.categorical_columns):
+            for value in self.known_categories[col]:
+                self._category_ids[(j, value)] = len(self._category_ids)
+        self._known_slots = np.array([self._hash_slots(self.categorical_columns[j], value)
+                                      for j, value in self._category_ids]).reshape(-1, depth)
+        self.reference = None
+        self.reset()
+
+    def _hash_slots(self, col: str, value: str) -> np.ndarray:
+        digest = hashlib.blake2b(f"{col}\0{value}".encode(), digest_size=4 * self.depth).digest()
+        buckets = np.frombuffer(digest, dtype=np.uint32) % self.width
+        return np.arange(self.depth) * self.width + buckets.astype(np.int64)
+
+    def reset(self) -> 'DriftMonitor':
+        """Zera as contagens das requisições (a referência fica)"""
+        self.histograms = np.zeros(len(self.numeric_columns) * self.n_bins, dtype=np.int64)
+        self.count_min = np.zeros(self.depth * self.width, dtype=np.int64)  # só as não vistas
+        self.category_counts = np.zeros(len(self._category_ids), dtype=np.int64)  # as do treino, por id
+        self.unseen = np.zeros(len(self.categorical_columns), dtype=np.int64)
+        self.categorical_missing = np.zeros(len(self.categorical_columns), dtype=np.int64)
+        self.n_rows = 0
+        self.n_updates = 0
+        self.update_ns = 0
+        self.since = datetime.now().isoformat(timespec='seconds')
+        return self
+
+    def _positions(self, columns: pd.Index):
+        """Posições das colunas monitoradas em X (-1 = ausente), guardadas enquanto as colunas não mudam"""
+        cached = getattr(self, '_columns', None)
+        if cached is None or not columns.equals(cached):
+            self._columns = columns
+            self._numeric_pos = columns.get_indexer(self.numeric_columns)
+            self._categorical_pos = columns.get_indexer(self.categorical_columns)
+        return self._numeric_pos, self._categorical_pos
+
+    def update(self, X: pd.DataFrame) -> 'DriftMonitor':
+        """Soma as linhas de X (features antes do preprocessador) aos sketches"""
+        start = time.perf_counter_ns()
+        numeric_pos, categorical_pos = self._positions(X.columns)
+        # Uma conversão do DataFrame inteiro; seleção de colunas no pandas custa mais que o sketch
+        data = X.to_numpy(dtype=object)
+        if self.numeric_columns:
+            values = data[:, numeric_pos].astype(float)
+            values[:, numeric_pos < 0] = np.nan
+            bins = (values[:, :, None] >= self.edges[None]).sum(axis=2)
+            bins[np.isnan(values)] = self.n_bins - 1
+            self.histograms += np.bincount((bins + self._offsets).ravel(), minlength=len(self.histograms))
+
+        if self.categorical_columns:
+            ids, weights = [], []
+            categories = data[:, categorical_pos]
+            categories[:, categorical_pos < 0] = None
+            for j, column in enumerate(categories.T):
+                # Em lote, cada valor distinto passa uma vez pelo dicionário/hash
+                counts = Counter(column).items() if len(column) > 1 else ((column[0], 1),)
+                for value, count in counts:
+                    if value is None or value != value:
+                        self.categorical_missing[j] += count
+                        continue
+                    category_id = self._category_ids.get((j, str(value)))
+                    if category_id is None:
+                        self.unseen[j] += count
+                        self.count_min[self._hash_slots(self.categorical_columns[j], str(value))] += count
+                    else:
+                        ids.append(category_id)
+                        weights.append(count)
+            if ids:
+                self.category_counts += np.bincount(ids, weights, minlength=len(self.category_counts)).astype(np.int64)
+
+        self.n_rows += len(X)
+        self.n_updates += 1
+        self.update_ns += time.perf_counter_ns() - start
+        return self
+
+    def sketch(self) -> np.ndarray:
+        """Tabela count-min completa (depth x width): não vistas + categorias do treino"""
+        table = self.count_min.copy()
+        np.add.at(table, self._known_slots, self.category_counts[:, None])
+        return table.reshape(self.depth, self.width)
+
+    def _snapshot(self) -> Dict:
+        # Estimativa count-min (mínimo entre as linhas) de cada categoria do treino
+        table = self.sketch().ravel()
+        estimates = table[self._known_slots].min(axis=1)
+        columns = np.array([j for j, _ in self._category_ids], dtype=np.int64)
+        return {
+            'histograms': self.histograms.copy(),
+            'unseen': self.unseen.copy(),
+            'categorical_missing': self.categorical_missing.copy(),
+            'categories': [estimates[columns == j] for j in range(len(self.categorical_columns))],
+            'n_rows': self.n_rows
+        }
+
+    def fit_reference(self, X: pd.DataFrame) -> 'DriftMonitor':
+        """Preenche os sketches com o X de treino e guarda como referência"""
+        self.reset().update(X)
+        self.reference = self._snapshot()
+        return self.reset()
+
+    @property
+    def memory_bytes(self) -> int:
+        """Memória das contagens (fixa: não cresce com as requisições)"""
+        arrays = (self.histograms, self.count_min, self.category_counts, self.unseen,
+                  self.categorical_missing, self.edges, self._known_slots)
+        return int(sum(array.nbytes for array in arrays))
+
+    def report(self, min_rows: int = DRIFT_MIN_ROWS) -> Dict:
+        """PSI e frações de ausentes/não vistas por feature contra a referência"""
+        if self.reference is None:
+            raise RuntimeError("DriftMonitor sem referência: chame fit_reference no treino")
+        current = self._snapshot()
+        n_ref, n_cur = self.reference['n_rows'], current['n_rows']
+        numeric = {}
+        for i, col in enumerate(self.numeric_columns):
+            ref = self.reference['histograms'][i * self.n_bins:(i + 1) * self.n_bins]
+            cur = current['histograms'][i * self.n_bins:(i + 1) * self.n_bins]
+            numeric[col] = {
+                'psi': population_stability_index(ref[:-1] / max(1, ref[:-1].sum()),
+                                                  cur[:-1] / max(1, cur[:-1].sum())) if cur[:-1].sum() else None,
+                'n_present': int(cur[:-1].sum()),
+                'missing_rate': float(cur[-1] / max(1, n_cur)),
+                'reference_missing_rate': float(ref[-1] / max(1, n_ref))
+            }
+        categorical = {}
+        for j, col in enumerate(self.categorical_columns):
+            # Categorias do treino + um bucket para as não vistas
+            ref = np.append(self.reference['categories'][j], self.reference['unseen'][j])
+            cur = np.append(current['categories'][j], current['unseen'][j])
+            n_present = n_cur - current['categorical_missing'][j]
+            categorical[col] = {
+                'psi': population_stability_index(ref / max(1, ref.sum()),
+                                                  cur / max(1, cur.sum())) if n_present else None,
+                'n_present': int(n_present),
+                'unseen_rate': float(current['unseen'][j] / max(1, n_present)),
+                'missing_rate': float(current['categorical_missing'][j] / max(1, n_cur))
+            }
+
+        # Só alerta feature com min_rows valores presentes: PSI de poucas linhas é ruído
+        stable = {col: stats for col, stats in {**numeric, **categorical}.items() if stats['n_present'] >= min_rows}
+        alerts = [f"drift em {col} (PSI {stats['psi']:.3f})" for col, stats in stable.items()
+                  if stats['psi'] > DRIFT_PSI_THRESHOLD]
+        alerts += [f"categorias não vistas em {col} ({stats['unseen_rate']:.1%})" for col, stats in stable.items()
+                   if col in categorical and stats['unseen_rate'] > UNSEEN_CATEGORY_THRESHOLD]
+        return {
+            'since': self.since,
+            'n_rows': int(n_cur),
+            'reference_rows': int(n_ref),
+            'enough_rows': n_cur >= min_rows,
+            'update_ns_mean': self.update_ns / max(1, self.n_updates),
+            'memory_bytes': self.memory_bytes,
+            'alerts': alerts,
+            'numeric': numeric,
+            'categorical': categorical
+        }
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop('_columns', None)  # cache das posições
+        return state
+
+    def save(self, filepath=None) -> Path:
+        """Salva o monitor com a referência (joblib)"""
+        filepath = Path(filepath or DRIFT_REFERENCE_PATH)
+        joblib.dump(self, filepath)
+        print(f"Referência de drift salva em: {filepath}")
+        return filepath
+
+    @staticmethod
+    def load(filepath=None) -> 'DriftMonitor':
+        return joblib.load(filepath or DRIFT_REFERENCE_PATH)
+
+
+def reference_monitor(X_train: pd.DataFrame, preprocessor) -> DriftMonitor:
+    """Monitor com os bins dos decis do treino e as categorias do preprocessador ajustado"""
+    numerical_features, _ = feature_lists(preprocessor)
+    edges = {col: np.unique(X_train[col].dropna().quantile(np.linspace(0.1, 0.9, 9)).to_numpy()).tolist()
+             for col in numerical_features}
+    return DriftMonitor(edges, known_categories(preprocessor)).fit_reference(X_train)
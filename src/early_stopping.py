@@ -0,0 +1,84 @@
+"""
+Early stopping para os modelos de boosting
+
+Cada família tem seu mecanismo: Gradient Boosting usa o n_iter_no_change
+do próprio scikit-learn; XGBoost e LightGBM recebem um conjunto de
+validação interno separado do treino. O número de rounds encontrado é
+usado depois para reajustar o modelo no treino completo sem validação.
+"""
+import numpy as np
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.model_selection import train_test_split
+from sklearn.utils import _safe_indexing
+from xgboost import XGBRegressor
+from lightgbm import LGBMRegressor, early_stopping
+from typing import Tuple
+
+from src.config import EARLY_STOPPING_FRACTION, RANDOM_STATE
+
+
+def supports_early_stopping(model) -> bool:
+    """Indica se o modelo é um dos boosters com early stopping"""
+    return isinstance(model, (GradientBoostingRegressor, XGBRegressor, LGBMRegressor))
+
+
+def fit_with_early_stopping(model, X, y, early_stopping_rounds: int,
+                            validation_fraction: float = EARLY_STOPPING_FRACTION,
+                            random_state: int = RANDOM_STATE) -> Tuple[object, int]:
+    """
+    Ajusta um clone do modelo com early stopping
+
+    O n_estimators do modelo funciona como teto de rounds.
+
+    Returns:
+        (modelo ajustado, número de rounds escolhido: o melhor round, sem a
+        paciência, em todas as famílias)
+    """
+    model = clone(model)
+
+    if isinstance(model, GradientBoostingRegressor):
+        model.set_params(
+            n_iter_no_change=early_stopping_rounds,
+            validation_fraction=validation_fraction
+        )
+        model.fit(X, y)
+        # n_estimators_ inclui a paciência; o melhor round é o anterior a ela
+        # (mesma contagem que best_iteration no XGBoost e no LightGBM)
+        n_rounds = model.n_estimators_
+        if n_rounds < model.n_estimators:
+            n_rounds = max(1, n_rounds - early_stopping_rounds)
+        return model, int(n_rounds)
+
+    y = np.asarray(y)
+    train_idx, val_idx = train_test_split(
+        np.arange(len(y)), test_size=validation_fraction, random_state=random_state
+    )
+    X_fit, y_fit = _safe_indexing(X, train_idx), y[train_idx]
+    X_val, y_val = _safe_indexing(X, val_idx), y[val_idx]
+
+    if isinstance(model, XGBRegressor):
+        model.set_params(early_stopping_rounds=early_stopping_rounds)
+        model.fit(X_fit, y_fit, eval_set=[(X_val, y_val)], verbose=False)
+        return model, int(model.best_iteration) + 1
+
+    if isinstance(model, LGBMRegressor):
+        model.fit(
+            X_fit, y_fit,
+            eval_set=[(X_val, y_val)],
+            callbacks=[early_stopping(early_stopping_rounds, verbose=False)]
+        )
+        return model, int(model.best_iteration_ or model.n_estimators)
+
+    raise ValueError(f"Early stopping não suportado para {type(model).__name__}")
+
+
+def rounds_trained(model) -> int:
+    """Número de rounds efetivamente construídos (inclui a paciência)"""
+    if isinstance(model, GradientBoostingRegressor):
+        return int(model.n_estimators_)
+    if isinstance(model, XGBRegressor):
+        return int(model.get_booster().num_boosted_rounds())
+    if isinstance(model, LGBMRegressor):
+        return int(model.booster_.current_iteration())
+    return int(model.get_params().get('n_estimators', 0))
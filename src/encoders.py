@@ -0,0 +1,248 @@
+"""
+Codificações compactas para categóricas de alta cardinalidade
+
+No one-hot, Neighborhood (28 categorias), Exterior 1st/2nd (~16 cada) e
+afins viram dezenas de colunas cada. Aqui cada coluna pode usar, no
+lugar do one-hot:
+
+- 'target': média do target por categoria, suavizada para a média geral;
+  no treino os valores são out-of-fold (cada linha codificada sem o
+  próprio fold, senão o modelo "vê" o target)
+- 'frequency': fração das linhas de treino com a categoria
+- 'hash': one-hot em poucos baldes pelo crc32 da categoria
+
+Tudo é calculado com bincount sobre os códigos das categorias e guardado
+como arrays de consulta (posição = código da categoria, última posição =
+categoria não vista). A escolha é por coluna, via
+DataPreprocessor.create_preprocessor(..., encodings={col: 'target'}).
+
+Uso (comparação com o one-hot):
+    python -m src.encoders
+"""
+import argparse
+import time
+import zlib
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin, clone
+from sklearn.model_selection import KFold, train_test_split
+from typing import Dict, List
+
+from src.config import (
+    RANDOM_STATE, TEST_SIZE, RAW_DATA_FILE, TARGET_COLUMN,
+    TARGET_ENCODING_FOLDS, TARGET_ENCODING_SMOOTHING, HASH_ENCODING_BUCKETS
+)
+
+MISSING = 'missing'  # mesmo valor do imputer do one-hot
+
+
+def _as_strings(values: pd.Series) -> pd.Series:
+    return values.astype(str).where(values.notna(), MISSING)
+
+
+class _LookupEncoder(BaseEstimator, TransformerMixin):
+    """Base: categorias por coluna + array de consulta com uma posição extra (não vista)"""
+
+    def _codes(self, X: pd.DataFrame, col: str) -> np.ndarray:
+        codes = self.categories_[col].get_indexer(_as_strings(X[col]))
+        codes[codes < 0] = len(self.categories_[col])
+        return codes
+
+    def _fit_categories(self, X: pd.DataFrame):
+        self.columns_ = list(X.columns)
+        self.categories_ = {col: pd.Index(sorted(_as_strings(X[col]).unique())) for col in self.columns_}
+
+    def transform(self, X: pd.DataFrame) -> np.ndarray:
+        out = np.empty((len(X), len(self.columns_)), dtype=float)
+        for i, col in enumerate(self.columns_):
+            out[:, i] = self.lookup_[col][self._codes(X, col)]
+        return out
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array([f"{col}_{self._suffix}" for col in self.columns_], dtype=object)
+
+
+class TargetEncoder(_LookupEncoder):
+    """
+    Média suavizada do target por categoria (out-of-fold no fit_transform)
+
+    Args:
+        n_folds: Folds da codificação out-of-fold
+        smoothing: Peso (em linhas) da média geral na suavização
+    """
+    _suffix = 'te'
+
+    def __init__(self, n_folds: int = TARGET_ENCODING_FOLDS, smoothing: float = TARGET_ENCODING_SMOOTHING,
+                 random_state: int = RANDOM_STATE):
+        self.n_folds = n_folds
+        self.smoothing = smoothing
+        self.random_state = random_state
+
+    def _encode(self, sums, counts, prior) -> np.ndarray:
+        # Última posição (categoria não vista) fica com a média geral
+        encoded = (sums + self.smoothing * prior) / (counts + self.smoothing)
+        return np.append(encoded, prior)
+
+    def fit(self, X: pd.DataFrame, y=None):
+        self.fit_transform(X, y)
+        return self
+
+    def fit_transform(self, X: pd.DataFrame, y=None, **fit_params) -> np.ndarray:
+        if y is None:
+            raise ValueError("TargetEncoder precisa do target no fit")
+        y = np.asarray(y, dtype=float)
+        self._fit_categories(X)
+        self.prior_ = float(y.mean())
+        folds = list(KFold(self.n_folds, shuffle=True, random_state=self.random_state).split(y))
+
+        self.lookup_ = {}
+        out = np.empty((len(X), len(self.columns_)), dtype=float)
+        for i, col in enumerate(self.columns_):
+            codes = self._codes(X, col)
+            k = len(self.categories_[col])
+            sums = np.bincount(codes, weights=y, minlength=k)[:k]
+            counts = np.bincount(codes, minlength=k)[:k]
+            self.lookup_[col] = self._encode(sums, counts, self.prior_)
+
+            # Out-of-fold: tira das somas totais a contribuição do fold
+            for _, val_idx in folds:
+                val_codes = codes[val_idx]
+                fold_sums = sums - np.bincount(val_codes, weights=y[val_idx], minlength=k)[:k]
+                fold_counts = counts - np.bincount(val_codes, minlength=k)[:k]
+                fold_prior = (y.sum() - y[val_idx].sum()) / (len(y) - len(val_idx))
+                out[val_idx, i] = self._encode(fold_sums, fold_counts, fold_prior)[val_codes]
+        return out
+
+
+class FrequencyEncoder(_LookupEncoder):
+    """Fração das linhas de treino com a categoria (não vista = 0)"""
+    _suffix = 'freq'
+
+    def fit(self, X: pd.DataFrame, y=None):
+        self._fit_categories(X)
+        self.lookup_ = {}
+        for col in self.columns_:
+            k = len(self.categories_[col])
+            counts = np.bincount(self._codes(X, col), minlength=k + 1)[:k]
+            self.lookup_[col] = np.append(counts / len(X), 0.0)
+        return self
+
+
+class HashingEncoder(_LookupEncoder):
+    """
+    One-hot em n_buckets baldes por coluna (crc32 da categoria)
+
+    Os baldes das categorias de treino ficam num array de consulta; só
+    categorias não vistas são hasheadas no transform.
+    """
+
+    def __init__(self, n_buckets: int = HASH_ENCODING_BUCKETS):
+        self.n_buckets = n_buckets
+
+    def _bucket(self, value: str) -> int:
+        return zlib.crc32(value.encode()) % self.n_buckets
+
+    def fit(self, X: pd.DataFrame, y=None):
+        self._fit_categories(X)
+        self.lookup_ = {col: np.array([self._bucket(v) for v in cats], dtype=np.intp)
+                        for col, cats in self.categories_.items()}
+        return self
+
+    def transform(self, X: pd.DataFrame) -> np.ndarray:
+        out = np.zeros((len(X), len(self.columns_) * self.n_buckets), dtype=float)
+        rows = np.arange(len(X))
+        for i, col in enumerate(self.columns_):
+            values = _as_strings(X[col])
+            codes = self.categories_[col].get_indexer(values)
+            buckets = np.empty(len(X), dtype=np.intp)
+            known = codes >= 0
+            buckets[known] = self.lookup_[col][codes[known]]
+            if not known.all():
+                unseen, inverse = np.unique(values[~known].to_numpy(dtype=object), return_inverse=True)
+                buckets[~known] = np.array([self._bucket(v) for v in unseen], dtype=np.intp)[inverse]
+            out[rows, i * self.n_buckets + buckets] = 1.0
+        return out
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array([f"{col}_h{b}" for col in self.columns_ for b in range(self.n_buckets)], dtype=object)
+
+
+ENCODERS = {
+    'target': TargetEncoder,
+    'frequency': FrequencyEncoder,
+    'hash': HashingEncoder
+}
+
+
+def high_cardinality_columns(X: pd.DataFrame, categorical_features: List[str], min_categories: int = 10) -> List[str]:
+    """Categóricas com pelo menos min_categories valores distintos"""
+    return [col for col in categorical_features if X[col].nunique(dropna=False) >= min_categories]
+
+
+def compare_encodings(strategies: Dict[str, Dict], models: Dict, X_train: pd.DataFrame, y_train,
+                      X_test: pd.DataFrame, y_test) -> pd.DataFrame:
+    """
+    Compara estratégias de codificação (largura, tempo de ajuste, latência e R²)
+
+    Args:
+        strategies: {nome: encodings por coluna} ({} = só one-hot)
+        models: {nome: estimador não ajustado}
+    """
+    from src.benchmark import time_call
+    from src.data_preprocessing import DataPreprocessor
+    from src.evaluation import regression_metrics
+
+    rows = []
+    for strategy, encodings in strategies.items():
+        prep = DataPreprocessor()
+        prep.create_preprocessor(*prep.identify_feature_types(X_train), encodings=encodings)
+        start = time.perf_counter()
+        X_train_t = prep.fit_transform(X_train, y_train)
+        prep_time = time.perf_counter() - start
+        X_test_t = prep.transform(X_test)
+
+        for name, model in models.items():
+            start = time.perf_counter()
+            fitted = clone(model).fit(X_train_t, y_train)
+            fit_time = time.perf_counter() - start
+            row = X_test.iloc[:1]
+            rows.append({
+                'estratégia': strategy,
+                'modelo': name,
+                'n_colunas': X_train_t.shape[1],
+                'preprocess_s': prep_time,
+                'fit_s': fit_time,
+                'latency_1_ms': time_call(lambda: fitted.predict(prep.transform(row)))['median_ms'],
+                'test_r2': regression_metrics(y_test, fitted.predict(X_test_t))['r2']
+            })
+    return pd.DataFrame(rows).set_index(['estratégia', 'modelo'])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara target/frequency/hash encoding com o one-hot")
+    parser.add_argument('--min-categories', type=int, default=10,
+                        help="Cardinalidade mínima para trocar o one-hot")
+    args = parser.parse_args()
+
+    from lightgbm import LGBMRegressor
+    from sklearn.linear_model import Ridge
+    from src.data_preprocessing import DataPreprocessor, handle_outliers
+    from src.feature_engineering import FeatureEngineer
+
+    prep = DataPreprocessor()
+    df = handle_outliers(FeatureEngineer.create_all_features(prep.load_data(RAW_DATA_FILE)),
+                         TARGET_COLUMN, method='iqr')
+    X, y = prep.split_features_target(df)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+
+    _, categorical = prep.identify_feature_types(X_train)
+    wide = high_cardinality_columns(X_train, categorical, args.min_categories)
+    print(f"Alta cardinalidade ({len(wide)}): {', '.join(wide)}")
+
+    strategies = {'one-hot': {}, **{method: {col: method for col in wide} for method in ENCODERS}}
+    models = {
+        'Ridge': Ridge(random_state=RANDOM_STATE),
+        'LightGBM': LGBMRegressor(n_estimators=300, learning_rate=0.05, random_state=RANDOM_STATE, verbose=-1)
+    }
+    results = compare_encodings(strategies, models, X_train, y_train, X_test, y_test)
+    print(results.to_string(float_format=lambda v: f"{v:,.4f}"))
@@ -0,0 +1,231 @@
+"""
+Módulo de avaliação de modelos
+
+Calcula métricas de holdout, scores de validação cruzada e predições
+out-of-fold em uma única passada (estilo cross_validate), sem ajustes
+nem predições redundantes.
+"""
+import pickle
+import time
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import KFold
+from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
+from sklearn.utils import _safe_indexing
+from typing import Dict, List, Tuple
+
+from src.config import CV_FOLDS
+from src.early_stopping import supports_early_stopping, fit_with_early_stopping, rounds_trained
+
+
+def regression_metrics(y_true, y_pred, prefix: str = '') -> Dict:
+    """Calcula R², RMSE e MAE com um prefixo opcional (ex: 'test_')"""
+    return {
+        f'{prefix}r2': float(r2_score(y_true, y_pred)),
+        f'{prefix}rmse': float(np.sqrt(mean_squared_error(y_true, y_pred))),
+        f'{prefix}mae': float(mean_absolute_error(y_true, y_pred))
+    }
+
+
+def _fit_and_predict(model, X_fit, y_fit, X_pred_list: List,
+                     early_stopping_rounds: int = None) -> Tuple:
+    """Ajusta um modelo e faz as predições pedidas, medindo os tempos"""
+    start = time.perf_counter()
+    if early_stopping_rounds is not None:
+        model, n_rounds = fit_with_early_stopping(model, X_fit, y_fit, early_stopping_rounds)
+    else:
+        model.fit(X_fit, y_fit)
+        n_rounds = None
+    fit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predictions = [model.predict(X) for X in X_pred_list]
+    score_time = time.perf_counter() - start
+
+    return model, predictions, fit_time, score_time, n_rounds
+
+
+def measure_inference(model, X, n_repeats: int = 20) -> Dict:
+    """Tamanho serializado do modelo e latência de predição de uma linha"""
+    row = _safe_indexing(X, [0])
+    timings = []
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        model.predict(row)
+        timings.append(time.perf_counter() - start)
+
+    return {
+        'model_size_kb': len(pickle.dumps(model)) / 1024,
+        'latency_1_ms': float(np.median(timings) * 1000)
+    }
+
+
+class ModelEvaluator:
+    """Avalia modelos com holdout + CV em uma única passada
+
+    Cada fold é ajustado uma única vez e suas predições de validação são
+    guardadas como predições out-of-fold (reaproveitadas no stacking e na
+    análise de erros). O ajuste final no treino completo roda em paralelo
+    com os folds.
+
+    Com early_stopping_rounds, os boosters param em cada fold usando um
+    split de validação interno, e o ajuste final usa a mediana dos rounds
+    escolhidos nos folds (sem early stopping).
+
+    Com um FoldPreprocessor, os folds usam matrizes de um preprocessador
+    ajustado só no treino do fold (CV sem vazamento); X_train continua
+    sendo a matriz transformada usada no ajuste final.
+    """
+
+    def __init__(self, cv: int = CV_FOLDS, n_jobs: int = -1,
+                 return_train_score: bool = False, keep_estimators: bool = True,
+                 early_stopping_rounds: int = None):
+        self.cv = cv
+        self.n_jobs = n_jobs
+        self.early_stopping_rounds = early_stopping_rounds
+        self.return_train_score = return_train_score
+        self.keep_estimators = keep_estimators
+        self._folds = {}
+
+    def get_folds(self, n_samples: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Retorna os índices dos folds (os mesmos para todos os modelos)
+
+        Usa KFold sem embaralhar, igual ao cross_val_score com cv=int,
+        para manter os scores comparáveis com as execuções anteriores.
+        """
+        if n_samples not in self._folds:
+            kfold = KFold(n_splits=self.cv)
+            self._folds[n_samples] = list(kfold.split(np.arange(n_samples)))
+        return self._folds[n_samples]
+
+    def evaluate(self, model, X_train, y_train, X_test=None, y_test=None,
+                 refit: bool = True, fold_preprocessor=None) -> Dict:
+        """
+        Avalia um modelo: CV + predições out-of-fold + métricas de holdout
+
+        Args:
+            model: Estimador (não ajustado) a ser avaliado
+            X_train, y_train: Dados de treino
+            X_test, y_test: Dados de teste (opcionais)
+            refit: Se True, ajusta o modelo no treino completo
+            fold_preprocessor: FoldPreprocessor com os dados brutos (opcional)
+
+        Returns:
+            Dicionário com 'model', 'metrics', 'oof_predictions',
+            'fold_estimators', 'folds' e 'test_predictions'
+        """
+        y_train = np.asarray(y_train)
+        folds = self.get_folds(len(y_train))
+        use_early_stopping = (self.early_stopping_rounds is not None
+                              and supports_early_stopping(model))
+        es_rounds = self.early_stopping_rounds if use_early_stopping else None
+
+        # Matrizes de cada fold (reajustadas por fold ou recortadas de X_train)
+        if fold_preprocessor is not None:
+            fold_matrices = fold_preprocessor.transform_folds(folds)
+        else:
+            fold_matrices = [
+                (_safe_indexing(X_train, train_idx), _safe_indexing(X_train, val_idx))
+                for train_idx, val_idx in folds
+            ]
+
+        # Jobs dos folds: ajusta no treino do fold, prediz só a validação
+        jobs = []
+        for (train_idx, _), (X_fit, X_val) in zip(folds, fold_matrices):
+            jobs.append(delayed(_fit_and_predict)(
+                clone(model), X_fit, y_train[train_idx], [X_val], es_rounds
+            ))
+
+        X_pred_list = []
+        if X_test is not None:
+            X_pred_list.append(X_test)
+        if self.return_train_score:
+            X_pred_list.append(X_train)
+
+        # Sem early stopping, o ajuste final roda na mesma chamada paralela
+        if refit and not use_early_stopping:
+            jobs.append(delayed(_fit_and_predict)(clone(model), X_train, y_train, X_pred_list))
+
+        start = time.perf_counter()
+        outputs = Parallel(n_jobs=self.n_jobs)(jobs)
+
+        # Com early stopping, o ajuste final depende dos rounds dos folds
+        chosen_rounds = None
+        if use_early_stopping:
+            chosen_rounds = int(np.median([out[4] for out in outputs]))
+            if refit:
+                final_model = clone(model).set_params(n_estimators=chosen_rounds)
+                outputs.append(_fit_and_predict(final_model, X_train, y_train, X_pred_list))
+        wall_time = time.perf_counter() - start
+
+        fold_outputs = outputs[:len(folds)]
+
+        # Montar predições out-of-fold e scores por fold
+        oof_predictions = np.empty(len(y_train), dtype=float)
+        cv_scores = []
+        for (train_idx, val_idx), (_, preds, _, _, _) in zip(folds, fold_outputs):
+            oof_predictions[val_idx] = preds[0]
+            cv_scores.append(r2_score(y_train[val_idx], preds[0]))
+        cv_scores = np.array(cv_scores)
+
+        metrics = {}
+        fitted_model = None
+        test_predictions = None
+
+        if refit:
+            fitted_model, preds, _, _, _ = outputs[-1]
+            if self.return_train_score:
+                metrics.update(regression_metrics(y_train, preds[-1], prefix='train_'))
+            if X_test is not None:
+                test_predictions = preds[0]
+                metrics.update(regression_metrics(y_test, test_predictions, prefix='test_'))
+
+        metrics['cv_r2_mean'] = float(cv_scores.mean())
+        metrics['cv_r2_std'] = float(cv_scores.std())
+        metrics.update(regression_metrics(y_train, oof_predictions, prefix='oof_'))
+
+        # Contabilidade de custo da avaliação
+        metrics['n_fits'] = len(outputs)
+        metrics['fit_time'] = float(sum(out[2] for out in outputs))
+        metrics['score_time'] = float(sum(out[3] for out in outputs))
+        metrics['wall_time'] = float(wall_time)
+        metrics['cv_fit_time'] = float(sum(out[2] for out in fold_outputs))
+        metrics['cv_score_time'] = float(sum(out[3] for out in fold_outputs))
+        if refit:
+            metrics['refit_time'] = float(outputs[-1][2])
+            metrics['predict_time'] = float(outputs[-1][3])
+
+        if use_early_stopping:
+            metrics.update(self._early_stopping_report(model, outputs, chosen_rounds))
+
+        if fitted_model is not None and X_test is not None:
+            metrics.update(measure_inference(fitted_model, X_test))
+
+        return {
+            'model': fitted_model,
+            'metrics': metrics,
+            'cv_scores': cv_scores,
+            'oof_predictions': oof_predictions,
+            'fold_estimators': [out[0] for out in fold_outputs] if self.keep_estimators else None,
+            'folds': folds,
+            'test_predictions': test_predictions
+        }
+
+    @staticmethod
+    def _early_stopping_report(model, outputs: List, chosen_rounds: int) -> Dict:
+        """Rounds escolhidos e estimativa do tempo poupado frente ao teto"""
+        max_rounds = model.get_params()['n_estimators']
+        time_saved = 0.0
+        total_rounds = 0
+        for fitted, _, fit_time, _, _ in outputs:
+            n_trained = max(1, rounds_trained(fitted))
+            total_rounds += n_trained
+            time_saved += fit_time / n_trained * (max_rounds - n_trained)
+
+        return {
+            'n_estimators': chosen_rounds,
+            'max_rounds': max_rounds,
+            'rounds_trained': total_rounds,
+            'estimated_time_saved': float(time_saved)
+        }
@@ -1,13 +1,224 @@
 # Feature Engineering
 
+import re
 import pandas as pd
 import numpy as np
+from functools import lru_cache
+from sklearn.base import BaseEstimator, TransformerMixin
+from typing import Dict, List
 # from scipy import stats 
 
 
+# Especificação declarativa das features derivadas: (nome, operação, entradas).
+# Cada feature só é criada se as entradas existirem ('sum' aceita qualquer
+# subconjunto), na ordem da lista. As operações reproduzem exatamente o
+# que o pandas faria (valores e dtypes), sem apply linha a linha.
+FEATURE_SPEC = [
+    ('House_Age', 'sub', ('Yr Sold', 'Year Built')),  # casas mais velhas valem menos geralmente
+    ('Years_Since_Remod', 'sub', ('Yr Sold', 'Year Remod/Add')),
+    ('Total_Bathrooms', 'sum', ('Full Bath', 'Half Bath', 'Bsmt Full Bath', 'Bsmt Half Bath')),
+    ('Total_SF', 'sum', ('Gr Liv Area', 'Total Bsmt SF')),
+    ('Total_Porch_SF', 'sum', ('Wood Deck SF', 'Open Porch SF', 'Enclosed Porch', '3Ssn Porch', 'Screen Porch')),
+    ('Is_Remodeled', 'ne', ('Year Built', 'Year Remod/Add')),
+    ('Overall_Score', 'mul', ('Overall Qual', 'Overall Cond')),
+    ('Has_Garage', 'positive', ('Garage Cars',)),
+    ('Has_Pool', 'positive', ('Pool Area',)),
+    ('Has_Fireplace', 'positive', ('Fireplaces',)),
+    ('Lot_To_Living_Ratio', 'ratio', ('Lot Area', 'Gr Liv Area')),  # lote / (área construída + 1)
+    ('Sale_Season', 'season', ('Mo Sold',)),
+]
+
+INTERACTION_SPEC = [
+    ('Qual_Area_Interaction', 'mul', ('Overall Qual', 'Gr Liv Area')),
+    ('Age_Qual_Interaction', 'mul', ('House_Age', 'Overall Qual')),
+]
+
+# Mês -> temporada (índice 0 e meses inválidos/NaN caem em 'Fall', como no if/else antigo)
+_SEASONS = np.array(['Fall', 'Winter', 'Winter', 'Spring', 'Spring', 'Spring',
+                     'Summer', 'Summer', 'Summer', 'Fall', 'Fall', 'Fall', 'Winter'], dtype=object)
+
+
+def _season_array(month):
+    month = np.asarray(month, dtype=np.float64)
+    valid = (month >= 0) & (month <= 12) & (month == np.floor(month))  # NaN -> False
+    return _SEASONS[np.where(valid, month, 0).astype(np.intp)]
+
+
+def _sum_arrays(*arrays):
+    # DataFrame.sum(axis=1): ignora NaN, inteiros somam em int64
+    if all(np.issubdtype(a.dtype, np.integer) for a in arrays):
+        return np.sum(arrays, axis=0, dtype=np.int64)
+    dtype = np.result_type(*arrays)
+    total = np.zeros(len(arrays[0]), dtype=dtype)
+    for a in arrays:
+        total += np.where(np.isnan(a), 0, a) if np.issubdtype(a.dtype, np.floating) else a
+    return total
+
+
+# Operações vetorizadas (arrays numpy)
+_ARRAY_OPS = {
+    'sub': lambda a, b: a - b,
+    'mul': lambda a, b: a * b,
+    'ne': lambda a, b: (a != b).astype(int),
+    'positive': lambda a: (a > 0).astype(int),
+    'ratio': lambda a, b: a / (b + 1),
+    'sum': _sum_arrays,
+    'season': _season_array,
+}
+
+
+def _is_nan(value) -> bool:
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+
+# Mesmas operações para um registro só (escalares Python; None = ausente)
+_SCALAR_OPS = {
+    'sub': lambda a, b: a - b,
+    'mul': lambda a, b: a * b,
+    'ne': lambda a, b: int(a != b),
+    'positive': lambda a: int(a > 0),
+    'ratio': lambda a, b: a / (b + 1),
+    'sum': lambda *values: sum(v for v in values if not _is_nan(v)),
+    'season': lambda m: _SEASONS[int(m)] if not _is_nan(m) and 0 <= m <= 12 and m == int(m) else 'Fall',
+}
+
+
+@lru_cache(maxsize=64)
+def compile_plan(specs: tuple, columns: tuple) -> tuple:
+    """
+    Resolve a especificação para um conjunto de colunas de entrada
+
+    Returns:
+        Tupla de (nome, operação, entradas presentes), só com as features
+        que podem ser calculadas. Fica em cache por conjunto de colunas.
+    """
+    available = set(columns)
+    plan = []
+    for name, op, inputs in specs:
+        present = tuple(col for col in inputs if col in available)
+        if (op == 'sum' and present) or (present and len(present) == len(inputs)):
+            plan.append((name, op, present))
+            available.add(name)
+    return tuple(plan)
+
+
+def _run_plan(df: pd.DataFrame, plan: tuple) -> pd.DataFrame:
+    """Calcula as features do plano e junta tudo ao df numa única alocação"""
+    columns = {}
+    for name, op, inputs in plan:
+        values = [columns[col] if col in columns else df[col].to_numpy() for col in inputs]
+        if op == 'season':
+            month = values[0]
+            if month.dtype == object:
+                month = pd.to_numeric(pd.Series(month), errors='coerce').to_numpy()
+            # O construtor infere o dtype de texto, como o apply fazia
+            columns[name] = pd.Series(_season_array(month), index=df.index)
+        elif any(v.dtype == object for v in values):
+            # Colunas object (ex: None vindo de JSON): mesma operação no pandas
+            series = [pd.Series(v, index=df.index) for v in values]
+            columns[name] = (pd.concat(series, axis=1).sum(axis=1) if op == 'sum'
+                             else _ARRAY_OPS[op](*series))
+        else:
+            columns[name] = _ARRAY_OPS[op](*values)
+
+    new = pd.DataFrame(columns, index=df.index)
+    existing = [col for col in new.columns if col in df.columns]
+    if existing:
+        # Raro: feature já presente na entrada, sobrescreve na mesma posição
+        df = df.copy()
+        for col in existing:
+            df[col] = new.pop(col)
+    return pd.concat([df, new], axis=1) if len(new.columns) else df.copy()
+
+
+def _api_alias(column: str) -> str:
+    """Nome da coluna no estilo dos campos da API (ex: 'Year Remod/Add' -> 'Year_Remod_Add')"""
+    return re.sub(r'[^0-9A-Za-z]+', '_', column).strip('_')
+
+
+DERIVED_FEATURES = [name for name, _, _ in FEATURE_SPEC + INTERACTION_SPEC]
+
+
+class FeatureTransformer(BaseEstimator, TransformerMixin):
+    """
+    Feature engineering como transformer do sklearn (1º passo do pipeline servido)
+
+    O fit guarda as colunas brutas e compila o plano das features uma vez.
+    O transform aceita DataFrame, dict ou lista de dicts:
+    - nomes no estilo da API (Gr_Liv_Area) viram os do CSV (Gr Liv Area)
+    - colunas ausentes entram como NaN (o preprocessador imputa)
+    - numéricas que chegam como object (None, texto) são convertidas
+
+    Args:
+        columns: Colunas brutas esperadas (None = as do X do fit)
+        categorical_columns: Quais delas são categóricas (None = inferidas do X)
+    """
+
+    def __init__(self, columns: list = None, categorical_columns: list = None):
+        self.columns = columns
+        self.categorical_columns = categorical_columns
+
+    def fit(self, X=None, y=None):
+        X = None if X is None else self._to_frame(X)
+        self.columns_ = list(self.columns if self.columns is not None else X.columns)
+        if self.categorical_columns is not None:
+            self.categorical_columns_ = list(self.categorical_columns)
+        else:
+            self.categorical_columns_ = [col for col in self.columns_
+                                         if not pd.api.types.is_numeric_dtype(X[col])]
+        self.aliases_ = {_api_alias(col): col for col in self.columns_ if _api_alias(col) != col}
+        self.plan_ = compile_plan(tuple(FEATURE_SPEC + INTERACTION_SPEC), tuple(self.columns_))
+        self.feature_names_out_ = self.columns_ + [name for name, _, _ in self.plan_]
+        return self
+
+    @staticmethod
+    def _to_frame(X) -> pd.DataFrame:
+        if isinstance(X, dict):
+            X = [X]
+        if isinstance(X, list):
+            X = pd.DataFrame(X)
+        return X
+
+    def align(self, X) -> pd.DataFrame:
+        """Entrada bruta -> DataFrame com exatamente as colunas do fit"""
+        df = self._to_frame(X)
+        renames = {alias: col for alias, col in self.aliases_.items()
+                   if alias in df.columns and col not in df.columns}
+        if renames:
+            df = df.rename(columns=renames)
+
+        # Ausentes viram NaN (o imputer do sklearn não reconhece None em colunas object)
+        categorical = set(self.categorical_columns_)
+        fixes = {}
+        for col in self.columns_:
+            if col not in df.columns:
+                fixes[col] = pd.Series(np.nan, index=df.index, dtype=object if col in categorical else float)
+            elif col in categorical:
+                if df[col].dtype == object:
+                    fixes[col] = df[col].where(df[col].notna(), np.nan)
+            elif not pd.api.types.is_numeric_dtype(df[col]):
+                fixes[col] = pd.to_numeric(df[col], errors='coerce')
+        if fixes:
+            df = df.assign(**fixes)
+        return df[self.columns_]
+
+    def missing_columns(self, X) -> List[str]:
+        """Colunas do fit ausentes na entrada bruta (aceita nomes do CSV ou da API)"""
+        present = {self.aliases_.get(col, col) for col in self._to_frame(X).columns}
+        return [col for col in self.columns_ if col not in present]
+
+    def transform(self, X) -> pd.DataFrame:
+        return _run_plan(self.align(X), self.plan_)
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array(self.feature_names_out_, dtype=object)
+
+
 class FeatureEngineer:
     """cria features novas baseadas no dataset
     
+    As features são definidas em FEATURE_SPEC / INTERACTION_SPEC e
+    calculadas com operações vetorizadas.
     """
     
     @staticmethod
@@ -15,96 +226,8 @@ class FeatureEngineer:
         """
         Cria novas features baseadas no conhecimento do domínio
         """
-        df = df.copy()
-        
-        # idade da casa - faz sentido, casas mais velhas valem menos geralmente
-        if 'Year Built' in df.columns and 'Yr Sold' in df.columns:
-            df['House_Age'] = df['Yr Sold'] - df['Year Built']
-        
-        # quanto tempo faz que reformou
-        if 'Year Remod/Add' in df.columns and 'Yr Sold' in df.columns:
-            df['Years_Since_Remod'] = df['Yr Sold'] - df['Year Remod/Add']
-        
-        # somar todos os banheiros (pq ta espalhado em varias colunas)
-        bathroom_cols = []
-        if 'Full Bath' in df.columns:
-            bathroom_cols.append('Full Bath')
-        if 'Half Bath' in df.columns:
-            bathroom_cols.append('Half Bath')
-        if 'Bsmt Full Bath' in df.columns:
-            bathroom_cols.append('Bsmt Full Bath')
-        if 'Bsmt Half Bath' in df.columns:
-            bathroom_cols.append('Bsmt Half Bath')
-        
-        if bathroom_cols:
-            df['Total_Bathrooms'] = df[bathroom_cols].sum(axis=1)
-        
-        # 4. Área total da casa
-        area_cols = []
-        if 'Gr Liv Area' in df.columns:
-            area_cols.append('Gr Liv Area')
-        if 'Total Bsmt SF' in df.columns:
-            area_cols.append('Total Bsmt SF')
-        
-        if area_cols:
-            df['Total_SF'] = df[area_cols].sum(axis=1)
-        
-        # 5. Área total de porches
-        porch_cols = []
-        if 'Wood Deck SF' in df.columns:
-            porch_cols.append('Wood Deck SF')
-        if 'Open Porch SF' in df.columns:
-            porch_cols.append('Open Porch SF')
-        if 'Enclosed Porch' in df.columns:
-            porch_cols.append('Enclosed Porch')
-        if '3Ssn Porch' in df.columns:
-            porch_cols.append('3Ssn Porch')
-        if 'Screen Porch' in df.columns:
-            porch_cols.append('Screen Porch')
-        
-        if porch_cols:
-            df['Total_Porch_SF'] = df[porch_cols].sum(axis=1)
-        
-        # 6. Indicador de casa remodelada
-        if 'Year Built' in df.columns and 'Year Remod/Add' in df.columns:
-            df['Is_Remodeled'] = (df['Year Built'] != df['Year Remod/Add']).astype(int)
-        
-        # 7. Qualidade geral x Condição geral
-        if 'Overall Qual' in df.columns and 'Overall Cond' in df.columns:
-            df['Overall_Score'] = df['Overall Qual'] * df['Overall Cond']
-        
-        # 8. Indicador de garagem
-        if 'Garage Cars' in df.columns:
-            df['Has_Garage'] = (df['Garage Cars'] > 0).astype(int)
-        
-        # 9. Indicador de piscina
-        if 'Pool Area' in df.columns:
-            df['Has_Pool'] = (df['Pool Area'] > 0).astype(int)
-        
-        # 10. Indicador de lareira
-        if 'Fireplaces' in df.columns:
-            df['Has_Fireplace'] = (df['Fireplaces'] > 0).astype(int)
-        
-        # 11. Razão área lote / área construída
-        if 'Lot Area' in df.columns and 'Gr Liv Area' in df.columns:
-            df['Lot_To_Living_Ratio'] = df['Lot Area'] / (df['Gr Liv Area'] + 1)
-        
-        # 12. Temporada de venda
-        if 'Mo Sold' in df.columns:
-            def get_season(month):
-                if month in [12, 1, 2]:
-                    return 'Winter'
-                elif month in [3, 4, 5]:
-                    return 'Spring'
-                elif month in [6, 7, 8]:
-                    return 'Summer'
-                else:
-                    return 'Fall'
-            
-            df['Sale_Season'] = df['Mo Sold'].apply(get_season)
-        
+        df = _run_plan(df, compile_plan(tuple(FEATURE_SPEC), tuple(df.columns)))
         print(f"Feats criadas. Shape atual: {df.shape}")
-        
         return df
     
     @staticmethod
@@ -112,22 +235,37 @@ class FeatureEngineer:
         """
         Cria features de interação entre as variáveis importantes
         """
-        df = df.copy()
-        
-        # Interação entre qualidade e área
-        if 'Overall Qual' in df.columns and 'Gr Liv Area' in df.columns:
-            df['Qual_Area_Interaction'] = df['Overall Qual'] * df['Gr Liv Area']
-        
-        # Interação entre idade e qualidade
-        if 'House_Age' in df.columns and 'Overall Qual' in df.columns:
-            df['Age_Qual_Interaction'] = df['House_Age'] * df['Overall Qual']
+        return _run_plan(df, compile_plan(tuple(INTERACTION_SPEC), tuple(df.columns)))
+    
+    @staticmethod
+    def create_all_features(df: pd.DataFrame) -> pd.DataFrame:
+        """create_features + create_interaction_features numa passada só (uma alocação)"""
+        return _run_plan(df, compile_plan(tuple(FEATURE_SPEC + INTERACTION_SPEC), tuple(df.columns)))
+    
+    @staticmethod
+    def create_record_features(record: Dict) -> Dict:
+        """
+        Caminho rápido para um registro (dict com nomes do CSV), sem pandas
         
-        return df
+        Retorna um novo dict com as features derivadas acrescentadas, com
+        os mesmos valores do create_all_features numa linha. Não é usado
+        pela API: o preprocessador precisa de um DataFrame, então o
+        pipeline servido passa pelo FeatureTransformer.
+        """
+        out = dict(record)
+        for name, op, inputs in compile_plan(tuple(FEATURE_SPEC + INTERACTION_SPEC), tuple(record)):
+            out[name] = _SCALAR_OPS[op](*[np.nan if out[col] is None else out[col] for col in inputs])
+        return out
     
     @staticmethod
     def select_top_features(X: pd.DataFrame, y: pd.Series, k: int = 50) -> list:
         """
-        Seleciona as k melhores features usando correlação
+        Seleciona as k melhores features pelo F-score (f_regression)
+        
+        Só olha as numéricas brutas, com NaN imputado pela mediana da coluna
+        (a correlação antiga ignorava os pares com NaN). Para a matriz
+        transformada (com o one-hot) e outros scores, com cache em disco,
+        ver src/feature_selection.py.
         
         Args:
             X: Features
@@ -137,18 +275,16 @@ class FeatureEngineer:
         Returns:
             Lista com nomes das top features
         """
-        from sklearn.feature_selection import f_regression, SelectKBest
+        from src.feature_selection import FeatureSelector
         
-        # Apenas features numéricas
+        # Apenas features numéricas (NaN pela mediana: o f_regression não aceita NaN)
         X_numeric = X.select_dtypes(include=[np.number])
+        X_numeric = X_numeric.fillna(X_numeric.median())
         
-        selector = SelectKBest(score_func=f_regression, k=min(k, X_numeric.shape[1]))
-        selector.fit(X_numeric, y)
-        
-        # Obter scores
+        # F-scores sem cache: helper simples, sem efeitos em disco
         scores = pd.DataFrame({
             'feature': X_numeric.columns,
-            'score': selector.scores_
+            'score': FeatureSelector(X_numeric.columns, cache_dir=None).f_scores(X_numeric.to_numpy(dtype=float), y)
         }).sort_values('score', ascending=False)
         
         print("\nTop 10 features por F-score:")
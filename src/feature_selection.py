@@ -0,0 +1,312 @@
+"""
+Seleção de features na matriz transformada (numéricas + one-hot)
+
+O FeatureEngineer.select_top_features só olhava as numéricas brutas e
+recalculava o f_regression a cada chamada. Aqui os scores são calculados
+sobre as colunas que o modelo realmente recebe (incluindo cada coluna do
+one-hot) e guardados em disco, com chave no hash dos dados:
+
+- F-score (f_regression): uma chamada vetorizada, já é barata
+- informação mútua: em blocos de colunas, em paralelo
+- importância por permutação: um job por (modelo, bloco de colunas)
+
+Com as features escolhidas, reduce() monta um preprocessador reduzido
+(só as colunas brutas necessárias + ColumnSubset) e retreina o modelo no
+subconjunto, medindo a latência, o tamanho e a memória contra o original.
+
+Uso:
+    python -m src.feature_selection --k 60 --out models/reduced
+"""
+import argparse
+import os
+import pickle
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.compose import ColumnTransformer
+from sklearn.feature_selection import f_regression, mutual_info_regression
+from sklearn.metrics import r2_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from typing import Dict, List
+
+from src.config import (
+    CACHE_DIR, RAW_DATA_FILE, RANDOM_STATE, TEST_SIZE, TARGET_COLUMN,
+    FEATURE_SELECTION_BLOCK_SIZE, FEATURE_SELECTION_PERM_REPEATS
+)
+from src.data_preprocessing import ColumnSubset, DataPreprocessor, handle_outliers
+from src.evaluation import regression_metrics
+
+
+def dataset_fingerprint(X, y, feature_names: List[str] = None) -> str:
+    """Hash do conteúdo dos dados (chave do cache de scores)"""
+    return joblib.hash((np.asarray(X), np.asarray(y), list(feature_names or [])))
+
+
+def _column_blocks(n_columns: int, block_size: int) -> List[np.ndarray]:
+    # Blocos fixos (não dependem de n_jobs): o resultado é o mesmo com 1 ou N processos
+    return [np.arange(start, min(start + block_size, n_columns))
+            for start in range(0, n_columns, block_size)]
+
+
+def _mutual_info_block(X, y, columns, discrete, random_state) -> np.ndarray:
+    return mutual_info_regression(X[:, columns], y, discrete_features=discrete[columns],
+                                  random_state=random_state)
+
+
+def _permutation_block(model, X, y, columns, n_repeats: int, random_state: int) -> np.ndarray:
+    """Queda média de R² ao embaralhar cada coluna do bloco"""
+    baseline = r2_score(y, model.predict(X))
+    X_perm = np.array(X, dtype=float, copy=True)
+    drops = np.empty(len(columns))
+    for i, col in enumerate(columns):
+        rng = np.random.default_rng([random_state, col])
+        original = X_perm[:, col].copy()
+        scores = []
+        for _ in range(n_repeats):
+            X_perm[:, col] = rng.permutation(original)
+            scores.append(r2_score(y, model.predict(X_perm)))
+        X_perm[:, col] = original
+        drops[i] = baseline - np.mean(scores)
+    return drops
+
+
+class FeatureSelector:
+    """
+    Scores de features com cache em disco
+
+    Args:
+        feature_names: Nomes das colunas da matriz (ex: DataPreprocessor.feature_names)
+        n_jobs: Processos do joblib
+        block_size: Colunas por job
+        cache_dir: Onde guardar os scores (None = sem cache em disco)
+        random_state: Semente da informação mútua e das permutações
+    """
+
+    def __init__(self, feature_names: List[str], n_jobs: int = -1,
+                 block_size: int = FEATURE_SELECTION_BLOCK_SIZE,
+                 cache_dir=CACHE_DIR / "feature_selection", random_state: int = RANDOM_STATE):
+        self.feature_names = list(feature_names)
+        self.n_jobs = n_jobs
+        self.block_size = block_size
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.random_state = random_state
+        self.log = []
+
+    def _cached(self, method: str, fingerprint: str, params, compute) -> np.ndarray:
+        """Carrega os scores do cache ou calcula e grava"""
+        key = joblib.hash((method, fingerprint, params, self.block_size, self.random_state))
+        path = self.cache_dir / f"{method}-{key[:16]}.pkl" if self.cache_dir is not None else None
+        start = time.perf_counter()
+        if path is not None and path.exists():
+            values = joblib.load(path)
+            status = 'hit'
+        else:
+            values = compute()
+            status = 'miss'
+            if path is not None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_name(path.name + '.tmp')
+                joblib.dump(values, tmp_path)
+                os.replace(tmp_path, path)
+        self.log.append({'method': method, 'status': status, 'time': time.perf_counter() - start})
+        return values
+
+    def f_scores(self, X, y, fingerprint: str = None) -> np.ndarray:
+        """F-score de cada coluna (colunas constantes ficam com 0)"""
+        fingerprint = fingerprint or dataset_fingerprint(X, y, self.feature_names)
+
+        def compute():
+            scores, _ = f_regression(np.asarray(X, dtype=float), np.asarray(y))
+            return np.nan_to_num(scores)
+        return self._cached('f_score', fingerprint, None, compute)
+
+    def mutual_info(self, X, y, fingerprint: str = None) -> np.ndarray:
+        """Informação mútua; colunas só com 0/1 (one-hot) são tratadas como discretas"""
+        fingerprint = fingerprint or dataset_fingerprint(X, y, self.feature_names)
+
+        def compute():
+            X_arr = np.asarray(X, dtype=float)
+            discrete = ((X_arr == 0) | (X_arr == 1)).all(axis=0)
+            blocks = _column_blocks(X_arr.shape[1], self.block_size)
+            results = Parallel(n_jobs=self.n_jobs)(
+                delayed(_mutual_info_block)(X_arr, np.asarray(y), columns, discrete, self.random_state)
+                for columns in blocks
+            )
+            return np.concatenate(results)
+        return self._cached('mutual_info', fingerprint, None, compute)
+
+    def permutation(self, models: Dict, X_train, y_train, X_val, y_val,
+                    n_repeats: int = FEATURE_SELECTION_PERM_REPEATS) -> Dict[str, np.ndarray]:
+        """
+        Importância por permutação no conjunto de validação, por modelo
+
+        Args:
+            models: {nome: estimador não ajustado}; ajustados em paralelo em X_train
+        """
+        fingerprint = dataset_fingerprint(
+            X_val, y_val, [dataset_fingerprint(X_train, y_train, self.feature_names)])
+        params = {name: (type(model).__name__, joblib.hash(model.get_params()), n_repeats)
+                  for name, model in models.items()}
+
+        def compute():
+            fitted = Parallel(n_jobs=self.n_jobs)(
+                delayed(clone(model).fit)(X_train, y_train) for model in models.values())
+            X_arr, y_arr = np.asarray(X_val, dtype=float), np.asarray(y_val)
+            blocks = _column_blocks(X_arr.shape[1], self.block_size)
+            jobs = [(name, columns) for name in models for columns in blocks]
+            results = Parallel(n_jobs=self.n_jobs)(
+                delayed(_permutation_block)(model, X_arr, y_arr, columns, n_repeats, self.random_state)
+                for model in fitted for columns in blocks
+            )
+            scores = {name: np.empty(X_arr.shape[1]) for name in models}
+            for (name, columns), drops in zip(jobs, results):
+                scores[name][columns] = drops
+            return scores
+        return self._cached('permutation', fingerprint, params, compute)
+
+    def score(self, X_train, y_train, X_val=None, y_val=None, models: Dict = None) -> pd.DataFrame:
+        """
+        Tabela de scores por coluna, ordenada pelo rank médio entre os métodos
+
+        Sem models (ou sem dados de validação) só entram F-score e informação mútua.
+        """
+        fingerprint = dataset_fingerprint(X_train, y_train, self.feature_names)
+        scores = pd.DataFrame({
+            'f_score': self.f_scores(X_train, y_train, fingerprint),
+            'mutual_info': self.mutual_info(X_train, y_train, fingerprint)
+        }, index=pd.Index(self.feature_names, name='feature'))
+        if models and X_val is not None:
+            for name, values in self.permutation(models, X_train, y_train, X_val, y_val).items():
+                scores[f'perm_{name}'] = values
+
+        scores['rank'] = scores.rank(ascending=False, method='average').mean(axis=1)
+        return scores.sort_values('rank')
+
+    @staticmethod
+    def select(scores: pd.DataFrame, k: int) -> List[str]:
+        """As k colunas com melhor rank médio"""
+        return scores.index[:k].tolist()
+
+
+def _output_names(preprocessor: ColumnTransformer) -> List[str]:
+    """Nomes das colunas de saída, sem o prefixo 'num__'/'cat__' (como no feature_names.pkl)"""
+    names = []
+    for name, transformer, columns in preprocessor.transformers_:
+        if name != 'remainder':
+            names.extend(transformer.get_feature_names_out(columns))
+    return names
+
+
+def build_reduced_preprocessor(preprocessor: ColumnTransformer, X_train: pd.DataFrame,
+                               selected: List[str], y_train=None) -> Pipeline:
+    """
+    Preprocessador que só produz as colunas selecionadas
+
+    O ColumnTransformer é reajustado só nas colunas brutas necessárias
+    (imputação, escala e categorias são por coluna, então as colunas que
+    ficam saem iguais) e um ColumnSubset descarta os dummies não escolhidos.
+    y_train só é necessário com target encoding.
+    """
+    selected = set(selected)
+    transformers = []
+    for name, transformer, columns in preprocessor.transformers_:
+        if name == 'remainder':
+            continue
+        outputs = transformer.get_feature_names_out(columns)
+        keep = [col for col in columns
+                if any(out in selected for out in outputs if out == col or out.startswith(f"{col}_"))]
+        if keep:
+            transformers.append((name, clone(transformer), keep))
+
+    reduced = ColumnTransformer(transformers).fit(X_train, y_train)
+    reduced_names = _output_names(reduced)
+    # Ordem das colunas = ordem no preprocessador original
+    output = [name for name in _output_names(preprocessor) if name in selected]
+    indices = [reduced_names.index(name) for name in output]
+    return Pipeline([('preprocessor', reduced), ('select', ColumnSubset(indices, output))])
+
+
+def _artifact_stats(preprocessor, model, X_raw: pd.DataFrame, y) -> Dict:
+    from src.benchmark import time_call
+    X = preprocessor.transform(X_raw)
+    row = X_raw.iloc[:1]
+    return {
+        'n_columns': int(X.shape[1]),
+        'test_r2': regression_metrics(y, model.predict(X))['r2'],
+        'latency_1_ms': time_call(lambda: model.predict(preprocessor.transform(row)))['median_ms'],
+        'latency_batch_ms': time_call(lambda: model.predict(preprocessor.transform(X_raw)))['median_ms'],
+        'matrix_kb_per_1k_rows': np.asarray(X, dtype=float).nbytes / len(X) * 1000 / 1024,
+        'artifact_kb': (len(pickle.dumps(preprocessor)) + len(pickle.dumps(model))) / 1024
+    }
+
+
+def reduce(model, preprocessor: ColumnTransformer, X_train: pd.DataFrame, y_train,
+           X_test: pd.DataFrame, y_test, selected: List[str]) -> Dict:
+    """
+    Retreina o modelo no subconjunto e compara com o par original
+
+    Args:
+        model: Modelo ajustado no preprocessador completo
+        preprocessor: ColumnTransformer ajustado
+        X_train, X_test: Dados brutos (após feature engineering)
+        selected: Colunas da matriz transformada a manter
+
+    Returns:
+        {'preprocessor', 'model', 'comparison' (DataFrame original x reduzido)}
+    """
+    reduced_preprocessor = build_reduced_preprocessor(preprocessor, X_train, selected, y_train)
+    reduced_model = clone(model).fit(reduced_preprocessor.transform(X_train), y_train)
+
+    comparison = pd.DataFrame({
+        'original': _artifact_stats(preprocessor, model, X_test, y_test),
+        'reduzido': _artifact_stats(reduced_preprocessor, reduced_model, X_test, y_test)
+    })
+    return {'preprocessor': reduced_preprocessor, 'model': reduced_model, 'comparison': comparison}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seleção de features na matriz transformada")
+    parser.add_argument('--k', type=int, default=60, help="Colunas a manter")
+    parser.add_argument('--model', default='Gradient Boosting', help="Modelo do ModelTrainer a reduzir")
+    parser.add_argument('--out', help="Diretório para salvar o pipeline reduzido")
+    args = parser.parse_args()
+
+    from src.feature_engineering import FeatureEngineer
+    from src.model_training import ModelTrainer
+
+    prep = DataPreprocessor()
+    df = handle_outliers(FeatureEngineer.create_all_features(prep.load_data(RAW_DATA_FILE)),
+                         TARGET_COLUMN, method='iqr')
+    X, y = prep.split_features_target(df)
+    prep.create_preprocessor(*prep.identify_feature_types(X))
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+    X_train_proc = prep.fit_transform(X_train)
+
+    # Validação interna para a permutação (o teste fica só para a comparação final)
+    X_fit, X_val, y_fit, y_val = train_test_split(X_train_proc, y_train, test_size=0.2,
+                                                  random_state=RANDOM_STATE)
+    all_models = ModelTrainer().get_models()
+    models = {name: all_models[name] for name in ('Ridge', args.model)}
+
+    selector = FeatureSelector(prep.feature_names)
+    scores = selector.score(X_fit, y_fit, X_val, y_val, models=models)
+    print(pd.DataFrame(selector.log).to_string(index=False))
+    print(f"\nTop 15 de {len(scores)} colunas:")
+    print(scores.head(15).to_string())
+
+    model = clone(all_models[args.model]).fit(X_train_proc, y_train)
+    result = reduce(model, prep.preprocessor, X_train, y_train, X_test, y_test,
+                    FeatureSelector.select(scores, args.k))
+    print(f"\n{args.model}: original x {args.k} colunas")
+    print(result['comparison'].to_string(float_format=lambda v: f"{v:,.4f}"))
+
+    if args.out:
+        from src.serving import build_pipeline, save_pipeline
+        out = Path(args.out)
+        out.mkdir(parents=True, exist_ok=True)
+        save_pipeline(build_pipeline(result['model'], result['preprocessor']), out / "pipeline.pkl")
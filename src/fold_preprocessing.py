@@ -0,0 +1,56 @@
+"""
+Preprocessamento por fold, sem vazamento, compartilhado entre modelos
+
+Ajustar o ColumnTransformer uma única vez em todo o X_train e depois
+rodar a validação cruzada nos dados já transformados vaza estatísticas
+de imputação e escala da validação para o treino de cada fold. Aqui o
+preprocessador é reajustado só no treino de cada fold, mas cada fold é
+transformado uma única vez: as matrizes ficam em memória e são
+reaproveitadas por todos os modelos e por todos os trials da busca.
+"""
+import time
+import numpy as np
+import joblib
+from sklearn.base import clone
+from sklearn.utils import _safe_indexing
+from typing import List, Tuple
+
+
+class FoldPreprocessor:
+    """
+    Cache das matrizes transformadas de cada fold
+
+    Args:
+        preprocessor: Transformador (ajustado ou não; é clonado por fold)
+        X: Dados de treino brutos (antes do preprocessamento)
+        y: Target (repassado ao fit do preprocessador)
+    """
+
+    def __init__(self, preprocessor, X, y=None):
+        self.preprocessor = preprocessor
+        self.X = X
+        self.y = None if y is None else np.asarray(y)
+        self._cache = {}
+        self.n_fits = 0
+        self.fit_time = 0.0
+
+    def transform_fold(self, train_idx: np.ndarray, val_idx: np.ndarray) -> Tuple:
+        """Retorna (X_treino, X_validação) transformados pelo preprocessador do fold"""
+        key = (joblib.hash(np.asarray(train_idx)), joblib.hash(np.asarray(val_idx)))
+        if key not in self._cache:
+            start = time.perf_counter()
+            X_fit = _safe_indexing(self.X, train_idx)
+            y_fit = None if self.y is None else self.y[train_idx]
+
+            fold_preprocessor = clone(self.preprocessor)
+            X_fit_t = fold_preprocessor.fit_transform(X_fit, y_fit)
+            X_val_t = fold_preprocessor.transform(_safe_indexing(self.X, val_idx))
+
+            self._cache[key] = (X_fit_t, X_val_t)
+            self.n_fits += 1
+            self.fit_time += time.perf_counter() - start
+        return self._cache[key]
+
+    def transform_folds(self, folds: List[Tuple[np.ndarray, np.ndarray]]) -> List[Tuple]:
+        """Matrizes transformadas de todos os folds"""
+        return [self.transform_fold(train_idx, val_idx) for train_idx, val_idx in folds]
@@ -0,0 +1,439 @@
+"""
+Busca de hiperparâmetros com orçamento (successive halving)
+
+Substitui o GridSearchCV exaustivo: candidatos são avaliados com poucos
+recursos (amostras ou rounds de boosting), e só os melhores sobem para
+o próximo nível. A busca respeita um orçamento de tempo e/ou de número
+de ajustes, roda os trials em paralelo e grava o histórico em SQLite
+para que buscas futuras comecem pelos melhores parâmetros já vistos.
+"""
+import json
+import sqlite3
+import time
+import numpy as np
+import joblib
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import KFold
+from sklearn.metrics import r2_score
+from sklearn.utils import _safe_indexing
+from typing import Dict, List, Optional
+
+from src.config import CV_FOLDS, RANDOM_STATE, SEARCH_DB_PATH
+from src.early_stopping import supports_early_stopping, fit_with_early_stopping
+
+
+# Espaços de busca por modelo
+# lista -> escolha discreta; ('int'|'float'|'log', min, max) -> intervalo
+SEARCH_SPACES = {
+    'Random Forest': {
+        'n_estimators': ('int', 100, 500),
+        'max_depth': [10, 20, 30, None],
+        'min_samples_split': ('int', 2, 10),
+        'min_samples_leaf': ('int', 1, 4),
+        'max_features': [1.0, 0.5, 'sqrt']
+    },
+    'Gradient Boosting': {
+        'n_estimators': ('int', 100, 500),
+        'learning_rate': ('log', 0.01, 0.2),
+        'max_depth': ('int', 3, 7),
+        'subsample': ('float', 0.7, 1.0)
+    },
+    'XGBoost': {
+        'n_estimators': ('int', 100, 500),
+        'learning_rate': ('log', 0.01, 0.2),
+        'max_depth': ('int', 3, 8),
+        'subsample': ('float', 0.7, 1.0),
+        'colsample_bytree': ('float', 0.5, 1.0),
+        'min_child_weight': ('log', 1, 10)
+    },
+    'LightGBM': {
+        'n_estimators': ('int', 100, 500),
+        'learning_rate': ('log', 0.01, 0.2),
+        'max_depth': [3, 5, 7, -1],
+        'num_leaves': ('int', 15, 80),
+        'subsample': ('float', 0.7, 1.0),
+        'subsample_freq': [1],
+        'colsample_bytree': ('float', 0.5, 1.0)
+    }
+}
+
+
+def sample_params(space: Dict, rng: np.random.RandomState) -> Dict:
+    """Sorteia um conjunto de parâmetros do espaço de busca"""
+    params = {}
+    for name, spec in space.items():
+        if isinstance(spec, list):
+            params[name] = spec[rng.randint(len(spec))]
+        elif spec[0] == 'int':
+            params[name] = int(rng.randint(spec[1], spec[2] + 1))
+        elif spec[0] == 'float':
+            params[name] = float(rng.uniform(spec[1], spec[2]))
+        elif spec[0] == 'log':
+            params[name] = float(np.exp(rng.uniform(np.log(spec[1]), np.log(spec[2]))))
+        else:
+            raise ValueError(f"Tipo de distribuição desconhecido: {spec[0]}")
+    return params
+
+
+def data_signature(X, y) -> str:
+    """Assinatura barata dos dados, usada para agrupar trials comparáveis"""
+    return f"{X.shape[0]}x{X.shape[1]}-{joblib.hash(np.asarray(y))[:12]}"
+
+
+class TrialStore:
+    """Histórico de trials em um arquivo SQLite local"""
+
+    def __init__(self, db_path: str = None):
+        if db_path is None:
+            db_path = SEARCH_DB_PATH
+        self.db_path = str(db_path)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS trials (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    model_name TEXT NOT NULL,
+                    data_signature TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    n_resources INTEGER NOT NULL,
+                    max_resources INTEGER NOT NULL,
+                    score REAL,
+                    fit_time REAL,
+                    created_at REAL
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+    def add_trials(self, model_name: str, signature: str, trials: List[Dict]):
+        """Grava uma lista de trials já avaliados"""
+        rows = [
+            (model_name, signature, json.dumps(t['params'], sort_keys=True, default=str),
+             t['n_resources'], t['max_resources'], t['score'], t['fit_time'], time.time())
+            for t in trials
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO trials (model_name, data_signature, params, n_resources, "
+                "max_resources, score, fit_time, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def best_params(self, model_name: str, signature: str = None, k: int = 5) -> List[Dict]:
+        """Retorna os k melhores parâmetros avaliados com recurso máximo"""
+        query = ("SELECT params, MAX(score) AS best FROM trials "
+                 "WHERE model_name = ? AND n_resources = max_resources AND score IS NOT NULL")
+        args = [model_name]
+        if signature is not None:
+            query += " AND data_signature = ?"
+            args.append(signature)
+        query += " GROUP BY params ORDER BY best DESC LIMIT ?"
+        args.append(k)
+
+        with self._connect() as conn:
+            rows = conn.execute(query, args).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def completed_trials(self, model_name: str, signature: str) -> List[Dict]:
+        """Todos os trials já avaliados nesses dados (usado para retomar buscas)"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT params, n_resources, max_resources, score, fit_time FROM trials "
+                "WHERE model_name = ? AND data_signature = ? AND score IS NOT NULL",
+                (model_name, signature)
+            ).fetchall()
+        return [
+            {'params': json.loads(params), 'n_resources': n_resources,
+             'max_resources': max_resources, 'score': score, 'fit_time': fit_time}
+            for params, n_resources, max_resources, score, fit_time in rows
+        ]
+
+    def count(self, model_name: str = None) -> int:
+        """Número de trials gravados"""
+        with self._connect() as conn:
+            if model_name is None:
+                return conn.execute("SELECT COUNT(*) FROM trials").fetchone()[0]
+            return conn.execute(
+                "SELECT COUNT(*) FROM trials WHERE model_name = ?", (model_name,)
+            ).fetchone()[0]
+
+
+def _evaluate_trial(estimator, params, X_train, y_train, X_val, y_val, resource,
+                    n_resources, early_stopping_rounds=None):
+    """Ajusta um candidato em um fold com o recurso do nível atual"""
+    model = clone(estimator).set_params(**params)
+
+    if resource == 'n_samples':
+        X_train = _safe_indexing(X_train, np.arange(min(n_resources, len(y_train))))
+        y_train = y_train[:n_resources]
+    else:
+        model.set_params(**{resource: n_resources})
+
+    start = time.perf_counter()
+    if early_stopping_rounds is not None:
+        model, n_rounds = fit_with_early_stopping(model, X_train, y_train, early_stopping_rounds)
+    else:
+        model.fit(X_train, y_train)
+        n_rounds = None
+    fit_time = time.perf_counter() - start
+
+    return r2_score(y_val, model.predict(X_val)), fit_time, n_rounds
+
+
+class BudgetedSearch:
+    """
+    Successive halving com orçamento de tempo e/ou de ajustes
+
+    Args:
+        estimator: Estimador base
+        param_space: Espaço de busca (formato de SEARCH_SPACES)
+        max_time: Orçamento em segundos (None = sem limite)
+        max_fits: Orçamento em número de ajustes (None = sem limite)
+        n_candidates: Candidatos no primeiro nível (None = calculado)
+        resource: 'n_samples' ou um parâmetro do modelo (ex: 'n_estimators')
+        min_resources: Recurso do primeiro nível (None = calculado)
+        max_resources: Recurso máximo (None = todas as amostras)
+        factor: Fator de corte entre níveis
+        cv: Número de folds
+        store: TrialStore para histórico e warm-start (None = sem persistência)
+        early_stopping_rounds: Paciência do early stopping para boosters
+            (o n_estimators do estimador vira o teto e deixa de ser sorteado)
+        model_name: Nome usado no histórico
+        resume: Reaproveita os trials idênticos (mesmos dados, parâmetros e
+            recurso) já gravados no store, ex: de uma busca interrompida
+    """
+
+    def __init__(self, estimator, param_space: Dict, max_time: float = None,
+                 max_fits: int = None, n_candidates: int = None,
+                 resource: str = 'n_samples', min_resources: int = None,
+                 max_resources: int = None, factor: int = 3, cv: int = CV_FOLDS,
+                 n_jobs: int = -1, early_stopping_rounds: int = None,
+                 store: Optional[TrialStore] = None,
+                 model_name: str = None, warm_start: int = 5,
+                 resume: bool = False, random_state: int = RANDOM_STATE):
+        self.estimator = estimator
+        self.param_space = param_space
+        self.max_time = max_time
+        self.max_fits = max_fits
+        self.n_candidates = n_candidates
+        self.resource = resource
+        self.min_resources = min_resources
+        self.max_resources = max_resources
+        self.factor = factor
+        self.cv = cv
+        self.n_jobs = n_jobs
+        self.store = store
+        # Early stopping não combina com n_estimators como recurso do halving
+        if resource == 'n_estimators' or not supports_early_stopping(estimator):
+            early_stopping_rounds = None
+        self.early_stopping_rounds = early_stopping_rounds
+        self.model_name = model_name or type(estimator).__name__
+        self.warm_start = warm_start
+        self.resume = resume
+        self.random_state = random_state
+
+    def _resource_schedule(self, n_samples: int) -> List[int]:
+        """Calcula o recurso de cada nível (do menor para o máximo)"""
+        if self.resource == 'n_samples':
+            max_r = self.max_resources or int(n_samples * (self.cv - 1) / self.cv)
+            min_r = self.min_resources or max(100, max_r // self.factor ** 3)
+        else:
+            spec = self.param_space.get(self.resource)
+            default_r = spec[2] if isinstance(spec, tuple) else self.estimator.get_params()[self.resource]
+            max_r = self.max_resources or default_r
+            min_r = self.min_resources or max(10, max_r // self.factor ** 3)
+
+        schedule = [max_r]
+        while schedule[0] // self.factor >= min_r:
+            schedule.insert(0, schedule[0] // self.factor)
+        return schedule
+
+    def _fixed_params(self) -> set:
+        """Parâmetros que não são sorteados: o recurso e, com early stopping, os rounds"""
+        fixed = {self.resource}
+        if self.early_stopping_rounds is not None:
+            fixed.add('n_estimators')
+        return fixed
+
+    def _initial_candidates(self, schedule: List[int], signature: str) -> List[Dict]:
+        """Candidatos do warm-start (histórico) seguidos de sorteios"""
+        rng = np.random.RandomState(self.random_state)
+        n_candidates = self.n_candidates or self.factor ** (len(schedule) - 1) * 2
+
+        candidates = []
+        if self.store is not None and self.warm_start:
+            candidates = self.store.best_params(self.model_name, signature, k=self.warm_start)
+            if not candidates:
+                candidates = self.store.best_params(self.model_name, k=self.warm_start)
+            if candidates:
+                print(f"Warm-start com {len(candidates)} candidatos do histórico")
+
+        fixed = self._fixed_params()
+        space = {k: v for k, v in self.param_space.items() if k not in fixed}
+        candidates = [{k: v for k, v in c.items() if k not in fixed} for c in candidates]
+
+        seen = {json.dumps(c, sort_keys=True) for c in candidates}
+        attempts = 0
+        while len(candidates) < n_candidates and attempts < n_candidates * 10:
+            params = sample_params(space, rng)
+            key = json.dumps(params, sort_keys=True)
+            if key not in seen:
+                seen.add(key)
+                candidates.append(params)
+            attempts += 1
+
+        return candidates
+
+    def _trial_key(self, params: Dict, n_resources: int, max_resources: int) -> str:
+        """Identifica um trial pelos parâmetros sorteados e pelo recurso"""
+        fixed = self._fixed_params()
+        sampled = {k: v for k, v in params.items() if k not in fixed}
+        return f"{json.dumps(sampled, sort_keys=True, default=str)}|{n_resources}|{max_resources}"
+
+    def _budget_left(self, start: float) -> Optional[int]:
+        """Ajustes ainda disponíveis (None = ilimitado, 0 = esgotado)"""
+        if self.max_time is not None and time.perf_counter() - start >= self.max_time:
+            return 0
+        if self.max_fits is not None:
+            return max(0, self.max_fits - self.n_fits_)
+        return None
+
+    def fit(self, X, y, fold_preprocessor=None):
+        """
+        Executa a busca
+
+        Args:
+            X, y: Dados de treino (já transformados)
+            fold_preprocessor: FoldPreprocessor com os dados brutos. Se
+                informado, cada fold usa o preprocessador ajustado só no
+                seu treino (as matrizes são compartilhadas com a avaliação)
+        """
+        y = np.asarray(y)
+
+        # Mesmos folds do ModelEvaluator, para reaproveitar o preprocessamento
+        folds = list(KFold(n_splits=self.cv).split(np.arange(len(y))))
+        if fold_preprocessor is not None:
+            fold_matrices = fold_preprocessor.transform_folds(folds)
+        else:
+            fold_matrices = [
+                (_safe_indexing(X, train_idx), _safe_indexing(X, val_idx))
+                for train_idx, val_idx in folds
+            ]
+
+        # Embaralha o treino de cada fold uma vez para que os subconjuntos
+        # de amostras sejam representativos
+        rng = np.random.RandomState(self.random_state)
+        fold_data = []
+        for (train_idx, val_idx), (X_fit, X_val) in zip(folds, fold_matrices):
+            order = rng.permutation(len(train_idx))
+            fold_data.append((_safe_indexing(X_fit, order), y[train_idx][order], X_val, y[val_idx]))
+
+        estimator = clone(self.estimator)
+        if 'n_jobs' in estimator.get_params():
+            # O paralelismo fica nos trials
+            estimator.set_params(n_jobs=1)
+
+        schedule = self._resource_schedule(len(y))
+        signature = data_signature(X, y)
+        candidates = self._initial_candidates(schedule, signature)
+
+        # Trials já avaliados (busca interrompida) não são refeitos
+        completed = {}
+        if self.resume and self.store is not None:
+            for trial in self.store.completed_trials(self.model_name, signature):
+                key = self._trial_key(trial['params'], trial['n_resources'], trial['max_resources'])
+                completed[key] = trial
+
+        self.n_fits_ = 0
+        self.trials_ = []
+        self.best_params_ = None
+        self.best_score_ = -np.inf
+        self.best_resources_ = None
+        self.schedule_ = schedule
+        start = time.perf_counter()
+
+        print(f"Successive halving: {len(candidates)} candidatos, "
+              f"níveis de {self.resource} = {schedule}")
+
+        with Parallel(n_jobs=self.n_jobs) as parallel:
+            for level, n_resources in enumerate(schedule):
+                budget = self._budget_left(start)
+                if budget is not None:
+                    # Só avalia os candidatos que cabem no orçamento
+                    candidates = candidates[:budget // self.cv]
+                if not candidates:
+                    print("Orçamento esgotado")
+                    break
+
+                # Candidatos avaliados em lotes para respeitar o orçamento de tempo
+                batch_size = max(1, joblib.effective_n_jobs(self.n_jobs) // self.cv) * 2
+                level_trials = []
+                for i in range(0, len(candidates), batch_size):
+                    if i > 0 and self._budget_left(start) == 0:
+                        print("Orçamento de tempo esgotado no meio do nível")
+                        break
+                    batch = candidates[i:i + batch_size]
+
+                    keys = [self._trial_key(params, n_resources, schedule[-1]) for params in batch]
+                    level_trials.extend(dict(completed[k], level=level) for k in keys if k in completed)
+                    batch = [params for params, k in zip(batch, keys) if k not in completed]
+                    if not batch:
+                        continue
+
+                    outputs = parallel(
+                        delayed(_evaluate_trial)(
+                            estimator, params, *data,
+                            self.resource, n_resources, self.early_stopping_rounds
+                        )
+                        for params in batch
+                        for data in fold_data
+                    )
+                    self.n_fits_ += len(outputs)
+
+                    batch_trials = []
+                    for j, params in enumerate(batch):
+                        scores, fit_times, rounds = zip(*outputs[j * self.cv:(j + 1) * self.cv])
+                        if self.early_stopping_rounds is not None:
+                            params = dict(params, n_estimators=int(np.median(rounds)))
+                        batch_trials.append({
+                            'params': params,
+                            'level': level,
+                            'n_resources': n_resources,
+                            'max_resources': schedule[-1],
+                            'score': float(np.mean(scores)),
+                            'fit_time': float(np.sum(fit_times))
+                        })
+
+                    # Gravado a cada lote: interromper a busca perde no máximo um lote
+                    if self.store is not None:
+                        self.store.add_trials(self.model_name, signature, batch_trials)
+                    level_trials.extend(batch_trials)
+
+                if not level_trials:
+                    print("Orçamento esgotado")
+                    break
+                self.trials_.extend(level_trials)
+
+                level_trials.sort(key=lambda t: t['score'], reverse=True)
+                best = level_trials[0]
+                print(f"  Nível {level} ({self.resource}={n_resources}): "
+                      f"{len(level_trials)} candidatos, melhor R^2 = {best['score']:.4f}")
+
+                # O melhor do nível mais alto alcançado é o resultado
+                self.best_params_ = dict(best['params'])
+                if self.resource != 'n_samples':
+                    self.best_params_[self.resource] = n_resources
+                self.best_score_ = best['score']
+                self.best_resources_ = n_resources
+
+                n_keep = max(1, len(level_trials) // self.factor)
+                candidates = [
+                    {k: v for k, v in t['params'].items() if k not in self._fixed_params()}
+                    for t in level_trials[:n_keep]
+                ]
+
+        self.elapsed_ = time.perf_counter() - start
+        print(f"Busca concluída: {self.n_fits_} ajustes em {self.elapsed_:.1f}s")
+
+        return self
@@ -0,0 +1,426 @@
+"""
+Retreino incremental com novas vendas
+
+Em vez de rodar o train.py do zero a cada lote novo, o modo incremental:
+- ingere só as linhas ainda não vistas (pelo PID)
+- checa drift das features e o erro do modelo atual nas linhas novas
+- continua o treino do modelo atual (boosters ganham rounds, florestas
+  ganham árvores via warm_start)
+- pede um retreino completo quando o drift ou o erro passam dos limites
+
+O preprocessador fica congelado entre retreinos completos: mudar a
+imputação ou a escala mudaria a entrada que o modelo já aprendeu. As
+estatísticas que podem ser combinadas (contagem, média, variância e
+frequência de categorias) são acumuladas no estado e passam a valer no
+próximo retreino completo.
+"""
+import json
+import tempfile
+import time
+from pathlib import Path
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from xgboost import XGBRegressor
+from lightgbm import LGBMRegressor
+from typing import Dict, List
+
+from src.config import (
+    MODEL_PKL_PATH, MODEL_ONNX_PATH, PREPROCESSOR_PATH, PIPELINE_PATH, TRAINING_STATE_PATH, INCREMENTAL_DATA_FILE,
+    OUTLIER_DETECTOR_PATH, BUNDLE_DIR,
+    TARGET_COLUMN, INCREMENTAL_ROUNDS, DRIFT_PSI_THRESHOLD, UNSEEN_CATEGORY_THRESHOLD,
+    MAE_DEGRADATION_THRESHOLD
+)
+from src.data_preprocessing import DataPreprocessor, feature_lists, known_categories
+from src.evaluation import regression_metrics
+from src.feature_engineering import FeatureEngineer
+from src.model_export import ModelExporter
+from src.serving import build_pipeline, save_pipeline
+
+
+def iqr_bounds(values: pd.Series) -> List[float]:
+    """Limites do IQR, os mesmos de handle_outliers(method='iqr')"""
+    q1, q3 = values.quantile(0.25), values.quantile(0.75)
+    iqr = q3 - q1
+    return [float(q1 - 1.5 * iqr), float(q3 + 1.5 * iqr)]
+
+
+def numeric_stats(X: pd.DataFrame, columns: list) -> Dict:
+    """Contagem, média e soma dos quadrados dos desvios (M2) por coluna"""
+    stats = {}
+    for col in columns:
+        values = X[col].dropna().to_numpy(dtype=float)
+        mean = float(values.mean()) if len(values) else 0.0
+        stats[col] = {
+            'count': int(len(values)),
+            'mean': mean,
+            'm2': float(((values - mean) ** 2).sum())
+        }
+    return stats
+
+
+def merge_stats(a: Dict, b: Dict) -> Dict:
+    """Combina duas estatísticas (algoritmo paralelo de Chan)"""
+    n = a['count'] + b['count']
+    if n == 0:
+        return dict(a)
+    delta = b['mean'] - a['mean']
+    return {
+        'count': n,
+        'mean': a['mean'] + delta * b['count'] / n,
+        'm2': a['m2'] + b['m2'] + delta ** 2 * a['count'] * b['count'] / n
+    }
+
+
+def population_stability_index(expected: np.ndarray, actual: np.ndarray) -> float:
+    """PSI entre duas distribuições de proporções por bin"""
+    expected = np.clip(expected, 1e-4, None)
+    actual = np.clip(actual, 1e-4, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def _bin_proportions(values: pd.Series, edges: list) -> np.ndarray:
+    counts = np.bincount(
+        np.searchsorted(edges, values.dropna().to_numpy(dtype=float), side='right'),
+        minlength=len(edges) + 1
+    )
+    return counts / max(1, counts.sum())
+
+
+def build_training_state(df: pd.DataFrame, X_train: pd.DataFrame, preprocessor,
+                         best_model_name: str, metrics: Dict) -> Dict:
+    """
+    Estado de referência salvo ao fim de um retreino completo
+
+    Args:
+        df: Dataset completo após feature engineering (antes dos outliers)
+        X_train: Features de treino (antes do preprocessamento)
+        preprocessor: Preprocessador ajustado
+        best_model_name: Nome do modelo servido
+        metrics: Métricas do modelo servido (usa test_mae/test_r2)
+    """
+    numerical_features, categorical_features = feature_lists(preprocessor)
+
+    psi_bins = {}
+    psi_reference = {}
+    for col in numerical_features:
+        edges = np.unique(X_train[col].dropna().quantile(np.linspace(0.1, 0.9, 9)).to_numpy())
+        psi_bins[col] = edges.tolist()
+        psi_reference[col] = _bin_proportions(X_train[col], psi_bins[col]).tolist()
+
+    return {
+        'best_model_name': best_model_name,
+        'n_samples': int(len(X_train)),
+        'pids': sorted(int(pid) for pid in df['PID'].dropna()) if 'PID' in df.columns else [],
+        'target_bounds': iqr_bounds(df[TARGET_COLUMN]),
+        'reference_mae': float(metrics['test_mae']),
+        'reference_r2': float(metrics['test_r2']),
+        'numeric_stats': numeric_stats(X_train, numerical_features),
+        'category_counts': {
+            col: {str(k): int(v) for k, v in X_train[col].value_counts().items()}
+            for col in categorical_features
+        },
+        'psi_bins': psi_bins,
+        'psi_reference': psi_reference,
+        'updates': []
+    }
+
+
+def save_training_state(state: Dict, filepath: str = None):
+    """Salva o estado de referência em JSON"""
+    if filepath is None:
+        filepath = TRAINING_STATE_PATH
+    with open(filepath, 'w') as f:
+        json.dump(state, f)
+    print(f"Estado de treino salvo em: {filepath}")
+
+
+def continue_training(model, X, y, n_rounds: int = INCREMENTAL_ROUNDS):
+    """
+    Continua o treino do modelo com as linhas novas
+
+    Boosters ganham n_rounds rounds ajustados nos resíduos das linhas
+    novas; a Random Forest ganha n_rounds árvores treinadas nelas.
+
+    Returns:
+        O modelo atualizado, ou None se o tipo não suporta atualização
+    """
+    if isinstance(model, XGBRegressor):
+        booster = model.get_booster()
+        model.set_params(n_estimators=n_rounds)
+        model.fit(X, y, xgb_model=booster, verbose=False)
+        return model
+
+    if isinstance(model, LGBMRegressor):
+        booster = model.booster_
+        model.set_params(n_estimators=n_rounds)
+        model.fit(X, y, init_model=booster)
+        return model
+
+    if isinstance(model, (GradientBoostingRegressor, RandomForestRegressor)):
+        n_current = len(model.estimators_)
+        model.set_params(warm_start=True, n_estimators=n_current + n_rounds)
+        model.fit(X, y)
+        return model
+
+    return None
+
+
+class IncrementalUpdater:
+    """Atualiza os artefatos do último retreino completo com novas vendas"""
+
+    def __init__(self, model_path: str = None, preprocessor_path: str = None,
+                 state_path: str = None, data_path: str = None,
+                 onnx_path: str = None, pipeline_path: str = None, outlier_detector_path: str = None,
+                 bundle_dir: str = None):
+        self.model_path = model_path or MODEL_PKL_PATH
+        self.preprocessor_path = preprocessor_path or PREPROCESSOR_PATH
+        self.state_path = state_path or TRAINING_STATE_PATH
+        self.data_path = data_path or INCREMENTAL_DATA_FILE
+        self.onnx_path = onnx_path or MODEL_ONNX_PATH
+        self.pipeline_path = pipeline_path or PIPELINE_PATH
+        self.outlier_detector_path = outlier_detector_path or OUTLIER_DETECTOR_PATH
+        self.bundle_dir = bundle_dir or BUNDLE_DIR
+
+        self.model = joblib.load(self.model_path)
+        self.preprocessor = joblib.load(self.preprocessor_path)
+        with open(self.state_path) as f:
+            self.state = json.load(f)
+
+    def select_new_rows(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Remove as linhas cujo PID já foi usado no treino"""
+        if 'PID' not in df.columns:
+            return df
+        seen = set(self.state['pids'])
+        return df[~df['PID'].isin(seen)]
+
+    def check(self, X_new: pd.DataFrame, y_new: pd.Series, min_rows: int = 50) -> Dict:
+        """Checa drift e degradação do erro nas linhas novas (antes de atualizar)"""
+        numerical_features, categorical_features = feature_lists(self.preprocessor)
+        reasons = []
+
+        # Erro do modelo atual nas linhas novas (ainda não vistas)
+        y_pred = self.model.predict(self.preprocessor.transform(X_new))
+        metrics = regression_metrics(y_new, y_pred, prefix='new_')
+        mae_ratio = metrics['new_mae'] / self.state['reference_mae']
+        if mae_ratio > MAE_DEGRADATION_THRESHOLD:
+            reasons.append(f"MAE {mae_ratio:.2f}x maior que a referência")
+
+        # Categorias não vistas no treino (pelas contagens do estado: o encoder
+        # servido pode ter sido compactado e não guardar todas)
+        known = {col: {value for value, n in counts.items() if n > 0}
+                 for col, counts in self.state['category_counts'].items()}
+        if not known:
+            known = known_categories(self.preprocessor)
+        unseen = np.zeros(len(X_new), dtype=bool)
+        for col in categorical_features:
+            values = X_new[col]
+            unseen |= (values.notna() & ~values.astype(str).isin(known[col])).to_numpy()
+        unseen_rate = float(unseen.mean()) if len(X_new) else 0.0
+        if unseen_rate > UNSEEN_CATEGORY_THRESHOLD:
+            reasons.append(f"{unseen_rate:.1%} das linhas com categorias não vistas")
+
+        # PSI só é confiável com um mínimo de linhas
+        psi = {}
+        if len(X_new) >= min_rows:
+            for col in numerical_features:
+                psi[col] = population_stability_index(
+                    np.array(self.state['psi_reference'][col]),
+                    _bin_proportions(X_new[col], self.state['psi_bins'][col])
+                )
+        max_psi_col = max(psi, key=psi.get) if psi else None
+        if max_psi_col and psi[max_psi_col] > DRIFT_PSI_THRESHOLD:
+            reasons.append(f"drift em {max_psi_col} (PSI {psi[max_psi_col]:.3f})")
+
+        metrics.update({
+            'mae_ratio': mae_ratio,
+            'unseen_category_rate': unseen_rate,
+            'max_psi': psi[max_psi_col] if max_psi_col else None,
+            'max_psi_feature': max_psi_col,
+            'needs_full_refit': bool(reasons),
+            'reasons': reasons
+        })
+        return metrics
+
+    def update(self, new_df: pd.DataFrame, force: bool = False) -> Dict:
+        """
+        Ingere um lote de vendas novas
+
+        Returns:
+            Relatório com a ação tomada ('skip', 'incremental' ou
+            'full_refit'), checagens e tempo
+        """
+        start = time.perf_counter()
+        new_df = self.select_new_rows(new_df)
+        if new_df.empty:
+            print("Nenhuma linha nova para ingerir")
+            return {'action': 'skip', 'n_rows': 0}
+
+        # Mesmo pipeline do treino, com os limites de outlier do último retreino
+        df = FeatureEngineer.create_all_features(new_df)
+        lower, upper = self.state['target_bounds']
+        df = df[(df[TARGET_COLUMN] >= lower) & (df[TARGET_COLUMN] <= upper)]
+
+        X_new, y_new = DataPreprocessor().split_features_target(df)
+        report = {'n_rows': int(len(new_df)), 'n_rows_used': int(len(X_new))}
+        report['checks'] = self.check(X_new, y_new)
+
+        # Guarda as linhas ingeridas para o próximo retreino completo
+        append_incremental_data(new_df, self.data_path)
+
+        if report['checks']['needs_full_refit'] and not force:
+            print("Retreino completo necessário: " + "; ".join(report['checks']['reasons']))
+            report['action'] = 'full_refit'
+            report['update_time'] = time.perf_counter() - start
+            return report
+
+        X_new_processed = self.preprocessor.transform(X_new)
+        updated = continue_training(self.model, X_new_processed, y_new)
+        if updated is None:
+            print(f"{type(self.model).__name__} não suporta atualização incremental")
+            report['action'] = 'full_refit'
+            report['update_time'] = time.perf_counter() - start
+            return report
+
+        self.model = updated
+        joblib.dump(self.model, self.model_path)
+        onnx_path = None
+        if Path(self.onnx_path).exists():
+            onnx_path = ModelExporter.export_to_onnx(self.model, X_new_processed[:10], self.onnx_path)
+        pipeline = build_pipeline(self.model, self.preprocessor)
+        if Path(self.pipeline_path).exists():
+            save_pipeline(pipeline, self.pipeline_path)
+        detector = None
+        if Path(self.outlier_detector_path).exists():
+            # Os sketches combinam: os limites passam a incluir as linhas novas
+            from src.outliers import OutlierDetector
+            detector = OutlierDetector.load(self.outlier_detector_path).update(X_new)
+            detector.save(self.outlier_detector_path)
+        if (Path(self.bundle_dir) / 'LATEST').exists():
+            from src.bundle import save_bundle
+            save_bundle(pipeline, metrics=report['checks'], model_name=self.state['best_model_name'],
+                        onnx_path=onnx_path, outlier_detector=detector, bundle_dir=self.bundle_dir)
+        self._update_state(new_df, X_new, report)
+
+        report['action'] = 'incremental'
+        report['update_time'] = time.perf_counter() - start
+        self.state['updates'][-1]['update_time'] = report['update_time']
+        save_training_state(self.state, self.state_path)
+
+        print(f"Modelo atualizado com {len(X_new)} linhas em {report['update_time']:.2f}s")
+        return report
+
+    def _update_state(self, new_df: pd.DataFrame, X_new: pd.DataFrame, report: Dict):
+        """Acumula PIDs, estatísticas combináveis e o log da atualização"""
+        numerical_features, categorical_features = feature_lists(self.preprocessor)
+
+        if 'PID' in new_df.columns:
+            self.state['pids'] = sorted(set(self.state['pids']) | set(int(p) for p in new_df['PID']))
+        self.state['n_samples'] += int(len(X_new))
+
+        new_stats = numeric_stats(X_new, numerical_features)
+        for col in numerical_features:
+            self.state['numeric_stats'][col] = merge_stats(self.state['numeric_stats'][col], new_stats[col])
+
+        for col in categorical_features:
+            counts = self.state['category_counts'].setdefault(col, {})
+            for value, n in X_new[col].value_counts().items():
+                counts[str(value)] = counts.get(str(value), 0) + int(n)
+
+        self.state['updates'].append({
+            'timestamp': time.time(),
+            'n_rows': report['n_rows_used'],
+            'new_mae': report['checks']['new_mae'],
+            'max_psi': report['checks']['max_psi']
+        })
+
+
+def append_incremental_data(new_df: pd.DataFrame, filepath: str = None):
+    """Acrescenta as linhas ingeridas ao arquivo usado nos retreinos completos"""
+    if filepath is None:
+        filepath = INCREMENTAL_DATA_FILE
+    header = not Path(filepath).exists()
+    new_df.to_csv(filepath, mode='a', header=header, index=False)
+
+
+def compare_with_full_retrain(raw_df: pd.DataFrame, model, new_fraction: float = 0.1,
+                              eval_fraction: float = 0.1) -> pd.DataFrame:
+    """
+    Compara atualização incremental com retreino completo
+
+    Ordena as vendas por data, faz um retreino completo nas mais antigas
+    (artefatos e estado num diretório temporário), ingere o lote seguinte
+    pelos dois caminhos e avalia nas vendas mais recentes. O incremental é
+    o IncrementalUpdater.update do --update (checagens, continuação do
+    treino e estado), com o tempo do update inteiro; o retreino completo
+    refaz features, preprocessador e modelo.
+
+    Args:
+        raw_df: Vendas brutas (antes do feature engineering)
+        model: Estimador (não ajustado) a comparar
+        new_fraction: Fração das vendas no lote novo
+        eval_fraction: Fração das vendas (as mais recentes) na avaliação
+    """
+    raw_df = raw_df.sort_values(['Yr Sold', 'Mo Sold'], kind='stable')
+    n = len(raw_df)
+    n_eval = int(n * eval_fraction)
+    n_new = int(n * new_fraction)
+    old_raw = raw_df.iloc[:n - n_eval - n_new]
+    new_raw = raw_df.iloc[n - n_eval - n_new:n - n_eval]
+
+    def full_retrain(raw):
+        """Features, outliers do target, preprocessador e modelo do zero (como o train.py)"""
+        df = FeatureEngineer.create_all_features(raw)
+        lower, upper = iqr_bounds(df[TARGET_COLUMN])
+        prep = DataPreprocessor()
+        X, y = prep.split_features_target(df[(df[TARGET_COLUMN] >= lower) & (df[TARGET_COLUMN] <= upper)])
+        prep.create_preprocessor(*prep.identify_feature_types(X))
+        return df, X, prep.preprocessor, clone(model).fit(prep.fit_transform(X), y)
+
+    old_df, X_old, preprocessor, base_model = full_retrain(old_raw)
+
+    # Avaliação nas vendas mais recentes, com os limites de outlier do treino antigo
+    eval_df = FeatureEngineer.create_all_features(raw_df.iloc[n - n_eval:])
+    lower, upper = iqr_bounds(old_df[TARGET_COLUMN])
+    X_eval, y_eval = DataPreprocessor().split_features_target(
+        eval_df[(eval_df[TARGET_COLUMN] >= lower) & (eval_df[TARGET_COLUMN] <= upper)]
+    )
+
+    rows = []
+    base_pred = base_model.predict(preprocessor.transform(X_eval))
+    rows.append({'strategy': 'sem atualização', 'update_time': 0.0,
+                 **regression_metrics(y_eval, base_pred, 'eval_')})
+
+    # Incremental: o mesmo update() do --update, sobre artefatos temporários
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        paths = {
+            'model_path': tmp / "model.pkl", 'preprocessor_path': tmp / "preprocessor.pkl",
+            'state_path': tmp / "state.json", 'data_path': tmp / "incremental.csv",
+            'onnx_path': tmp / "model.onnx", 'pipeline_path': tmp / "pipeline.pkl",
+            'outlier_detector_path': tmp / "outlier_detector.pkl", 'bundle_dir': tmp / "bundles"
+        }
+        joblib.dump(base_model, paths['model_path'])
+        joblib.dump(preprocessor, paths['preprocessor_path'])
+        save_training_state(build_training_state(old_df, X_old, preprocessor, type(model).__name__,
+                                                 regression_metrics(y_eval, base_pred, 'test_')),
+                            paths['state_path'])
+        updater = IncrementalUpdater(**paths)
+        report = updater.update(new_raw, force=True)
+        if report['action'] == 'incremental':
+            rows.append({'strategy': 'incremental', 'update_time': report['update_time'],
+                         **regression_metrics(y_eval, updater.model.predict(updater.preprocessor.transform(X_eval)),
+                                              'eval_')})
+
+    start = time.perf_counter()
+    _, _, full_preprocessor, full_model = full_retrain(pd.concat([old_raw, new_raw]))
+    full_time = time.perf_counter() - start
+    rows.append({'strategy': 'retreino completo', 'update_time': full_time,
+                 **regression_metrics(y_eval, full_model.predict(full_preprocessor.transform(X_eval)), 'eval_')})
+
+    report = pd.DataFrame(rows).set_index('strategy')
+    print("\nIncremental x retreino completo:")
+    print(report.to_string())
+    return report
@@ -1,21 +1,34 @@
 """
 Módulo para exportação de modelos em diferentes formatos
+
+Os oito modelos do ModelTrainer e o StackedEnsemble exportam para ONNX:
+os do sklearn pelo skl2onnx e XGBoost/LightGBM/ensemble pelos conversores
+de src/onnx_converters.py.
+onnx_parity_report confere todos em paralelo (paridade no split de
+teste inteiro em vários tamanhos de lote) e compara a latência
+pickle x ONNX. O LightGBM (e o ensemble que o contém) compara em double e
+é exportado com entrada double; os demais recebem float32 (predict_onnx converte conforme a
+entrada da sessão).
 """
 import joblib
 import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from typing import Dict, Sequence
 
 # Importações ONNX opcionais
 try:
     from skl2onnx import convert_sklearn
-    from skl2onnx.common.data_types import FloatTensorType
+    from skl2onnx.common.data_types import DoubleTensorType, FloatTensorType
     import onnxruntime as rt
+    from src.onnx_converters import needs_double_input  # registra XGBoost/LightGBM/StackedEnsemble
     ONNX_AVAILABLE = True
 except (ImportError, AttributeError, Exception) as e:
     ONNX_AVAILABLE = False
     print(f"AVISO: ONNX não disponível: {type(e).__name__}")
     print("Exportação ONNX será desabilitada (não afeta o treinamento)")
 
-from src.config import MODEL_PKL_PATH, MODEL_ONNX_PATH
+from src.config import MODEL_PKL_PATH, MODEL_ONNX_PATH, ONNX_PARITY_BATCH_SIZES, ONNX_PARITY_RTOL
 
 
 class ModelExporter:
@@ -34,6 +47,15 @@ class ModelExporter:
         
         return filepath
     
+    @staticmethod
+    def to_onnx(model, n_features: int):
+        """Converte o modelo para ONNX em memória (erro se não houver conversor)"""
+        if needs_double_input(model):
+            initial_type = [('double_input', DoubleTensorType([None, n_features]))]
+            return convert_sklearn(model, initial_types=initial_type, target_opset={'': 12, 'ai.onnx.ml': 3})
+        initial_type = [('float_input', FloatTensorType([None, n_features]))]
+        return convert_sklearn(model, initial_types=initial_type, target_opset=12)
+    
     @staticmethod
     def export_to_onnx(model, X_sample, filepath: str = None):
         """
@@ -51,17 +73,11 @@ class ModelExporter:
         if filepath is None:
             filepath = MODEL_ONNX_PATH
         
-        # Definir tipo de entrada
         n_features = X_sample.shape[1]
-        initial_type = [('float_input', FloatTensorType([None, n_features]))]
         
         # Converter para ONNX
         try:
-            onnx_model = convert_sklearn(
-                model,
-                initial_types=initial_type,
-                target_opset=12
-            )
+            onnx_model = ModelExporter.to_onnx(model, n_features)
             
             # Salvar
             with open(filepath, "wb") as f:
@@ -106,45 +122,64 @@ class ModelExporter:
         input_name = sess.get_inputs()[0].name
         label_name = sess.get_outputs()[0].name
         
-        # Garantir que X é float32
-        X = X.astype(np.float32)
+        # Garantir o tipo da entrada da sessão
+        X = X.astype(ModelExporter.onnx_input_dtype(sess))
         
         pred_onnx = sess.run([label_name], {input_name: X})[0]
         
         return pred_onnx
     
     @staticmethod
-    def verify_onnx_export(sklearn_model, onnx_session, X_test, tolerance=1e-4):
+    def onnx_input_dtype(sess):
+        """Tipo numpy da entrada da sessão (float32, ou float64 no LightGBM)"""
+        return np.float64 if sess.get_inputs()[0].type == 'tensor(double)' else np.float32
+    
+    @staticmethod
+    def predict_onnx_batches(sess, X, batch_size: int) -> np.ndarray:
+        """Predição ONNX de X inteiro em lotes de batch_size linhas"""
+        X = np.asarray(X, dtype=ModelExporter.onnx_input_dtype(sess))
+        return np.concatenate([
+            ModelExporter.predict_onnx(sess, X[start:start + batch_size]).ravel()
+            for start in range(0, len(X), batch_size)
+        ])
+    
+    @staticmethod
+    def verify_onnx_export(sklearn_model, onnx_session, X_test, tolerance=ONNX_PARITY_RTOL, X_onnx=None,
+                           batch_sizes: Sequence[int] = ONNX_PARITY_BATCH_SIZES):
         """
         Verifica se o modelo ONNX produz os mesmos resultados que o scikit-learn
         
         Args:
             sklearn_model: Modelo scikit-learn original
             onnx_session: Sessão ONNX Runtime
-            X_test: Dados de teste
-            tolerance: Tolerância para diferenças
+            X_test: Dados de teste (todas as linhas são conferidas)
+            tolerance: Diferença máxima relativa à maior predição (o ONNX
+                calcula em float32)
+            X_onnx: Entrada do ONNX, se diferente de X_test (ex: códigos das
+                categorias nativas)
+            batch_sizes: Tamanhos de lote conferidos (o resultado não pode
+                depender do lote)
         """
-        # Predição com scikit-learn
-        y_sklearn = sklearn_model.predict(X_test)
+        if X_onnx is None:
+            X_onnx = X_test
         
-        # Predição com ONNX
-        y_onnx = ModelExporter.predict_onnx(onnx_session, X_test).flatten()
-        
-        # Calcular diferença
-        diff = np.abs(y_sklearn - y_onnx)
-        max_diff = np.max(diff)
-        mean_diff = np.mean(diff)
+        # Predição com scikit-learn
+        y_sklearn = np.asarray(sklearn_model.predict(X_test), dtype=float).ravel()
+        limit = tolerance * max(1.0, float(np.max(np.abs(y_sklearn))))
         
         print("\nVerificação de exportação ONNX:")
-        print(f"Diferença máxima: {max_diff:.6f}")
-        print(f"Diferença média: {mean_diff:.6f}")
+        ok = True
+        for batch_size in batch_sizes:
+            y_onnx = ModelExporter.predict_onnx_batches(onnx_session, X_onnx, batch_size)
+            diff = np.abs(y_sklearn - y_onnx)
+            print(f"Lote {batch_size:>5}: diferença máxima {np.max(diff):.6f}, média {np.mean(diff):.6f}")
+            ok &= bool(np.max(diff) <= limit)
         
-        if max_diff < tolerance:
+        if ok:
             print("Exportação ONNX verificada com sucesso!")
-            return True
         else:
             print("Diferenças significativas detectadas")
-            return False
+        return ok
 
 
 def export_full_pipeline(model, preprocessor, feature_names, base_path: str):
@@ -177,3 +212,72 @@ def export_full_pipeline(model, preprocessor, feature_names, base_path: str):
     print(f"Feature names salvas no arquivo: {features_path}")
     
     print("\nPipeline completo exportado com sucesso!")
+
+
+def _export_and_check(model, X: np.ndarray, batch_sizes: Sequence[int], tolerance: float) -> Dict:
+    """Converte e confere um modelo (roda nos workers do onnx_parity_report)"""
+    try:
+        onnx_bytes = ModelExporter.to_onnx(model, X.shape[1]).SerializeToString()
+    except Exception as e:
+        return {'exportado': False, 'erro': f"{type(e).__name__}: {e}"[:200], 'onnx': None}
+
+    session = rt.InferenceSession(onnx_bytes)
+    y_ref = np.asarray(model.predict(X), dtype=float).ravel()
+    max_diff = max(
+        float(np.max(np.abs(y_ref - ModelExporter.predict_onnx_batches(session, X, batch_size))))
+        for batch_size in batch_sizes
+    )
+    max_rel = max_diff / max(1.0, float(np.max(np.abs(y_ref))))
+    return {
+        'exportado': True,
+        'max_abs_diff': max_diff,
+        'max_rel_diff': max_rel,
+        'paridade': max_rel <= tolerance,
+        'onnx_kb': len(onnx_bytes) / 1024,
+        'onnx': onnx_bytes
+    }
+
+
+def onnx_parity_report(models: Dict, X_test, batch_sizes: Sequence[int] = ONNX_PARITY_BATCH_SIZES,
+                       n_jobs: int = -1, tolerance: float = ONNX_PARITY_RTOL,
+                       min_time: float = 0.1) -> pd.DataFrame:
+    """
+    Exporta todos os modelos para ONNX e compara com o pickle
+
+    Conversão e paridade (split de teste inteiro, em cada tamanho de lote)
+    rodam em paralelo, um modelo por job. A latência é medida depois, em
+    sequência, para um modelo não disputar CPU com outro.
+
+    Args:
+        models: {nome: modelo ajustado na matriz X_test}
+        X_test: Matriz preprocessada
+        tolerance: Diferença máxima relativa à maior predição
+
+    Returns:
+        DataFrame com uma linha por modelo: exportado, diferenças, tamanho e
+        latência pickle/ONNX (ms) por tamanho de lote
+    """
+    from src.benchmark import time_call
+
+    if not ONNX_AVAILABLE:
+        raise RuntimeError("ONNX não está disponível")
+    X_test = np.asarray(X_test, dtype=np.float64)
+    checks = Parallel(n_jobs=n_jobs)(
+        delayed(_export_and_check)(model, X_test, batch_sizes, tolerance) for model in models.values()
+    )
+
+    rows = []
+    for (name, model), check in zip(models.items(), checks):
+        onnx_bytes = check.pop('onnx')
+        row = {'modelo': name, **check}
+        if onnx_bytes is not None:
+            session = rt.InferenceSession(onnx_bytes)
+            for batch_size in batch_sizes:
+                X = X_test[:batch_size]
+                X_onnx = X.astype(ModelExporter.onnx_input_dtype(session))
+                pkl_ms = time_call(lambda: model.predict(X), min_time=min_time)['median_ms']
+                onnx_ms = time_call(lambda: ModelExporter.predict_onnx(session, X_onnx), min_time=min_time)['median_ms']
+                row.update({f'pkl_ms_b{batch_size}': pkl_ms, f'onnx_ms_b{batch_size}': onnx_ms,
+                            f'speedup_b{batch_size}': pkl_ms / onnx_ms})
+        rows.append(row)
+    return pd.DataFrame(rows).set_index('modelo')
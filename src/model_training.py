@@ -2,7 +2,9 @@
 
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
+from sklearn.model_selection import train_test_split, GridSearchCV, KFold
+from sklearn.base import clone
+from sklearn.pipeline import Pipeline
 from sklearn.linear_model import LinearRegression, Ridge, Lasso, ElasticNet
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 # from sklearn.svm import SVR 
@@ -12,25 +14,52 @@ from lightgbm import LGBMRegressor
 import joblib
 from typing import Dict, Tuple
 import json
+import time
 import warnings
 
-from src.config import RANDOM_STATE, TEST_SIZE, CV_FOLDS, MODEL_PKL_PATH
+from src.config import (
+    RANDOM_STATE, TEST_SIZE, CV_FOLDS, MODEL_PKL_PATH,
+    SEARCH_MAX_TIME, SEARCH_MAX_FITS, MAX_BOOSTING_ROUNDS, EARLY_STOPPING_ROUNDS, EARLY_STOPPING_FRACTION,
+    CACHE_DIR,
+    STACKING_TOP_K, STACKING_MIN_GAIN
+)
+from src.evaluation import ModelEvaluator
+from src.hyperparameter_search import BudgetedSearch, TrialStore, SEARCH_SPACES
+from src.native_categorical import get_native_models
+from src.profiling import RunProfiler
+from src.stacking import build_stacked_ensemble
+from src.checkpoint import CheckpointStore
 
 
 class ModelTrainer:
     """Classe para treinamento de modelos"""
     
-    def __init__(self, random_state: int = RANDOM_STATE):
+    def __init__(self, random_state: int = RANDOM_STATE, return_train_score: bool = False,
+                 early_stopping_rounds: int = EARLY_STOPPING_ROUNDS, profiler: RunProfiler = None,
+                 checkpoints: CheckpointStore = None):
         self.random_state = random_state
+        self.checkpoints = checkpoints
+        self.profiler = profiler or RunProfiler(enabled=False)
+        self.return_train_score = return_train_score
+        self.early_stopping_rounds = early_stopping_rounds
         self.models = {}
         self.results = {}
+        self.cv_results = {}
+        self.run_stats = {}
+        self.tuning_results = {}
+        self.model_preprocessing = {}
+        self.ensemble_results = None
         self.best_model = None
         self.best_model_name = None
         
     def get_models(self) -> Dict:
         """Retorna dicionário com modelos a serem treinados
         
+        Com early stopping ativo, o n_estimators dos boosters vira apenas
+        o teto de rounds (MAX_BOOSTING_ROUNDS).
         """
+        n_rounds = MAX_BOOSTING_ROUNDS if self.early_stopping_rounds else 100
+        
         models = {
             'Linear Regression': LinearRegression(),  # baseline simples
             
@@ -50,14 +79,14 @@ class ModelTrainer:
             ),
             
             'Gradient Boosting': GradientBoostingRegressor(
-                n_estimators=100,
+                n_estimators=n_rounds,
                 learning_rate=0.1,
                 max_depth=5,
                 random_state=self.random_state
             ),
             
             'XGBoost': XGBRegressor(
-                n_estimators=100,
+                n_estimators=n_rounds,
                 learning_rate=0.1,
                 max_depth=5,
                 random_state=self.random_state,
@@ -65,7 +94,7 @@ class ModelTrainer:
             ),
             
             'LightGBM': LGBMRegressor(
-                n_estimators=100,
+                n_estimators=n_rounds,
                 learning_rate=0.1,
                 max_depth=5,
                 random_state=self.random_state,
@@ -76,49 +105,100 @@ class ModelTrainer:
         
         return models
     
-    def train_models(self, X_train, y_train, X_test, y_test) -> Dict:
+    def _checkpoint_key(self, preprocessing: str, model) -> tuple:
+        """Tudo o que muda a avaliação do modelo: parâmetros, folds e early stopping"""
+        return (preprocessing, model.get_params(), {
+            'cv_folds': CV_FOLDS,
+            'return_train_score': self.return_train_score,
+            'early_stopping_rounds': self.early_stopping_rounds,
+            'max_boosting_rounds': MAX_BOOSTING_ROUNDS,
+            'early_stopping_fraction': EARLY_STOPPING_FRACTION,
+            'random_state': RANDOM_STATE
+        })
+    
+    def train_models(self, X_train, y_train, X_test, y_test, native_data: tuple = None,
+                     fold_preprocessors: Dict = None) -> Dict:
         """
         Treina múltiplos modelos e avalia performance
+
+        Holdout, CV e predições out-of-fold saem de uma única passada do
+        ModelEvaluator (CV_FOLDS ajustes nos folds + 1 ajuste final).
+        
+        Args:
+            native_data: (X_train, X_test) do NativeCategoricalEncoder. Se
+                informado, XGBoost e LightGBM usam categorias nativas.
+            fold_preprocessors: {'onehot': FoldPreprocessor, 'native': ...}.
+                Com eles a CV reajusta o preprocessamento em cada fold (sem
+                vazamento), com as matrizes compartilhadas entre os modelos.
         """
+        fold_preprocessors = fold_preprocessors or {}
         self.models = self.get_models()
+        native_models = get_native_models(self.models) if native_data is not None else {}
+        evaluator = ModelEvaluator(
+            cv=CV_FOLDS,
+            return_train_score=self.return_train_score,
+            early_stopping_rounds=self.early_stopping_rounds
+        )
         
         print("Iniciando treinamento...\n")
+        run_start = time.perf_counter()
         
         for name, model in self.models.items():
-            print(f"Treinando {name}...")
-            
-            # Treinar modelo
-            model.fit(X_train, y_train)
+            X_train_model, X_test_model = X_train, X_test
+            self.model_preprocessing[name] = 'onehot'
+            if name in native_models:
+                model = native_models[name]
+                X_train_model, X_test_model = native_data
+                self.model_preprocessing[name] = 'native'
             
-            # Predições
-            y_pred_train = model.predict(X_train)
-            y_pred_test = model.predict(X_test)
+            print(f"Treinando {name} ({self.model_preprocessing[name]})...")
             
-            # Métricas
-            metrics = {
-                'train_r2': r2_score(y_train, y_pred_train),
-                'test_r2': r2_score(y_test, y_pred_test),
-                'train_rmse': np.sqrt(mean_squared_error(y_train, y_pred_train)),
-                'test_rmse': np.sqrt(mean_squared_error(y_test, y_pred_test)),
-                'train_mae': mean_absolute_error(y_train, y_pred_train),
-                'test_mae': mean_absolute_error(y_test, y_pred_test)
-            }
+            checkpoint_key = self._checkpoint_key(self.model_preprocessing[name], model)
+            evaluation = None
+            if self.checkpoints is not None:
+                evaluation = self.checkpoints.load('model', name, checkpoint_key)
+            resumed = evaluation is not None
             
-            # Cross-validation
-            cv_scores = cross_val_score(
-                model, X_train, y_train, 
-                cv=CV_FOLDS, 
-                scoring='r2',
-                n_jobs=-1
-            )
-            metrics['cv_r2_mean'] = cv_scores.mean()
-            metrics['cv_r2_std'] = cv_scores.std()
+            with self.profiler.section(f"model:{name}") as record:
+                if not resumed:
+                    evaluation = evaluator.evaluate(
+                        model, X_train_model, y_train, X_test_model, y_test,
+                        fold_preprocessor=fold_preprocessors.get(self.model_preprocessing[name])
+                    )
+                    if self.checkpoints is not None:
+                        # Os modelos dos folds não são usados depois; ficam fora do checkpoint
+                        self.checkpoints.save('model', name, dict(evaluation, fold_estimators=None),
+                                              checkpoint_key)
+                else:
+                    print("  (retomado do checkpoint)")
+                record['resumed'] = resumed
+                metrics = evaluation['metrics']
+                # Tempos medidos dentro dos workers (CV, ajuste final, predição)
+                for key in ('cv_fit_time', 'cv_score_time', 'refit_time', 'predict_time', 'n_fits'):
+                    record[key] = metrics[key]
             
+            self.models[name] = evaluation['model']
+            self.cv_results[name] = evaluation
             self.results[name] = metrics
             
             print(f"  Test R^2: {metrics['test_r2']:.4f}")
             print(f"  Test RMSE: {metrics['test_rmse']:.2f}")
-            print(f"  CV R^2 (mean +- std): {metrics['cv_r2_mean']:.4f} ± {metrics['cv_r2_std']:.4f}\n")
+            print(f"  CV R^2 (mean +- std): {metrics['cv_r2_mean']:.4f} ± {metrics['cv_r2_std']:.4f}")
+            if 'n_estimators' in metrics:
+                print(f"  Early stopping: {metrics['n_estimators']} de {metrics['max_rounds']} rounds "
+                      f"(~{metrics['estimated_time_saved']:.2f}s poupados)")
+            print(f"  Modelo: {metrics['model_size_kb']:.1f} KB | Latência (1 linha): "
+                  f"{metrics['latency_1_ms']:.3f} ms")
+            print(f"  Ajustes: {metrics['n_fits']} | Tempo de fit: {metrics['fit_time']:.2f}s "
+                  f"| Tempo total: {metrics['wall_time']:.2f}s\n")
+        
+        self.run_stats = {
+            'n_fits': sum(r['n_fits'] for r in self.results.values()),
+            'fit_time': sum(r['fit_time'] for r in self.results.values()),
+            'wall_time': time.perf_counter() - run_start,
+            'preprocessing_fits': sum(fp.n_fits for fp in fold_preprocessors.values()),
+            'preprocessing_time': sum(fp.fit_time for fp in fold_preprocessors.values())
+        }
         
         # Identificar melhor modelo
         self.best_model_name = max(self.results.keys(), 
@@ -127,18 +207,87 @@ class ModelTrainer:
         
         print(f"Melhor modelo: {self.best_model_name}")
         print(f"Test R^2: {self.results[self.best_model_name]['test_r2']:.4f}")
+        print(f"Total de ajustes: {self.run_stats['n_fits']} | "
+              f"Tempo de fit somado: {self.run_stats['fit_time']:.2f}s | "
+              f"Tempo total: {self.run_stats['wall_time']:.2f}s")
+        if fold_preprocessors:
+            print(f"Preprocessamento por fold: {self.run_stats['preprocessing_fits']} ajustes "
+                  f"em {self.run_stats['preprocessing_time']:.2f}s (compartilhados entre os modelos)")
         
         return self.results
     
-    def hyperparameter_tuning(self, X_train, y_train, model_name: str = None):
+    def build_ensemble(self, y_train, X_test, y_test, preprocessing: str = 'onehot',
+                       top_k: int = STACKING_TOP_K, min_gain: float = STACKING_MIN_GAIN) -> Dict:
+        """
+        Stacking dos melhores modelos a partir das predições out-of-fold
+
+        Nenhum modelo base é reajustado. O ensemble vira o melhor modelo só
+        se o ganho de R^2 out-of-fold sobre o melhor modelo individual
+        passar de min_gain (o custo de latência é mostrado ao lado).
+
+        Args:
+            X_test: Holdout na representação dos candidatos
+            preprocessing: Só modelos com esse preprocessamento entram
+                ('onehot' ou 'native'), pois compartilham a mesma entrada
+        """
+        names = [n for n in self.cv_results if self.model_preprocessing.get(n) == preprocessing]
+        if len(names) < 2:
+            print("Stacking precisa de pelo menos 2 modelos com o mesmo preprocessamento")
+            return None
+
+        with self.profiler.section('stacking'):
+            ensemble = build_stacked_ensemble(
+                {n: self.cv_results[n] for n in names}, y_train, X_test, y_test, top_k=top_k
+            )
+        metrics, baseline = ensemble['metrics'], ensemble['baseline']
+        self.ensemble_results = ensemble
+
+        weights = ', '.join(f"{n}: {w:.3f}" for n, w in ensemble['weights'].items())
+        print(f"Pesos do meta-modelo: {weights}")
+        print(f"  OOF R^2: {metrics['oof_r2']:.4f} (ganho de {metrics['oof_r2_gain']:+.4f} sobre {baseline['name']})")
+        print(f"  Test R^2: {metrics['test_r2']:.4f} (ganho de {metrics['test_r2_gain']:+.4f})")
+        print(f"  Latência (1 linha): {metrics['latency_1_ms']:.3f} ms vs {baseline['latency_1_ms']:.3f} ms "
+              f"({metrics['latency_ratio']:.1f}x) | Lote de teste: {metrics['batch_latency_ms']:.1f} ms "
+              f"vs {baseline['batch_latency_ms']:.1f} ms")
+
+        name = 'Stacked Ensemble'
+        self.results[name] = metrics
+        self.models[name] = ensemble['model']
+        self.model_preprocessing[name] = preprocessing
+
+        if metrics['oof_r2_gain'] >= min_gain:
+            print(f"Ensemble adotado como melhor modelo (ganho >= {min_gain})")
+            self.best_model_name = name
+            self.best_model = ensemble['model']
+        else:
+            print(f"Ensemble não adotado (ganho < {min_gain}); mantido {self.best_model_name}")
+
+        return ensemble
+
+    def hyperparameter_tuning(self, X_train, y_train, model_name: str = None,
+                              method: str = 'budgeted', max_time: float = SEARCH_MAX_TIME,
+                              max_fits: int = SEARCH_MAX_FITS, resource: str = 'n_samples',
+                              fold_preprocessor=None):
         """
         Otimização de hiperparâmetros para o melhor modelo
+        
+        Args:
+            method: 'budgeted' (successive halving com orçamento) ou 'grid' (GridSearchCV)
+            max_time: Orçamento de tempo em segundos (apenas 'budgeted')
+            max_fits: Orçamento em número de ajustes (apenas 'budgeted')
+            resource: Recurso do successive halving ('n_samples' ou 'n_estimators')
+            fold_preprocessor: FoldPreprocessor com os dados brutos; a CV da
+                busca reajusta o preprocessamento por fold (sem vazamento)
         """
         if model_name is None:
             model_name = self.best_model_name
         
         print(f"\nOtimizando hiperparâmetros para {model_name}...")
         
+        if method == 'budgeted':
+            return self._budgeted_tuning(X_train, y_train, model_name, max_time, max_fits,
+                                         resource, fold_preprocessor)
+        
         param_grids = {
             'Random Forest': {
                 'n_estimators': [100, 200, 300],
@@ -167,26 +316,115 @@ class ModelTrainer:
             return self.models[model_name]
         
         base_model = self.get_models()[model_name]
+        param_grid = param_grids[model_name]
+        X_search = X_train
+        
+        # Pipeline completo (preprocessamento + modelo) na CV; o memory do
+        # Pipeline guarda o preprocessador ajustado de cada fold, que é
+        # reaproveitado por todos os candidatos do grid
+        if fold_preprocessor is not None:
+            base_model = Pipeline([
+                ('preprocessor', clone(fold_preprocessor.preprocessor)),
+                ('model', base_model)
+            ], memory=str(CACHE_DIR / "grid_pipeline"))
+            param_grid = {f'model__{k}': v for k, v in param_grid.items()}
+            X_search = fold_preprocessor.X
         
         grid_search = GridSearchCV(
             base_model,
-            param_grids[model_name],
-            cv=CV_FOLDS,
+            param_grid,
+            cv=KFold(n_splits=CV_FOLDS),
             scoring='r2',
             n_jobs=-1,
             verbose=1
         )
         
-        grid_search.fit(X_train, y_train)
+        grid_search.fit(X_search, y_train)
         
         print(f"\nMelhores parâmetros: {grid_search.best_params_}")
         print(f"Melhor CV R^2: {grid_search.best_score_:.4f}")
         
         self.best_model = grid_search.best_estimator_
+        if fold_preprocessor is not None:
+            # Serve só o modelo (o preprocessador é salvo à parte)
+            self.best_model = self.best_model.named_steps['model']
         self.models[model_name] = self.best_model
         
         return self.best_model
     
+    def _budgeted_tuning(self, X_train, y_train, model_name, max_time, max_fits, resource,
+                         fold_preprocessor=None):
+        """Busca com successive halving, orçamento e histórico em SQLite"""
+        if model_name not in SEARCH_SPACES:
+            print(f"Espaço de busca não configurado para {model_name}")
+            return self.models[model_name]
+        
+        base_model = self.get_models()[model_name]
+        store_name = model_name
+        if self.model_preprocessing.get(model_name) == 'native':
+            base_model = get_native_models({model_name: base_model})[model_name]
+            store_name = f"{model_name} (native)"
+        
+        search = BudgetedSearch(
+            base_model,
+            SEARCH_SPACES[model_name],
+            max_time=max_time,
+            max_fits=max_fits,
+            resource=resource,
+            early_stopping_rounds=self.early_stopping_rounds,
+            store=TrialStore(),
+            model_name=store_name,
+            resume=self.checkpoints is not None and self.checkpoints.resume,
+            random_state=self.random_state
+        )
+        with self.profiler.section(f"search:{model_name}") as record:
+            search.fit(X_train, y_train, fold_preprocessor=fold_preprocessor)
+            record['n_fits'] = search.n_fits_
+        
+        self.tuning_results[model_name] = {
+            'best_params': search.best_params_,
+            'best_cv_r2': search.best_score_,
+            'n_fits': search.n_fits_,
+            'elapsed': search.elapsed_
+        }
+        
+        if search.best_params_ is None:
+            return self.models[model_name]
+        
+        print(f"\nMelhores parâmetros: {search.best_params_}")
+        print(f"Melhor CV R^2: {search.best_score_:.4f}")
+        
+        # Só troca o modelo se o melhor candidato chegou ao recurso máximo
+        # e supera o CV do modelo padrão
+        reached_max = search.best_resources_ == search.schedule_[-1]
+        if not reached_max:
+            print("Parâmetros padrão mantidos (melhor candidato não chegou ao recurso máximo)")
+            return self.models[model_name]
+        
+        # O best_score_ vem dos folds embaralhados da busca; o CV do padrão, dos
+        # folds do ModelEvaluator. O vencedor é reavaliado nos mesmos folds do
+        # padrão, para a comparação não depender do ruído dos folds
+        evaluation = ModelEvaluator(cv=CV_FOLDS, early_stopping_rounds=self.early_stopping_rounds).evaluate(
+            base_model.set_params(**search.best_params_), X_train, y_train, fold_preprocessor=fold_preprocessor
+        )
+        tuned_cv = evaluation['metrics']['cv_r2_mean']
+        baseline_cv = self.results.get(model_name, {}).get('cv_r2_mean', -np.inf)
+        self.tuning_results[model_name].update({
+            'tuned_cv_r2': tuned_cv, 'tuned_cv_r2_std': evaluation['metrics']['cv_r2_std'],
+            'baseline_cv_r2': baseline_cv
+        })
+        print(f"CV R^2 nos folds do modelo padrão: {tuned_cv:.4f} (padrão: {baseline_cv:.4f})")
+        if tuned_cv <= baseline_cv:
+            print("Parâmetros padrão mantidos (busca não superou o modelo atual)")
+            return self.models[model_name]
+        
+        tuned_model = evaluation['model']
+        
+        self.best_model = tuned_model
+        self.models[model_name] = tuned_model
+        
+        return self.best_model
+    
     def save_model(self, filepath: str = None):
         """Salva o melhor modelo"""
         if filepath is None:
@@ -210,8 +448,19 @@ class ModelTrainer:
     
     def save_results(self, filepath: str):
         """Salva resultados em JSON"""
+        results = {}
+        for name, metrics in self.results.items():
+            results[name] = dict(metrics)
+            if name in self.model_preprocessing:
+                results[name]['preprocessing'] = self.model_preprocessing[name]
+            if name in self.tuning_results:
+                results[name]['tuning'] = self.tuning_results[name]
+        if self.ensemble_results is not None:
+            results['Stacked Ensemble']['weights'] = self.ensemble_results['weights']
+            results['Stacked Ensemble']['baseline'] = self.ensemble_results['baseline']
+        
         with open(filepath, 'w') as f:
-            json.dump(self.results, f, indent=4)
+            json.dump(results, f, indent=4)
         print(f"Resultados salvos no arquivo json: {filepath}")
 
 
@@ -0,0 +1,117 @@
+"""
+Caminho de categorias nativas para LightGBM e XGBoost
+
+Os boosters recebem as categóricas como colunas `category` (ver
+NativeCategoricalEncoder) em vez da matriz one-hot densa. Este módulo
+define as versões desses modelos com suporte a categorias e compara os
+dois caminhos em largura da matriz, tempo de fit, latência e acurácia.
+"""
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from typing import Dict
+
+from src.evaluation import regression_metrics
+from src.model_export import ModelExporter
+
+# Modelos que usam o caminho nativo quando ele está habilitado
+NATIVE_CATEGORICAL_MODELS = ('XGBoost', 'LightGBM')
+
+
+def get_native_models(models: Dict) -> Dict:
+    """Versões com categorias nativas dos boosters de `models`
+
+    Mantém os hiperparâmetros de ModelTrainer.get_models e liga o
+    suporte a categorias de cada biblioteca.
+    """
+    native = {}
+    if 'XGBoost' in models:
+        native['XGBoost'] = clone(models['XGBoost']).set_params(
+            enable_categorical=True,
+            tree_method='hist',
+            max_cat_to_onehot=1
+        )
+    if 'LightGBM' in models:
+        # O LightGBM detecta as colunas `category` do DataFrame sozinho
+        native['LightGBM'] = clone(models['LightGBM'])
+    return native
+
+
+def _predict_latency(model, X, n_repeats: int = 5) -> float:
+    """Mediana do tempo de predição em ms"""
+    timings = []
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        model.predict(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1000)
+
+
+def _onnx_exportable(model, X_sample) -> bool:
+    """Tenta exportar para ONNX em um arquivo temporário"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = ModelExporter.export_to_onnx(model, X_sample, Path(tmp) / "model.onnx")
+        return path is not None
+
+
+def compare_categorical_paths(models: Dict, onehot_data: tuple, native_data: tuple,
+                              y_train, y_test, codes_sample=None) -> pd.DataFrame:
+    """
+    Compara o caminho one-hot com o caminho de categorias nativas
+
+    Args:
+        models: Modelos base (ModelTrainer.get_models())
+        onehot_data: (X_train, X_test) do preprocessador one-hot
+        native_data: (X_train, X_test) do NativeCategoricalEncoder
+        codes_sample: Amostra em códigos (transform_codes) para testar ONNX
+
+    Returns:
+        DataFrame com uma linha por (modelo, caminho)
+    """
+    native_models = get_native_models(models)
+    rows = []
+
+    for name in NATIVE_CATEGORICAL_MODELS:
+        for path, base_model, (X_train, X_test) in (
+            ('onehot', models[name], onehot_data),
+            ('native', native_models[name], native_data)
+        ):
+            model = clone(base_model)
+            start = time.perf_counter()
+            model.fit(X_train, y_train)
+            fit_time = time.perf_counter() - start
+
+            y_pred = model.predict(X_test)
+            row = {
+                'model': name,
+                'path': path,
+                'n_columns': X_train.shape[1],
+                'train_memory_mb': _memory_mb(X_train),
+                'fit_time': fit_time,
+                'latency_batch_ms': _predict_latency(model, X_test),
+                'latency_1_ms': _predict_latency(model, X_test[:1], n_repeats=20)
+            }
+            row.update(regression_metrics(y_test, y_pred, prefix='test_'))
+
+            # No caminho nativo, a predição servida usa a matriz de códigos
+            if path == 'native' and codes_sample is not None:
+                row['latency_1_codes_ms'] = _predict_latency(model, codes_sample[:1], n_repeats=20)
+            
+            sample = X_test[:10] if path == 'onehot' else codes_sample
+            row['onnx_exportable'] = sample is not None and _onnx_exportable(model, sample)
+            rows.append(row)
+
+    report = pd.DataFrame(rows).set_index(['model', 'path'])
+    print("\nComparação one-hot x categorias nativas:")
+    print(report.to_string())
+    return report
+
+
+def _memory_mb(X) -> float:
+    """Memória ocupada pela matriz de treino"""
+    if isinstance(X, pd.DataFrame):
+        return X.memory_usage(deep=True).sum() / 1024 ** 2
+    return X.nbytes / 1024 ** 2
@@ -0,0 +1,226 @@
+"""
+Conversores ONNX do XGBoost, do LightGBM e do StackedEnsemble para o skl2onnx
+
+O skl2onnx só conhece estimadores do sklearn: sem conversor registrado,
+convert_sklearn falha para XGBRegressor/LGBMRegressor (justamente os que
+o ModelTrainer costuma escolher). Aqui as árvores de cada booster viram
+um nó TreeEnsembleRegressor (domínio ai.onnx.ml) e os dois tipos são
+registrados com update_registered_converter ao importar o módulo.
+
+Paridade:
+- XGBoost compara x < limiar em float32: o limiar do JSON já é float32
+- LightGBM compara x <= limiar em double: exportado com entrada double
+  (ai.onnx.ml v3, limiares em tensores double). Com entrada float32 o
+  limiar vira o maior float32 <= limiar, exato para x já em float32, mas
+  arredondar x para float32 muda o lado de valores colados no limiar
+
+Sem suporte (ValueError na conversão): splits categóricos, dart,
+árvores lineares e objetivos com função de ligação.
+
+StackedEnsemble: cada modelo base vira um subgrafo (pelo conversor do
+próprio tipo) e a combinação é um MatMul com os pesos do meta-modelo, em
+double. Cada base recebe a entrada no tipo em que seria exportado sozinho
+(double só no LightGBM): o XGBoost com entrada double erra nos limiares.
+O ensemble tem entrada double se algum modelo base for LightGBM.
+"""
+import json
+import numpy as np
+from onnx import TensorProto, numpy_helper
+from skl2onnx import update_registered_converter
+from skl2onnx.algebra.onnx_operator import OnnxSubEstimator
+from skl2onnx.algebra.onnx_ops import OnnxAdd, OnnxCast, OnnxConcat, OnnxMatMul
+from skl2onnx.common.data_types import DoubleTensorType, FloatTensorType
+from typing import Dict, List
+
+from src.stacking import StackedEnsemble
+
+try:
+    from xgboost import XGBRegressor
+    XGBOOST_AVAILABLE = True
+except ImportError:
+    XGBOOST_AVAILABLE = False
+
+try:
+    from lightgbm import LGBMRegressor
+    LIGHTGBM_AVAILABLE = True
+except ImportError:
+    LIGHTGBM_AVAILABLE = False
+
+IDENTITY_OBJECTIVES = ('reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror',
+                       'regression', 'regression_l1', 'huber', 'fair', 'quantile')
+
+
+class _TreeAttributes:
+    """Acumula os atributos do TreeEnsembleRegressor, árvore a árvore"""
+
+    def __init__(self):
+        self.nodes = {key: [] for key in ('treeids', 'nodeids', 'featureids', 'values', 'modes',
+                                          'truenodeids', 'falsenodeids', 'missing_value_tracks_true')}
+        self.targets = {key: [] for key in ('treeids', 'nodeids', 'ids', 'weights')}
+
+    def branch(self, tree: int, node: int, feature: int, threshold: float, mode: str,
+               true_node: int, false_node: int, missing_true: bool):
+        for key, value in zip(self.nodes, (tree, node, feature, threshold, mode,
+                                           true_node, false_node, int(missing_true))):
+            self.nodes[key].append(value)
+
+    def leaf(self, tree: int, node: int, value: float):
+        self.branch(tree, node, 0, 0.0, 'LEAF', 0, 0, False)
+        for key, item in zip(self.targets, (tree, node, 0, float(value))):
+            self.targets[key].append(item)
+
+    def build(self, base_value: float, double: bool = False) -> Dict:
+        """Atributos do nó; double=True guarda limiares/folhas em tensores double (ai.onnx.ml v3)"""
+        attrs = {f'nodes_{key}': values for key, values in self.nodes.items()}
+        attrs.update({f'target_{key}': values for key, values in self.targets.items()})
+        attrs.update({'n_targets': 1, 'base_values': [float(base_value)],
+                      'aggregate_function': 'SUM', 'post_transform': 'NONE'})
+        if double:
+            for key in ('nodes_values', 'target_weights', 'base_values'):
+                attrs[f'{key}_as_tensor'] = numpy_helper.from_array(np.asarray(attrs.pop(key), dtype=np.float64))
+        return attrs
+
+
+def xgboost_tree_attributes(model, double: bool = False) -> Dict:
+    """Atributos do TreeEnsembleRegressor a partir do JSON do booster"""
+    booster = model.get_booster()
+    learner = json.loads(booster.save_raw('json'))['learner']
+    objective = learner['objective']['name']
+    if objective not in IDENTITY_OBJECTIVES:
+        raise ValueError(f"Objetivo do XGBoost sem suporte: {objective}")
+    gbm = learner['gradient_booster']
+    if gbm['name'] != 'gbtree':
+        raise ValueError(f"Booster do XGBoost sem suporte: {gbm['name']}")
+
+    trees = gbm['model']['trees']
+    best = booster.attr('best_iteration')
+    if best is not None:
+        # Mesmas árvores que model.predict usa depois de early stopping
+        trees = trees[:int(gbm['model']['iteration_indptr'][int(best) + 1])]
+
+    attrs = _TreeAttributes()
+    for tree_id, tree in enumerate(trees):
+        if any(tree.get('split_type', [])):
+            raise ValueError("Splits categóricos do XGBoost não têm conversão")
+        values = np.asarray(tree['split_conditions'], dtype=np.float32)
+        for node, (left, right) in enumerate(zip(tree['left_children'], tree['right_children'])):
+            if left == -1:
+                attrs.leaf(tree_id, node, values[node])
+            else:
+                attrs.branch(tree_id, node, tree['split_indices'][node], float(values[node]), 'BRANCH_LT',
+                             left, right, bool(tree['default_left'][node]))
+
+    base_score = float(str(learner['learner_model_param']['base_score']).strip('[]').split(',')[0])
+    return attrs.build(base_score, double)
+
+
+def _float32_at_most(value: float) -> float:
+    """Maior float32 <= value: x <= value e x <= esse limiar coincidem para x float32"""
+    rounded = np.float32(value)
+    if float(rounded) > value:
+        rounded = np.nextafter(rounded, np.float32(-np.inf))
+    return float(rounded)
+
+
+def lightgbm_tree_attributes(model, double: bool = False) -> Dict:
+    """Atributos do TreeEnsembleRegressor a partir do dump_model do LightGBM"""
+    dump = model.booster_.dump_model()
+    objective = dump.get('objective', '').split(' ')[0]
+    if objective not in IDENTITY_OBJECTIVES:
+        raise ValueError(f"Objetivo do LightGBM sem suporte: {objective}")
+    if dump.get('average_output'):
+        raise ValueError("LightGBM em modo random forest sem suporte")
+
+    attrs = _TreeAttributes()
+    for tree_id, info in enumerate(dump['tree_info']):
+        next_id = [0]
+
+        def visit(node: Dict) -> int:
+            node_id = next_id[0]
+            next_id[0] += 1
+            if 'leaf_value' in node or 'split_feature' not in node:
+                if 'leaf_coeff' in node:
+                    raise ValueError("Árvores lineares do LightGBM sem suporte")
+                attrs.leaf(tree_id, node_id, node.get('leaf_value', 0.0))
+                return node_id
+            if node['decision_type'] != '<=' or node['missing_type'] == 'Zero':
+                raise ValueError(f"Split do LightGBM sem suporte: {node['decision_type']}/{node['missing_type']}")
+            # Reserva a posição do nó antes dos filhos (ids em pré-ordem)
+            position = len(attrs.nodes['nodeids'])
+            attrs.branch(tree_id, node_id, 0, 0.0, 'BRANCH_LEQ', 0, 0, False)
+            left, right = visit(node['left_child']), visit(node['right_child'])
+            threshold = float(node['threshold'])
+            # missing_type 'None': o LightGBM trata NaN como 0
+            missing_true = node['default_left'] if node['missing_type'] == 'NaN' else 0.0 <= threshold
+            stored = threshold if double else _float32_at_most(threshold)
+            for key, value in (('featureids', node['split_feature']), ('values', stored),
+                               ('truenodeids', left), ('falsenodeids', right),
+                               ('missing_value_tracks_true', int(missing_true))):
+                attrs.nodes[key][position] = value
+            return node_id
+
+        visit(info['tree_structure'])
+    return attrs.build(0.0, double)
+
+
+def _output_shape(operator):
+    """Saída [N, 1] float (o TreeEnsembleRegressor sempre devolve float)"""
+    operator.outputs[0].type = FloatTensorType([operator.inputs[0].get_first_dimension(), 1])
+
+
+def _converter(tree_attributes):
+    def convert(scope, operator, container):
+        double = isinstance(operator.inputs[0].type, DoubleTensorType)
+        container.add_node(
+            'TreeEnsembleRegressor', operator.inputs[0].full_name, operator.outputs[0].full_name,
+            op_domain='ai.onnx.ml', op_version=3 if double else 1,
+            name=scope.get_unique_operator_name('TreeEnsembleRegressor'),
+            **tree_attributes(operator.raw_operator, double)
+        )
+    return convert
+
+
+def needs_double_input(model) -> bool:
+    """Se o modelo é exportado com entrada double (LightGBM, ou ensemble com um LightGBM)"""
+    if isinstance(model, StackedEnsemble):
+        return any(needs_double_input(base) for _, base in model.estimators)
+    return type(model).__name__ == 'LGBMRegressor'
+
+
+def _convert_stacked_ensemble(scope, operator, container):
+    model = operator.raw_operator
+    opv = container.target_opset
+    X = operator.inputs[0]
+    float_input = FloatTensorType(X.type.shape)
+    X_float = OnnxCast(X, to=TensorProto.FLOAT, op_version=opv)
+    predictions = [
+        OnnxCast(OnnxSubEstimator(base, X, op_version=opv) if needs_double_input(base) else
+                 OnnxSubEstimator(base, X_float, op_version=opv, input_types=[float_input]),
+                 to=TensorProto.DOUBLE, op_version=opv)
+        for _, base in model.estimators
+    ]
+    coef = np.asarray(model.coef, dtype=np.float64).reshape(-1, 1)
+    combined = OnnxAdd(OnnxMatMul(OnnxConcat(*predictions, axis=1, op_version=opv), coef, op_version=opv),
+                       np.array([model.intercept], dtype=np.float64), op_version=opv)
+    output = OnnxCast(combined, to=TensorProto.FLOAT, op_version=opv, output_names=operator.outputs[:1])
+    output.add_to(scope, container)
+
+
+def register_converters() -> List[str]:
+    """Registra os conversores no skl2onnx (idempotente); devolve os tipos registrados"""
+    registered = []
+    if XGBOOST_AVAILABLE:
+        update_registered_converter(XGBRegressor, 'AmesXGBoostRegressor',
+                                    _output_shape, _converter(xgboost_tree_attributes))
+        registered.append('XGBRegressor')
+    if LIGHTGBM_AVAILABLE:
+        update_registered_converter(LGBMRegressor, 'AmesLightGBMRegressor',
+                                    _output_shape, _converter(lightgbm_tree_attributes))
+        registered.append('LGBMRegressor')
+    update_registered_converter(StackedEnsemble, 'AmesStackedEnsemble',
+                                _output_shape, _convert_stacked_ensemble)
+    registered.append('StackedEnsemble')
+    return registered
+
+
+register_converters()
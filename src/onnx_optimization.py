@@ -0,0 +1,228 @@
+"""
+Otimização do ONNX exportado: grafo, quantização int8 e relatório
+
+O ModelExporter grava o grafo como o skl2onnx gera. Este estágio opcional
+(ONNX_OPTIMIZE no train.py) monta variantes do modelo e só troca o arquivo
+servido se a diferença para o modelo float ficar dentro de
+ONNX_OPTIMIZATION_RTOL:
+
+- otimizado: otimizações de grafo do ONNX Runtime (constant folding,
+  eliminação de nós redundantes) gravadas offline, sem as entradas e
+  initializers que nenhum nó usa
+- quantizado: o otimizado com pesos int8 (quantize_dynamic). O
+  LinearRegressor (ai.onnx.ml) dos modelos lineares é antes reescrito como
+  MatMul + Add, que o quantizador conhece. Árvores (TreeEnsembleRegressor)
+  não têm versão quantizada no ONNX Runtime: para elas só há o otimizado
+
+Colunas que o modelo nunca usa já saem do artefato servido na compactação
+(COMPACT_SERVING_ARTIFACT): o grafo do skl2onnx tem uma única entrada.
+
+Para cada variante: tamanho, tempo de carga, latência com lote 1 e 1000 e
+diferença para o modelo float no X inteiro.
+
+Uso:
+    python -m src.onnx_optimization --model models/best_model.onnx --rows 1000
+"""
+import argparse
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Sequence
+
+import numpy as np
+import onnx
+import onnxruntime as rt
+from onnx import helper, numpy_helper
+
+from src.config import (
+    MODEL_ONNX_PATH, ONNX_OPTIMIZATION_LEVEL, ONNX_OPTIMIZATION_REPORT_PATH, ONNX_OPTIMIZATION_RTOL,
+    ONNX_QUANTIZE
+)
+from src.model_export import ModelExporter
+
+try:
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    QUANTIZATION_AVAILABLE = True
+except ImportError:
+    QUANTIZATION_AVAILABLE = False
+
+OPTIMIZATION_LEVELS = {
+    'basic': rt.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    'extended': rt.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+}
+QUANTIZABLE_OPS = {'MatMul', 'Gemm'}
+REPORT_BATCH_SIZES = (1, 1000)
+
+
+def prune_unused(model: onnx.ModelProto) -> onnx.ModelProto:
+    """Remove entradas e initializers que nenhum nó consome e opsets repetidos por domínio"""
+    model = onnx.ModelProto.FromString(model.SerializeToString())
+    graph = model.graph
+    used = {name for node in graph.node for name in node.input} | {output.name for output in graph.output}
+    for collection in (graph.input, graph.initializer):
+        for item in [item for item in collection if item.name not in used]:
+            collection.remove(item)
+    # O skl2onnx declara o domínio padrão duas vezes; o quantizador exige uma só
+    versions = {}
+    for opset in model.opset_import:
+        versions[opset.domain] = max(versions.get(opset.domain, 0), opset.version)
+    del model.opset_import[:]
+    model.opset_import.extend(helper.make_opsetid(domain, version) for domain, version in versions.items())
+    return model
+
+
+def optimize_graph(model: onnx.ModelProto, level: str = ONNX_OPTIMIZATION_LEVEL) -> onnx.ModelProto:
+    """Grafo otimizado offline pelo ONNX Runtime ('basic' é portável entre máquinas)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        options = rt.SessionOptions()
+        options.graph_optimization_level = OPTIMIZATION_LEVELS[level]
+        options.optimized_model_filepath = str(Path(tmp) / "optimized.onnx")
+        rt.InferenceSession(model.SerializeToString(), options)
+        optimized = onnx.load(options.optimized_model_filepath)
+    return prune_unused(optimized)
+
+
+def linear_to_matmul(model: onnx.ModelProto) -> onnx.ModelProto:
+    """Reescreve um LinearRegressor (post_transform NONE) como MatMul + Add; None se não houver"""
+    nodes = [node for node in model.graph.node if node.op_type == 'LinearRegressor']
+    if len(nodes) != 1:
+        return None
+    node = nodes[0]
+    attrs = {attr.name: helper.get_attribute_value(attr) for attr in node.attribute}
+    if attrs.get('post_transform', b'NONE') not in (b'NONE', 'NONE'):
+        return None
+    n_targets = int(attrs.get('targets', 1))
+    weights = np.asarray(attrs['coefficients'], dtype=np.float32).reshape(n_targets, -1).T
+    intercepts = np.asarray(attrs.get('intercepts', [0.0] * n_targets), dtype=np.float32)
+
+    model = onnx.ModelProto.FromString(model.SerializeToString())
+    graph = model.graph
+    product = node.output[0] + '_matmul'
+    replacement = [
+        helper.make_node('MatMul', [node.input[0], 'linear_weights'], [product], name='LinearMatMul'),
+        helper.make_node('Add', [product, 'linear_intercepts'], list(node.output), name='LinearAdd')
+    ]
+    position = list(graph.node).index(node)
+    graph.node.remove(node)
+    for offset, new_node in enumerate(replacement):
+        graph.node.insert(position + offset, new_node)
+    graph.initializer.extend([numpy_helper.from_array(weights, 'linear_weights'),
+                              numpy_helper.from_array(intercepts, 'linear_intercepts')])
+    return model
+
+
+def quantize(model: onnx.ModelProto) -> onnx.ModelProto:
+    """Pesos em int8 (quantização dinâmica); None se o modelo não tem operador quantizável"""
+    if not QUANTIZATION_AVAILABLE:
+        return None
+    model = linear_to_matmul(model) or model
+    if not any(node.op_type in QUANTIZABLE_OPS for node in model.graph.node):
+        return None
+    with tempfile.TemporaryDirectory() as tmp:
+        source, target = Path(tmp) / "float.onnx", Path(tmp) / "int8.onnx"
+        onnx.save(model, source)
+        quantize_dynamic(str(source), str(target), weight_type=QuantType.QInt8)
+        return onnx.load(target)
+
+
+def _batch(X: np.ndarray, n_rows: int) -> np.ndarray:
+    """n_rows linhas de X (repete as linhas se X for menor)"""
+    return np.take(X, np.arange(n_rows) % len(X), axis=0)
+
+
+def evaluate_variant(model_bytes: bytes, X: np.ndarray, y_ref: np.ndarray,
+                     batch_sizes: Sequence[int] = REPORT_BATCH_SIZES, min_time: float = 0.1) -> Dict:
+    """Tamanho, carga, latência por lote e diferença para y_ref (predições do modelo float)"""
+    from src.benchmark import time_call
+
+    session = rt.InferenceSession(model_bytes)
+    y_pred = ModelExporter.predict_onnx_batches(session, X, 1000)
+    max_diff = float(np.max(np.abs(y_pred - y_ref)))
+    metrics = {
+        'size_kb': len(model_bytes) / 1024,
+        'load_ms': time_call(lambda: rt.InferenceSession(model_bytes), min_time=min_time)['median_ms'],
+        'max_abs_diff': max_diff,
+        'max_rel_diff': max_diff / max(1.0, float(np.max(np.abs(y_ref))))
+    }
+    for batch_size in batch_sizes:
+        X_batch = _batch(X, batch_size).astype(ModelExporter.onnx_input_dtype(session))
+        metrics[f'latency_b{batch_size}_ms'] = time_call(
+            lambda: ModelExporter.predict_onnx(session, X_batch), min_time=min_time)['median_ms']
+    return metrics
+
+
+def optimize_onnx(onnx_path=None, X=None, tolerance: float = ONNX_OPTIMIZATION_RTOL,
+                  quantization: bool = ONNX_QUANTIZE, level: str = ONNX_OPTIMIZATION_LEVEL,
+                  output_path=None, min_time: float = 0.1) -> Dict:
+    """
+    Monta as variantes do modelo, mede cada uma e grava a escolhida
+
+    A escolhida é a quantizada, senão a otimizada, senão a original: a
+    primeira com diferença relativa (à maior predição) <= tolerance.
+
+    Args:
+        onnx_path: ONNX exportado (padrão: MODEL_ONNX_PATH)
+        X: Entrada do ONNX (matriz preprocessada) para medir diferença e latência
+        tolerance: Diferença máxima relativa aceita para trocar o modelo
+        quantization: Tenta a variante int8
+        level: Nível das otimizações de grafo ('basic' ou 'extended')
+        output_path: Onde gravar a escolhida (padrão: sobrescreve onnx_path)
+
+    Returns:
+        Dicionário com a variante mantida, a tolerância e as métricas de cada variante
+    """
+    onnx_path = Path(onnx_path or MODEL_ONNX_PATH)
+    output_path = Path(output_path or onnx_path)
+    original = onnx.load(onnx_path)
+    X = np.asarray(X)
+    session = rt.InferenceSession(original.SerializeToString())
+    y_ref = ModelExporter.predict_onnx_batches(session, X, 1000)
+
+    variants = {'original': original, 'otimizado': optimize_graph(original, level)}
+    if quantization:
+        quantized = quantize(variants['otimizado'])
+        if quantized is not None:
+            variants['quantizado'] = quantized
+
+    report = {}
+    for name, model in variants.items():
+        report[name] = evaluate_variant(model.SerializeToString(), X, y_ref, min_time=min_time)
+        report[name]['aceito'] = report[name]['max_rel_diff'] <= tolerance
+        print(f"  {name:<11} {report[name]['size_kb']:8.1f} KB  carga {report[name]['load_ms']:7.2f} ms  "
+              f"lote 1 {report[name]['latency_b1_ms']:7.3f} ms  lote 1000 {report[name]['latency_b1000_ms']:7.2f} ms  "
+              f"dif. rel. {report[name]['max_rel_diff']:.2e}")
+
+    kept = next(name for name in ('quantizado', 'otimizado', 'original')
+                if name in report and report[name]['aceito'])
+    if kept != 'original' or output_path != onnx_path:
+        tmp_path = output_path.with_name(output_path.name + '.tmp')
+        onnx.save(variants[kept], tmp_path)
+        os.replace(tmp_path, output_path)
+    print(f"ONNX mantido: {kept} (tolerância relativa {tolerance:g})")
+    return {'mantido': kept, 'tolerancia': tolerance, 'variantes': report}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Otimiza e quantiza o ONNX exportado")
+    parser.add_argument('--model', default=str(MODEL_ONNX_PATH), help="ONNX exportado")
+    parser.add_argument('--output', help="Onde gravar a variante mantida (padrão: sobrescreve --model)")
+    parser.add_argument('--rows', type=int, default=1000, help="Linhas do CSV usadas nas medições")
+    parser.add_argument('--tolerance', type=float, default=ONNX_OPTIMIZATION_RTOL)
+    parser.add_argument('--no-quantize', action='store_true', help="Não tenta a variante int8")
+    args = parser.parse_args()
+
+    from src.config import RAW_DATA_FILE
+    from src.data_loading import load_dataset
+    from src.serving import load_pipeline
+
+    pipeline = load_pipeline()
+    X = pipeline[:-1].transform(load_dataset(RAW_DATA_FILE).head(args.rows))
+    report = optimize_onnx(args.model, X, args.tolerance, not args.no_quantize, output_path=args.output)
+    with open(ONNX_OPTIMIZATION_REPORT_PATH, 'w') as f:
+        json.dump(report, f, indent=4)
+    print(f"Relatório salvo em: {ONNX_OPTIMIZATION_REPORT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
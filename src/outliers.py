@@ -0,0 +1,300 @@
+"""
+Limites de outlier em uma passada, combináveis e reaproveitados na inferência
+
+handle_outliers calcula quantis exatos (ou média/desvio) de uma coluna
+com tudo em memória. Aqui cada coluna numérica tem:
+
+- um sketch de quantis t-digest (QuantileSketch): memória fixa (algumas
+  centenas de centróides por coluna), preciso nas pontas e combinável
+- momentos online (contagem, média e M2, algoritmo de Chan)
+
+Os dois se acumulam bloco a bloco (OutlierDetector.update), podem ser
+calculados em paralelo por bloco e combinados (fit_chunks), e os limites
+finais são salvos com o detector. Na inferência, flag() só compara cada
+coluna com dois números.
+
+Métodos de limite:
+- 'iqr': [Q1 - f*IQR, Q3 + f*IQR] (como handle_outliers)
+- 'zscore': média ± f desvios
+- 'quantile': [q_baixo, q_alto] (ex: fora de 99,8% do treino)
+
+Uso (limites de um CSV/Parquet por blocos, em paralelo):
+    python -m src.outliers --input data/AmesHousing.csv --n-jobs 2
+"""
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+from src.config import (
+    OUTLIER_DETECTOR_PATH, OUTLIER_INPUT_METHOD, OUTLIER_INPUT_FACTOR, OUTLIER_INPUT_QUANTILES,
+    OUTLIER_SKETCH_COMPRESSION, STREAMING_CHUNK_SIZE
+)
+from src.incremental import merge_stats, numeric_stats
+
+METHODS = ('iqr', 'zscore', 'quantile')
+
+
+class QuantileSketch:
+    """
+    Sketch de quantis combinável (t-digest)
+
+    Guarda centróides (média, peso) ordenados. Na compressão, pontos e
+    centróides vizinhos se juntam enquanto cabem na mesma unidade da
+    escala k(q) = delta/(2*pi) * asin(2q - 1), que é estreita nas pontas:
+    os quantis extremos (os que importam para outliers) ficam precisos.
+    Enquanto nada foi comprimido o quantil é exato (mesma interpolação do
+    pandas). Sem aleatoriedade: o resultado só depende da ordem dos merges.
+
+    Args:
+        compression: delta (~delta/2 centróides guardados)
+    """
+
+    def __init__(self, compression: int = OUTLIER_SKETCH_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._buffer = []  # (valores, pesos) ainda não comprimidos
+        self._buffered = 0
+
+    def _add(self, means: np.ndarray, weights: np.ndarray):
+        self._buffer.append((means, weights))
+        self._buffered += len(means)
+        if self._buffered > 10 * self.compression:
+            self._compress()
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        means = np.concatenate([self.means] + [m for m, _ in self._buffer])
+        weights = np.concatenate([self.weights] + [w for _, w in self._buffer])
+        self._buffer, self._buffered = [], 0
+
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        q_mid = (np.cumsum(weights) - weights / 2) / weights.sum()
+        scale = np.floor(self.compression / (2 * np.pi) * np.arcsin(2 * q_mid - 1))
+        starts = np.flatnonzero(np.r_[True, np.diff(scale) != 0])
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def update(self, values) -> 'QuantileSketch':
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.n += len(values)
+            self.min = min(self.min, float(values.min()))
+            self.max = max(self.max, float(values.max()))
+            self._add(values, np.ones(len(values)))
+        return self
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        if other.n:
+            self.n += other.n
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            for means, weights in [(other.means, other.weights)] + other._buffer:
+                if len(means):
+                    self._add(means, weights)
+        return self
+
+    def quantile(self, q) -> np.ndarray:
+        q = np.asarray(q, dtype=float)
+        if self.n == 0:
+            return np.full(q.shape, np.nan)
+        if not len(self.means) and all(np.all(w == 1) for _, w in self._buffer):
+            # Só valores crus (nada comprimido nem centróides de merge): exato
+            return np.quantile(np.concatenate([m for m, _ in self._buffer]), q)
+        self._compress()
+        # Interpolação linear entre os centros dos centróides (posições 0..n)
+        centers = np.cumsum(self.weights) - self.weights / 2
+        return np.interp(q * self.n, np.r_[0.0, centers, self.n], np.r_[self.min, self.means, self.max])
+
+    def __len__(self) -> int:
+        """Centróides guardados (memória), não valores vistos"""
+        return len(self.means) + self._buffered
+
+
+class OutlierDetector:
+    """
+    Limites de outlier de várias colunas, acumulados por blocos
+
+    Args:
+        columns: Colunas numéricas
+        method: 'iqr', 'zscore' ou 'quantile'
+        factor: Multiplicador do IQR ('iqr') ou número de desvios ('zscore')
+        quantiles: (baixo, alto) do método 'quantile'
+        compression: delta dos sketches de quantis
+    """
+
+    def __init__(self, columns: List[str], method: str = 'iqr', factor: float = 1.5,
+                 quantiles: Tuple[float, float] = (0.001, 0.999),
+                 compression: int = OUTLIER_SKETCH_COMPRESSION):
+        if method not in METHODS:
+            raise ValueError(f"Método desconhecido: {method} (opções: {METHODS})")
+        self.columns = list(columns)
+        self.method = method
+        self.factor = factor
+        self.quantiles = tuple(quantiles)
+        self.compression = compression
+        self.n_rows = 0
+        self.sketches = {col: QuantileSketch(compression) for col in self.columns}
+        self.moments = {col: {'count': 0, 'mean': 0.0, 'm2': 0.0} for col in self.columns}
+        self.bounds_ = None
+
+    def _values(self, X: pd.DataFrame) -> np.ndarray:
+        # Coluna ausente (ex: pipeline compactado) vira NaN e nunca é sinalizada
+        return np.column_stack([
+            pd.to_numeric(X[col], errors='coerce').to_numpy(dtype=np.float64) if col in X.columns
+            else np.full(len(X), np.nan)
+            for col in self.columns
+        ])
+
+    def update(self, X: pd.DataFrame) -> 'OutlierDetector':
+        """Acumula um bloco (limites ficam desatualizados até bounds())"""
+        values = self._values(X)
+        self.n_rows += len(X)
+        chunk_moments = numeric_stats(pd.DataFrame(values, columns=self.columns), self.columns)
+        for i, col in enumerate(self.columns):
+            self.sketches[col].update(values[:, i])
+            self.moments[col] = merge_stats(self.moments[col], chunk_moments[col])
+        self.bounds_ = None
+        return self
+
+    def merge(self, other: 'OutlierDetector') -> 'OutlierDetector':
+        """Combina com o detector de outro conjunto de blocos (mesmas colunas)"""
+        self.n_rows += other.n_rows
+        for col in self.columns:
+            self.sketches[col].merge(other.sketches[col])
+            self.moments[col] = merge_stats(self.moments[col], other.moments[col])
+        self.bounds_ = None
+        return self
+
+    def fit(self, X: pd.DataFrame) -> 'OutlierDetector':
+        return self.update(X).bounds()
+
+    def fit_chunks(self, chunks: Iterable[pd.DataFrame], n_jobs: int = 1) -> 'OutlierDetector':
+        """
+        Um detector por bloco em paralelo, combinados na ordem dos blocos
+
+        O resultado não depende de n_jobs.
+        """
+        params = {'method': self.method, 'factor': self.factor, 'quantiles': self.quantiles,
+                  'compression': self.compression}
+        partials = Parallel(n_jobs=n_jobs)(
+            delayed(_fit_chunk)(self.columns, params, chunk) for chunk in chunks
+        )
+        for partial in partials:
+            self.merge(partial)
+        return self.bounds()
+
+    def bounds(self) -> 'OutlierDetector':
+        """Calcula os limites {coluna: [inferior, superior]} a partir dos sketches/momentos"""
+        bounds = {}
+        for col in self.columns:
+            if self.method == 'iqr':
+                q1, q3 = self.sketches[col].quantile([0.25, 0.75])
+                lower, upper = q1 - self.factor * (q3 - q1), q3 + self.factor * (q3 - q1)
+            elif self.method == 'zscore':
+                m = self.moments[col]
+                std = np.sqrt(m['m2'] / (m['count'] - 1)) if m['count'] > 1 else np.nan
+                lower, upper = m['mean'] - self.factor * std, m['mean'] + self.factor * std
+            else:
+                lower, upper = self.sketches[col].quantile(self.quantiles)
+            bounds[col] = [float(lower), float(upper)]
+        self.bounds_ = bounds
+        self.lower_ = np.array([bounds[col][0] for col in self.columns])
+        self.upper_ = np.array([bounds[col][1] for col in self.columns])
+        return self
+
+    def flag(self, X: pd.DataFrame) -> np.ndarray:
+        """Matriz (linhas x colunas) com True fora dos limites; NaN nunca é outlier"""
+        if self.bounds_ is None:
+            self.bounds()
+        values = self._values(X)
+        with np.errstate(invalid='ignore'):
+            return (values < self.lower_) | (values > self.upper_)
+
+    def anomalous_columns(self, X: pd.DataFrame) -> List[List[str]]:
+        """Colunas fora dos limites, por linha (usado pela API)"""
+        flags = self.flag(X)
+        columns = np.array(self.columns, dtype=object)
+        return [list(columns[row]) for row in flags]
+
+    def filter(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Remove as linhas com alguma coluna fora dos limites"""
+        flags = self.flag(df)
+        df_clean = df[~flags.any(axis=1)]
+        removed = len(df) - len(df_clean)
+        if removed > 0:
+            counts = {col: int(n) for col, n in zip(self.columns, flags.sum(axis=0)) if n}
+            print(f"Removidos {removed} outliers ({', '.join(f'{c}: {n}' for c, n in counts.items())})")
+        return df_clean
+
+    def summary(self) -> pd.DataFrame:
+        """Limites, contagem e memória por coluna"""
+        if self.bounds_ is None:
+            self.bounds()
+        return pd.DataFrame({
+            'lower': self.lower_,
+            'upper': self.upper_,
+            'count': [self.moments[col]['count'] for col in self.columns],
+            'centroids': [len(self.sketches[col]) for col in self.columns]
+        }, index=self.columns)
+
+    def save(self, filepath=None) -> Path:
+        """Salva o detector (limites + sketches, para combinar depois)"""
+        if self.bounds_ is None:
+            self.bounds()
+        filepath = Path(filepath or OUTLIER_DETECTOR_PATH)
+        joblib.dump(self, filepath)
+        print(f"Limites de outlier salvos em: {filepath}")
+        return filepath
+
+    @staticmethod
+    def load(filepath=None) -> 'OutlierDetector':
+        return joblib.load(filepath or OUTLIER_DETECTOR_PATH)
+
+
+def _fit_chunk(columns: List[str], params: Dict, chunk: pd.DataFrame) -> OutlierDetector:
+    return OutlierDetector(columns, **params).update(chunk)
+
+
+def input_detector(columns: List[str]) -> OutlierDetector:
+    """Detector das features de entrada com os parâmetros do config (sinaliza, não remove)"""
+    return OutlierDetector(columns, method=OUTLIER_INPUT_METHOD, factor=OUTLIER_INPUT_FACTOR,
+                           quantiles=OUTLIER_INPUT_QUANTILES)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Limites de outlier por blocos (sketches combináveis)")
+    parser.add_argument('--input', required=True, help="CSV/Parquet no schema do Ames")
+    parser.add_argument('--chunk-size', type=int, default=STREAMING_CHUNK_SIZE)
+    parser.add_argument('--n-jobs', type=int, default=1)
+    parser.add_argument('--output', help="Arquivo do detector (padrão: OUTLIER_DETECTOR_PATH)")
+    args = parser.parse_args()
+
+    import contextlib
+    import io
+    from src.data_loading import iter_dataset
+    from src.data_preprocessing import DataPreprocessor
+    from src.feature_engineering import FeatureEngineer
+
+    def feature_chunks():
+        for chunk in iter_dataset(args.input, args.chunk_size):
+            yield FeatureEngineer.create_all_features(chunk)
+
+    first = next(feature_chunks())
+    X_first, _ = DataPreprocessor().split_features_target(first)
+    with contextlib.redirect_stdout(io.StringIO()):
+        numerical_features, _ = DataPreprocessor().identify_feature_types(X_first)
+
+    detector = input_detector(numerical_features).fit_chunks(feature_chunks(), n_jobs=args.n_jobs)
+    print(detector.summary().to_string(float_format=lambda v: f"{v:,.2f}"))
+    detector.save(args.output)
@@ -0,0 +1,202 @@
+"""
+Cache em disco dos estágios do pipeline de treino
+
+Cada estágio tem uma chave de conteúdo: hash dos arquivos de entrada,
+das chaves dos estágios anteriores, do código-fonte envolvido e da
+configuração (RANDOM_STATE, TEST_SIZE, ...). Se a chave já existe no
+cache, o estágio não roda: as saídas são recarregadas do disco. Arrays
+numpy são gravados como .npy e abertos com memory-map, então recarregar
+as matrizes de features é quase instantâneo.
+
+Os estágios são preguiçosos: um estágio em cache só é lido se alguém
+usar suas saídas, então quando tudo está em cache apenas o último
+estágio é carregado.
+"""
+import hashlib
+import inspect
+import json
+import shutil
+import time
+from contextlib import nullcontext
+from pathlib import Path
+import joblib
+import numpy as np
+from typing import Callable, Dict, Iterable
+
+from src.config import CACHE_DIR
+
+CACHE_FORMAT_VERSION = 1
+
+
+def file_fingerprint(path) -> str:
+    """Hash do conteúdo de um arquivo ('missing' se não existir)"""
+    path = Path(path)
+    if not path.exists():
+        return 'missing'
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_fingerprint(obj) -> str:
+    """Hash do código-fonte de um módulo ou função"""
+    try:
+        source = inspect.getsource(obj)
+    except (OSError, TypeError):
+        source = repr(obj)
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+class Stage:
+    """Um estágio do pipeline com saídas resolvidas sob demanda"""
+
+    def __init__(self, cache: 'StageCache', name: str, fn: Callable, inputs: tuple, key: str):
+        self.cache = cache
+        self.name = name
+        self.fn = fn
+        self.inputs = inputs
+        self.key = key
+        self._outputs = None
+
+    @property
+    def cached(self) -> bool:
+        return self.cache.enabled and self.cache.path_for(self).exists()
+
+    @property
+    def outputs(self) -> Dict:
+        if self._outputs is None:
+            self._outputs = self.cache.resolve(self)
+        return self._outputs
+
+
+class StageCache:
+    """Cache de estágios endereçado por conteúdo
+
+    Args:
+        cache_dir: Diretório do cache
+        enabled: Se False, todos os estágios rodam (e nada é gravado)
+        profiler: RunProfiler opcional (cada estágio vira uma seção)
+    """
+
+    def __init__(self, cache_dir: str = None, enabled: bool = True, profiler=None):
+        self.cache_dir = Path(cache_dir or CACHE_DIR)
+        self.enabled = enabled
+        self.profiler = profiler
+        self.stages = []
+        self.log = []
+        self._file_hashes = {}
+
+    def stage(self, name: str, fn: Callable, inputs: Iterable[Stage] = (),
+              files: Iterable = (), code: Iterable = (), config: Dict = None) -> Stage:
+        """
+        Declara um estágio
+
+        Args:
+            name: Nome do estágio
+            fn: Função que recebe as saídas (dicts) dos estágios de entrada
+                e retorna um dict com as saídas deste estágio
+            inputs: Estágios anteriores
+            files: Arquivos lidos pelo estágio
+            code: Módulos/funções cujo código afeta o resultado
+            config: Parâmetros de configuração que afetam o resultado
+        """
+        inputs = tuple(inputs)
+        payload = {
+            'format': CACHE_FORMAT_VERSION,
+            'stage': name,
+            'inputs': [stage.key for stage in inputs],
+            'files': [self._file_hash(f) for f in files],
+            'code': [code_fingerprint(c) for c in list(code) + [fn]],
+            'config': {k: repr(v) for k, v in sorted((config or {}).items())}
+        }
+        key = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+        stage = Stage(self, name, fn, inputs, key)
+        self.stages.append(stage)
+        return stage
+
+    def _file_hash(self, path) -> str:
+        path = str(path)
+        if path not in self._file_hashes:
+            self._file_hashes[path] = file_fingerprint(path)
+        return self._file_hashes[path]
+
+    def path_for(self, stage: Stage) -> Path:
+        return self.cache_dir / f"{stage.name}-{stage.key[:16]}"
+
+    def resolve(self, stage: Stage) -> Dict:
+        """Carrega as saídas do cache ou roda o estágio"""
+        start = time.perf_counter()
+        section = self.profiler.section(stage.name) if self.profiler is not None else nullcontext({})
+
+        with section as record:
+            if stage.cached:
+                outputs = self._load(self.path_for(stage))
+                status = 'hit'
+            else:
+                outputs = stage.fn(*[s.outputs for s in stage.inputs])
+                if self.enabled:
+                    self._save(self.path_for(stage), outputs)
+                status = 'miss' if self.enabled else 'disabled'
+            record['cache'] = status
+
+        self.log.append({
+            'stage': stage.name,
+            'status': status,
+            'key': stage.key[:16],
+            'time': time.perf_counter() - start
+        })
+        return outputs
+
+    def _save(self, path: Path, outputs: Dict):
+        """Grava as saídas (arrays em .npy, o resto em joblib) de forma atômica"""
+        tmp_path = path.with_name(path.name + '.tmp')
+        if tmp_path.exists():
+            shutil.rmtree(tmp_path)
+        tmp_path.mkdir(parents=True)
+
+        manifest = {}
+        for name, value in outputs.items():
+            if isinstance(value, np.ndarray) and value.dtype != object:
+                np.save(tmp_path / f"{name}.npy", np.ascontiguousarray(value))
+                manifest[name] = 'npy'
+            else:
+                joblib.dump(value, tmp_path / f"{name}.pkl")
+                manifest[name] = 'pkl'
+
+        with open(tmp_path / "manifest.json", 'w') as f:
+            json.dump(manifest, f)
+
+        if path.exists():
+            shutil.rmtree(path)
+        tmp_path.rename(path)
+
+    @staticmethod
+    def _load(path: Path) -> Dict:
+        with open(path / "manifest.json") as f:
+            manifest = json.load(f)
+
+        outputs = {}
+        for name, kind in manifest.items():
+            if kind == 'npy':
+                outputs[name] = np.load(path / f"{name}.npy", mmap_mode='r')
+            else:
+                outputs[name] = joblib.load(path / f"{name}.pkl")
+        return outputs
+
+    def report(self):
+        """Mostra quais estágios vieram do cache"""
+        print("\nCache de estágios:")
+        resolved = {entry['stage'] for entry in self.log}
+        for entry in self.log:
+            print(f"  {entry['stage']:<12} {entry['status']:<8} {entry['time']:.2f}s  ({entry['key']})")
+        for stage in self.stages:
+            if stage.name not in resolved:
+                print(f"  {stage.name:<12} {'skip':<8} (em cache, não precisou ser lido)")
+
+    def clear(self):
+        """Apaga todo o cache"""
+        if self.cache_dir.exists():
+            shutil.rmtree(self.cache_dir)
@@ -0,0 +1,182 @@
+"""
+Profiler do pipeline de treino
+
+Mede tempo de parede, tempo de CPU, pico de RSS e (opcionalmente) pico
+de memória do tracemalloc para cada estágio do train.py e para cada
+modelo (CV, ajuste final e predição). As seções podem ser aninhadas; o
+relatório é gravado em JSON ao lado das métricas.
+
+Um profiler de amostragem (pyinstrument, se instalado; senão cProfile)
+pode ser ligado para investigações mais detalhadas.
+
+Obs: tempo de CPU e RSS são do processo principal. O trabalho feito nos
+workers do joblib aparece no tempo de parede e nos tempos de fit/predição
+medidos dentro de cada worker (ver ModelEvaluator).
+"""
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:  # Windows
+    RESOURCE_AVAILABLE = False
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+    PYINSTRUMENT_AVAILABLE = True
+except ImportError:
+    PYINSTRUMENT_AVAILABLE = False
+
+from src.config import PROFILE_PATH
+
+MB = 1024 * 1024
+
+
+def peak_rss_mb() -> float:
+    """Pico de memória residente do processo até agora (MB)"""
+    if not RESOURCE_AVAILABLE:
+        return float('nan')
+    # ru_maxrss vem em KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class RunProfiler:
+    """
+    Coleta métricas de tempo e memória por seção
+
+    Args:
+        enabled: Se False, as seções não medem nada (custo zero)
+        trace_memory: Liga o tracemalloc (pico de alocações Python/numpy
+            por seção). Deixa o treino mais lento, por isso é opcional
+        sampler: None, 'pyinstrument' ou 'cprofile' para amostrar a execução
+    """
+
+    def __init__(self, enabled: bool = True, trace_memory: bool = False, sampler: str = None):
+        self.enabled = enabled
+        self.trace_memory = trace_memory and enabled
+        self.sampler = sampler if enabled else None
+        self.sections = []
+        self._stack = []
+        self._sampler = None
+        self._start = None
+
+    def start(self):
+        """Inicia a medição da execução completa"""
+        if not self.enabled:
+            return self
+        self._start = (time.perf_counter(), time.process_time())
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.sampler == 'pyinstrument' and not PYINSTRUMENT_AVAILABLE:
+            print("pyinstrument não instalado, usando cProfile")
+            self.sampler = 'cprofile'
+        if self.sampler == 'pyinstrument':
+            self._sampler = SamplingProfiler()
+            self._sampler.start()
+        elif self.sampler == 'cprofile':
+            import cProfile
+            self._sampler = cProfile.Profile()
+            self._sampler.enable()
+        return self
+
+    @contextmanager
+    def section(self, name: str, **tags):
+        """Mede um bloco de código; seções dentro de seções viram 'pai/filho'"""
+        if not self.enabled:
+            yield {}
+            return
+
+        path = '/'.join([frame['path'] for frame in self._stack[-1:]] + [name])
+        frame = {'path': path, 'child_peak': 0}
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                # Preserva o pico do pai antes de zerar para o filho
+                self._stack[-1]['child_peak'] = max(self._stack[-1]['child_peak'], peak)
+            tracemalloc.reset_peak()
+            frame['mem_start'] = current
+        self._stack.append(frame)
+
+        record = {'name': path, **tags}
+        wall, cpu, rss = time.perf_counter(), time.process_time(), peak_rss_mb()
+        try:
+            yield record
+        finally:
+            record['wall_time'] = time.perf_counter() - wall
+            record['cpu_time'] = time.process_time() - cpu
+            record['peak_rss_mb'] = peak_rss_mb()
+            record['rss_growth_mb'] = record['peak_rss_mb'] - rss
+
+            self._stack.pop()
+            if self.trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, frame['child_peak'])
+                record['traced_peak_mb'] = (peak - frame['mem_start']) / MB
+                if self._stack:
+                    self._stack[-1]['child_peak'] = max(self._stack[-1]['child_peak'], peak)
+                tracemalloc.reset_peak()
+
+            self.sections.append(record)
+
+    def stop(self, sampler_path: str = None) -> Dict:
+        """Encerra a medição e grava a saída do profiler de amostragem"""
+        if not self.enabled or self._start is None:
+            return {}
+        summary = {
+            'wall_time': time.perf_counter() - self._start[0],
+            'cpu_time': time.process_time() - self._start[1],
+            'peak_rss_mb': peak_rss_mb()
+        }
+
+        if self._sampler is not None:
+            sampler_path = Path(sampler_path or PROFILE_PATH.with_suffix(''))
+            if self.sampler == 'pyinstrument':
+                self._sampler.stop()
+                sampler_path = sampler_path.with_suffix('.html')
+                sampler_path.write_text(self._sampler.output_html())
+            else:
+                self._sampler.disable()
+                sampler_path = sampler_path.with_suffix('.prof')
+                self._sampler.dump_stats(str(sampler_path))
+            summary['sampler_output'] = str(sampler_path)
+            print(f"Saída do profiler ({self.sampler}) salva em: {sampler_path}")
+            self._sampler = None
+
+        if self.trace_memory:
+            tracemalloc.stop()
+
+        self.summary = summary
+        return summary
+
+    def report(self) -> Dict:
+        """Relatório estruturado: resumo da execução + seções em ordem de início"""
+        return {
+            'summary': getattr(self, 'summary', {}),
+            'trace_memory': self.trace_memory,
+            'sections': self.sections
+        }
+
+    def print_report(self, top: int = 25):
+        """Tabela com as seções mais caras (tempo de parede)"""
+        if not self.sections:
+            return
+        print(f"\n{'Seção':<45} {'Parede':>9} {'CPU':>9} {'RSS pico':>10}"
+              + (f" {'Alocado':>10}" if self.trace_memory else ""))
+        for record in sorted(self.sections, key=lambda r: r['wall_time'], reverse=True)[:top]:
+            line = (f"{record['name']:<45} {record['wall_time']:>8.2f}s {record['cpu_time']:>8.2f}s "
+                    f"{record['peak_rss_mb']:>8.0f}MB")
+            if self.trace_memory:
+                line += f" {record['traced_peak_mb']:>8.1f}MB"
+            print(line)
+
+    def save(self, filepath: str = None):
+        """Grava o relatório em JSON"""
+        filepath = filepath or PROFILE_PATH
+        with open(filepath, 'w') as f:
+            json.dump(self.report(), f, indent=4)
+        print(f"Perfil da execução salvo em: {filepath}")
@@ -0,0 +1,121 @@
+"""
+Replay do tráfego capturado pelo log de requisições (src/request_log.py)
+
+Reenvia os registros contra a API, na ordem em que chegaram e respeitando
+os intervalos originais divididos por --speed (2 = duas vezes mais rápido;
+0 = sem espera, o mais rápido possível). As requisições saem por um pool
+de threads para que uma resposta lenta não atrase o cronograma.
+
+Para cada requisição: status e predição comparados com os registrados, e
+latência. O relatório traz percentis da latência, o atraso em relação ao
+cronograma e a vazão obtida.
+
+Uso:
+    python -m src.replay --url http://localhost:8000 --speed 1
+    python -m src.replay --log data/request_logs/requests-...jsonl.gz --speed 0 --workers 16
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from src.config import REQUEST_LOG_DIR
+from src.request_log import read_log
+
+
+def _predictions(body) -> List[float]:
+    """Preços previstos de uma resposta (uma predição ou lote)"""
+    items = body if isinstance(body, list) else [body]
+    return [item['predicted_price'] for item in items if isinstance(item, dict) and 'predicted_price' in item]
+
+
+def replay(records: Iterable[Dict], client, speed: float = 1.0, workers: int = 8, rtol: float = 1e-6) -> Dict:
+    """
+    Reenvia os registros e compara com as respostas registradas
+
+    Args:
+        records: Registros do log (read_log)
+        client: Cliente HTTP com .request(method, path, content=..., headers=...) — httpx.Client com
+            base_url ou o TestClient do FastAPI
+        speed: Fator sobre os intervalos originais (0 = sem espera)
+        workers: Requisições simultâneas
+        rtol: Diferença relativa aceita entre a predição reenviada e a registrada
+
+    Returns:
+        Dicionário com contagens, divergências, latência e atraso
+    """
+    records = list(records)
+    if not records:
+        return {'n_requests': 0}
+
+    def send(record):
+        body = json.dumps(record['request']).encode() if record['request'] is not None else b''
+        start = time.perf_counter()
+        try:
+            response = client.request(record['method'], record['path'], content=body,
+                                      headers={'content-type': 'application/json'})
+        except Exception as e:
+            return {'error': f"{type(e).__name__}: {e}", 'latency_ms': (time.perf_counter() - start) * 1000}
+        latency_ms = (time.perf_counter() - start) * 1000
+        try:
+            replayed = _predictions(response.json())
+        except ValueError:
+            replayed = []
+        recorded = _predictions(record['response'])
+        same = len(replayed) == len(recorded) and np.allclose(replayed, recorded, rtol=rtol, atol=0.0)
+        return {'status_match': response.status_code == record['status'], 'prediction_match': same,
+                'latency_ms': latency_ms}
+
+    t0 = records[0]['ts']
+    start = time.perf_counter()
+    futures, lag_ms = [], []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for record in records:
+            if speed > 0:
+                due = (record['ts'] - t0) / speed
+                wait = due - (time.perf_counter() - start)
+                if wait > 0:
+                    time.sleep(wait)
+                lag_ms.append(max(0.0, -wait) * 1000)
+            futures.append(pool.submit(send, record))
+        results = [future.result() for future in futures]
+    duration = time.perf_counter() - start
+
+    latencies = np.array([result['latency_ms'] for result in results])
+    failed = [result for result in results if 'error' in result]
+    return {
+        'n_requests': len(results),
+        'duration_s': duration,
+        'recorded_duration_s': records[-1]['ts'] - t0,
+        'throughput_rps': len(results) / max(duration, 1e-9),
+        'errors': len(failed),
+        'status_mismatches': sum(not result.get('status_match', False) for result in results),
+        'prediction_mismatches': sum(not result.get('prediction_match', False) for result in results),
+        'latency_ms': {f'p{q}': float(np.percentile(latencies, q)) for q in (50, 95, 99)},
+        'schedule_lag_ms_max': max(lag_ms) if lag_ms else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reenvia o tráfego capturado contra a API")
+    parser.add_argument('--log', default=str(REQUEST_LOG_DIR), help="Arquivo ou diretório do log")
+    parser.add_argument('--url', default='http://localhost:8000', help="Endereço da API")
+    parser.add_argument('--speed', type=float, default=1.0, help="Fator de velocidade (0 = sem espera)")
+    parser.add_argument('--workers', type=int, default=8, help="Requisições simultâneas")
+    parser.add_argument('--limit', type=int, help="Reenvia só os primeiros N registros")
+    args = parser.parse_args()
+
+    import httpx
+
+    records = list(read_log(args.log))[:args.limit]
+    print(f"Reenviando {len(records)} requisições para {args.url} (velocidade {args.speed:g}x)...")
+    with httpx.Client(base_url=args.url, timeout=30.0) as client:
+        report = replay(records, client, args.speed, args.workers)
+    print(json.dumps(report, indent=4))
+
+
+if __name__ == "__main__":
+    main()
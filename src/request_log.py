@@ -0,0 +1,226 @@
+"""
+Log das requisições de predição da API, gravado em segundo plano
+
+Cada requisição de predição (entrada, resposta, status e latência) vira um
+registro para auditoria e para o replay de carga (src/replay.py). Gravar
+no disco dentro do handler somaria a latência de I/O a toda chamada. O
+RequestLogger só coloca o registro numa fila limitada (put_nowait) e uma
+thread grava em lotes:
+
+- um lote sai com REQUEST_LOG_BATCH_SIZE registros ou a cada
+  REQUEST_LOG_FLUSH_SECONDS
+- formato 'jsonl' (gzip) ou 'parquet' (zstd, uma row group por lote); a
+  entrada e a resposta vão como o JSON recebido/enviado
+- o arquivo aberto termina em .part e troca de nome ao fechar, a cada
+  REQUEST_LOG_ROTATE_RECORDS registros ou REQUEST_LOG_ROTATE_SECONDS; só
+  os REQUEST_LOG_KEEP mais recentes ficam
+- fila cheia (disco lento): o registro é descartado e contado em
+  'dropped'; a requisição nunca espera pelo log
+
+O corpo chega como bytes e só é decodificado na thread de gravação.
+"""
+import gzip
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+from src.config import (
+    REQUEST_LOG_BATCH_SIZE, REQUEST_LOG_DIR, REQUEST_LOG_FLUSH_SECONDS, REQUEST_LOG_FORMAT, REQUEST_LOG_KEEP,
+    REQUEST_LOG_QUEUE_SIZE, REQUEST_LOG_ROTATE_RECORDS, REQUEST_LOG_ROTATE_SECONDS
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+    # Entrada e resposta como texto JSON: os campos variam por endpoint
+    PARQUET_SCHEMA = pa.schema([
+        ('ts', pa.float64()), ('method', pa.string()), ('path', pa.string()), ('status', pa.int32()),
+        ('latency_ms', pa.float64()), ('request', pa.string()), ('response', pa.string())
+    ])
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+EXTENSIONS = {'jsonl': '.jsonl.gz', 'parquet': '.parquet'}
+FIELDS = ('ts', 'method', 'path', 'status', 'latency_ms', 'request', 'response')
+
+
+def _decode(body: bytes):
+    """JSON do corpo (texto se não for JSON; None se vazio)"""
+    if not body:
+        return None
+    try:
+        return json.loads(body)
+    except ValueError:
+        return body.decode('utf-8', errors='replace')
+
+
+class RequestLogger:
+    """
+    Fila limitada + thread de gravação em lotes, com rotação dos arquivos
+
+    Args:
+        log_dir: Diretório dos arquivos
+        fmt: 'jsonl' ou 'parquet'
+        batch_size: Registros por gravação
+        flush_seconds: Intervalo máximo entre gravações
+        queue_size: Registros pendentes antes de descartar
+        rotate_records: Registros por arquivo
+        rotate_seconds: Idade máxima do arquivo aberto
+        keep: Arquivos mantidos
+    """
+
+    def __init__(self, log_dir=None, fmt: str = REQUEST_LOG_FORMAT, batch_size: int = REQUEST_LOG_BATCH_SIZE,
+                 flush_seconds: float = REQUEST_LOG_FLUSH_SECONDS, queue_size: int = REQUEST_LOG_QUEUE_SIZE,
+                 rotate_records: int = REQUEST_LOG_ROTATE_RECORDS,
+                 rotate_seconds: float = REQUEST_LOG_ROTATE_SECONDS, keep: int = REQUEST_LOG_KEEP):
+        if fmt not in EXTENSIONS:
+            raise ValueError(f"Formato desconhecido: {fmt} (use {list(EXTENSIONS)})")
+        if fmt == 'parquet' and not PARQUET_AVAILABLE:
+            raise ImportError("pyarrow não instalado: use fmt='jsonl'")
+        self.log_dir = Path(log_dir or REQUEST_LOG_DIR)
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.rotate_records = rotate_records
+        self.rotate_seconds = rotate_seconds
+        self.keep = keep
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._file = None
+        self.counters = {'received': 0, 'written': 0, 'dropped': 0, 'errors': 0, 'batches': 0, 'files': 0}
+        self.write_ms = 0.0
+
+    def start(self) -> 'RequestLogger':
+        """Inicia a thread de gravação"""
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-logger', daemon=True)
+        self._thread.start()
+        return self
+
+    def log(self, method: str, path: str, status: int, latency_ms: float,
+            request: bytes = b'', response: bytes = b'') -> bool:
+        """Enfileira um registro sem bloquear; False se foi descartado (fila cheia)"""
+        self.counters['received'] += 1
+        try:
+            self._queue.put_nowait((time.time(), method, path, status, latency_ms, request, response))
+            return True
+        except queue.Full:
+            self.counters['dropped'] += 1
+            return False
+
+    def close(self):
+        """Grava o que está na fila e fecha o arquivo aberto"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> Dict:
+        """Contadores, fila pendente e tempo médio de gravação por lote"""
+        return {
+            **self.counters,
+            'pending': self._queue.qsize(),
+            'write_ms_mean': self.write_ms / max(1, self.counters['batches']),
+            'format': self.fmt,
+            'log_dir': str(self.log_dir)
+        }
+
+    def _run(self):
+        deadline = time.monotonic() + self.flush_seconds
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                pass
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline or self._stop.is_set():
+                # Esvazia o que já está na fila até completar o lote
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if batch:
+                    self._write(batch)
+                    batch = []
+                elif self._file is not None and time.time() - self._file['opened'] >= self.rotate_seconds:
+                    self._close_file()
+                deadline = time.monotonic() + self.flush_seconds
+                if self._stop.is_set() and self._queue.empty():
+                    break
+        self._close_file()
+
+    def _write(self, batch: List[tuple]):
+        start = time.perf_counter()
+        try:
+            records = [dict(zip(FIELDS, (ts, method, path, status, latency_ms, _decode(request), _decode(response))))
+                       for ts, method, path, status, latency_ms, request, response in batch]
+            file = self._open_file()
+            if self.fmt == 'jsonl':
+                lines = ''.join(json.dumps(record, ensure_ascii=False, default=str) + '\n' for record in records)
+                file['handle'].write(lines.encode('utf-8'))
+                file['handle'].flush()
+            else:
+                for record in records:
+                    record['request'] = json.dumps(record['request'], ensure_ascii=False, default=str)
+                    record['response'] = json.dumps(record['response'], ensure_ascii=False, default=str)
+                file['handle'].write_table(pa.Table.from_pylist(records, schema=PARQUET_SCHEMA))
+            file['records'] += len(records)
+            self.counters['written'] += len(records)
+            self.counters['batches'] += 1
+            if file['records'] >= self.rotate_records or time.time() - file['opened'] >= self.rotate_seconds:
+                self._close_file()
+        except Exception as e:
+            # O log nunca derruba a API: o lote é contado como erro
+            self.counters['errors'] += len(batch)
+            print(f"Erro ao gravar o log de requisições: {e}")
+        self.write_ms += (time.perf_counter() - start) * 1000
+
+    def _open_file(self) -> Dict:
+        if self._file is None:
+            name = f"requests-{datetime.now():%Y%m%d-%H%M%S-%f}{EXTENSIONS[self.fmt]}"
+            part = self.log_dir / (name + '.part')
+            if self.fmt == 'jsonl':
+                handle = gzip.open(part, 'wb')
+            else:
+                handle = pq.ParquetWriter(part, PARQUET_SCHEMA, compression='zstd')
+            self._file = {'path': self.log_dir / name, 'part': part, 'handle': handle,
+                          'records': 0, 'opened': time.time()}
+        return self._file
+
+    def _close_file(self):
+        if self._file is None:
+            return
+        self._file['handle'].close()
+        self._file['part'].rename(self._file['path'])
+        self._file = None
+        self.counters['files'] += 1
+        for old in log_files(self.log_dir)[:-self.keep]:
+            old.unlink()
+
+
+def log_files(log_dir=None) -> List[Path]:
+    """Arquivos fechados do log, do mais antigo para o mais recente"""
+    log_dir = Path(log_dir or REQUEST_LOG_DIR)
+    return sorted(path for ext in EXTENSIONS.values() for path in log_dir.glob(f"requests-*{ext}"))
+
+
+def read_log(path=None) -> Iterator[Dict]:
+    """Registros de um arquivo ou de todos os arquivos fechados de um diretório, em ordem"""
+    path = Path(path or REQUEST_LOG_DIR)
+    for file in (log_files(path) if path.is_dir() else [path]):
+        if file.name.endswith(EXTENSIONS['jsonl']):
+            with gzip.open(file, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    yield json.loads(line)
+        else:
+            for record in pq.read_table(file).to_pylist():
+                record['request'] = json.loads(record['request'])
+                record['response'] = json.loads(record['response'])
+                yield record
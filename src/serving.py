@@ -0,0 +1,111 @@
+"""
+Pipeline servido: feature engineering + preprocessador + modelo num só artefato
+
+Antes a API carregava modelo e preprocessador separados e cada endpoint
+refazia a mesma sequência (dict -> DataFrame -> features -> transform ->
+predict), com o risco de um endpoint esquecer um passo. Aqui os três
+passos ajustados viram um sklearn Pipeline salvo em models/pipeline.pkl:
+
+    pipeline.predict(registros_brutos)
+
+O primeiro passo (FeatureTransformer) aceita DataFrame, dict ou lista de
+dicts, com nomes do CSV ('Gr Liv Area') ou da API ('Gr_Liv_Area'), e
+completa as colunas ausentes com NaN para o preprocessador imputar.
+
+Uso (pontuação em lote de um CSV/Parquet):
+    python -m src.serving --input data/novas.csv --output predicoes.csv
+"""
+import argparse
+import os
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from sklearn.pipeline import Pipeline
+
+from src.config import PIPELINE_PATH, STREAMING_CHUNK_SIZE
+from src.data_loading import iter_dataset
+from src.data_preprocessing import DataPreprocessor, feature_lists
+from src.feature_engineering import DERIVED_FEATURES, FEATURE_SPEC, INTERACTION_SPEC, FeatureTransformer
+
+
+def build_pipeline(model, preprocessor) -> Pipeline:
+    """
+    Monta o pipeline servido a partir de modelo e preprocessador já ajustados
+
+    As colunas brutas esperadas são as de entrada do preprocessador menos
+    as derivadas pelo feature engineering, mais as entradas das derivadas
+    (um preprocessador reduzido pode usar House_Age sem usar Year Built).
+
+    Args:
+        model: Modelo treinado
+        preprocessor: DataPreprocessor, ColumnTransformer ou NativeCategoricalEncoder
+    """
+    if isinstance(preprocessor, DataPreprocessor):
+        preprocessor = preprocessor.preprocessor
+    numerical_features, categorical_features = feature_lists(preprocessor)
+    derived = set(DERIVED_FEATURES)
+    columns = [col for col in numerical_features + categorical_features if col not in derived]
+    spec_inputs = [col for _, _, inputs in FEATURE_SPEC + INTERACTION_SPEC for col in inputs]
+    columns += [col for col in dict.fromkeys(spec_inputs) if col not in derived and col not in columns]
+    categorical = [col for col in categorical_features if col not in derived]
+
+    features = FeatureTransformer(columns=columns, categorical_columns=categorical).fit()
+    return Pipeline([
+        ('features', features),
+        ('preprocessor', preprocessor),
+        ('model', model)
+    ])
+
+
+def save_pipeline(pipeline: Pipeline, filepath=None) -> Path:
+    """Salva o pipeline de forma atômica (a API pode estar lendo o arquivo)"""
+    filepath = Path(filepath or PIPELINE_PATH)
+    tmp_path = filepath.with_name(filepath.name + '.tmp')
+    joblib.dump(pipeline, tmp_path)
+    os.replace(tmp_path, filepath)
+    print(f"Pipeline servido salvo em: {filepath}")
+    return filepath
+
+
+def load_pipeline(filepath=None) -> Pipeline:
+    """Carrega o pipeline servido"""
+    return joblib.load(filepath or PIPELINE_PATH)
+
+
+def score_file(input_path, output_path, pipeline: Pipeline = None,
+               chunk_size: int = STREAMING_CHUNK_SIZE) -> dict:
+    """
+    Pontua um CSV/Parquet em blocos e grava PID (se houver) + predicted_price em CSV
+
+    Returns:
+        {'n_rows', 'wall_time', 'rows_per_sec'}
+    """
+    pipeline = pipeline if pipeline is not None else load_pipeline()
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    n_rows = 0
+    for i, chunk in enumerate(iter_dataset(input_path, chunk_size)):
+        predictions = pd.DataFrame({'predicted_price': np.asarray(pipeline.predict(chunk), dtype=float)})
+        if 'PID' in chunk.columns:
+            predictions.insert(0, 'PID', chunk['PID'].to_numpy())
+        predictions.to_csv(output_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+        n_rows += len(chunk)
+
+    wall_time = time.perf_counter() - start
+    print(f"{n_rows:,} linhas pontuadas em {wall_time:.1f}s -> {output_path}")
+    return {'n_rows': n_rows, 'wall_time': wall_time, 'rows_per_sec': n_rows / max(wall_time, 1e-9)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pontuação em lote com o pipeline servido")
+    parser.add_argument('--input', required=True, help="CSV/Parquet com os imóveis")
+    parser.add_argument('--output', required=True, help="CSV de saída com as predições")
+    parser.add_argument('--pipeline', help="Arquivo do pipeline (padrão: PIPELINE_PATH)")
+    parser.add_argument('--chunk-size', type=int, default=STREAMING_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    score_file(args.input, args.output, load_pipeline(args.pipeline), chunk_size=args.chunk_size)
@@ -0,0 +1,138 @@
+"""
+Ensemble empilhado (stacking) a partir das predições out-of-fold
+
+O ModelEvaluator já guarda as predições out-of-fold de cada modelo, então
+o meta-modelo é ajustado direto nelas: nenhum modelo base é reajustado.
+O meta-modelo é uma regressão linear com pesos não negativos; modelos
+com peso zero saem do ensemble e não custam nada na inferência.
+"""
+import time
+import numpy as np
+from sklearn.base import BaseEstimator, RegressorMixin
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import r2_score
+from typing import Dict, List
+
+from src.config import STACKING_TOP_K
+from src.evaluation import regression_metrics, measure_inference
+
+
+class StackedEnsemble(BaseEstimator, RegressorMixin):
+    """
+    Combinação linear de modelos base já ajustados
+
+    Todos os modelos base recebem a mesma matriz preprocessada; cada um
+    prediz o lote inteiro de uma vez e a combinação é um único produto
+    matriz-vetor.
+
+    Args:
+        estimators: Lista de (nome, modelo ajustado)
+        coef: Peso de cada modelo base
+        intercept: Intercepto do meta-modelo
+    """
+
+    def __init__(self, estimators: List = None, coef=None, intercept: float = 0.0):
+        self.estimators = estimators
+        self.coef = coef
+        self.intercept = intercept
+
+    def fit(self, X, y):
+        # Os modelos base chegam ajustados; o meta-modelo vem das predições OOF
+        return self
+
+    def base_predictions(self, X) -> np.ndarray:
+        """Matriz (n_amostras, n_modelos) com as predições dos modelos base"""
+        predictions = np.empty((X.shape[0], len(self.estimators)), dtype=np.float64)
+        for j, (_, model) in enumerate(self.estimators):
+            predictions[:, j] = model.predict(X)
+        return predictions
+
+    def predict(self, X) -> np.ndarray:
+        return self.base_predictions(X) @ np.asarray(self.coef) + self.intercept
+
+
+def _meta_cv_predictions(P: np.ndarray, y: np.ndarray, folds: List):
+    """Predições out-of-fold do próprio meta-modelo (para compará-lo com os modelos base)"""
+    predictions = np.empty(len(y), dtype=float)
+    scores = []
+    for train_idx, val_idx in folds:
+        meta = LinearRegression(positive=True).fit(P[train_idx], y[train_idx])
+        predictions[val_idx] = meta.predict(P[val_idx])
+        scores.append(r2_score(y[val_idx], predictions[val_idx]))
+    return predictions, np.array(scores)
+
+
+def build_stacked_ensemble(evaluations: Dict, y_train, X_test, y_test,
+                           names: List[str] = None, top_k: int = STACKING_TOP_K) -> Dict:
+    """
+    Ajusta o meta-modelo nas predições out-of-fold já calculadas
+
+    Args:
+        evaluations: {nome: saída do ModelEvaluator.evaluate} (mesmos folds)
+        X_test, y_test: Holdout (na mesma representação de todos os modelos)
+        names: Modelos candidatos (None = todos)
+        top_k: Quantos candidatos entram, pelo melhor R^2 out-of-fold
+
+    Returns:
+        Dicionário com 'model' (StackedEnsemble), 'weights', 'metrics'
+        e 'baseline' (métricas do melhor modelo individual)
+    """
+    y_train = np.asarray(y_train)
+    y_test = np.asarray(y_test)
+    names = list(names or evaluations)
+    names = sorted(names, key=lambda n: evaluations[n]['metrics']['oof_r2'], reverse=True)[:top_k]
+    best_name = names[0]
+    folds = evaluations[best_name]['folds']
+
+    P_oof = np.column_stack([evaluations[n]['oof_predictions'] for n in names])
+    P_test = np.column_stack([evaluations[n]['test_predictions'] for n in names])
+
+    start = time.perf_counter()
+    meta = LinearRegression(positive=True).fit(P_oof, y_train)
+    oof_predictions, cv_scores = _meta_cv_predictions(P_oof, y_train, folds)
+    fit_time = time.perf_counter() - start
+
+    # Modelos com peso zero não entram no ensemble servido
+    keep = meta.coef_ > 0
+    if not keep.any():
+        keep[0] = True
+    ensemble = StackedEnsemble(
+        estimators=[(n, evaluations[n]['model']) for n, k in zip(names, keep) if k],
+        coef=meta.coef_[keep],
+        intercept=float(meta.intercept_)
+    )
+
+    metrics = regression_metrics(y_test, P_test @ meta.coef_ + meta.intercept_, prefix='test_')
+    metrics['cv_r2_mean'] = float(cv_scores.mean())
+    metrics['cv_r2_std'] = float(cv_scores.std())
+    metrics.update(regression_metrics(y_train, oof_predictions, prefix='oof_'))
+    metrics['n_fits'] = len(folds) + 1  # só o meta-modelo
+    metrics['fit_time'] = float(fit_time)
+    metrics['n_base_models'] = int(keep.sum())
+    metrics.update(measure_inference(ensemble, X_test))
+
+    start = time.perf_counter()
+    ensemble.predict(X_test)
+    metrics['batch_latency_ms'] = (time.perf_counter() - start) * 1000
+
+    best = evaluations[best_name]
+    baseline = {
+        'name': best_name,
+        'test_r2': best['metrics']['test_r2'],
+        'oof_r2': best['metrics']['oof_r2'],
+        **measure_inference(best['model'], X_test)
+    }
+    start = time.perf_counter()
+    best['model'].predict(X_test)
+    baseline['batch_latency_ms'] = (time.perf_counter() - start) * 1000
+
+    metrics['oof_r2_gain'] = metrics['oof_r2'] - baseline['oof_r2']
+    metrics['test_r2_gain'] = metrics['test_r2'] - baseline['test_r2']
+    metrics['latency_ratio'] = metrics['latency_1_ms'] / max(baseline['latency_1_ms'], 1e-9)
+
+    return {
+        'model': ensemble,
+        'weights': {n: float(c) for n, c in zip(names, meta.coef_)},
+        'metrics': metrics,
+        'baseline': baseline
+    }
@@ -0,0 +1,459 @@
+"""
+Treino em streaming (out-of-core) para datasets maiores que a memória
+
+O train.py carrega tudo num DataFrame e numa matriz densa. Aqui o
+arquivo (CSV ou Parquet) é lido em blocos e nenhuma passada guarda mais
+que um bloco:
+
+1. limites de outlier do target (só a coluna SalePrice é lida), por um
+   sketch t-digest (src/outliers.py)
+2. estatísticas do preprocessamento nas linhas de treino: contagem,
+   média e variância (combináveis, algoritmo de Chan), vocabulário das
+   categóricas e uma amostra uniforme de tamanho fixo para as medianas;
+   na mesma passada, os limites das features de entrada servidos à API
+3. treino: Ridge acumula X'X e X'y bloco a bloco (solução exata); o
+   XGBoost usa memória externa (DataIter + ExtMemQuantileDMatrix, com
+   as páginas em cache no disco)
+4. avaliação no holdout com métricas acumuladas
+
+O split treino/teste é por hash do PID, então cada linha cai sempre do
+mesmo lado em qualquer passada. Os artefatos (best_model.pkl,
+preprocessor.pkl, feature_names.pkl, outlier_detector.pkl, ONNX quando possível) têm o mesmo
+formato do train.py e são servidos pela API sem mudanças.
+
+Obs: com amostra >= linhas de treino, as medianas (e portanto o
+preprocessador inteiro) saem idênticas às do ajuste em memória.
+"""
+import contextlib
+import io
+import json
+import shutil
+import tempfile
+import time
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.linear_model import Ridge
+from xgboost import XGBRegressor
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from src.config import (
+    CACHE_DIR, FEATURE_NAMES_PATH, MODEL_ONNX_PATH, MODEL_PKL_PATH, RANDOM_STATE,
+    STREAMING_BOOST_ROUNDS, STREAMING_CHUNK_SIZE, STREAMING_RESULTS_PATH, STREAMING_SAMPLE_SIZE,
+    TARGET_COLUMN, TEST_SIZE
+)
+from src.data_loading import iter_dataset
+from src.data_preprocessing import DataPreprocessor
+from src.feature_engineering import FeatureEngineer
+from src.incremental import merge_stats, numeric_stats
+from src.model_export import ModelExporter
+from src.model_training import ModelTrainer
+from src.outliers import OutlierDetector, input_detector
+from src.profiling import RunProfiler
+from src.serving import build_pipeline, save_pipeline
+from src.bundle import save_bundle
+
+STREAMING_MODELS = ('Ridge', 'XGBoost')
+
+
+def holdout_mask(df: pd.DataFrame, start: int = 0, test_size: float = TEST_SIZE) -> np.ndarray:
+    """Linhas de teste, por hash do PID (ou da posição no arquivo, sem PID)"""
+    if 'PID' in df.columns:
+        ids = df['PID'].to_numpy(dtype=np.int64).astype(np.uint64)
+    else:
+        ids = np.arange(start, start + len(df), dtype=np.uint64)
+    # Hash multiplicativo (Fibonacci): uniforme em [0, 1) e estável entre execuções
+    hashed = (ids * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(11)
+    return hashed.astype(np.float64) / 2.0 ** 53 < test_size
+
+
+class RowSample:
+    """
+    Amostra uniforme de tamanho fixo de um fluxo de linhas
+
+    Cada linha recebe uma chave aleatória e ficam as `size` menores
+    (bottom-k). Duas amostras se combinam com merge, como se o fluxo
+    tivesse sido lido de uma vez.
+    """
+
+    def __init__(self, size: int, random_state: int = RANDOM_STATE):
+        self.size = size
+        self.rng = np.random.default_rng(random_state)
+        self.keys = np.empty(0)
+        self.values = None
+
+    def update(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 1:
+            values = values[:, None]
+        return self._keep(self.rng.random(len(values)), values)
+
+    def merge(self, other: 'RowSample') -> 'RowSample':
+        if other.values is None:
+            return self
+        return self._keep(other.keys, other.values)
+
+    def _keep(self, keys: np.ndarray, values: np.ndarray) -> 'RowSample':
+        """Junta as novas linhas e mantém as `size` de menor chave"""
+        if self.values is not None:
+            keys = np.concatenate([self.keys, keys])
+            values = np.vstack([self.values, values])
+        if len(keys) > self.size:
+            keep = np.argpartition(keys, self.size)[:self.size]
+            keys, values = keys[keep], values[keep]
+        self.keys, self.values = keys, values
+        return self
+
+
+class StreamingStats:
+    """
+    Estatísticas combináveis das features de treino
+
+    Args:
+        numerical_features, categorical_features: Colunas (como no
+            DataPreprocessor.identify_feature_types)
+        sample_size: Linhas da amostra usada para as medianas
+    """
+
+    def __init__(self, numerical_features: List[str], categorical_features: List[str],
+                 sample_size: int = STREAMING_SAMPLE_SIZE, random_state: int = RANDOM_STATE):
+        self.numerical_features = list(numerical_features)
+        self.categorical_features = list(categorical_features)
+        self.n_rows = 0
+        self.moments = {col: {'count': 0, 'mean': 0.0, 'm2': 0.0} for col in self.numerical_features}
+        self.category_counts = {col: {} for col in self.categorical_features}
+        self.n_missing = {col: 0 for col in self.categorical_features}
+        self.sample = RowSample(sample_size, random_state)
+
+    def update(self, X: pd.DataFrame):
+        """Acumula um bloco de features (antes do preprocessamento)"""
+        self.n_rows += len(X)
+        chunk_moments = numeric_stats(X, self.numerical_features)
+        for col in self.numerical_features:
+            self.moments[col] = merge_stats(self.moments[col], chunk_moments[col])
+        for col in self.categorical_features:
+            counts = self.category_counts[col]
+            for value, count in X[col].astype(object).value_counts().items():
+                counts[str(value)] = counts.get(str(value), 0) + int(count)
+            self.n_missing[col] += int(X[col].isna().sum())
+        self.sample.update(X[self.numerical_features].to_numpy(dtype=np.float64))
+        return self
+
+    def merge(self, other: 'StreamingStats') -> 'StreamingStats':
+        """Combina com as estatísticas de outro conjunto de blocos"""
+        self.n_rows += other.n_rows
+        for col in self.numerical_features:
+            self.moments[col] = merge_stats(self.moments[col], other.moments[col])
+        for col in self.categorical_features:
+            for value, count in other.category_counts[col].items():
+                self.category_counts[col][value] = self.category_counts[col].get(value, 0) + count
+            self.n_missing[col] += other.n_missing[col]
+        self.sample.merge(other.sample)
+        return self
+
+    def medians(self) -> np.ndarray:
+        return np.nanmedian(self.sample.values, axis=0)
+
+    def vocabulary(self, col: str) -> List[str]:
+        """Categorias da coluna como o OneHotEncoder vê (NaN vira 'missing')"""
+        values = set(self.category_counts[col])
+        if self.n_missing[col]:
+            values.add('missing')
+        return sorted(values)
+
+    def imputed_moments(self, medians: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Média e variância depois de imputar os NaN com as medianas (o que o StandardScaler vê)"""
+        means, variances = [], []
+        for col, median in zip(self.numerical_features, medians):
+            n_missing = self.n_rows - self.moments[col]['count']
+            merged = merge_stats(self.moments[col], {'count': n_missing, 'mean': float(median), 'm2': 0.0})
+            means.append(merged['mean'])
+            variances.append(merged['m2'] / max(merged['count'], 1))
+        return np.array(means), np.array(variances)
+
+    def build_preprocessor(self) -> DataPreprocessor:
+        """
+        DataPreprocessor ajustado com as estatísticas do fluxo
+
+        O ColumnTransformer é ajustado numa tabela protótipo (medianas nas
+        numéricas, todo o vocabulário nas categóricas) e depois recebe as
+        medianas, médias e variâncias do fluxo. O objeto final é o mesmo
+        do train.py.
+        """
+        medians = self.medians()
+        vocabularies = {col: self.vocabulary(col) for col in self.categorical_features}
+        n_proto = max([2] + [len(v) for v in vocabularies.values()])
+        prototype = pd.DataFrame({
+            **{col: np.full(n_proto, median) for col, median in zip(self.numerical_features, medians)},
+            **{col: np.resize(np.array(vocab, dtype=object), n_proto) for col, vocab in vocabularies.items()}
+        })
+
+        preprocessor = DataPreprocessor()
+        preprocessor.create_preprocessor(self.numerical_features, self.categorical_features)
+        preprocessor.fit_transform(prototype)
+
+        numeric = preprocessor.preprocessor.named_transformers_['num']
+        numeric.named_steps['imputer'].statistics_ = medians
+        scaler = numeric.named_steps['scaler']
+        scaler.mean_, scaler.var_ = self.imputed_moments(medians)
+        scale = np.sqrt(scaler.var_)
+        scale[scale < 10 * np.finfo(np.float64).eps] = 1.0  # coluna constante: como o sklearn
+        scaler.scale_ = scale
+        scaler.n_samples_seen_ = self.n_rows
+        return preprocessor
+
+
+class RidgeAccumulator:
+    """
+    Ridge exata a partir de X'X e X'y acumulados bloco a bloco
+
+    Mesmo problema do sklearn Ridge(fit_intercept=True): os dados são
+    centrados com as médias do fluxo e o intercepto não é penalizado.
+    """
+
+    def __init__(self, alpha: float = 1.0):
+        self.alpha = alpha
+        self.n = 0
+        self.xtx = self.xty = self.x_sum = None
+        self.y_sum = 0.0
+
+    def update(self, X: np.ndarray, y: np.ndarray):
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if self.xtx is None:
+            p = X.shape[1]
+            self.xtx, self.xty, self.x_sum = np.zeros((p, p)), np.zeros(p), np.zeros(p)
+        self.n += len(y)
+        self.xtx += X.T @ X
+        self.xty += X.T @ y
+        self.x_sum += X.sum(axis=0)
+        self.y_sum += y.sum()
+        return self
+
+    def to_estimator(self) -> Ridge:
+        """Resolve o sistema e devolve um Ridge do sklearn pronto para predict/ONNX"""
+        x_mean, y_mean = self.x_sum / self.n, self.y_sum / self.n
+        gram = self.xtx - self.n * np.outer(x_mean, x_mean)
+        rhs = self.xty - self.n * x_mean * y_mean
+        coef = np.linalg.solve(gram + self.alpha * np.eye(len(rhs)), rhs)
+
+        model = Ridge(alpha=self.alpha)
+        model.coef_ = coef
+        model.intercept_ = float(y_mean - x_mean @ coef)
+        model.n_features_in_ = len(coef)
+        return model
+
+
+class StreamingMetrics:
+    """R², RMSE e MAE acumulados (soma dos erros e dos momentos do target)"""
+
+    def __init__(self):
+        self.n = 0
+        self.sse = self.sae = self.y_sum = self.y_sq_sum = 0.0
+
+    def update(self, y_true, y_pred):
+        y_true = np.asarray(y_true, dtype=np.float64)
+        error = y_true - np.asarray(y_pred, dtype=np.float64)
+        self.n += len(y_true)
+        self.sse += float(error @ error)
+        self.sae += float(np.abs(error).sum())
+        self.y_sum += float(y_true.sum())
+        self.y_sq_sum += float(y_true @ y_true)
+        return self
+
+    def result(self, prefix: str = 'test_') -> Dict:
+        sst = self.y_sq_sum - self.y_sum ** 2 / max(self.n, 1)
+        return {
+            f'{prefix}r2': 1 - self.sse / sst if sst > 0 else float('nan'),
+            f'{prefix}rmse': float(np.sqrt(self.sse / max(self.n, 1))),
+            f'{prefix}mae': self.sae / max(self.n, 1)
+        }
+
+
+class _ChunkIter(xgb.DataIter):
+    """Entrega os blocos preprocessados ao XGBoost (memória externa)"""
+
+    def __init__(self, make_chunks: Callable[[], Iterator], cache_prefix: str):
+        self._make_chunks = make_chunks
+        self._chunks = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data) -> bool:
+        if self._chunks is None:
+            self._chunks = self._make_chunks()
+        batch = next(self._chunks, None)
+        if batch is None:
+            return False
+        X, y = batch
+        input_data(data=X, label=y)
+        return True
+
+    def reset(self):
+        self._chunks = None
+
+
+class StreamingTrainer:
+    """
+    Treino por blocos de um arquivo maior que a memória
+
+    Args:
+        filepath: CSV ou Parquet no schema do Ames
+        chunk_size: Linhas por bloco (a memória de pico é proporcional a isso)
+        sample_size: Tamanho da amostra das medianas
+        models: Subconjunto de STREAMING_MODELS
+        n_rounds: Rounds do XGBoost
+        profiler: RunProfiler opcional (uma seção por passada)
+    """
+
+    def __init__(self, filepath, chunk_size: int = STREAMING_CHUNK_SIZE,
+                 sample_size: int = STREAMING_SAMPLE_SIZE, models: List[str] = None,
+                 n_rounds: int = STREAMING_BOOST_ROUNDS, random_state: int = RANDOM_STATE,
+                 profiler: RunProfiler = None):
+        self.filepath = filepath
+        self.chunk_size = chunk_size
+        self.sample_size = sample_size
+        self.models_to_train = list(models or STREAMING_MODELS)
+        self.n_rounds = n_rounds
+        self.random_state = random_state
+        self.profiler = profiler or RunProfiler(enabled=False)
+        self.target_bounds = None
+        self.stats = None
+        self.input_detector = None
+        self.preprocessor = None
+        self.models = {}
+        self.results = {}
+
+    def chunks(self, split: str = 'train') -> Iterator[Tuple[pd.DataFrame, pd.Series]]:
+        """(X, y) de cada bloco: feature engineering, outliers e o lado pedido do split"""
+        start = 0
+        for chunk in iter_dataset(self.filepath, self.chunk_size):
+            df = FeatureEngineer.create_all_features(chunk)
+            # Split antes do filtro do target: sem PID, a posição no arquivo não depende dos limites
+            mask = holdout_mask(df, start)
+            start += len(chunk)
+            lower, upper = self.target_bounds
+            inside = ((df[TARGET_COLUMN] >= lower) & (df[TARGET_COLUMN] <= upper)).to_numpy()
+            df = df[inside & mask] if split == 'test' else df[inside & ~mask]
+            if len(df):
+                yield DataPreprocessor().split_features_target(df)
+
+    def processed_chunks(self, split: str = 'train', dtype=np.float64) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        for X, y in self.chunks(split):
+            yield self.preprocessor.transform(X).astype(dtype, copy=False), y.to_numpy(dtype=np.float64)
+
+    def fit_target_bounds(self):
+        """1ª passada: limites do IQR do target (só a coluna do target é lida)"""
+        detector = OutlierDetector([TARGET_COLUMN], method='iqr', factor=1.5).fit_chunks(
+            iter_dataset(self.filepath, self.chunk_size, columns=[TARGET_COLUMN])
+        )
+        self.target_bounds = detector.bounds_[TARGET_COLUMN]
+        print(f"Limites do target (IQR): {self.target_bounds[0]:,.0f} a {self.target_bounds[1]:,.0f}")
+
+    def fit_preprocessor(self) -> DataPreprocessor:
+        """2ª passada: estatísticas combináveis e o preprocessador"""
+        for X, _ in self.chunks('train'):
+            if self.stats is None:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    numerical_features, categorical_features = DataPreprocessor().identify_feature_types(X)
+                self.stats = StreamingStats(numerical_features, categorical_features,
+                                            self.sample_size, self.random_state)
+                self.input_detector = input_detector(numerical_features)
+            self.stats.update(X)
+            self.input_detector.update(X)
+        self.preprocessor = self.stats.build_preprocessor()
+        print(f"Preprocessador ajustado em {self.stats.n_rows:,} linhas de treino "
+              f"({len(self.preprocessor.feature_names)} features)")
+        return self.preprocessor
+
+    def fit_ridge(self) -> Ridge:
+        accumulator = RidgeAccumulator(alpha=ModelTrainer().get_models()['Ridge'].alpha)
+        for X, y in self.processed_chunks('train'):
+            accumulator.update(X, y)
+        return accumulator.to_estimator()
+
+    def fit_xgboost(self) -> XGBRegressor:
+        template = ModelTrainer(random_state=self.random_state, early_stopping_rounds=None).get_models()['XGBoost']
+        template.set_params(n_estimators=self.n_rounds, tree_method='hist')
+        params = template.get_xgb_params()
+
+        cache_dir = tempfile.mkdtemp(prefix='xgb-extmem-', dir=CACHE_DIR)
+        try:
+            data_iter = _ChunkIter(lambda: self.processed_chunks('train', np.float32), cache_dir + '/cache')
+            dtrain = xgb.ExtMemQuantileDMatrix(data_iter, max_bin=params.get('max_bin') or 256)
+            booster = xgb.train(params, dtrain, num_boost_round=self.n_rounds)
+            del dtrain  # libera as páginas antes de apagar o cache
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+        # Mesmo objeto sklearn do train.py (a API chama model.predict)
+        model = XGBRegressor(**template.get_params())
+        model.load_model(bytearray(booster.save_raw(raw_format='json')))
+        return model
+
+    def evaluate(self) -> Dict:
+        """Última passada: métricas de todos os modelos no holdout"""
+        metrics = {name: StreamingMetrics() for name in self.models}
+        for X, y in self.processed_chunks('test'):
+            for name, model in self.models.items():
+                metrics[name].update(y, model.predict(X))
+        return {name: m.result() for name, m in metrics.items()}
+
+    def run(self) -> Dict:
+        start = time.perf_counter()
+        with self.profiler.section('stream/target_bounds'):
+            self.fit_target_bounds()
+        with self.profiler.section('stream/preprocessor'):
+            self.fit_preprocessor()
+
+        fitters = {'Ridge': self.fit_ridge, 'XGBoost': self.fit_xgboost}
+        for name in self.models_to_train:
+            print(f"Treinando {name} em streaming...")
+            with self.profiler.section(f'stream/model:{name}') as record:
+                model_start = time.perf_counter()
+                self.models[name] = fitters[name]()
+                self.results[name] = {'fit_time': time.perf_counter() - model_start}
+            record['fit_time'] = self.results[name]['fit_time']
+
+        with self.profiler.section('stream/evaluate'):
+            for name, metrics in self.evaluate().items():
+                self.results[name].update(metrics)
+
+        self.best_model_name = max(self.results, key=lambda n: self.results[n]['test_r2'])
+        self.run_stats = {
+            'n_train_rows': self.stats.n_rows,
+            'chunk_size': self.chunk_size,
+            'sample_size': self.sample_size,
+            'target_bounds': self.target_bounds,
+            'wall_time': time.perf_counter() - start
+        }
+        return self.results
+
+    def save(self, results_path: str = None):
+        """Artefatos no formato do train.py (modelo, preprocessador, features, pipeline, limites, ONNX, bundle)"""
+        model = self.models[self.best_model_name]
+        ModelExporter.export_to_pickle(model, MODEL_PKL_PATH)
+        self.preprocessor.save_preprocessor()
+        joblib.dump(self.preprocessor.feature_names, FEATURE_NAMES_PATH)
+        pipeline = build_pipeline(model, self.preprocessor)
+        save_pipeline(pipeline)
+        self.input_detector.save()
+
+        X_sample, _ = next(self.processed_chunks('test'))
+        onnx_path = ModelExporter.export_to_onnx(model, X_sample[:10])
+        if onnx_path is None and MODEL_ONNX_PATH.exists():
+            # Não deixa um ONNX de outro modelo sendo servido pela API
+            MODEL_ONNX_PATH.unlink()
+            print(f"ONNX antigo removido: {MODEL_ONNX_PATH}")
+        save_bundle(pipeline, metrics=self.results[self.best_model_name], model_name=self.best_model_name,
+                    feature_names=self.preprocessor.feature_names, onnx_path=onnx_path,
+                    outlier_detector=self.input_detector)
+
+        results_path = results_path or STREAMING_RESULTS_PATH
+        with open(results_path, 'w') as f:
+            json.dump({
+                'best_model': self.best_model_name,
+                'results': self.results,
+                'run_stats': self.run_stats
+            }, f, indent=4)
+        print(f"Resultados do streaming salvos em: {results_path}")
@@ -0,0 +1,194 @@
+"""
+Gerador sintético de dados no schema do Ames para benchmarks em escala
+
+O AmesHousing.csv tem ~2.930 linhas; para reproduzir volumes de produção
+(100 mil a 50 milhões de linhas) as linhas reais são reamostradas
+(bootstrap) e perturbadas:
+
+- categóricas e padrões de valores ausentes vêm da linha reamostrada,
+  então frequências e co-ocorrências de NaN se mantêm
+- áreas recebem um fator de escala por linha (lognormal) e os totais são
+  recalculados a partir das partes (Gr Liv Area, Total Bsmt SF)
+- o preço acompanha a área com elasticidade < 1, mais um ruído próprio
+- anos e contagens (banheiros, quartos, notas) não são perturbados
+- Order e PID são novos e únicos
+
+A geração é feita em blocos com semente por bloco: o resultado é
+reprodutível e nenhum bloco depende dos outros. A saída é Parquet (um
+row group por bloco) ou CSV, escrita bloco a bloco.
+
+Uso:
+    python -m src.synthetic --rows 1000000 --out data/synthetic/ames_1m.parquet
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Iterator
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+from src.config import RAW_DATA_FILE, RANDOM_STATE, TARGET_COLUMN
+from src.data_loading import apply_schema, load_dataset
+
+# Colunas de área escaladas pelo fator da linha
+AREA_COLUMNS = [
+    'Lot Frontage', 'Lot Area', 'Mas Vnr Area', 'BsmtFin SF 1', 'BsmtFin SF 2', 'Bsmt Unf SF',
+    '1st Flr SF', '2nd Flr SF', 'Low Qual Fin SF', 'Garage Area', 'Wood Deck SF',
+    'Open Porch SF', 'Enclosed Porch', '3Ssn Porch', 'Screen Porch', 'Pool Area'
+]
+# Totais recalculados a partir das partes (mantém a consistência entre colunas)
+TOTAL_COLUMNS = {
+    'Gr Liv Area': ['1st Flr SF', '2nd Flr SF', 'Low Qual Fin SF'],
+    'Total Bsmt SF': ['BsmtFin SF 1', 'BsmtFin SF 2', 'Bsmt Unf SF']
+}
+PID_OFFSET = 10 ** 10  # PIDs sintéticos não colidem com os reais (9-10 dígitos)
+
+
+class SyntheticAmesGenerator:
+    """
+    Bootstrap + perturbação das linhas reais
+
+    Args:
+        source: DataFrame de origem (None = AmesHousing.csv tipado)
+        area_noise: Desvio do log do fator de escala das áreas
+        price_elasticity: Quanto o preço acompanha o fator de área
+        price_noise: Desvio do log do ruído próprio do preço
+        random_state: Semente base (cada bloco usa random_state + índice)
+    """
+
+    def __init__(self, source: pd.DataFrame = None, area_noise: float = 0.08,
+                 price_elasticity: float = 0.6, price_noise: float = 0.04,
+                 random_state: int = RANDOM_STATE):
+        if source is None:
+            source = load_dataset(RAW_DATA_FILE)
+        self.source = apply_schema(source.reset_index(drop=True))
+        self.area_noise = area_noise
+        self.price_elasticity = price_elasticity
+        self.price_noise = price_noise
+        self.random_state = random_state
+
+    def generate_chunk(self, n_rows: int, chunk_index: int = 0, start: int = 0) -> pd.DataFrame:
+        """Gera um bloco de n_rows linhas (start = posição da primeira linha no dataset)"""
+        rng = np.random.default_rng([self.random_state, chunk_index])
+        rows = rng.integers(0, len(self.source), size=n_rows)
+        df = self.source.iloc[rows].reset_index(drop=True)
+
+        factor = np.exp(rng.normal(0.0, self.area_noise, size=n_rows))
+        for col in AREA_COLUMNS:
+            if col in df.columns:
+                dtype = df[col].dtype
+                # NaN continua NaN; zeros continuam zero (ex: sem piscina)
+                df[col] = np.round(df[col].to_numpy(dtype=float) * factor).astype(dtype)
+        for total, parts in TOTAL_COLUMNS.items():
+            if total in df.columns and all(p in df.columns for p in parts):
+                values = np.nansum(df[parts].to_numpy(dtype=float), axis=1)
+                values[df[parts].isna().all(axis=1).to_numpy()] = np.nan
+                df[total] = values.astype(df[total].dtype)
+
+        if TARGET_COLUMN in df.columns:
+            price_factor = factor ** self.price_elasticity * np.exp(rng.normal(0.0, self.price_noise, size=n_rows))
+            df[TARGET_COLUMN] = np.round(df[TARGET_COLUMN].to_numpy(dtype=float) * price_factor).astype(
+                df[TARGET_COLUMN].dtype)
+
+        ids = np.arange(start, start + n_rows)
+        if 'Order' in df.columns:
+            df['Order'] = (ids + 1).astype(df['Order'].dtype)
+        if 'PID' in df.columns:
+            df['PID'] = (PID_OFFSET + ids).astype(np.int64)
+        return df
+
+    def generate(self, n_rows: int, chunk_size: int = 500_000) -> Iterator[pd.DataFrame]:
+        """Gera o dataset em blocos"""
+        for chunk_index, start in enumerate(range(0, n_rows, chunk_size)):
+            yield self.generate_chunk(min(chunk_size, n_rows - start), chunk_index, start)
+
+    def write(self, filepath, n_rows: int, chunk_size: int = 500_000, file_format: str = None) -> Path:
+        """
+        Escreve o dataset bloco a bloco (memória limitada ao tamanho do bloco)
+
+        Args:
+            file_format: 'parquet' ou 'csv' (None = pela extensão do arquivo)
+        """
+        filepath = Path(filepath)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        file_format = file_format or filepath.suffix.lstrip('.')
+        if file_format == 'parquet' and not PARQUET_AVAILABLE:
+            raise ImportError("pyarrow não instalado; use file_format='csv'")
+
+        start_time = time.perf_counter()
+        writer = None
+        try:
+            for i, chunk in enumerate(self.generate(n_rows, chunk_size)):
+                if file_format == 'parquet':
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(filepath, table.schema)
+                    writer.write_table(table)
+                elif file_format == 'csv':
+                    chunk.to_csv(filepath, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+                else:
+                    raise ValueError(f"Formato desconhecido: {file_format}")
+                done = min((i + 1) * chunk_size, n_rows)
+                print(f"  {done:,}/{n_rows:,} linhas ({time.perf_counter() - start_time:.1f}s)")
+        finally:
+            if writer is not None:
+                writer.close()
+
+        print(f"Dataset sintético salvo em: {filepath}")
+        return filepath
+
+
+def compare_distributions(source: pd.DataFrame, synthetic: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Compara as distribuições do dataset sintético com as da origem
+
+    Returns:
+        {'numeric': média/desvio relativos e diferença de NaN por coluna,
+         'categorical': distância de variação total das frequências por coluna}
+    """
+    numeric_rows = []
+    categorical_rows = []
+    for col in source.columns:
+        if col not in synthetic.columns or col in ('Order', 'PID'):
+            continue
+        missing_diff = synthetic[col].isna().mean() - source[col].isna().mean()
+        if pd.api.types.is_numeric_dtype(source[col]):
+            src, syn = source[col].astype(float), synthetic[col].astype(float)
+            numeric_rows.append({
+                'column': col,
+                'mean_ratio': syn.mean() / src.mean() if src.mean() else np.nan,
+                'std_ratio': syn.std() / src.std() if src.std() else np.nan,
+                'missing_diff': missing_diff
+            })
+        else:
+            src_freq = source[col].astype(str).value_counts(normalize=True)
+            syn_freq = synthetic[col].astype(str).value_counts(normalize=True)
+            freq = pd.concat([src_freq, syn_freq], axis=1).fillna(0)
+            categorical_rows.append({
+                'column': col,
+                'tv_distance': 0.5 * np.abs(freq.iloc[:, 0] - freq.iloc[:, 1]).sum(),
+                'missing_diff': missing_diff
+            })
+    return {
+        'numeric': pd.DataFrame(numeric_rows).set_index('column'),
+        'categorical': pd.DataFrame(categorical_rows).set_index('column')
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos no schema do Ames")
+    parser.add_argument('--rows', type=int, default=100_000, help="Número de linhas")
+    parser.add_argument('--out', required=True, help="Arquivo de saída (.parquet ou .csv)")
+    parser.add_argument('--chunk-size', type=int, default=500_000, help="Linhas por bloco")
+    parser.add_argument('--seed', type=int, default=RANDOM_STATE)
+    args = parser.parse_args()
+
+    generator = SyntheticAmesGenerator(random_state=args.seed)
+    generator.write(args.out, args.rows, chunk_size=args.chunk_size)
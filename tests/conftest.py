@@ -0,0 +1,56 @@
+"""
+Fixtures compartilhadas dos testes
+
+O CSV é lido e passa pelo feature engineering uma vez por sessão; o
+preprocessador ajustado nas primeiras n_rows linhas também fica em cache
+(um por valor de n_rows). Os testes não devem alterar os objetos
+devolvidos (copie antes de modificar).
+
+Uso (sem parametrize: DEFAULT_FIT_ROWS linhas):
+    def test_algo(fitted_data):
+        fitted_data.prep, fitted_data.X_train, ...
+
+    @pytest.mark.parametrize('fitted_data', [2000], indirect=True)
+    def test_com_mais_linhas(fitted_data):
+        ...
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.config import RAW_DATA_FILE
+from src.data_preprocessing import DataPreprocessor
+from src.feature_engineering import FeatureEngineer
+
+DEFAULT_FIT_ROWS = 1500
+
+
+@pytest.fixture(scope='session')
+def ames_features():
+    """(X, y) do CSV inteiro depois do feature engineering"""
+    prep = DataPreprocessor()
+    raw = prep.load_data(RAW_DATA_FILE)
+    return prep.split_features_target(FeatureEngineer.create_all_features(raw))
+
+
+@pytest.fixture(scope='session')
+def fitted_data(request, ames_features):
+    """
+    Preprocessador ajustado nas primeiras n_rows linhas (parametrize com indirect=True)
+
+    Atributos: prep, X, y (todas as linhas), n_rows, X_train (primeiras
+    n_rows transformadas), y_train e X_test (demais linhas transformadas).
+    """
+    n_rows = getattr(request, 'param', DEFAULT_FIT_ROWS)
+    X, y = ames_features
+    prep = DataPreprocessor()
+    prep.create_preprocessor(*prep.identify_feature_types(X))
+    X_train = prep.fit_transform(X.iloc[:n_rows])
+    return SimpleNamespace(
+        prep=prep, X=X, y=y, n_rows=n_rows,
+        X_train=X_train, y_train=y.iloc[:n_rows], X_test=prep.transform(X.iloc[n_rows:])
+    )
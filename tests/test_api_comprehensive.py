@@ -2,12 +2,15 @@
 Testes da API
 """
 import requests
-import pandas as pd
 import json
 import math
 import time
 import sys
 from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.config import RAW_DATA_FILE
+from src.data_loading import load_dataset  # tipado + cache Parquet
 # import pytest
 
 BASE_URL = "http://127.0.0.1:8000"
@@ -64,7 +67,7 @@ def test_predict_raw_valid():
     print("\n[TEST] Testando POST /predict/raw (dados válidos)...")
     
     # Carregar dados reais
-    df = pd.read_csv('AmesHousing.csv')
+    df = load_dataset(RAW_DATA_FILE)
     sample = df.iloc[0].to_dict()
     
     # Remover campos não-feature
@@ -111,7 +114,7 @@ def test_predict_performance():
     """Testa performance de predições"""
     print("\n[TEST] Testando performance de predições...")
     
-    df = pd.read_csv('AmesHousing.csv')
+    df = load_dataset(RAW_DATA_FILE)
     sample = df.iloc[0].to_dict()
     
     for field in ['Order', 'PID', 'SalePrice']:
@@ -146,7 +149,7 @@ def test_predict_accuracy():
     """Testa acurácia das predições"""
     print("\n[TEST] Testando acurácia das predições...")
     
-    df = pd.read_csv('AmesHousing.csv')
+    df = load_dataset(RAW_DATA_FILE)
     samples = df.sample(n=20, random_state=42)
     
     errors = []
@@ -184,7 +187,7 @@ def test_concurrent_requests():
     """Testa requisições concorrentes"""
     print("\n[TEST] Testando requisições concorrentes...")
     
-    df = pd.read_csv('AmesHousing.csv')
+    df = load_dataset(RAW_DATA_FILE)
     sample = df.iloc[0].to_dict()
     
     for field in ['Order', 'PID', 'SalePrice']:
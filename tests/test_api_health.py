@@ -2,8 +2,13 @@
 Script para testar a API localmente
 """
 import requests
-import pandas as pd
 import json
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.config import RAW_DATA_FILE
+from src.data_loading import load_dataset  # tipado + cache Parquet
 
 # URL da API
 BASE_URL = "http://127.0.0.1:8000"
@@ -35,7 +40,7 @@ except Exception as e:
 print("\n[3/3] Testando predição com dados do CSV...")
 try:
     # Carregar uma linha do CSV
-    df = pd.read_csv('AmesHousing.csv')
+    df = load_dataset(RAW_DATA_FILE)
     
     # Pegar primeira casa (sem o SalePrice)
     sample = df.iloc[0].to_dict()
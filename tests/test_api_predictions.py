@@ -2,9 +2,14 @@
 Teste completo da API com múltiplas predições
 """
 import requests
-import pandas as pd
 import json
 import math
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.config import RAW_DATA_FILE
+from src.data_loading import load_dataset  # tipado + cache Parquet
 
 BASE_URL = "http://127.0.0.1:8000"
 
@@ -13,7 +18,7 @@ print("TESTE COMPLETO DA API - PREDIÇÕES MÚLTIPLAS")
 print("=" * 80)
 
 # Carregar dados
-df = pd.read_csv('AmesHousing.csv')
+df = load_dataset(RAW_DATA_FILE)
 
 print(f"\n📊 Dataset carregado: {len(df)} casas")
 
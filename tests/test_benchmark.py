@@ -0,0 +1,57 @@
+"""
+Testes da suíte de benchmarks
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import copy
+
+from src.benchmark import BenchmarkSuite, compare_runs, load_results, main, save_results
+
+
+def test_benchmark_run_and_json(tmp_path):
+    """Suíte pequena: todos os grupos, metadados e JSON"""
+    print("\n[TEST] Testando suíte de benchmarks...")
+    suite = BenchmarkSuite(batch_sizes=[1, 200], fit_rows=300, models=['Ridge'], min_time=0.01)
+    results = suite.run()
+    path = save_results(results, tmp_path / "run.json")
+    results = load_results(path)
+    
+    names = {(r['benchmark'], r['batch_size']) for r in results['results']}
+    assert ('features/create_features', 1) in names
+    assert ('preprocess/fit_transform', 200) in names
+    assert ('preprocess/fit_transform', 1) not in names  # lote pequeno demais para ajustar
+    assert ('outliers/handle_outliers', 200) in names
+    assert ('model/Ridge/fit', 300) in names and ('model/Ridge/predict', 200) in names
+    for record in results['results']:
+        assert record['min_ms'] <= record['median_ms'] <= record['p90_ms']
+        if record['benchmark'].startswith('onnx/'):
+            assert record['max_abs_diff'] < 1.0
+    assert results['metadata']['cpu_count'] >= 1 and 'numpy' in results['metadata']['packages']
+    print(f"[OK] {len(results['results'])} benchmarks gravados")
+
+
+def test_compare_flags_regressions(tmp_path):
+    """compare aponta regressões acima do limite e ignora diferenças de ruído"""
+    print("\n[TEST] Testando comparação de execuções...")
+    baseline = {'metadata': {}, 'results': [
+        {'benchmark': 'a', 'batch_size': 1, 'median_ms': 10.0},
+        {'benchmark': 'b', 'batch_size': 1, 'median_ms': 10.0},
+        {'benchmark': 'c', 'batch_size': 1, 'median_ms': 0.01},
+        {'benchmark': 'd', 'batch_size': 1, 'median_ms': 10.0}
+    ]}
+    current = copy.deepcopy(baseline)
+    current['results'][0]['median_ms'] = 13.0   # +30%: regressão
+    current['results'][1]['median_ms'] = 10.5   # +5%: dentro do limite
+    current['results'][2]['median_ms'] = 0.02   # +100%, mas 0.01 ms é ruído
+    current['results'][3]['median_ms'] = 5.0    # -50%: melhora
+    
+    status = compare_runs(baseline, current, threshold=0.10)['status']
+    assert status.tolist() == ['regressão', 'ok', 'ok', 'melhora']
+    
+    save_results(baseline, tmp_path / "base.json")
+    save_results(current, tmp_path / "curr.json")
+    assert main(['compare', str(tmp_path / "base.json"), str(tmp_path / "curr.json")]) == 1
+    assert main(['compare', str(tmp_path / "base.json"), str(tmp_path / "base.json")]) == 0
+    print("[OK] Regressões detectadas")
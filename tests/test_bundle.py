@@ -0,0 +1,70 @@
+"""
+Testes do bundle versionado (manifesto, checksums, arrays mapeados)
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import json
+import numpy as np
+import pytest
+from sklearn.linear_model import Ridge
+
+from src.bundle import list_versions, load_bundle, save_bundle
+from src.data_preprocessing import feature_lists
+from src.model_export import ModelExporter
+from src.outliers import input_detector
+from src.serving import build_pipeline
+
+
+def _pipeline(data, alpha: float = 1.0):
+    model = Ridge(alpha=alpha).fit(data.X_train, data.y_train)
+    numerical_features, _ = feature_lists(data.prep.preprocessor)
+    detector = input_detector(numerical_features).fit(data.X.iloc[:data.n_rows])
+    return build_pipeline(model, data.prep), detector
+
+
+def test_bundle_roundtrip(fitted_data, tmp_path):
+    """Salva e abre a mesma versão: manifesto completo, arrays mapeados e predições iguais"""
+    print("\n[TEST] Testando bundle versionado...")
+    pipeline, detector = _pipeline(fitted_data)
+    prep, X_train, X_new = fitted_data.prep, fitted_data.X_train, fitted_data.X.iloc[fitted_data.n_rows:]
+    onnx_path = ModelExporter.export_to_onnx(pipeline.named_steps['model'], X_train, tmp_path / "model.onnx")
+    metrics = {'test_r2': 0.9, 'test_mae': 15000.0}
+    version_dir = save_bundle(pipeline, metrics, 'Ridge', prep.feature_names, onnx_path, detector,
+                              bundle_dir=tmp_path / "bundles")
+
+    manifest = json.loads((version_dir / "manifest.json").read_text())
+    assert set(manifest['files']) == {'pipeline.pkl', 'model.onnx', 'outlier_detector.pkl'}
+    assert manifest['schema']['feature_names'] == list(prep.feature_names)
+    assert manifest['schema']['n_features'] == X_train.shape[1]
+    assert 'scikit-learn' in manifest['libraries']
+
+    bundle = load_bundle(tmp_path / "bundles")
+    assert bundle.version == version_dir.name and bundle.metrics == metrics
+    assert isinstance(bundle.model.coef_, np.memmap), "Coeficientes copiados em vez de mapeados"
+    np.testing.assert_allclose(bundle.predict(X_new), pipeline.predict(X_new))
+    y_onnx = ModelExporter.predict_onnx(bundle.onnx_session, prep.transform(X_new)).ravel()
+    np.testing.assert_allclose(y_onnx, pipeline.predict(X_new), rtol=1e-4)
+    assert bundle.outlier_detector.bounds_ == detector.bounds_
+    missing = bundle.missing_columns({'Gr_Liv_Area': 1500})
+    assert 'Gr Liv Area' not in missing and len(missing) == len(bundle.schema['input_columns']) - 1
+    print(f"[OK] Bundle {bundle.version} aberto em {bundle.load_ms:.1f} ms")
+
+
+def test_bundle_versions_and_validation(fitted_data, tmp_path):
+    """LATEST aponta para a última versão, antigas são podadas e arquivos alterados são recusados"""
+    print("\n[TEST] Testando versões e validação do bundle...")
+    bundle_dir = tmp_path / "bundles"
+    versions = [save_bundle(_pipeline(fitted_data, alpha)[0], bundle_dir=bundle_dir, keep=2).name
+                for alpha in (1.0, 2.0, 3.0)]
+    assert list_versions(bundle_dir) == sorted(versions)[-2:]
+    assert load_bundle(bundle_dir, checksums=False).version == versions[-1]
+
+    pipeline_file = bundle_dir / versions[-1] / "pipeline.pkl"
+    data = bytearray(pipeline_file.read_bytes())
+    data[-20] ^= 0xFF
+    pipeline_file.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match='Checksum'):
+        load_bundle(bundle_dir)
+    print(f"[OK] {len(list_versions(bundle_dir))} versões mantidas; alteração detectada")
@@ -0,0 +1,72 @@
+"""
+Testes dos checkpoints e da retomada de execuções
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from lightgbm import LGBMRegressor
+from sklearn.datasets import make_regression
+from sklearn.linear_model import Ridge
+
+from src.checkpoint import CheckpointStore
+from src.hyperparameter_search import BudgetedSearch, TrialStore
+from src.model_training import ModelTrainer
+
+
+def test_checkpoint_store(tmp_path):
+    """Checkpoint só é reaproveitado com --resume e com a mesma chave"""
+    print("\n[TEST] Testando checkpoints...")
+    store = CheckpointStore('run1', checkpoint_dir=tmp_path)
+    store.save('model', 'Gradient Boosting', {'test_r2': 0.9}, key={'max_depth': 5})
+    assert store.load('model', 'Gradient Boosting', key={'max_depth': 5}) is None, \
+        "Sem resume nada é recarregado"
+    
+    resumed = CheckpointStore('run1', resume=True, checkpoint_dir=tmp_path)
+    assert resumed.load('model', 'Gradient Boosting', key={'max_depth': 5}) == {'test_r2': 0.9}
+    assert resumed.load('model', 'Gradient Boosting', key={'max_depth': 7}) is None
+    assert resumed.load('model', 'XGBoost') is None
+    
+    CheckpointStore('run1', checkpoint_dir=tmp_path)
+    fresh = CheckpointStore('run1', resume=True, checkpoint_dir=tmp_path)
+    assert fresh.load('model', 'Gradient Boosting', key={'max_depth': 5}) is None, \
+        "Execução nova (sem resume) apaga os checkpoints antigos"
+    print("[OK] Checkpoints OK")
+
+
+def test_resume_interrupted_search(tmp_path):
+    """Busca retomada reaproveita os trials gravados e chega ao mesmo resultado"""
+    print("\n[TEST] Testando retomada da busca...")
+    X, y = make_regression(n_samples=600, n_features=10, noise=10.0, random_state=42)
+    space = {'alpha': ('log', 0.01, 100.0)}
+    
+    full = BudgetedSearch(Ridge(), space, cv=3, n_jobs=1, warm_start=0).fit(X, y)
+    
+    store = TrialStore(tmp_path / "trials.db")
+    interrupted = BudgetedSearch(Ridge(), space, max_fits=12, cv=3, n_jobs=1,
+                                 store=store, model_name='Ridge', warm_start=0).fit(X, y)
+    resumed = BudgetedSearch(Ridge(), space, cv=3, n_jobs=1, store=store, model_name='Ridge',
+                             warm_start=0, resume=True).fit(X, y)
+    
+    assert resumed.best_params_ == full.best_params_
+    assert resumed.n_fits_ == full.n_fits_ - interrupted.n_fits_
+    print(f"[OK] {interrupted.n_fits_} ajustes reaproveitados, {resumed.n_fits_} novos")
+
+
+def test_resume_depends_on_early_stopping(tmp_path, monkeypatch, capsys):
+    """Mudar o early stopping invalida o checkpoint do modelo (mesmos parâmetros)"""
+    print("\n[TEST] Testando chave do checkpoint com early stopping...")
+    X, y = make_regression(n_samples=300, n_features=8, noise=10.0, random_state=42)
+    monkeypatch.setattr(ModelTrainer, 'get_models',
+                        lambda self: {'LightGBM': LGBMRegressor(n_estimators=200, verbose=-1)})
+    
+    def run(early_stopping_rounds, resume):
+        store = CheckpointStore('run1', resume=resume, checkpoint_dir=tmp_path)
+        trainer = ModelTrainer(early_stopping_rounds=early_stopping_rounds, checkpoints=store)
+        trainer.train_models(X[:240], y[:240], X[240:], y[240:])
+        return 'retomado do checkpoint' in capsys.readouterr().out
+    
+    assert not run(20, resume=False)
+    assert not run(5, resume=True), "Checkpoint de outro early stopping foi reaproveitado"
+    assert run(5, resume=True)
+    print("[OK] Checkpoint só vale para o mesmo early stopping")
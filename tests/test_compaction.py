@@ -0,0 +1,59 @@
+"""
+Testes da compactação do artefato (colunas não usadas pelo modelo)
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+from lightgbm import LGBMRegressor
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.linear_model import Lasso, Ridge
+from xgboost import XGBRegressor
+
+from src.compaction import compact
+from src.serving import build_pipeline
+
+
+def test_compaction_keeps_predictions(fitted_data):
+    """Modelos compactados dão as mesmas predições com menos colunas"""
+    print("\n[TEST] Testando compactação por tipo de modelo...")
+    prep, X, y, X_train, n = (fitted_data.prep, fitted_data.X, fitted_data.y, fitted_data.X_train,
+                              fitted_data.n_rows)
+    models = {
+        'Lasso': Lasso(alpha=100, max_iter=5000),
+        'Gradient Boosting': GradientBoostingRegressor(n_estimators=30, max_depth=3, random_state=0),
+        'XGBoost': XGBRegressor(n_estimators=30, max_depth=3),
+        'LightGBM': LGBMRegressor(n_estimators=30, max_depth=3, verbose=-1)
+    }
+    X_new = X.iloc[n:]
+    for name, model in models.items():
+        model.fit(X_train, y.iloc[:n])
+        result = compact(model, prep, X_new)
+        report = result['report']
+        assert report['status'] == 'ok', f"{name}: {report['status']}"
+        assert report['n_used'] < report['n_columns']
+
+        expected = model.predict(prep.transform(X_new))
+        X_compact = result['preprocessor'].transform(X_new)
+        assert X_compact.shape[1] == report['n_used'] == len(result['preprocessor'].feature_names)
+        np.testing.assert_allclose(result['model'].predict(X_compact), expected, rtol=1e-9)
+        print(f"[OK] {name}: {report['n_columns']} -> {report['n_used']} colunas")
+
+
+def test_compacted_pipeline_and_unsupported(fitted_data):
+    """O par compactado entra no pipeline servido; sem colunas mortas nada muda"""
+    print("\n[TEST] Testando pipeline compactado...")
+    prep, X, y, X_train, n = (fitted_data.prep, fitted_data.X, fitted_data.y, fitted_data.X_train,
+                              fitted_data.n_rows)
+    model = LGBMRegressor(n_estimators=30, max_depth=3, verbose=-1).fit(X_train, y.iloc[:n])
+    result = compact(model, prep, X.iloc[n:])
+    pipeline = build_pipeline(result['model'], result['preprocessor'])
+
+    records = X.iloc[n:n + 5].astype(object).where(X.iloc[n:n + 5].notna(), None).to_dict('records')
+    np.testing.assert_allclose(pipeline.predict(records), model.predict(prep.transform(X.iloc[n:n + 5])),
+                               rtol=1e-9)
+
+    ridge = Ridge().fit(X_train, y.iloc[:n])
+    assert compact(ridge, prep, X.iloc[n:])['report']['status'] == 'nada a remover'
+    print("[OK] Pipeline compactado equivalente")
@@ -0,0 +1,76 @@
+"""
+Testes da carga tipada com cache Parquet
+"""
+import sys
+import shutil
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+
+import src.data_loading as data_loading
+from src.config import RAW_DATA_FILE, TARGET_COLUMN
+from src.data_loading import compare_load_paths, load_dataset
+from src.data_preprocessing import DataPreprocessor, handle_outliers
+from src.feature_engineering import FeatureEngineer
+
+
+def test_typed_load_and_parquet_cache(tmp_path, monkeypatch):
+    """Tipos do schema, reuso do Parquet, invalidação e projeção"""
+    print("\n[TEST] Testando carga tipada...")
+    monkeypatch.setattr(data_loading, 'CACHE_DIR', tmp_path / "cache")
+    csv_path = tmp_path / "ames.csv"
+    shutil.copy(RAW_DATA_FILE, csv_path)
+    
+    df = load_dataset(csv_path)
+    assert df['Neighborhood'].dtype == 'category'
+    assert df['Gr Liv Area'].dtype == np.int32
+    assert df['Garage Cars'].dtype == np.float32
+    assert df['PID'].dtype == np.int64
+    parquet_path = next((tmp_path / "cache" / "parquet").glob("*.parquet"))
+    
+    # Segunda leitura vem do Parquet, com os mesmos tipos
+    cached = load_dataset(csv_path)
+    pd.testing.assert_frame_equal(df, cached)
+    
+    projected = load_dataset(csv_path, columns=['Neighborhood', 'SalePrice'])
+    assert list(projected.columns) == ['Neighborhood', 'SalePrice']
+    
+    # CSV alterado invalida o cache
+    mtime = parquet_path.stat().st_mtime_ns
+    pd.read_csv(csv_path).iloc[:100].to_csv(csv_path, index=False)
+    assert len(load_dataset(csv_path)) == 100
+    assert parquet_path.stat().st_mtime_ns != mtime
+    print(f"[OK] Memória: {df.memory_usage(deep=True).sum() / 1024 ** 2:.2f} MB")
+
+
+def test_typed_load_preserves_preprocessing():
+    """A matriz preprocessada é idêntica à do pd.read_csv puro"""
+    print("\n[TEST] Testando equivalência do preprocessamento...")
+    
+    def process(df):
+        df = FeatureEngineer.create_interaction_features(FeatureEngineer.create_features(df))
+        prep = DataPreprocessor()
+        X, _ = prep.split_features_target(handle_outliers(df, TARGET_COLUMN))
+        prep.create_preprocessor(*prep.identify_feature_types(X))
+        return prep.fit_transform(X)
+    
+    expected = process(pd.read_csv(RAW_DATA_FILE))
+    actual = process(load_dataset(RAW_DATA_FILE, use_cache=False))
+    assert np.array_equal(expected, actual), "Preprocessamento mudou com os tipos novos"
+    print(f"[OK] Matrizes idênticas: {actual.shape}")
+
+
+def test_compare_load_paths(tmp_path, monkeypatch):
+    """Relatório de tempo e memória dos três caminhos de carga"""
+    print("\n[TEST] Testando comparação dos caminhos de carga...")
+    monkeypatch.setattr(data_loading, 'CACHE_DIR', tmp_path / "cache")
+    report = compare_load_paths(RAW_DATA_FILE, n_repeats=1)
+    
+    assert list(report.index) == ['read_csv', 'csv_tipado', 'parquet']
+    assert (report['tempo_ms'] > 0).all()
+    # Os dois caminhos tipados guardam o texto como category
+    assert (report.loc[['csv_tipado', 'parquet'], 'memoria_mb'] < report.loc['read_csv', 'memoria_mb'] / 2).all()
+    print(f"[OK] Parquet {report.loc['parquet', 'tempo_ms']:.1f} ms x read_csv "
+          f"{report.loc['read_csv', 'tempo_ms']:.1f} ms")
@@ -0,0 +1,68 @@
+"""
+Testes do monitor de drift com memória constante
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import copy
+
+import numpy as np
+import pytest
+
+from src.drift import DriftMonitor, reference_monitor
+
+
+def _monitor(data):
+    # Referência numa amostra aleatória: o CSV é ordenado por venda (Yr Sold derivaria)
+    X = data.X.sample(frac=1.0, random_state=42)
+    return reference_monitor(X.iloc[:data.n_rows], data.prep.preprocessor), X.iloc[data.n_rows:]
+
+
+@pytest.mark.parametrize('fitted_data', [2000], indirect=True)
+def test_drift_alerts(fitted_data):
+    """Amostra parecida com o treino não alerta; área deslocada e bairro novo alertam"""
+    print("\n[TEST] Testando alertas de drift...")
+    monitor, X_new = _monitor(fitted_data)
+    report = monitor.update(X_new).report()
+    assert report['n_rows'] == len(X_new) and report['enough_rows']
+    assert report['alerts'] == [], report['alerts']
+    assert report['numeric']['Gr Liv Area']['psi'] < 0.1
+    assert report['categorical']['Neighborhood']['unseen_rate'] < 0.01
+
+    shifted = X_new.copy()
+    shifted['Gr Liv Area'] = shifted['Gr Liv Area'] * 1.8
+    shifted['Neighborhood'] = 'Bairro Novo'
+    shifted['Lot Frontage'] = np.nan
+    report = monitor.reset().update(shifted).report()
+    assert report['numeric']['Gr Liv Area']['psi'] > 0.25
+    assert report['numeric']['Lot Frontage']['missing_rate'] == 1.0
+    assert report['categorical']['Neighborhood']['unseen_rate'] == 1.0
+    assert any('Gr Liv Area' in alert for alert in report['alerts'])
+    assert any('não vistas em Neighborhood' in alert for alert in report['alerts'])
+
+    # Requisições de uma linha somam o mesmo que o lote
+    single, batch = monitor.reset(), copy.deepcopy(monitor)
+    for i in range(50):
+        single.update(shifted.iloc[[i]])
+    batch.update(shifted.iloc[:50])
+    assert np.array_equal(single.histograms, batch.histograms)
+    assert np.array_equal(single.sketch(), batch.sketch())
+    print(f"[OK] {len(report['alerts'])} alertas; update médio {report['update_ns_mean'] / 1000:.0f} us")
+
+
+@pytest.mark.parametrize('fitted_data', [2000], indirect=True)
+def test_drift_constant_memory_and_persistence(fitted_data, tmp_path):
+    """A memória não cresce com as requisições e a referência sobrevive ao save/load"""
+    print("\n[TEST] Testando memória e persistência do monitor...")
+    monitor, X_new = _monitor(fitted_data)
+    before = monitor.memory_bytes
+    for _ in range(5):
+        monitor.update(X_new)
+    assert monitor.memory_bytes == before
+    assert monitor.n_rows == 5 * len(X_new)
+
+    loaded = DriftMonitor.load(monitor.save(tmp_path / "drift.pkl"))
+    assert loaded.report() == monitor.report()
+    assert loaded.update(X_new.iloc[:10]).n_rows == monitor.n_rows + 10
+    print(f"[OK] {before / 1024:.0f} KB fixos")
@@ -0,0 +1,90 @@
+"""
+Testes das codificações alternativas ao one-hot
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import Ridge
+
+from src.config import RAW_DATA_FILE
+from src.data_preprocessing import DataPreprocessor
+from src.encoders import FrequencyEncoder, HashingEncoder, TargetEncoder
+from src.feature_engineering import FeatureEngineer
+from src.serving import build_pipeline
+
+
+def _toy():
+    X = pd.DataFrame({'bairro': ['A', 'A', 'B', 'B', 'B', 'C', None, 'A'] * 25})
+    y = pd.Series(np.arange(len(X), dtype=float))
+    return X, y
+
+
+def test_lookups_match_groupby():
+    """Arrays de consulta = médias/frequências por grupo; não vistas caem no valor padrão"""
+    print("\n[TEST] Testando tabelas de consulta...")
+    X, y = _toy()
+    new = pd.DataFrame({'bairro': ['B', 'Z', None]})
+
+    te = TargetEncoder(smoothing=0.0).fit(X, y)
+    groups = y.groupby(X['bairro'].fillna('missing')).mean()
+    np.testing.assert_allclose(te.transform(new)[:, 0], [groups['B'], y.mean(), groups['missing']])
+
+    freq = FrequencyEncoder().fit(X)
+    shares = X['bairro'].fillna('missing').value_counts(normalize=True)
+    np.testing.assert_allclose(freq.transform(new)[:, 0], [shares['B'], 0.0, shares['missing']])
+
+    hashing = HashingEncoder(n_buckets=4).fit(X)
+    out = hashing.transform(new)
+    assert out.shape == (3, 4) and (out.sum(axis=1) == 1).all()
+    assert list(hashing.get_feature_names_out()) == [f"bairro_h{b}" for b in range(4)]
+    print("[OK] Consultas iguais ao groupby")
+
+
+def test_target_encoding_out_of_fold():
+    """No treino cada linha é codificada sem o próprio fold"""
+    print("\n[TEST] Testando target encoding out-of-fold...")
+    X, y = _toy()
+    te = TargetEncoder(n_folds=5, smoothing=0.0)
+    oof = te.fit_transform(X, y)[:, 0]
+    full = te.transform(X)[:, 0]
+    assert not np.allclose(oof, full), "Valores de treino iguais aos da consulta completa (vazamento)"
+
+    # Refaz a linha 0 à mão: média do grupo sem o fold dela
+    from sklearn.model_selection import KFold
+    for train_idx, val_idx in KFold(5, shuffle=True, random_state=te.random_state).split(y):
+        if 0 in val_idx:
+            keys = X['bairro'].fillna('missing')
+            expected = y.iloc[train_idx][keys.iloc[train_idx] == keys.iloc[0]].mean()
+            assert np.isclose(oof[0], expected)
+    print("[OK] Out-of-fold sem vazamento")
+
+
+def test_preprocessor_with_encodings():
+    """Codificação por coluna no DataPreprocessor e no pipeline servido"""
+    print("\n[TEST] Testando DataPreprocessor com codificações...")
+    prep = DataPreprocessor()
+    raw = prep.load_data(RAW_DATA_FILE).iloc[:1200]
+    X, y = prep.split_features_target(FeatureEngineer.create_all_features(raw))
+    num_features, cat_features = prep.identify_feature_types(X)
+
+    onehot = DataPreprocessor()
+    onehot.create_preprocessor(num_features, cat_features)
+    width_onehot = onehot.fit_transform(X.iloc[:900], y.iloc[:900]).shape[1]
+
+    encodings = {'Neighborhood': 'target', 'Exterior 1st': 'frequency', 'Exterior 2nd': 'hash'}
+    prep.create_preprocessor(num_features, cat_features, encodings)
+    X_train = prep.fit_transform(X.iloc[:900], y.iloc[:900])
+    assert X_train.shape[1] < width_onehot
+    assert X_train.shape[1] == len(prep.feature_names)
+    assert {'Neighborhood_te', 'Exterior 1st_freq', 'Exterior 2nd_h0'} <= set(prep.feature_names)
+    assert not any(name.startswith('Neighborhood_') and name != 'Neighborhood_te' for name in prep.feature_names)
+
+    model = Ridge().fit(X_train, y.iloc[:900])
+    pipeline = build_pipeline(model, prep)
+    X_new = X.iloc[900:905]
+    records = X_new.astype(object).where(X_new.notna(), None).to_dict('records')
+    np.testing.assert_allclose(pipeline.predict(records), model.predict(prep.transform(X_new)), rtol=1e-9)
+    print(f"[OK] {width_onehot} -> {X_train.shape[1]} colunas; pipeline servido equivalente")
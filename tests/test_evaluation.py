@@ -0,0 +1,84 @@
+"""
+Testes do motor de avaliação (holdout + CV + out-of-fold em uma passada)
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+from sklearn.datasets import make_regression
+from sklearn.linear_model import Ridge
+from sklearn.model_selection import cross_val_score
+
+from src.evaluation import ModelEvaluator
+
+
+def _make_data():
+    X, y = make_regression(n_samples=200, n_features=8, noise=10.0, random_state=42)
+    return X[:160], y[:160], X[160:], y[160:]
+
+
+def test_single_pass_evaluation():
+    """Verifica número de ajustes, OOF e scores iguais ao cross_val_score"""
+    print("\n[TEST] Testando avaliação em uma passada...")
+    X_train, y_train, X_test, y_test = _make_data()
+    
+    evaluator = ModelEvaluator(cv=5, n_jobs=1)
+    result = evaluator.evaluate(Ridge(), X_train, y_train, X_test, y_test)
+    metrics = result['metrics']
+    
+    assert metrics['n_fits'] == 6, "Devem ser 5 folds + 1 ajuste final"
+    assert result['oof_predictions'].shape == y_train.shape
+    assert len(result['fold_estimators']) == 5
+    assert 'train_r2' not in metrics, "Predição no treino não foi pedida"
+    
+    expected = cross_val_score(Ridge(), X_train, y_train, cv=5, scoring='r2')
+    assert np.allclose(result['cv_scores'], expected), "Scores de CV divergentes"
+    
+    print(f"[OK] CV R^2: {metrics['cv_r2_mean']:.4f} com {metrics['n_fits']} ajustes")
+
+
+def test_train_score_on_request():
+    """Métricas de treino só aparecem quando pedidas"""
+    print("\n[TEST] Testando métricas de treino opcionais...")
+    X_train, y_train, X_test, y_test = _make_data()
+    
+    evaluator = ModelEvaluator(cv=3, n_jobs=1, return_train_score=True, keep_estimators=False)
+    result = evaluator.evaluate(Ridge(), X_train, y_train, X_test, y_test)
+    
+    assert 'train_r2' in result['metrics']
+    assert result['fold_estimators'] is None
+    print("[OK] Métricas de treino calculadas sob demanda")
+
+
+def test_early_stopping_rounds():
+    """Boosters param cedo nos folds e o ajuste final usa os rounds escolhidos"""
+    print("\n[TEST] Testando early stopping no motor de avaliação...")
+    from lightgbm import LGBMRegressor
+    X_train, y_train, X_test, y_test = _make_data()
+    
+    model = LGBMRegressor(n_estimators=1000, learning_rate=0.3, verbose=-1)
+    evaluator = ModelEvaluator(cv=3, n_jobs=1, early_stopping_rounds=10)
+    result = evaluator.evaluate(model, X_train, y_train, X_test, y_test)
+    metrics = result['metrics']
+    
+    assert metrics['n_estimators'] < 1000, "Early stopping não interrompeu o treino"
+    assert result['model'].n_estimators == metrics['n_estimators']
+    assert metrics['estimated_time_saved'] >= 0
+    print(f"[OK] {metrics['n_estimators']} rounds de {metrics['max_rounds']}")
+
+
+def test_gradient_boosting_rounds_exclude_patience():
+    """Gradient Boosting devolve o melhor round, como XGBoost e LightGBM (sem a paciência)"""
+    print("\n[TEST] Testando rounds escolhidos do Gradient Boosting...")
+    from sklearn.ensemble import GradientBoostingRegressor
+    from src.early_stopping import fit_with_early_stopping, rounds_trained
+    X_train, y_train, _, _ = _make_data()
+    
+    model, n_rounds = fit_with_early_stopping(
+        GradientBoostingRegressor(n_estimators=1000, learning_rate=0.3, random_state=42), X_train, y_train, 10
+    )
+    assert model.n_estimators_ < 1000, "Early stopping não interrompeu o treino"
+    assert n_rounds == model.n_estimators_ - 10
+    assert rounds_trained(model) == model.n_estimators_
+    print(f"[OK] {n_rounds} rounds escolhidos de {rounds_trained(model)} construídos")
@@ -0,0 +1,98 @@
+"""
+Testes do feature engineering declarativo
+
+A referência abaixo é a implementação anterior (if/else + apply); as
+features vetorizadas têm que sair idênticas, inclusive nos dtypes.
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+
+from src.config import RAW_DATA_FILE
+from src.data_loading import load_dataset
+from src.feature_engineering import FeatureEngineer
+
+
+def _reference_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Implementação anterior do create_features + create_interaction_features"""
+    df = df.copy()
+    cols = df.columns
+    if 'Year Built' in cols and 'Yr Sold' in cols:
+        df['House_Age'] = df['Yr Sold'] - df['Year Built']
+    if 'Year Remod/Add' in cols and 'Yr Sold' in cols:
+        df['Years_Since_Remod'] = df['Yr Sold'] - df['Year Remod/Add']
+    for name, group in [('Total_Bathrooms', ['Full Bath', 'Half Bath', 'Bsmt Full Bath', 'Bsmt Half Bath']),
+                        ('Total_SF', ['Gr Liv Area', 'Total Bsmt SF']),
+                        ('Total_Porch_SF', ['Wood Deck SF', 'Open Porch SF', 'Enclosed Porch',
+                                            '3Ssn Porch', 'Screen Porch'])]:
+        present = [c for c in group if c in cols]
+        if present:
+            df[name] = df[present].sum(axis=1)
+    if 'Year Built' in cols and 'Year Remod/Add' in cols:
+        df['Is_Remodeled'] = (df['Year Built'] != df['Year Remod/Add']).astype(int)
+    if 'Overall Qual' in cols and 'Overall Cond' in cols:
+        df['Overall_Score'] = df['Overall Qual'] * df['Overall Cond']
+    for name, col in [('Has_Garage', 'Garage Cars'), ('Has_Pool', 'Pool Area'), ('Has_Fireplace', 'Fireplaces')]:
+        if col in cols:
+            df[name] = (df[col] > 0).astype(int)
+    if 'Lot Area' in cols and 'Gr Liv Area' in cols:
+        df['Lot_To_Living_Ratio'] = df['Lot Area'] / (df['Gr Liv Area'] + 1)
+    if 'Mo Sold' in cols:
+        def get_season(month):
+            if month in [12, 1, 2]:
+                return 'Winter'
+            elif month in [3, 4, 5]:
+                return 'Spring'
+            elif month in [6, 7, 8]:
+                return 'Summer'
+            return 'Fall'
+        df['Sale_Season'] = df['Mo Sold'].apply(get_season)
+    if 'Overall Qual' in df.columns and 'Gr Liv Area' in df.columns:
+        df['Qual_Area_Interaction'] = df['Overall Qual'] * df['Gr Liv Area']
+    if 'House_Age' in df.columns and 'Overall Qual' in df.columns:
+        df['Age_Qual_Interaction'] = df['House_Age'] * df['Overall Qual']
+    return df
+
+
+def test_vectorized_features_match_reference():
+    """Mesmos valores e dtypes em dados tipados, CSV cru, uma linha, colunas faltando e None"""
+    print("\n[TEST] Testando features vetorizadas...")
+    typed = load_dataset(RAW_DATA_FILE)
+    raw = pd.read_csv(RAW_DATA_FILE)
+    with_none = raw.iloc[:3].astype(object)
+    with_none.loc[0, ['Garage Cars', 'Yr Sold', 'Mo Sold', 'Bsmt Full Bath']] = None
+    frames = {
+        'tipado': typed,
+        'csv': raw,
+        'uma_linha': pd.DataFrame([raw.iloc[5].to_dict()]),
+        'parcial': typed.drop(columns=['Full Bath', 'Garage Cars', 'Mo Sold', 'Yr Sold']),
+        'com_none': with_none
+    }
+    for name, df in frames.items():
+        expected = _reference_features(df)
+        pd.testing.assert_frame_equal(FeatureEngineer.create_all_features(df), expected, check_exact=True)
+        pd.testing.assert_frame_equal(
+            FeatureEngineer.create_interaction_features(FeatureEngineer.create_features(df)),
+            expected, check_exact=True)
+    assert 'Sale_Season' not in FeatureEngineer.create_all_features(frames['parcial']).columns
+    print(f"[OK] {len(frames)} variações idênticas à referência")
+
+
+def test_record_path_matches_frame():
+    """Caminho de um dict dá os mesmos valores que o DataFrame de uma linha"""
+    print("\n[TEST] Testando caminho de um registro...")
+    raw = pd.read_csv(RAW_DATA_FILE)
+    for i in [0, 7, 1500]:
+        record = {k: (None if pd.isna(v) else v.item() if hasattr(v, 'item') else v)
+                  for k, v in raw.iloc[i].to_dict().items()}
+        record['Garage Cars'] = None
+        expected = _reference_features(pd.DataFrame([record])).iloc[0].to_dict()
+        result = FeatureEngineer.create_record_features(record)
+        assert list(result) == list(expected)
+        for key, value in expected.items():
+            assert value == result[key] or (pd.isna(value) and pd.isna(result[key])), key
+        assert result['Has_Garage'] == 0
+    print("[OK] Registro idêntico ao DataFrame")
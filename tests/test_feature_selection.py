@@ -0,0 +1,58 @@
+"""
+Testes da seleção de features
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+from sklearn.linear_model import Ridge
+
+from src.feature_selection import FeatureSelector, build_reduced_preprocessor, reduce
+
+
+@pytest.mark.parametrize('fitted_data', [1200], indirect=True)
+def test_scores_cached_and_deterministic(fitted_data, tmp_path):
+    """Segunda chamada vem do cache; o resultado não depende de n_jobs"""
+    print("\n[TEST] Testando cache e determinismo dos scores...")
+    prep, X_proc, y = fitted_data.prep, fitted_data.X_train, fitted_data.y_train
+    models = {'Ridge': Ridge()}
+
+    selector = FeatureSelector(prep.feature_names, n_jobs=1, cache_dir=tmp_path)
+    scores = selector.score(X_proc[:900], y[:900], X_proc[900:], y[900:], models=models)
+    assert len(scores) == X_proc.shape[1], "Faltam colunas do one-hot"
+    assert {'f_score', 'mutual_info', 'perm_Ridge', 'rank'} <= set(scores.columns)
+
+    again = FeatureSelector(prep.feature_names, n_jobs=2, cache_dir=tmp_path)
+    cached = again.score(X_proc[:900], y[:900], X_proc[900:], y[900:], models=models)
+    assert all(entry['status'] == 'hit' for entry in again.log)
+    assert cached.equals(scores)
+
+    # Sem cache e com outro n_jobs: mesmos valores
+    fresh = FeatureSelector(prep.feature_names, n_jobs=2, cache_dir=None)
+    np.testing.assert_allclose(fresh.mutual_info(X_proc[:900], y[:900]),
+                               scores.loc[prep.feature_names, 'mutual_info'])
+    print(f"[OK] {len(scores)} colunas pontuadas; cache em {len(list(tmp_path.iterdir()))} arquivos")
+
+
+@pytest.mark.parametrize('fitted_data', [900], indirect=True)
+def test_reduced_preprocessor_matches_columns(fitted_data):
+    """O preprocessador reduzido gera exatamente as colunas escolhidas do original"""
+    print("\n[TEST] Testando preprocessador reduzido...")
+    prep, X_proc = fitted_data.prep, fitted_data.X_train
+    X, y = fitted_data.X.iloc[:1200], fitted_data.y.iloc[:1200]
+    scores = FeatureSelector(prep.feature_names, cache_dir=None).score(X_proc, y[:900])
+    selected = FeatureSelector.select(scores, 40)
+
+    reduced = build_reduced_preprocessor(prep.preprocessor, X.iloc[:900], selected)
+    indices = [prep.feature_names.index(name) for name in reduced.get_feature_names_out()]
+    assert sorted(reduced.get_feature_names_out()) == sorted(selected)
+    np.testing.assert_allclose(reduced.transform(X.iloc[900:]), prep.transform(X.iloc[900:])[:, indices])
+
+    model = Ridge().fit(X_proc, y[:900])
+    result = reduce(model, prep.preprocessor, X.iloc[:900], y[:900], X.iloc[900:], y[900:], selected)
+    comparison = result['comparison']
+    assert comparison.loc['n_columns', 'reduzido'] == 40
+    assert comparison.loc['matrix_kb_per_1k_rows', 'reduzido'] < comparison.loc['matrix_kb_per_1k_rows', 'original']
+    print(f"[OK] R² {comparison.loc['test_r2', 'original']:.3f} -> {comparison.loc['test_r2', 'reduzido']:.3f}")
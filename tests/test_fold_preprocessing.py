@@ -0,0 +1,65 @@
+"""
+Testes do preprocessamento por fold (CV sem vazamento)
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+from sklearn.datasets import make_regression
+from sklearn.linear_model import Ridge
+from sklearn.model_selection import cross_val_score, KFold
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.impute import SimpleImputer
+
+from src.evaluation import ModelEvaluator
+from src.fold_preprocessing import FoldPreprocessor
+from src.hyperparameter_search import BudgetedSearch
+
+
+def _make_data():
+    X, y = make_regression(n_samples=200, n_features=6, noise=10.0, random_state=42)
+    X = X * np.arange(1, 7) + 5
+    X[::7, 2] = np.nan
+    return pd.DataFrame(X, columns=[f'f{i}' for i in range(6)]), y
+
+
+def test_fold_preprocessing_matches_pipeline():
+    """CV com preprocessamento por fold = cross_val_score do Pipeline completo"""
+    print("\n[TEST] Testando CV sem vazamento...")
+    X, y = _make_data()
+    preprocessor = make_pipeline(SimpleImputer(), StandardScaler())
+    fold_preprocessor = FoldPreprocessor(preprocessor, X, y)
+    X_processed = preprocessor.fit_transform(X)
+    
+    evaluator = ModelEvaluator(cv=5, n_jobs=1)
+    result = evaluator.evaluate(Ridge(), X_processed, y, fold_preprocessor=fold_preprocessor)
+    
+    expected = cross_val_score(make_pipeline(SimpleImputer(), StandardScaler(), Ridge()),
+                               X, y, cv=KFold(5), scoring='r2')
+    assert np.allclose(result['cv_scores'], expected), "Scores divergem do Pipeline completo"
+    
+    # Segundo modelo reaproveita as matrizes dos folds
+    evaluator.evaluate(Ridge(alpha=10), X_processed, y, fold_preprocessor=fold_preprocessor)
+    assert fold_preprocessor.n_fits == 5, "Preprocessador deve ser ajustado uma vez por fold"
+    print(f"[OK] CV R^2: {result['metrics']['cv_r2_mean']:.4f} com {fold_preprocessor.n_fits} ajustes do preprocessador")
+
+
+def test_search_shares_fold_matrices():
+    """Busca usa os mesmos folds (e o mesmo cache) da avaliação"""
+    print("\n[TEST] Testando busca com preprocessamento por fold...")
+    X, y = _make_data()
+    preprocessor = make_pipeline(SimpleImputer(), StandardScaler())
+    fold_preprocessor = FoldPreprocessor(preprocessor, X, y)
+    X_processed = preprocessor.fit_transform(X)
+    
+    ModelEvaluator(cv=3, n_jobs=1).evaluate(Ridge(), X_processed, y, fold_preprocessor=fold_preprocessor)
+    search = BudgetedSearch(Ridge(), {'alpha': ('log', 0.01, 10)}, max_fits=30,
+                            cv=3, n_jobs=1, min_resources=40)
+    search.fit(X_processed, y, fold_preprocessor=fold_preprocessor)
+    
+    assert search.best_params_ is not None
+    assert fold_preprocessor.n_fits == 3, "Busca não deve reajustar o preprocessador"
+    print(f"[OK] {search.n_fits_} ajustes da busca com {fold_preprocessor.n_fits} ajustes do preprocessador")
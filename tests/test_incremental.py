@@ -0,0 +1,109 @@
+"""
+Testes do retreino incremental
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import joblib
+import pandas as pd
+from lightgbm import LGBMRegressor
+
+from src.bundle import list_versions, load_bundle, save_bundle
+from src.config import RAW_DATA_FILE, TARGET_COLUMN
+from src.data_preprocessing import DataPreprocessor, handle_outliers
+from src.evaluation import regression_metrics
+from src.feature_engineering import FeatureEngineer
+from src.incremental import (
+    IncrementalUpdater, build_training_state, compare_with_full_retrain, save_training_state, merge_stats,
+    numeric_stats
+)
+from src.serving import build_pipeline
+
+
+def _train_base(tmp_path, n_rows=2400):
+    """Treina um modelo nas primeiras linhas e salva os artefatos em tmp_path"""
+    prep = DataPreprocessor()
+    raw = prep.load_data(RAW_DATA_FILE)
+    df = FeatureEngineer.create_interaction_features(FeatureEngineer.create_features(raw.iloc[:n_rows]))
+    X, y = prep.split_features_target(handle_outliers(df, TARGET_COLUMN))
+    prep.create_preprocessor(*prep.identify_feature_types(X))
+    
+    model = LGBMRegressor(n_estimators=100, verbose=-1).fit(prep.fit_transform(X), y)
+    metrics = regression_metrics(y, model.predict(prep.transform(X)), prefix='test_')
+    
+    paths = {
+        'model_path': tmp_path / "model.pkl",
+        'preprocessor_path': tmp_path / "preprocessor.pkl",
+        'state_path': tmp_path / "state.json",
+        'data_path': tmp_path / "incremental.csv",
+        'onnx_path': tmp_path / "model.onnx",
+        'pipeline_path': tmp_path / "pipeline.pkl",
+        'outlier_detector_path': tmp_path / "outlier_detector.pkl",
+        'bundle_dir': tmp_path / "bundles"
+    }
+    joblib.dump(model, paths['model_path'])
+    joblib.dump(prep.preprocessor, paths['preprocessor_path'])
+    save_training_state(build_training_state(df, X, prep.preprocessor, 'LightGBM', metrics),
+                        paths['state_path'])
+    save_bundle(build_pipeline(model, prep), metrics, 'LightGBM', bundle_dir=paths['bundle_dir'])
+    return raw, paths
+
+
+def test_merge_stats():
+    """Combinar estatísticas de dois lotes equivale a calcular no total"""
+    print("\n[TEST] Testando combinação de estatísticas...")
+    df = pd.DataFrame({'a': [1.0, 2.0, 3.0, 4.0, 10.0, None]})
+    merged = merge_stats(numeric_stats(df.iloc[:2], ['a'])['a'], numeric_stats(df.iloc[2:], ['a'])['a'])
+    total = numeric_stats(df, ['a'])['a']
+    
+    assert merged['count'] == total['count']
+    assert abs(merged['mean'] - total['mean']) < 1e-9
+    assert abs(merged['m2'] - total['m2']) < 1e-9
+    print("[OK] Estatísticas combinadas corretamente")
+
+
+def test_incremental_update(tmp_path):
+    """Linhas novas atualizam o modelo; linhas já vistas são ignoradas"""
+    print("\n[TEST] Testando atualização incremental...")
+    raw, paths = _train_base(tmp_path)
+    
+    updater = IncrementalUpdater(**paths)
+    n_rounds = updater.model.booster_.current_iteration()
+    report = updater.update(raw.iloc[2400:], force=True)
+    
+    assert report['action'] == 'incremental'
+    assert updater.model.booster_.current_iteration() > n_rounds, "Modelo não ganhou rounds"
+    assert paths['data_path'].exists(), "Linhas ingeridas não foram guardadas"
+    assert len(list_versions(paths['bundle_dir'])) == 2, "Atualização não gerou nova versão do bundle"
+    assert load_bundle(paths['bundle_dir']).model.booster_.current_iteration() > n_rounds
+    
+    # Mesmo lote de novo: nada a ingerir
+    again = IncrementalUpdater(**paths).update(raw.iloc[2400:])
+    assert again['action'] == 'skip'
+    print(f"[OK] Atualização em {report['update_time']:.2f}s")
+
+
+def test_compare_with_full_retrain(monkeypatch):
+    """A comparação passa pelo mesmo update() do --update e mede os dois caminhos"""
+    print("\n[TEST] Testando incremental x retreino completo...")
+    calls = []
+    original = IncrementalUpdater.update
+    
+    def spy(self, new_df, force=False):
+        report = original(self, new_df, force=force)
+        calls.append(report)
+        return report
+    
+    monkeypatch.setattr(IncrementalUpdater, 'update', spy)
+    raw = DataPreprocessor().load_data(RAW_DATA_FILE)
+    report = compare_with_full_retrain(raw, LGBMRegressor(n_estimators=50, verbose=-1))
+    
+    assert list(report.index) == ['sem atualização', 'incremental', 'retreino completo']
+    assert len(calls) == 1 and calls[0]['action'] == 'incremental'
+    assert calls[0]['n_rows'] == int(len(raw) * 0.1)
+    assert report.loc['incremental', 'update_time'] == calls[0]['update_time'] > 0
+    assert report.loc['retreino completo', 'update_time'] > 0
+    assert (report['eval_r2'] > 0.7).all(), report['eval_r2'].to_dict()
+    print(f"[OK] Incremental {report.loc['incremental', 'update_time']:.2f}s "
+          f"x retreino {report.loc['retreino completo', 'update_time']:.2f}s")
@@ -0,0 +1,58 @@
+"""
+Testes do caminho de categorias nativas (LightGBM/XGBoost)
+"""
+import sys
+import warnings
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+from lightgbm import LGBMRegressor
+
+from src.config import RAW_DATA_FILE
+from src.data_preprocessing import DataPreprocessor
+
+
+def _native_data():
+    prep = DataPreprocessor()
+    df = prep.load_data(RAW_DATA_FILE)
+    X, y = prep.split_features_target(df)
+    num_features, cat_features = prep.identify_feature_types(X)
+    prep.create_native_preprocessor(num_features, cat_features)
+    return prep, X, y, cat_features
+
+
+def test_native_encoder_shape():
+    """Uma coluna por feature, categóricas como `category`"""
+    print("\n[TEST] Testando NativeCategoricalEncoder...")
+    prep, X, y, cat_features = _native_data()
+    
+    X_native = prep.fit_transform(X)
+    
+    assert X_native.shape == X.shape, "Categorias nativas não devem expandir colunas"
+    assert all(isinstance(X_native[c].dtype, pd.CategoricalDtype) for c in cat_features)
+    
+    # Categoria não vista vira ausente
+    X_unknown = X.head(1).copy()
+    X_unknown['Neighborhood'] = 'Desconhecido'
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')  # pandas 3 avisa (e o 4 recusa) valores fora das categorias
+        assert prep.transform(X_unknown)['Neighborhood'].isna().all()
+    print(f"[OK] {X_native.shape[1]} colunas")
+
+
+def test_codes_match_frame_predictions():
+    """Predição na matriz de códigos é idêntica à do DataFrame"""
+    print("\n[TEST] Testando predição com códigos das categorias...")
+    prep, X, y, _ = _native_data()
+    
+    X_native = prep.fit_transform(X)
+    model = LGBMRegressor(n_estimators=50, verbose=-1).fit(X_native, y)
+    
+    prep.preprocessor.set_params(output='codes')
+    codes = prep.transform(X.head(200))
+    
+    assert codes.dtype == np.float32
+    assert np.allclose(model.predict(codes), model.predict(X_native.head(200)))
+    print("[OK] Predições idênticas")
@@ -0,0 +1,69 @@
+"""
+Testes da exportação ONNX dos oito modelos e da paridade com o pickle
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import onnxruntime as rt
+import pytest
+from xgboost import XGBRegressor
+
+from src.model_export import ModelExporter, onnx_parity_report
+from src.model_training import ModelTrainer
+from src.stacking import StackedEnsemble
+
+
+def test_all_models_export_with_parity(fitted_data):
+    """Todos os modelos do ModelTrainer exportam e batem com o pickle em qualquer lote"""
+    print("\n[TEST] Testando paridade ONNX dos oito modelos...")
+    X_train, y_train, X_test = fitted_data.X_train, fitted_data.y_train.to_numpy(), fitted_data.X_test
+    models = ModelTrainer().get_models()
+    for model in models.values():
+        model.fit(X_train, y_train)
+
+    report = onnx_parity_report(models, X_test, batch_sizes=(1, 100, 1000), n_jobs=2, min_time=0.01)
+    assert list(report.index) == list(models)
+    assert report['exportado'].all(), report.get('erro')
+    assert report['paridade'].all(), report['max_rel_diff'].to_dict()
+    assert (report['onnx_kb'] > 0).all()
+    assert {'pkl_ms_b1', 'onnx_ms_b1000', 'speedup_b100'} <= set(report.columns)
+    print(f"[OK] Maior diferença relativa: {report['max_rel_diff'].max():.2e}")
+
+
+def test_stacked_ensemble_export(fitted_data):
+    """O ensemble exporta com os modelos base (cada um no seu tipo de entrada) e bate com o pickle"""
+    print("\n[TEST] Testando exportação ONNX do StackedEnsemble...")
+    X_train, y_train, X_test = fitted_data.X_train, fitted_data.y_train.to_numpy(), fitted_data.X_test
+    models = ModelTrainer().get_models()
+    estimators = [(name, models[name].fit(X_train, y_train)) for name in ('XGBoost', 'LightGBM', 'Ridge')]
+    ensembles = {
+        'com LightGBM': StackedEnsemble(estimators, np.array([0.5, 0.3, 0.2]), 1000.0),
+        'sem LightGBM': StackedEnsemble(estimators[::2], np.array([0.7, 0.3]), -500.0)
+    }
+
+    report = onnx_parity_report(ensembles, X_test, batch_sizes=(1, 100), n_jobs=1, min_time=0.01)
+    assert report['exportado'].all(), report.get('erro')
+    assert report['paridade'].all(), report['max_rel_diff'].to_dict()
+    session = rt.InferenceSession(ModelExporter.to_onnx(ensembles['com LightGBM'], X_test.shape[1]).SerializeToString())
+    assert ModelExporter.onnx_input_dtype(session) == np.float64
+    print(f"[OK] Maior diferença relativa: {report['max_rel_diff'].max():.2e}")
+
+
+def test_xgboost_early_stopping_and_unsupported(fitted_data):
+    """Só as árvores até best_iteration entram no ONNX; boosters sem conversão falham claramente"""
+    print("\n[TEST] Testando XGBoost com early stopping...")
+    X_train, y_train, X_test = fitted_data.X_train, fitted_data.y_train.to_numpy(), fitted_data.X_test
+    model = XGBRegressor(n_estimators=300, learning_rate=0.3, early_stopping_rounds=5)
+    model.fit(X_train[:1200], y_train[:1200], eval_set=[(X_train[1200:], y_train[1200:])], verbose=False)
+    assert model.best_iteration < 299, "Early stopping não parou antes do teto"
+
+    session = rt.InferenceSession(ModelExporter.to_onnx(model, X_test.shape[1]).SerializeToString())
+    y_onnx = ModelExporter.predict_onnx_batches(session, X_test, 100)
+    np.testing.assert_allclose(y_onnx, model.predict(X_test), rtol=1e-5)
+
+    dart = XGBRegressor(n_estimators=5, booster='dart').fit(X_train, y_train)
+    with pytest.raises(ValueError, match='dart'):
+        ModelExporter.to_onnx(dart, X_train.shape[1])
+    print(f"[OK] {model.best_iteration + 1} rounds exportados")
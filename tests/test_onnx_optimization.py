@@ -0,0 +1,64 @@
+"""
+Testes da otimização pós-exportação do ONNX (grafo e quantização int8)
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import onnx
+import onnxruntime as rt
+import pytest
+from onnx import numpy_helper
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.linear_model import Ridge
+
+from src.model_export import ModelExporter
+from src.onnx_optimization import linear_to_matmul, optimize_onnx, prune_unused
+
+
+@pytest.mark.parametrize('fitted_data', [2000], indirect=True)
+def test_graph_rewrites_keep_predictions(fitted_data):
+    """LinearRegressor -> MatMul + Add dá o mesmo resultado; initializers órfãos saem do grafo"""
+    print("\n[TEST] Testando reescritas do grafo...")
+    X_train, y_train, X_test = fitted_data.X_train, fitted_data.y_train, fitted_data.X_test
+    model = ModelExporter.to_onnx(Ridge().fit(X_train, y_train), X_train.shape[1])
+
+    rewritten = linear_to_matmul(model)
+    assert [node.op_type for node in rewritten.graph.node] == ['MatMul', 'Add']
+    before = ModelExporter.predict_onnx(rt.InferenceSession(model.SerializeToString()), X_test)
+    after = ModelExporter.predict_onnx(rt.InferenceSession(rewritten.SerializeToString()), X_test)
+    np.testing.assert_allclose(after, before, rtol=1e-5)
+
+    rewritten.graph.initializer.append(numpy_helper.from_array(np.zeros(3, dtype=np.float32), 'orfao'))
+    pruned = prune_unused(rewritten)
+    assert 'orfao' not in {init.name for init in pruned.graph.initializer}
+    assert len({opset.domain for opset in pruned.opset_import}) == len(pruned.opset_import)
+    print("[OK] Reescritas equivalentes")
+
+
+@pytest.mark.parametrize('fitted_data', [2000], indirect=True)
+def test_tolerance_decides_kept_variant(fitted_data, tmp_path):
+    """Quantizado só fica dentro da tolerância; árvores não têm variante int8"""
+    print("\n[TEST] Testando variantes e tolerância...")
+    X_train, y_train, X_test = fitted_data.X_train, fitted_data.y_train, fitted_data.X_test
+    path = ModelExporter.export_to_onnx(Ridge().fit(X_train, y_train), X_train, tmp_path / "ridge.onnx")
+
+    strict = optimize_onnx(path, X_test, tolerance=1e-6, output_path=tmp_path / "strict.onnx", min_time=0.01)
+    assert set(strict['variantes']) == {'original', 'otimizado', 'quantizado'}
+    assert not strict['variantes']['quantizado']['aceito'] and strict['mantido'] != 'quantizado'
+    for metrics in strict['variantes'].values():
+        assert {'size_kb', 'load_ms', 'latency_b1_ms', 'latency_b1000_ms', 'max_rel_diff'} <= set(metrics)
+
+    loose = optimize_onnx(path, X_test, tolerance=1.0, output_path=tmp_path / "int8.onnx", min_time=0.01)
+    assert loose['mantido'] == 'quantizado'
+    kept = onnx.load(tmp_path / "int8.onnx")
+    assert any(node.op_type.startswith('DynamicQuantize') for node in kept.graph.node)
+
+    gbr = GradientBoostingRegressor(n_estimators=20, random_state=0).fit(X_train, y_train)
+    path = ModelExporter.export_to_onnx(gbr, X_train, tmp_path / "gbr.onnx")
+    trees = optimize_onnx(path, X_test, min_time=0.01)
+    assert 'quantizado' not in trees['variantes'] and trees['mantido'] == 'otimizado'
+    y_kept = ModelExporter.predict_onnx(rt.InferenceSession(str(path)), X_test).ravel()
+    np.testing.assert_allclose(y_kept, gbr.predict(X_test), rtol=1e-5)
+    print(f"[OK] int8 do Ridge: diferença relativa {strict['variantes']['quantizado']['max_rel_diff']:.2e}")
@@ -0,0 +1,74 @@
+"""
+Testes dos limites de outlier por sketches combináveis
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+
+from src.config import RAW_DATA_FILE, TARGET_COLUMN
+from src.data_preprocessing import DataPreprocessor, handle_outliers
+from src.outliers import OutlierDetector, QuantileSketch
+
+
+def test_sketch_accuracy_and_merge():
+    """Quantis do t-digest (inclusive nas pontas) e merge equivalente a ler tudo"""
+    print("\n[TEST] Testando sketch de quantis...")
+    values = np.random.default_rng(0).lognormal(12, 0.4, 200_000)
+    q = np.array([0.001, 0.25, 0.75, 0.999])
+
+    whole = QuantileSketch()
+    for chunk in np.array_split(values, 40):
+        whole.update(chunk)
+    ranks = np.array([np.mean(values <= v) for v in whole.quantile(q)])
+    assert np.all(np.abs(ranks - q) < 0.002), f"Ranks fora da tolerância: {ranks}"
+    assert len(whole) < 500, "Sketch cresceu com os dados"
+
+    parts = [QuantileSketch().update(chunk) for chunk in np.array_split(values, 7)]
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+    merged_ranks = np.array([np.mean(values <= v) for v in merged.quantile(q)])
+    assert np.all(np.abs(merged_ranks - q) < 0.002)
+
+    # Merge num sketch vazio (como o fit_chunks): os centróides recebidos têm peso
+    empty = QuantileSketch()
+    for part in np.array_split(values, 2):
+        empty.merge(QuantileSketch().update(part))
+    empty_ranks = np.array([np.mean(values <= v) for v in empty.quantile(q)])
+    assert np.all(np.abs(empty_ranks - q) < 0.002), f"Ranks após merge no vazio: {empty_ranks}"
+
+    # Poucos valores: exato, como o pandas
+    small = values[:300]
+    np.testing.assert_allclose(QuantileSketch().update(small).quantile(q), pd.Series(small).quantile(q))
+    print(f"[OK] Ranks {np.round(ranks, 4)} com {len(whole)} centróides")
+
+
+def test_detector_chunks_and_inference(tmp_path):
+    """Limites por blocos em paralelo ~ handle_outliers; salvos e aplicados na inferência"""
+    print("\n[TEST] Testando detector multi-coluna...")
+    df = DataPreprocessor().load_data(RAW_DATA_FILE)
+    columns = [TARGET_COLUMN, 'Gr Liv Area', 'Lot Area']
+    chunks = [df.iloc[i:i + 400] for i in range(0, len(df), 400)]
+
+    serial = OutlierDetector(columns).fit_chunks(chunks, n_jobs=1)
+    parallel = OutlierDetector(columns).fit_chunks(chunks, n_jobs=2)
+    assert serial.bounds_ == parallel.bounds_, "Resultado depende de n_jobs"
+
+    # Mesmo corte do handle_outliers, a menos de poucas linhas na borda
+    expected = handle_outliers(df, TARGET_COLUMN, method='iqr')
+    target_only = OutlierDetector([TARGET_COLUMN]).fit_chunks(chunks).filter(df)
+    assert abs(len(target_only) - len(expected)) <= 0.005 * len(df)
+
+    zscore = OutlierDetector([TARGET_COLUMN], method='zscore', factor=3.0).fit_chunks(chunks)
+    mean, std = df[TARGET_COLUMN].mean(), df[TARGET_COLUMN].std()
+    np.testing.assert_allclose(zscore.bounds_[TARGET_COLUMN], [mean - 3 * std, mean + 3 * std])
+
+    path = serial.save(tmp_path / "detector.pkl")
+    loaded = OutlierDetector.load(path)
+    new = pd.DataFrame({'Gr Liv Area': [1500, 50_000, None], 'Lot Area': [9000, 9000, 1e7]})
+    flagged = loaded.anomalous_columns(new)
+    assert flagged == [[], ['Gr Liv Area'], ['Lot Area']], flagged
+    print(f"[OK] Limites do target: {serial.bounds_[TARGET_COLUMN]}")
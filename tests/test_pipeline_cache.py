@@ -0,0 +1,61 @@
+"""
+Testes do cache de estágios do pipeline
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from src.pipeline_cache import StageCache
+
+
+def _double(data):
+    return {'X': data['X'] * 2, 'meta': {'n': len(data['X'])}}
+
+
+def test_stage_cache_hit_and_miss(tmp_path):
+    """Segunda execução vem do cache; mudança de config ou arquivo invalida"""
+    print("\n[TEST] Cache de estágios...")
+    data_file = tmp_path / "data.csv"
+    data_file.write_text("a\n1\n")
+    calls = []
+    
+    def load():
+        calls.append('load')
+        return {'X': np.arange(10, dtype=float)}
+    
+    def run(seed):
+        cache = StageCache(tmp_path / "cache")
+        loaded = cache.stage('load', load, files=[data_file])
+        doubled = cache.stage('double', _double, inputs=[loaded], config={'seed': seed})
+        return cache, doubled.outputs
+    
+    cache, outputs = run(seed=1)
+    assert [e['status'] for e in cache.log] == ['miss', 'miss']
+    
+    cache, cached = run(seed=1)
+    assert [e['status'] for e in cache.log] == ['hit']
+    assert isinstance(cached['X'], np.memmap)
+    np.testing.assert_array_equal(cached['X'], outputs['X'])
+    assert cached['meta'] == {'n': 10}
+    
+    cache, _ = run(seed=2)
+    assert [e['status'] for e in cache.log] == ['hit', 'miss']
+    
+    data_file.write_text("a\n2\n")
+    cache, _ = run(seed=2)
+    assert [e['status'] for e in cache.log] == ['miss', 'miss']
+    assert calls == ['load', 'load']
+    print("[OK] Cache de estágios OK")
+
+
+def test_stage_cache_disabled(tmp_path):
+    """Com o cache desligado nada é gravado"""
+    print("\n[TEST] Cache desligado...")
+    cache = StageCache(tmp_path / "cache", enabled=False)
+    stage = cache.stage('load', lambda: {'X': np.ones(3)})
+    assert stage.outputs['X'].sum() == 3
+    assert cache.log[0]['status'] == 'disabled'
+    assert not (tmp_path / "cache").exists()
+    print("[OK] Cache desligado OK")
@@ -0,0 +1,58 @@
+"""
+Testes do profiler do pipeline de treino
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import json
+import numpy as np
+
+from src.profiling import RunProfiler
+
+
+def test_nested_sections_and_memory(tmp_path):
+    """Seções aninhadas, pico do tracemalloc e relatório em JSON"""
+    print("\n[TEST] Testando seções do profiler...")
+    profiler = RunProfiler(trace_memory=True).start()
+    
+    with profiler.section('train') as record:
+        with profiler.section('model:big'):
+            big = np.ones(4_000_000)  # ~32 MB
+            del big
+        with profiler.section('model:small'):
+            small = np.ones(1000)
+        record['n_models'] = 2
+    
+    profiler.stop()
+    sections = {r['name']: r for r in profiler.sections}
+    
+    assert set(sections) == {'train', 'train/model:big', 'train/model:small'}
+    assert sections['train']['n_models'] == 2
+    assert sections['train/model:big']['traced_peak_mb'] > 25
+    assert sections['train/model:small']['traced_peak_mb'] < 1
+    # O pico do filho conta para o pai
+    assert sections['train']['traced_peak_mb'] >= sections['train/model:big']['traced_peak_mb']
+    assert sections['train']['wall_time'] >= sections['train/model:big']['wall_time']
+    
+    profiler.save(tmp_path / "profile.json")
+    with open(tmp_path / "profile.json") as f:
+        report = json.load(f)
+    assert len(report['sections']) == 3 and 'wall_time' in report['summary']
+    print(f"[OK] Pico do modelo grande: {sections['train/model:big']['traced_peak_mb']:.1f} MB")
+
+
+def test_disabled_profiler_and_sampler(tmp_path):
+    """Profiler desligado não mede nada; cProfile grava o .prof"""
+    print("\n[TEST] Testando profiler desligado e amostragem...")
+    profiler = RunProfiler(enabled=False)
+    with profiler.section('train'):
+        pass
+    assert profiler.sections == []
+    
+    profiler = RunProfiler(sampler='cprofile').start()
+    with profiler.section('work'):
+        sum(i * i for i in range(10000))
+    summary = profiler.stop(sampler_path=tmp_path / "run")
+    assert Path(summary['sampler_output']).exists()
+    print("[OK] Profiler desligado e cProfile OK")
@@ -0,0 +1,81 @@
+"""
+Testes do log de requisições em segundo plano e do replay
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.linear_model import Ridge
+
+import api.main as api
+from src.replay import replay
+from src.request_log import PARQUET_AVAILABLE, RequestLogger, log_files, read_log
+from src.serving import build_pipeline
+
+PAYLOAD = {
+    "Gr_Liv_Area": 1500, "Overall_Qual": 7, "Overall_Cond": 5, "Year_Built": 2000, "Year_Remod_Add": 2000,
+    "Total_Bsmt_SF": 1000, "Full_Bath": 2, "Half_Bath": 1, "Bedroom_AbvGr": 3, "Kitchen_AbvGr": 1,
+    "TotRms_AbvGrd": 7, "Fireplaces": 1, "Garage_Cars": 2, "Garage_Area": 500
+}
+
+
+@pytest.fixture
+def served_api(fitted_data, monkeypatch):
+    """API com um Ridge pequeno carregado (sem depender dos artefatos de models/)"""
+    model = Ridge().fit(fitted_data.X_train, fitted_data.y_train)
+    pipeline = build_pipeline(model, fitted_data.prep)
+    monkeypatch.setattr(api, 'pipeline', pipeline)
+    monkeypatch.setattr(api, 'model_pkl', pipeline.named_steps['model'])
+    monkeypatch.setattr(api, 'outlier_detector', None)
+    monkeypatch.setattr(api, 'drift_monitor', None)
+    return TestClient(api.app)
+
+
+def test_api_capture_and_replay(served_api, tmp_path, monkeypatch):
+    """Predições vão para o log em lotes, com rotação, e o replay reproduz as respostas"""
+    print("\n[TEST] Testando captura e replay das requisições...")
+    logger = RequestLogger(tmp_path, batch_size=4, flush_seconds=0.05, rotate_records=5).start()
+    monkeypatch.setattr(api, 'request_logger', logger)
+
+    for area in range(1000, 2200, 100):
+        assert served_api.post("/predict/pkl", json={**PAYLOAD, "Gr_Liv_Area": area}).status_code == 200
+    assert served_api.post("/predict/batch", json=[PAYLOAD, PAYLOAD]).status_code == 200
+    assert served_api.post("/predict/pkl", json={"Gr_Liv_Area": "x"}).status_code == 422
+    served_api.get("/health")  # fora do /predict: não registrado
+    stats = served_api.get("/monitoring/requests").json()
+    assert stats['enabled'] and stats['received'] == 14 and stats['dropped'] == 0
+    logger.close()
+
+    records = list(read_log(tmp_path))
+    assert len(records) == 14 and len(log_files(tmp_path)) >= 2  # no máximo 5 + 3 por arquivo
+    assert [r['request']['Gr_Liv_Area'] for r in records[:12]] == list(range(1000, 2200, 100))
+    assert records[12]['path'] == '/predict/batch' and len(records[12]['response']) == 2
+    assert records[13]['status'] == 422
+    assert not list(tmp_path.glob('*.part'))
+
+    report = replay(records, served_api, speed=0, workers=4)
+    assert report['n_requests'] == 14 and report['errors'] == 0
+    assert report['status_mismatches'] == 0 and report['prediction_mismatches'] == 0
+    print(f"[OK] {len(records)} registros em {len(log_files(tmp_path))} arquivos; replay p50 "
+          f"{report['latency_ms']['p50']:.1f} ms")
+
+
+def test_backpressure_drops_without_blocking(tmp_path):
+    """Fila cheia descarta e conta; a thread grava o que ficou; keep poda os arquivos antigos"""
+    print("\n[TEST] Testando descarte sob pressão e formato parquet...")
+    fmt = 'parquet' if PARQUET_AVAILABLE else 'jsonl'
+    logger = RequestLogger(tmp_path, fmt=fmt, batch_size=2, queue_size=5, rotate_records=2, keep=2)
+    accepted = [logger.log('POST', '/predict/raw', 200, 1.0, b'{"a": %d}' % i, b'{"predicted_price": 1.0}')
+                for i in range(20)]
+    assert sum(accepted) == 5 and logger.stats()['dropped'] == 15
+    logger.start().close()
+
+    assert logger.counters['written'] == 5 and logger.counters['files'] == 3
+    files = log_files(tmp_path)
+    assert len(files) == 2 and files[0].name.endswith('.parquet' if fmt == 'parquet' else '.jsonl.gz')
+    assert [r['request']['a'] for r in read_log(tmp_path)] == [2, 3, 4]
+    with pytest.raises(ValueError):
+        RequestLogger(tmp_path, fmt='csv')
+    print(f"[OK] {logger.counters['dropped']} descartados; {fmt} legível")
@@ -0,0 +1,117 @@
+"""
+Testes do pipeline servido (features + preprocessador + modelo)
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+from lightgbm import LGBMRegressor
+from sklearn.linear_model import Ridge
+
+import api.main as api
+
+from src.config import RAW_DATA_FILE
+from src.data_preprocessing import DataPreprocessor
+from src.feature_engineering import FeatureEngineer
+from src.serving import build_pipeline, load_pipeline, save_pipeline, score_file
+
+
+def _fit(native: bool = False, n_rows: int = 1500):
+    """Treina um modelo pequeno; retorna dados brutos, preprocessador e modelo"""
+    prep = DataPreprocessor()
+    raw = prep.load_data(RAW_DATA_FILE)
+    X, y = prep.split_features_target(FeatureEngineer.create_all_features(raw.iloc[:n_rows]))
+    features = prep.identify_feature_types(X)
+    if native:
+        prep.create_native_preprocessor(*features)
+        model = LGBMRegressor(n_estimators=30, verbose=-1).fit(prep.fit_transform(X), y)
+        prep.preprocessor.set_params(output='codes')
+    else:
+        prep.create_preprocessor(*features)
+        model = Ridge().fit(prep.fit_transform(X), y)
+    return raw, prep, model
+
+
+def _manual_predict(raw, prep, model):
+    X, _ = prep.split_features_target(FeatureEngineer.create_all_features(raw))
+    return model.predict(prep.transform(X))
+
+
+def test_pipeline_matches_manual_path():
+    """pipeline.predict nos dados brutos = features + transform + predict à mão"""
+    print("\n[TEST] Testando pipeline x caminho manual...")
+    for native in (False, True):
+        raw, prep, model = _fit(native)
+        pipeline = build_pipeline(model, prep)
+        new = raw.iloc[2000:2300]
+
+        np.testing.assert_allclose(pipeline.predict(new), _manual_predict(new, prep, model), rtol=1e-9)
+        print(f"[OK] {'Nativo' if native else 'One-hot'}: predições idênticas")
+
+
+def test_pipeline_accepts_records():
+    """Dicts com nomes do CSV ou da API, e registros incompletos"""
+    print("\n[TEST] Testando entrada em registros...")
+    raw, prep, model = _fit()
+    pipeline = build_pipeline(model, prep)
+    new = raw.iloc[2000:2010].drop(columns=['SalePrice'])
+    expected = pipeline.predict(new)
+
+    records = new.astype(object).where(new.notna(), None).to_dict('records')
+    np.testing.assert_allclose(pipeline.predict(records), expected, rtol=1e-9)
+    np.testing.assert_allclose(pipeline.predict(records[0]), expected[:1], rtol=1e-9)
+
+    # Nomes no estilo da API (Gr_Liv_Area) e números como texto
+    aliased = {key.replace(' ', '_').replace('/', '_'): value for key, value in records[0].items()}
+    aliased['Gr_Liv_Area'] = str(aliased['Gr_Liv_Area'])
+    np.testing.assert_allclose(pipeline.predict(aliased), expected[:1], rtol=1e-9)
+
+    # Campos ausentes são imputados
+    partial = pipeline.predict({'Gr_Liv_Area': 1500, 'Overall_Qual': 7, 'Neighborhood': 'NAmes'})
+    assert np.isfinite(partial).all()
+    print("[OK] Registros, aliases e campos ausentes aceitos")
+
+
+def test_save_load_and_score_file(tmp_path):
+    """Artefato único salvo/carregado e pontuação em lote de um CSV"""
+    print("\n[TEST] Testando artefato e pontuação em lote...")
+    raw, prep, model = _fit()
+    pipeline_path = save_pipeline(build_pipeline(model, prep), tmp_path / "pipeline.pkl")
+    pipeline = load_pipeline(pipeline_path)
+
+    new = raw.iloc[2000:2500]
+    input_path = tmp_path / "novas.csv"
+    new.to_csv(input_path, index=False)
+    stats = score_file(input_path, tmp_path / "predicoes.csv", pipeline, chunk_size=200)
+
+    scored = pd.read_csv(tmp_path / "predicoes.csv")
+    assert stats['n_rows'] == len(new) == len(scored)
+    assert (scored['PID'].to_numpy() == new['PID'].to_numpy()).all()
+    np.testing.assert_allclose(scored['predicted_price'], _manual_predict(new, prep, model), rtol=1e-6)
+    print(f"[OK] {stats['n_rows']} linhas pontuadas ({stats['rows_per_sec']:,.0f} linhas/s)")
+
+
+def test_predict_raw_rejects_incomplete_records(monkeypatch):
+    """Os endpoints tipados imputam ausentes; o /predict/raw exige o registro do CSV"""
+    print("\n[TEST] Testando /predict/raw com registros incompletos...")
+    raw, prep, model = _fit()
+    pipeline = build_pipeline(model, prep)
+    for name, value in [('pipeline', pipeline), ('model_pkl', model), ('bundle', None),
+                        ('outlier_detector', None), ('drift_monitor', None), ('request_logger', None)]:
+        monkeypatch.setattr(api, name, value)
+    client = TestClient(api.app)
+
+    record = raw.iloc[2000].drop('SalePrice')
+    record = record.astype(object).where(record.notna(), None).to_dict()
+    response = client.post("/predict/raw", json=record)
+    assert response.status_code == 200
+    assert np.isclose(response.json()['predicted_price'], pipeline.predict(record)[0])
+
+    for payload in ({}, {"Foo": 1}, {"Gr Liv Area": 1500, "Overall Qual": 7}):
+        response = client.post("/predict/raw", json=payload)
+        assert response.status_code == 422, payload
+        assert 'Registro incompleto' in response.json()['detail']
+    print("[OK] Registro completo aceito; vazio, desconhecido e parcial rejeitados com 422")
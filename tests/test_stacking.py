@@ -0,0 +1,45 @@
+"""
+Testes do stacking com predições out-of-fold
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+from sklearn.datasets import make_regression
+from sklearn.linear_model import Ridge
+from sklearn.tree import DecisionTreeRegressor
+from sklearn.neighbors import KNeighborsRegressor
+
+from src.evaluation import ModelEvaluator
+from src.stacking import build_stacked_ensemble
+
+
+def test_stacking_from_oof_predictions():
+    """Meta-modelo ajustado só nas predições OOF, servido em uma passada"""
+    print("\n[TEST] Testando stacking...")
+    X, y = make_regression(n_samples=300, n_features=8, noise=20.0, random_state=42)
+    X_train, y_train, X_test, y_test = X[:240], y[:240], X[240:], y[240:]
+    
+    evaluator = ModelEvaluator(cv=5, n_jobs=1)
+    models = {
+        'Ridge': Ridge(),
+        'Tree': DecisionTreeRegressor(max_depth=4, random_state=42),
+        'KNN': KNeighborsRegressor()
+    }
+    evaluations = {n: evaluator.evaluate(m, X_train, y_train, X_test, y_test) for n, m in models.items()}
+    fitted = {n: e['model'] for n, e in evaluations.items()}
+    
+    result = build_stacked_ensemble(evaluations, y_train, X_test, y_test, top_k=3)
+    ensemble, metrics = result['model'], result['metrics']
+    
+    assert all(w >= 0 for w in result['weights'].values()), "Pesos devem ser não negativos"
+    # Os modelos base servidos são os mesmos objetos já ajustados (sem refit)
+    assert all(model is fitted[name] for name, model in ensemble.estimators)
+    
+    expected = sum(w * evaluations[n]['test_predictions'] for n, w in result['weights'].items())
+    assert np.allclose(ensemble.predict(X_test), expected + ensemble.intercept)
+    assert metrics['oof_r2'] >= result['baseline']['oof_r2'] - 0.01
+    assert metrics['latency_ratio'] > 0
+    print(f"[OK] OOF R^2 {metrics['oof_r2']:.4f} vs {result['baseline']['oof_r2']:.4f} "
+          f"({result['baseline']['name']}), latência {metrics['latency_ratio']:.1f}x")
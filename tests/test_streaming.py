@@ -0,0 +1,96 @@
+"""
+Testes do treino em streaming (out-of-core)
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import Ridge
+
+from src.config import RAW_DATA_FILE
+from src.data_preprocessing import DataPreprocessor
+from src.streaming import RowSample, StreamingStats, StreamingTrainer, holdout_mask
+
+
+def _train_frame(trainer):
+    X_parts, y_parts = zip(*trainer.chunks('train'))
+    return pd.concat(X_parts), pd.concat(y_parts)
+
+
+def test_streaming_preprocessor_matches_in_memory():
+    """Estatísticas por blocos geram o mesmo preprocessador (e a mesma Ridge) do ajuste em memória"""
+    print("\n[TEST] Testando preprocessador em streaming...")
+    trainer = StreamingTrainer(RAW_DATA_FILE, chunk_size=700, sample_size=10_000)
+    trainer.fit_target_bounds()
+    trainer.fit_preprocessor()
+    X, y = _train_frame(trainer)
+    
+    reference = DataPreprocessor()
+    reference.create_preprocessor(*reference.identify_feature_types(X))
+    expected = reference.fit_transform(X)
+    
+    assert trainer.preprocessor.feature_names == reference.feature_names
+    np.testing.assert_allclose(trainer.preprocessor.transform(X), expected, atol=1e-9)
+    
+    ridge = trainer.fit_ridge()
+    np.testing.assert_allclose(ridge.predict(expected), Ridge(alpha=1.0).fit(expected, y).predict(expected),
+                               rtol=1e-6)
+    print(f"[OK] {expected.shape[1]} features idênticas em {trainer.stats.n_rows} linhas")
+
+
+def test_mergeable_pieces():
+    """Amostra e estatísticas combinadas = lidas de uma vez; split estável"""
+    print("\n[TEST] Testando estatísticas combináveis...")
+    values = np.arange(1000, dtype=float)
+    sample = RowSample(50, random_state=0).update(values[:600]).merge(RowSample(50, random_state=1).update(values[600:]))
+    assert len(sample.values) == 50 and len(np.unique(sample.values)) == 50
+    
+    X = pd.DataFrame({'a': [1.0, np.nan, 3.0, 4.0], 'c': pd.Series(['x', None, 'y', 'x'], dtype=object)})
+    whole = StreamingStats(['a'], ['c'], sample_size=10).update(X)
+    merged = StreamingStats(['a'], ['c'], sample_size=10).update(X[:2]).merge(
+        StreamingStats(['a'], ['c'], sample_size=10).update(X[2:]))
+    assert merged.category_counts == whole.category_counts == {'c': {'x': 2, 'y': 1}}
+    assert merged.vocabulary('c') == ['missing', 'x', 'y']
+    assert np.isclose(merged.moments['a']['mean'], whole.moments['a']['mean'])
+    assert merged.medians()[0] == 3.0
+    
+    df = pd.DataFrame({'PID': np.arange(10_000)})
+    mask = holdout_mask(df)
+    assert np.array_equal(mask, holdout_mask(df)) and 0.18 < mask.mean() < 0.22
+    print("[OK] Merge e split OK")
+
+
+def test_holdout_independent_of_target_bounds(tmp_path):
+    """Sem PID, o split usa a posição no arquivo: os limites do target só tiram linhas de cada lado"""
+    print("\n[TEST] Testando split sem PID com filtro do target...")
+    csv = tmp_path / "sem_pid.csv"
+    pd.read_csv(RAW_DATA_FILE).drop(columns=['PID']).to_csv(csv, index=False)
+    trainer = StreamingTrainer(csv, chunk_size=700)
+    
+    def split_rows(bounds):
+        # Índice dos blocos = posição da linha no arquivo
+        trainer.target_bounds = bounds
+        return [{row for X, _ in trainer.chunks(split) for row in X.index} for split in ('test', 'train')]
+    
+    all_test, all_train = split_rows((-np.inf, np.inf))
+    test, train = split_rows((100_000, 300_000))
+    prices = pd.read_csv(RAW_DATA_FILE)['SalePrice']
+    inside = set(prices[(prices >= 100_000) & (prices <= 300_000)].index)
+    assert test == all_test & inside and train == all_train & inside
+    print(f"[OK] {len(test)} linhas de teste dentro dos limites")
+
+
+def test_streaming_run_xgboost():
+    """Execução completa com XGBoost em memória externa"""
+    print("\n[TEST] Testando treino em streaming com XGBoost...")
+    trainer = StreamingTrainer(RAW_DATA_FILE, chunk_size=1000, n_rounds=30)
+    results = trainer.run()
+    assert set(results) == {'Ridge', 'XGBoost'}
+    assert results['XGBoost']['test_r2'] > 0.8 and results['Ridge']['test_r2'] > 0.8
+    
+    X, _ = next(trainer.chunks('test'))
+    predictions = trainer.models['XGBoost'].predict(trainer.preprocessor.transform(X))
+    assert predictions.shape == (len(X),)
+    print(f"[OK] R^2 XGBoost: {results['XGBoost']['test_r2']:.4f}")
@@ -4,9 +4,12 @@ Script principal de treinamento do pipeline completo
 TODO: precisa refatorar 
 """
 import sys
+import argparse
+import json
 from pathlib import Path
 import pandas as pd
 import numpy as np
+from sklearn.base import clone
 from sklearn.model_selection import train_test_split
 import joblib
 import warnings
@@ -17,134 +20,386 @@ warnings.filterwarnings('ignore')
 # dicionar src ao path
 sys.path.append(str(Path(__file__).parent))
 
+import src.data_loading
+import src.data_preprocessing
+import src.encoders
+import src.feature_engineering
 from src.config import (
     RAW_DATA_FILE, RANDOM_STATE, TEST_SIZE, 
-    MODELS_DIR, TARGET_COLUMN
+    MODELS_DIR, MODEL_ONNX_PATH, TARGET_COLUMN, NATIVE_CATEGORICAL_BOOSTERS, INCREMENTAL_DATA_FILE,
+    STREAMING_CHUNK_SIZE, COMPACT_SERVING_ARTIFACT, CATEGORICAL_ENCODINGS, TARGET_ENCODING_FOLDS,
+    TARGET_ENCODING_SMOOTHING, HASH_ENCODING_BUCKETS, ONNX_PARITY_REPORT, ONNX_REPORT_PATH,
+    ONNX_OPTIMIZE, ONNX_OPTIMIZATION_REPORT_PATH
 )
-from src.data_preprocessing import DataPreprocessor, handle_outliers
+from src.data_loading import apply_schema, load_dataset
+from src.data_preprocessing import DataPreprocessor, feature_lists, handle_outliers
 from src.feature_engineering import FeatureEngineer
 from src.model_training import ModelTrainer
-from src.model_export import ModelExporter, export_full_pipeline
+from src.evaluation import regression_metrics
+from src.model_export import ONNX_AVAILABLE, ModelExporter, export_full_pipeline, onnx_parity_report
+from src.native_categorical import compare_categorical_paths
+from src.incremental import IncrementalUpdater, compare_with_full_retrain, build_training_state, save_training_state
+from src.pipeline_cache import StageCache
+from src.fold_preprocessing import FoldPreprocessor
+from src.profiling import RunProfiler
+from src.checkpoint import CheckpointStore
+from src.streaming import StreamingTrainer
+from src.serving import build_pipeline, save_pipeline
+from src.bundle import save_bundle
+from src.drift import reference_monitor
+from src.compaction import compact
+from src.outliers import input_detector
 
 
-def main():
-    """Executa o pipeline completo de treinamento"""
-    
-    print("="*80)
-    print("AMES HOUSING PRICE PREDICTION - PIPELINE DE TREINAMENTO")
-    print("="*80)
-    
-    # 1. CARREGAR DADOS
-    print("\n[1/7] Carregando dados...")
+def stage_load() -> dict:
+    """[1/7] Carrega o CSV (mais as vendas ingeridas pelo modo incremental)"""
     preprocessor = DataPreprocessor()
     df = preprocessor.load_data(RAW_DATA_FILE)
     
+    # Vendas ingeridas pelo modo incremental entram no retreino completo
+    if INCREMENTAL_DATA_FILE.exists():
+        df_new = preprocessor.load_data(INCREMENTAL_DATA_FILE)
+        df = pd.concat([df, df_new], ignore_index=True).drop_duplicates(subset='PID', keep='last')
+        df = apply_schema(df)
+    
     print(f"Shape original: {df.shape}")
     print(f"Valores ausentes:\n{df.isnull().sum().sum()} no total")
     # print(df.head())  # debug
     # print(df.info())
-    
-    # 2. FEATURE ENGINEERING
-    print("\n[2/7] Criando novas feats...")
-    engineer = FeatureEngineer()
-    df = engineer.create_features(df)
-    df = engineer.create_interaction_features(df)
-    
-    # 3. TRATAR OUTLIERS DO TARGET
-    print("\n[3/7] Tratando outliers do target...")
-    df_clean = handle_outliers(df, TARGET_COLUMN, method='iqr')
-    
-    # 4. SEPARAR FEATURES E TARGET
-    print("\n[4/7] Preparando feats e target...")
-    X, y = preprocessor.split_features_target(df_clean)
+    return {'df': df}
+
+
+def stage_features(loaded: dict) -> dict:
+    """[2/7] Feature engineering"""
+    df = FeatureEngineer.create_all_features(loaded['df'])
+    print(f"Feats criadas. Shape atual: {df.shape}")
+    return {'df': df}
+
+
+def stage_outliers(features: dict) -> dict:
+    """[3/7] Remove outliers do target"""
+    return {'df': handle_outliers(features['df'], TARGET_COLUMN, method='iqr')}
+
+
+def stage_preprocess(cleaned: dict) -> dict:
+    """[4/7] Split treino/teste e ajuste do(s) preprocessador(es)"""
+    preprocessor = DataPreprocessor()
+    X, y = preprocessor.split_features_target(cleaned['df'])
     
     # Identificar tipos de features
     numerical_features, categorical_features = preprocessor.identify_feature_types(X)
     
     # Criar preprocessador
-    preprocessor.create_preprocessor(numerical_features, categorical_features)
+    preprocessor.create_preprocessor(numerical_features, categorical_features, CATEGORICAL_ENCODINGS)
     
     # Split treino/teste
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE
     )
     
-    print(f"Treino: {X_train.shape}, Teste: {X_test.shape}")
-    
     # Transformar dados
-    X_train_processed = preprocessor.fit_transform(X_train, y_train)
-    X_test_processed = preprocessor.transform(X_test)
+    outputs = {
+        'X_train': X_train,
+        'X_test': X_test,
+        'y_train': y_train,
+        'y_test': y_test,
+        'X_train_processed': preprocessor.fit_transform(X_train, y_train),
+        'X_test_processed': preprocessor.transform(X_test),
+        'preprocessor': preprocessor,
+        'native_preprocessor': None,
+        'native_train': None,
+        'native_test': None
+    }
     
-    print(f"Shape após pré-processamento: {X_train_processed.shape}")
+    # Caminho de categorias nativas para XGBoost/LightGBM (opcional)
+    if NATIVE_CATEGORICAL_BOOSTERS:
+        native_preprocessor = DataPreprocessor()
+        native_preprocessor.create_native_preprocessor(numerical_features, categorical_features)
+        outputs['native_train'] = native_preprocessor.fit_transform(X_train, y_train)
+        outputs['native_test'] = native_preprocessor.transform(X_test)
+        outputs['native_preprocessor'] = native_preprocessor
     
-    # Salvar preprocessador
-    preprocessor.save_preprocessor()
-    
-    # 5. TREINAR MODELOS
-    print("\n[5/7] Treinando modelos...")
-    print("-"*80)
+    return outputs
+
+
+def main(use_cache: bool = True, profile_memory: bool = False, sampler: str = None,
+         resume: bool = False):
+    """Executa o pipeline completo de treinamento
     
-    trainer = ModelTrainer(random_state=RANDOM_STATE)
-    results = trainer.train_models(
-        X_train_processed, y_train,
-        X_test_processed, y_test
-    )
+    Args:
+        use_cache: Reaproveita os estágios 1-4 do cache em disco
+        profile_memory: Mede o pico de alocações por seção (tracemalloc, mais lento)
+        sampler: Profiler de amostragem opcional ('pyinstrument' ou 'cprofile')
+        resume: Retoma uma execução interrompida a partir dos checkpoints
+    """
     
-    # Mostrar resultados
-    print("\n" + "="*80)
-    print("RESULTADOS DOS MODELOS")
     print("="*80)
-    results_df = trainer.get_results_dataframe()
-    print(results_df[['test_r2', 'test_rmse', 'test_mae', 'cv_r2_mean']].to_string())
+    print("AMES HOUSING PRICE PREDICTION - PIPELINE DE TREINAMENTO")
+    print("="*80)
     
-    # Salvar resultados
-    trainer.save_results(MODELS_DIR / "training_results.json")
+    # Tempo/memória por estágio e por modelo (models/training_profile.json)
+    profiler = RunProfiler(trace_memory=profile_memory, sampler=sampler).start()
     
-    # 6. OTIMIZAÇÃO DE HIPERPARÂMETROS (opcional)
-    print("\n[6/7] Otimizando hiperparâmetros do melhor modelo...")
+    # Estágios 1-4 com cache em disco (chave = dados + código + config)
+    cache = StageCache(enabled=use_cache, profiler=profiler)
+    loaded = cache.stage(
+        'load', stage_load,
+        files=[RAW_DATA_FILE, INCREMENTAL_DATA_FILE],
+        code=[src.data_loading, src.data_preprocessing]
+    )
+    features = cache.stage(
+        'features', stage_features, inputs=[loaded],
+        code=[src.feature_engineering]
+    )
+    cleaned = cache.stage(
+        'outliers', stage_outliers, inputs=[features],
+        code=[handle_outliers], config={'TARGET_COLUMN': TARGET_COLUMN}
+    )
+    prepared = cache.stage(
+        'preprocess', stage_preprocess, inputs=[cleaned],
+        code=[src.data_preprocessing, src.encoders],
+        config={
+            'RANDOM_STATE': RANDOM_STATE,
+            'TEST_SIZE': TEST_SIZE,
+            'TARGET_COLUMN': TARGET_COLUMN,
+            'NATIVE_CATEGORICAL_BOOSTERS': NATIVE_CATEGORICAL_BOOSTERS,
+            'CATEGORICAL_ENCODINGS': CATEGORICAL_ENCODINGS,
+            'TARGET_ENCODING_FOLDS': TARGET_ENCODING_FOLDS,
+            'TARGET_ENCODING_SMOOTHING': TARGET_ENCODING_SMOOTHING,
+            'HASH_ENCODING_BUCKETS': HASH_ENCODING_BUCKETS
+        }
+    )
     
-    # TODO : testar com a otimização habilitada
+    # 1. CARREGAR DADOS / 2. FEATURE ENGINEERING / 3. TRATAR OUTLIERS DO TARGET
+    # (só rodam se o estágio seguinte não estiver em cache)
+    print("\n[1-3/7] Carregando dados, criando novas feats e tratando outliers...")
     
-    # 7. EXPORTAR MODELOS
-    print("\n[7/7] Exportando modelos...")
+    # 4. SEPARAR FEATURES E TARGET
+    print("\n[4/7] Preparando feats e target...")
+    data = prepared.outputs
+    X_train, X_test = data['X_train'], data['X_test']
+    y_train, y_test = data['y_train'], data['y_test']
+    X_train_processed = data['X_train_processed']
+    X_test_processed = data['X_test_processed']
+    preprocessor = data['preprocessor']
+    native_preprocessor = data['native_preprocessor']
+    native_data = None
+    if native_preprocessor is not None:
+        native_data = (data['native_train'], data['native_test'])
+        print(f"Shape com categorias nativas: {native_data[0].shape}")
     
-    # Salvar modelo pickle
-    trainer.save_model()
+    print(f"Treino: {X_train.shape}, Teste: {X_test.shape}")
+    print(f"Shape após pré-processamento: {X_train_processed.shape}")
+    cache.report()
     
-    # Exportar para ONNX
-    exporter = ModelExporter()
+    # Salvar preprocessador
+    preprocessor.save_preprocessor()
     
-    # Amostra para ONNX
-    X_sample = X_test_processed[:10]
+    # 5. TREINAR MODELOS
+    with profiler.section('train'):
+        print("\n[5/7] Treinando modelos...")
+        print("-"*80)
+        
+        # CV sem vazamento: preprocessador reajustado em cada fold, com as
+        # matrizes dos folds compartilhadas entre modelos e trials da busca
+        fold_preprocessors = {'onehot': FoldPreprocessor(preprocessor.preprocessor, X_train, y_train)}
+        if native_preprocessor is not None:
+            fold_preprocessors['native'] = FoldPreprocessor(native_preprocessor.preprocessor, X_train, y_train)
+        
+        # Cada modelo avaliado é salvo em models/checkpoints/ assim que termina
+        checkpoints = CheckpointStore(run_key=prepared.key, resume=resume)
+        if resume:
+            print(f"Retomando a partir de: {checkpoints.run_dir}")
+        
+        trainer = ModelTrainer(random_state=RANDOM_STATE, profiler=profiler, checkpoints=checkpoints)
+        results = trainer.train_models(
+            X_train_processed, y_train,
+            X_test_processed, y_test,
+            native_data=native_data,
+            fold_preprocessors=fold_preprocessors
+        )
+        
+        if NATIVE_CATEGORICAL_BOOSTERS:
+            # Mesmos rounds fixos nos dois caminhos para uma comparação justa
+            compare_categorical_paths(
+                ModelTrainer(random_state=RANDOM_STATE, early_stopping_rounds=None).get_models(),
+                (X_train_processed, X_test_processed),
+                native_data,
+                y_train, y_test,
+                codes_sample=native_preprocessor.preprocessor.transform_codes(X_test[:10])
+            )
+        
+        # Stacking dos melhores modelos com as predições out-of-fold já calculadas
+        print("\nStacking dos melhores modelos...")
+        best_preprocessing = trainer.model_preprocessing[trainer.best_model_name]
+        trainer.build_ensemble(
+            y_train,
+            native_data[1] if best_preprocessing == 'native' else X_test_processed,
+            y_test,
+            preprocessing=best_preprocessing
+        )
+        
+        # O melhor modelo define qual preprocessador é servido
+        best_is_native = trainer.model_preprocessing.get(trainer.best_model_name) == 'native'
+        
+        # Mostrar resultados
+        print("\n" + "="*80)
+        print("RESULTADOS DOS MODELOS")
+        print("="*80)
+        results_df = trainer.get_results_dataframe()
+        print(results_df[['test_r2', 'test_rmse', 'test_mae', 'cv_r2_mean', 'n_fits', 'fit_time']].to_string())
+        print(f"\nTotal de ajustes: {trainer.run_stats['n_fits']} "
+              f"| Tempo total de treino: {trainer.run_stats['wall_time']:.2f}s")
+        
+        # Salvar resultados
+        trainer.save_results(MODELS_DIR / "training_results.json")
     
-    onnx_path = exporter.export_to_onnx(
-        trainer.best_model,
-        X_sample
-    )
+    # 6. OTIMIZAÇÃO DE HIPERPARÂMETROS (opcional)
+    with profiler.section('tuning'):
+        print("\n[6/7] Otimizando hiperparâmetros do melhor modelo...")
+        
+        # Successive halving com orçamento (SEARCH_MAX_TIME / SEARCH_MAX_FITS em config.py)
+        X_train_best, X_test_best = native_data if best_is_native else (X_train_processed, X_test_processed)
+        default_model = trainer.best_model
+        trainer.hyperparameter_tuning(
+            X_train_best, y_train, method='budgeted',
+            fold_preprocessor=fold_preprocessors['native' if best_is_native else 'onehot']
+        )
+        
+        # Métricas do modelo servido: as do padrão, ou as do ajustado se a busca o adotou
+        served_metrics = dict(results[trainer.best_model_name])
+        if trainer.best_model is not default_model:
+            tuning = trainer.tuning_results[trainer.best_model_name]
+            tuned_metrics = regression_metrics(y_test, trainer.best_model.predict(X_test_best), prefix='test_')
+            print(f"R^2 no teste após otimização: {tuned_metrics['test_r2']:.4f}")
+            tuning.update(tuned_metrics)
+            served_metrics.update(tuned_metrics, cv_r2_mean=tuning['tuned_cv_r2'],
+                                  cv_r2_std=tuning['tuned_cv_r2_std'], tuned=True)
+        
+        trainer.save_results(MODELS_DIR / "training_results.json")
     
-    # Verificar exportação ONNX
-    if onnx_path:
-        onnx_session = exporter.load_onnx_model(onnx_path)
-        exporter.verify_onnx_export(
+    # 7. EXPORTAR MODELOS
+    with profiler.section('export'):
+        print("\n[7/7] Exportando modelos...")
+        
+        # Modelo com categorias nativas: o preprocessador servido é o nativo
+        # e o ONNX recebe os códigos das categorias
+        serving_preprocessor = preprocessor
+        X_onnx = X_test_processed
+        if best_is_native:
+            serving_preprocessor = native_preprocessor
+            serving_preprocessor.preprocessor.set_params(output='codes')
+            serving_preprocessor.save_preprocessor()
+            X_onnx = serving_preprocessor.transform(X_test)
+        elif COMPACT_SERVING_ARTIFACT:
+            # Tira do artefato servido as colunas que o modelo nunca usa (predições idênticas)
+            compacted = compact(trainer.best_model, preprocessor, X_test)
+            report = compacted['report']
+            if compacted['model'] is not None:
+                print(f"Compactação: {report['n_columns']} -> {report['n_used']} colunas "
+                      f"(diferença máx. {report['max_abs_diff']:.2e})")
+                trainer.best_model = compacted['model']
+                serving_preprocessor = compacted['preprocessor']
+                serving_preprocessor.save_preprocessor()
+                X_onnx = X_test_best = serving_preprocessor.transform(X_test)
+            else:
+                print(f"Compactação não aplicada: {report['status']}")
+        
+        # Salvar modelo pickle
+        trainer.save_model()
+        
+        # Exportar para ONNX
+        exporter = ModelExporter()
+        
+        # Amostra para ONNX
+        X_sample = X_onnx[:10]
+        
+        onnx_path = exporter.export_to_onnx(
             trainer.best_model,
-            onnx_session,
-            X_test_processed[:100]
+            X_sample
+        )
+        
+        # Verificar exportação ONNX
+        if onnx_path:
+            onnx_session = exporter.load_onnx_model(onnx_path)
+            exporter.verify_onnx_export(
+                trainer.best_model,
+                onnx_session,
+                X_test_best,
+                X_onnx=X_onnx
+            )
+            
+            # Otimização pós-exportação (opcional): troca o ONNX só dentro da tolerância
+            if ONNX_OPTIMIZE:
+                from src.onnx_optimization import optimize_onnx
+                print("\nOtimizando o ONNX exportado...")
+                optimization = optimize_onnx(onnx_path, X_onnx)
+                with open(ONNX_OPTIMIZATION_REPORT_PATH, 'w') as f:
+                    json.dump(optimization, f, indent=4)
+        elif MODEL_ONNX_PATH.exists():
+            # Não deixa um ONNX de outro modelo sendo servido pela API
+            MODEL_ONNX_PATH.unlink()
+            print(f"ONNX antigo removido: {MODEL_ONNX_PATH}")
+        
+        # Paridade e latência ONNX de todos os modelos do caminho one-hot
+        if ONNX_PARITY_REPORT and ONNX_AVAILABLE:
+            onnx_report = onnx_parity_report(
+                {name: model for name, model in trainer.models.items()
+                 if trainer.model_preprocessing.get(name) == 'onehot'},
+                X_test_processed
+            )
+            print("\nONNX x pickle (todos os modelos):")
+            print(onnx_report.to_string(float_format=lambda v: f"{v:.4g}"))
+            onnx_report.to_json(ONNX_REPORT_PATH, orient='index', indent=4)
+        
+        # Salvar feature names
+        feature_names_path = MODELS_DIR / "feature_names.pkl"
+        joblib.dump(serving_preprocessor.feature_names, feature_names_path)
+        print(f"Feature names salvas em: {feature_names_path}")
+        
+        # Pipeline servido pela API: features + preprocessador + modelo
+        serving_pipeline = build_pipeline(trainer.best_model, serving_preprocessor)
+        save_pipeline(serving_pipeline)
+        
+        # Estado de referência para o modo incremental (--update)
+        # (referência dos dados: o preprocessador completo, mesmo se o servido foi compactado)
+        save_training_state(build_training_state(
+            features.outputs['df'], X_train,
+            native_preprocessor.preprocessor if best_is_native else preprocessor.preprocessor,
+            trainer.best_model_name, served_metrics
+        ))
+        
+        # Limites das features de entrada: a API sinaliza valores fora do treino
+        numerical_features, _ = feature_lists(preprocessor.preprocessor)
+        detector = input_detector(numerical_features).fit(X_train)
+        detector.save()
+        
+        # Referência do monitor de drift: sketches do X de treino
+        drift = reference_monitor(X_train, preprocessor.preprocessor)
+        drift.save()
+        
+        # Bundle versionado: pipeline, ONNX, limites e referência de drift da mesma versão
+        save_bundle(
+            serving_pipeline,
+            metrics=served_metrics,
+            model_name=trainer.best_model_name,
+            feature_names=serving_preprocessor.feature_names,
+            onnx_path=onnx_path,
+            outlier_detector=detector,
+            drift_monitor=drift
         )
-    
-    # Salvar feature names
-    feature_names_path = MODELS_DIR / "feature_names.pkl"
-    joblib.dump(preprocessor.feature_names, feature_names_path)
-    print(f"Feature names salvas em: {feature_names_path}")
     
     # 8. RESUMO FINAL
     print("\n" + "="*80)
     print("RESUMO DO TREINAMENTO")
     print("="*80)
     print(f"Melhor Modelo: {trainer.best_model_name}")
-    print(f"R^2 no conjunto de teste: {results[trainer.best_model_name]['test_r2']:.4f}")
-    print(f"RMSE no conjunto de teste: ${results[trainer.best_model_name]['test_rmse']:,.2f}")
-    print(f"MAE no conjunto de teste: ${results[trainer.best_model_name]['test_mae']:,.2f}")
-    print(f"\nCross-Validation R^2 (mean +-std): {results[trainer.best_model_name]['cv_r2_mean']:.4f} ± {results[trainer.best_model_name]['cv_r2_std']:.4f}")
+    if served_metrics.get('tuned'):
+        print("(hiperparâmetros otimizados)")
+    print(f"R^2 no conjunto de teste: {served_metrics['test_r2']:.4f}")
+    print(f"RMSE no conjunto de teste: ${served_metrics['test_rmse']:,.2f}")
+    print(f"MAE no conjunto de teste: ${served_metrics['test_mae']:,.2f}")
+    print(f"\nCross-Validation R^2 (mean +-std): {served_metrics['cv_r2_mean']:.4f} ± {served_metrics['cv_r2_std']:.4f}")
     
     print("\n" + "="*80)
     print("PIPELINE CONCLUÍDO COM SUCESSO!")
@@ -154,7 +409,104 @@ def main():
     print("- best_model.onnx (se compatível)")
     print("- preprocessor.pkl")
     print("- feature_names.pkl")
+    print("- pipeline.pkl")
+    print("- outlier_detector.pkl")
+    print("- drift_reference.pkl")
+    print("- onnx_report.json")
+    print("- bundles/<versão>/ (manifest.json, pipeline.pkl, model.onnx, outlier_detector.pkl, drift_reference.pkl)")
     print("- training_results.json")
+    print("- training_profile.json")
+    
+    # Perfil de tempo e memória
+    profiler.stop()
+    print("\nSeções mais caras:")
+    profiler.print_report()
+    profiler.save()
+
+def update(new_data_path: str, compare: bool = False):
+    """
+    Ingere novas vendas sem retreinar do zero (retreino completo só se necessário)
+    
+    Com compare=True só compara, sem alterar os artefatos: o update() incremental
+    x retreino completo do modelo servido, simulados no histórico (treino + vendas
+    novas, em ordem de data).
+    """
+    print("="*80)
+    print("AMES HOUSING PRICE PREDICTION - ATUALIZAÇÃO INCREMENTAL")
+    print("="*80)
+    
+    updater = IncrementalUpdater()
+    new_df = load_dataset(new_data_path, use_cache=False)
+    if compare:
+        history = pd.concat([load_dataset(RAW_DATA_FILE), new_df], ignore_index=True)
+        if 'PID' in history.columns:
+            history = history.drop_duplicates('PID', keep='last')
+        compare_with_full_retrain(history, clone(updater.model))
+        return
+    
+    report = updater.update(new_df)
+    
+    checks = report.get('checks', {})
+    if checks:
+        print(f"MAE nas linhas novas: ${checks['new_mae']:,.2f} "
+              f"({checks['mae_ratio']:.2f}x a referência)")
+        print(f"Categorias não vistas: {checks['unseen_category_rate']:.1%} das linhas")
+    
+    if report['action'] == 'full_refit':
+        main()
+
+
+def stream(data_path: str, chunk_size: int = None):
+    """Treino out-of-core de um CSV/Parquet maior que a memória (ver src/streaming.py)"""
+    print("="*80)
+    print("AMES HOUSING PRICE PREDICTION - TREINO EM STREAMING")
+    print("="*80)
+    
+    profiler = RunProfiler().start()
+    trainer = StreamingTrainer(data_path, chunk_size=chunk_size or STREAMING_CHUNK_SIZE, profiler=profiler)
+    results = trainer.run()
+    trainer.save()
+    
+    print("\n" + "="*80)
+    print("RESULTADOS DO STREAMING")
+    print("="*80)
+    print(pd.DataFrame(results).T[['test_r2', 'test_rmse', 'test_mae', 'fit_time']].to_string())
+    print(f"\nMelhor Modelo: {trainer.best_model_name}")
+    print(f"Linhas de treino: {trainer.run_stats['n_train_rows']:,} "
+          f"| Tempo total: {trainer.run_stats['wall_time']:.1f}s")
+    
+    profiler.stop()
+    profiler.print_report()
+    profiler.save()
+
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Pipeline de treinamento Ames Housing")
+    parser.add_argument('--update', metavar='CSV',
+                        help="Ingere novas vendas de um CSV no modo incremental")
+    parser.add_argument('--compare', action='store_true',
+                        help="Com --update: compara incremental x retreino completo (tempo e R^2), "
+                             "sem alterar os artefatos")
+    parser.add_argument('--stream', metavar='ARQUIVO',
+                        help="Treino em streaming de um CSV/Parquet maior que a memória")
+    parser.add_argument('--chunk-size', type=int,
+                        help="Linhas por bloco no --stream (padrão: STREAMING_CHUNK_SIZE)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Roda todos os estágios sem usar o cache em disco")
+    parser.add_argument('--resume', action='store_true',
+                        help="Retoma uma execução interrompida (pula modelos e trials já concluídos)")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="Mede o pico de alocações por seção com tracemalloc (mais lento)")
+    parser.add_argument('--sampler', choices=['pyinstrument', 'cprofile'],
+                        help="Liga um profiler de amostragem durante o treino")
+    args = parser.parse_args()
+    
+    if args.compare and not args.update:
+        parser.error("--compare só vale com --update")
+    if args.update:
+        update(args.update, compare=args.compare)
+    elif args.stream:
+        stream(args.stream, chunk_size=args.chunk_size)
+    else:
+        main(use_cache=not args.no_cache, profile_memory=args.profile_memory,
+             sampler=args.sampler, resume=args.resume)